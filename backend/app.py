@@ -1,304 +1,121 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, g
 from flask_cors import CORS
-import requests
-from bs4 import BeautifulSoup
+import io
 import json
 import os
+import secrets
+import tempfile
+import time
 from datetime import datetime, timedelta
 import re
-import pandas as pd
+from court_data import INDIAN_COURTS_DATA, COURT_TYPES, DEFAULT_COURTS
+from hierarchy import HierarchyIndex, load_snapshot
+from geo_responses import GeoResponseCache
+from transport import RETRY_STATUSES, Transport, TransportError
+from portal import (PortalError, case_key, case_status_request, cause_list_request, normalize_case_number,
+                    normalize_cnr)
+from bulk import BulkCaseLookup, parse_batch
+from case_cache import CaseStatusCache
+from cause_lists import (ArtifactStore, CauseListStore, iter_mock_cause_list, list_seed,
+                         encode as encode_cause_list, FORMATS as CAUSE_LIST_FORMATS)
+from cause_list_pdf import render_cause_list_pdf, parse_cause_list_pdf
+from prefetch import PrefetchScheduler
+from listing_index import ListingIndex
+from page_parsers import ParserPool
+from change_feed import ChangeFeed
+from watchlists import WebhookNotifier, Watchlists
+from metrics import (HTTP_IN_FLIGHT, HTTP_LATENCY, PARSE_SECONDS, REGISTRY, RequestProfiler,
+                     SnapshotWriter)
+from exports import EXPORT_FORMATS, cause_list_table, export as export_table, geography_tables
+from storage import CourtStore
+from hierarchy_sync import HierarchySync
+from search import CauseListSearch
+from browser_pool import BrowserPool
+from records import CauseListEntries
+from lazy import LazyModule, preload as preload_modules
+from jobs import case_job, cause_list_job, open_queue
+from revalidate import DEFAULT_POLICIES, Policy, RefreshLeases, Revalidator
+from housekeeping import Housekeeper
 
 app = Flask(__name__)
 CORS(app)
 
-# Enhanced Indian Courts Data (Top 10 Major States)
-INDIAN_COURTS_DATA = {
-    "states": [
-        {
-            "code": "DL",
-            "name": "Delhi",
-            "districts": [
-                {
-                    "code": "DL01",
-                    "name": "New Delhi",
-                    "taluks": ["Connaught Place", "Parliament Street", "Chanakyapuri"],
-                    "court_complexes": ["Patiala House Court", "New Delhi District Court"]
-                },
-                {
-                    "code": "DL02",
-                    "name": "Central Delhi",
-                    "taluks": ["Daryaganj", "Paharganj", "Karol Bagh"],
-                    "court_complexes": ["Tis Hazari Court"]
-                },
-                {
-                    "code": "DL03",
-                    "name": "South Delhi",
-                    "taluks": ["Saket", "Hauz Khas", "Mehrauli"],
-                    "court_complexes": ["Saket District Court"]
-                }
-            ]
-        },
-        {
-            "code": "MH",
-            "name": "Maharashtra",
-            "districts": [
-                {
-                    "code": "MH01",
-                    "name": "Mumbai City",
-                    "taluks": ["Fort", "Colaba", "Byculla"],
-                    "court_complexes": ["City Civil Court Mumbai", "Small Causes Court"]
-                },
-                {
-                    "code": "MH02",
-                    "name": "Pune",
-                    "taluks": ["Pune City", "Haveli"],
-                    "court_complexes": ["Pune District Court"]
-                },
-                {
-                    "code": "MH03",
-                    "name": "Nagpur",
-                    "taluks": ["Nagpur Urban", "Kamptee"],
-                    "court_complexes": ["Nagpur District Court"]
-                }
-            ]
-        },
-        {
-            "code": "KA",
-            "name": "Karnataka",
-            "districts": [
-                {
-                    "code": "KA01",
-                    "name": "Bangalore Urban",
-                    "taluks": ["Bangalore North", "Bangalore South", "Anekal"],
-                    "court_complexes": ["City Civil Court Bangalore", "Family Court Bangalore"]
-                },
-                {
-                    "code": "KA02",
-                    "name": "Mysuru",
-                    "taluks": ["Mysore", "Nanjangud"],
-                    "court_complexes": ["Mysuru District Court"]
-                },
-                {
-                    "code": "KA03",
-                    "name": "Mangaluru",
-                    "taluks": ["Mangalore", "Bantwal"],
-                    "court_complexes": ["Dakshina Kannada District Court"]
-                }
-            ]
-        },
-        {
-            "code": "TN",
-            "name": "Tamil Nadu",
-            "districts": [
-                {
-                    "code": "TN01",
-                    "name": "Chennai",
-                    "taluks": ["Egmore", "Saidapet"],
-                    "court_complexes": ["Madras High Court", "City Civil Court Chennai"]
-                },
-                {
-                    "code": "TN02",
-                    "name": "Madurai",
-                    "taluks": ["Madurai North", "Madurai South"],
-                    "court_complexes": ["Madurai District Court"]
-                },
-                {
-                    "code": "TN03",
-                    "name": "Coimbatore",
-                    "taluks": ["Coimbatore North", "Sulur"],
-                    "court_complexes": ["Coimbatore District Court"]
-                }
-            ]
-        },
-        {
-            "code": "UP",
-            "name": "Uttar Pradesh",
-            "districts": [
-                {
-                    "code": "UP01",
-                    "name": "Lucknow",
-                    "taluks": ["Lucknow City", "Mohanlalganj"],
-                    "court_complexes": ["Lucknow District Court"]
-                },
-                {
-                    "code": "UP02",
-                    "name": "Varanasi",
-                    "taluks": ["Varanasi Sadar", "Pindra"],
-                    "court_complexes": ["Varanasi District Court"]
-                },
-                {
-                    "code": "UP03",
-                    "name": "Allahabad",
-                    "taluks": ["Phaphamau", "Karchana"],
-                    "court_complexes": ["Allahabad District Court"]
-                }
-            ]
-        },
-        {
-            "code": "GJ",
-            "name": "Gujarat",
-            "districts": [
-                {
-                    "code": "GJ01",
-                    "name": "Ahmedabad",
-                    "taluks": ["Ahmedabad City", "Daskroi"],
-                    "court_complexes": ["City Civil & Sessions Court Ahmedabad"]
-                },
-                {
-                    "code": "GJ02",
-                    "name": "Surat",
-                    "taluks": ["Surat City", "Olpad"],
-                    "court_complexes": ["Surat District Court"]
-                },
-                {
-                    "code": "GJ03",
-                    "name": "Vadodara",
-                    "taluks": ["Vadodara", "Savli"],
-                    "court_complexes": ["Vadodara District Court"]
-                }
-            ]
-        },
-        {
-            "code": "WB",
-            "name": "West Bengal",
-            "districts": [
-                {
-                    "code": "WB01",
-                    "name": "Kolkata",
-                    "taluks": ["Alipore", "Ballygunge"],
-                    "court_complexes": ["City Civil Court Kolkata", "Alipore Judges Court"]
-                },
-                {
-                    "code": "WB02",
-                    "name": "Howrah",
-                    "taluks": ["Howrah Sadar"],
-                    "court_complexes": ["Howrah District Court"]
-                },
-                {
-                    "code": "WB03",
-                    "name": "Darjeeling",
-                    "taluks": ["Darjeeling", "Siliguri"],
-                    "court_complexes": ["Darjeeling District Court"]
-                }
-            ]
-        },
-        {
-            "code": "RJ",
-            "name": "Rajasthan",
-            "districts": [
-                {
-                    "code": "RJ01",
-                    "name": "Jaipur",
-                    "taluks": ["Jaipur City", "Amer"],
-                    "court_complexes": ["Jaipur District Court"]
-                },
-                {
-                    "code": "RJ02",
-                    "name": "Jodhpur",
-                    "taluks": ["Jodhpur City", "Luni"],
-                    "court_complexes": ["Jodhpur District Court"]
-                },
-                {
-                    "code": "RJ03",
-                    "name": "Udaipur",
-                    "taluks": ["Udaipur", "Girwa"],
-                    "court_complexes": ["Udaipur District Court"]
-                }
-            ]
-        },
-        {
-            "code": "MP",
-            "name": "Madhya Pradesh",
-            "districts": [
-                {
-                    "code": "MP01",
-                    "name": "Bhopal",
-                    "taluks": ["Bhopal Urban", "Huzur"],
-                    "court_complexes": ["Bhopal District Court"]
-                },
-                {
-                    "code": "MP02",
-                    "name": "Indore",
-                    "taluks": ["Indore City", "Mhow"],
-                    "court_complexes": ["Indore District Court"]
-                },
-                {
-                    "code": "MP03",
-                    "name": "Gwalior",
-                    "taluks": ["Gwalior City", "Bhitarwar"],
-                    "court_complexes": ["Gwalior District Court"]
-                }
-            ]
-        },
-        {
-            "code": "KL",
-            "name": "Kerala",
-            "districts": [
-                {
-                    "code": "KL01",
-                    "name": "Thiruvananthapuram",
-                    "taluks": ["Nedumangad", "Neyyattinkara"],
-                    "court_complexes": ["Thiruvananthapuram District Court"]
-                },
-                {
-                    "code": "KL02",
-                    "name": "Ernakulam",
-                    "taluks": ["Kochi", "Aluva"],
-                    "court_complexes": ["Ernakulam District Court"]
-                },
-                {
-                    "code": "KL03",
-                    "name": "Kozhikode",
-                    "taluks": ["Kozhikode", "Vadakara"],
-                    "court_complexes": ["Kozhikode District Court"]
-                }
-            ]
-        },
-        {
-            "code": "TS",
-            "name": "Telangana",
-            "districts": [
-                {
-                    "code": "TS01",
-                    "name": "Hyderabad",
-                    "taluks": ["Secunderabad", "Charminar"],
-                    "court_complexes": ["City Civil Court Hyderabad"]
-                },
-                {
-                    "code": "TS02",
-                    "name": "Ranga Reddy",
-                    "taluks": ["Shamshabad", "Ibrahimpatnam"],
-                    "court_complexes": ["Ranga Reddy District Court"]
-                },
-                {
-                    "code": "TS03",
-                    "name": "Warangal",
-                    "taluks": ["Warangal Urban", "Hanamkonda"],
-                    "court_complexes": ["Warangal District Court"]
-                }
-            ]
-        }
-    ]
-}
+bs4 = LazyModule("bs4")
+
+# Generated files (cause-list artifacts, local SQLite stores)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+def static_path(name):
+    """Default path of a generated file; STATIC_DIR is only created once something is put there"""
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    return os.path.join(STATIC_DIR, name)
 
-COURT_TYPES = {
-    "patiala_house": ["Civil Judge", "Metropolitan Magistrate"],
-    "tis_hazari": ["Metropolitan Magistrate", "Sessions Court", "CBI Court"],
-    "mumbai_civil": ["Civil Judge Senior Division", "Small Causes Court"],
-    "bangalore_city": ["District Judge", "Family Court"],
-    "madras_high": ["Civil Appellate", "Criminal Appellate"],
-    "default": ["District Judge", "Additional District Judge", "Civil Judge"]
-}
+# Built once at startup; every dropdown lookup goes through this index.
+# It starts from the last synced tree's snapshot if there is one (so workers
+# inherit it instead of each re-reading the store), else the built-in tree.
+# swap_hierarchy() replaces it when a sync changes the stored tree.
+HIERARCHY_SNAPSHOT = os.environ.get('HIERARCHY_SNAPSHOT', os.path.join(STATIC_DIR, 'hierarchy.snapshot'))
+_snapshot = load_snapshot(HIERARCHY_SNAPSHOT)
+HIERARCHY = HierarchyIndex(_snapshot[1] if _snapshot else INDIAN_COURTS_DATA)
 
-DEFAULT_COURTS = ["District Judge", "Additional District Judge", "Civil Judge"]
+# Days of past cause lists the in-memory listing index keeps (0: today onwards)
+LISTING_RETENTION_DAYS = int(os.environ.get('LISTING_RETENTION_DAYS', 0))
+
+# How often each worker's listing index picks up lists saved by other processes
+LISTING_POLL_SECONDS = float(os.environ.get('LISTING_POLL_SECONDS', 30))
+
+
+def listing_cutoff():
+    """Earliest list date the listing index keeps, YYYY-MM-DD"""
+    return (datetime.now() - timedelta(days=LISTING_RETENTION_DAYS)).strftime('%Y-%m-%d')
 
 class ECourtsScraper:
-    def __init__(self):
-        self.base_url = "https://services.ecourts.gov.in/ecourtindia_v6/"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    def __init__(self, hierarchy=None, transport=None, base_url=None, live=None, case_cache=None,
+                 cause_list_store=None, parsers=None, change_feed=None, watchlists=None, store=None,
+                 browsers=None, revalidator=None):
+        self.hierarchy = hierarchy or HIERARCHY
+        self.base_url = base_url or os.environ.get(
+            'ECOURTS_BASE_URL', "https://services.ecourts.gov.in/ecourtindia_v6/")
+        # Portal lookups are opt-in (ECOURTS_LIVE=1); mock data otherwise
+        self.live = os.environ.get('ECOURTS_LIVE') == '1' if live is None else live
+        # Status-aware TTL cache; CASE_CACHE_DB adds a SQLite tier shared by workers
+        self.case_cache = case_cache or CaseStatusCache(db_path=os.environ.get('CASE_CACHE_DB'))
+        # Fetched and pre-fetched cause lists, served before going to the portal
+        self.cause_list_store = cause_list_store or CauseListStore(
+            os.environ.get('CAUSE_LIST_DB') or static_path('cause_lists.db'))
+        # Where each case is listed: lists this process saves go in as they land, lists
+        # other processes save when the index catches up with the store (see init_worker)
+        self.listings = ListingIndex()
+        self.listings.catch_up(self.cause_list_store, listing_cutoff())
+        self.cause_list_store.on_save(self.listings.add_list)
+        # Row-level changes between successive versions of each list
+        self.change_feed = change_feed or ChangeFeed(self.cause_list_store.path)
+        self.cause_list_store.on_save(self.change_feed.record)
+        # Pooled, rate-limited, retrying client shared by every request thread
+        self.transport = transport or Transport()
+        # Leased headless browsers for case-status pages that need JavaScript and a session; plain HTTP if None
+        self.browsers = browsers
+        # Stale-while-revalidate for /api/search and /api/cause-list in live mode; off if None
+        self.revalidator = revalidator
+        # lxml page parsing, in worker processes for anything bigger than a case page
+        self.parsers = parsers or ParserPool(int(os.environ.get('PARSE_WORKERS', 0)) or None)
+        # Users' watched cases, matched against every cause list that lands
+        # WEBHOOK_ALLOW_PRIVATE=1 lets webhooks point at private addresses (a local sink in development)
+        allow_private = os.environ.get('WEBHOOK_ALLOW_PRIVATE') == '1'
+        self.watchlists = watchlists or Watchlists(
+            os.environ.get('WATCHLIST_DB') or static_path('watchlists.db'),
+            resolve=self.watch_keys, allow_private_webhooks=allow_private)
+        if self.watchlists.notifier is None:
+            self.watchlists.notifier = WebhookNotifier(self.watchlists.webhook, delivered=self.watchlists.delivered,
+                                                       allow_private=allow_private)
+        self.cause_list_store.on_save(self.watchlists.on_cause_list)
+        # Hierarchy, fetched cases and every cause-list entry, indexed for per-case queries
+        self.store = store or CourtStore(os.environ.get('COURT_DB') or static_path('court.db'))
+        self.store.seed_hierarchy(self.hierarchy)
+        self.cause_list_store.on_save(self.store.save_cause_list)
+        # Typo-tolerant search over the stored entries' parties and case numbers
+        self.search = CauseListSearch(self.store)
         # Government data sources
         self.data_sources = {
             'census': 'https://censusindia.gov.in/',
@@ -309,87 +126,43 @@ class ECourtsScraper:
     def get_all_states(self):
         """Get all states with codes"""
         try:
-            states = []
-            for state in INDIAN_COURTS_DATA["states"]:
-                states.append({
-                    "code": state["code"],
-                    "name": state["name"],
-                    "total_districts": len(state["districts"])
-                })
-            return states
+            return list(self.hierarchy.state_rows)
         except Exception as e:
             return {"error": f"Error fetching states: {str(e)}"}
 
     def get_all_districts(self, state_code=None):
         """Get all districts or filtered by state"""
         try:
-            districts = []
-            for state in INDIAN_COURTS_DATA["states"]:
-                if state_code and state["code"] != state_code:
-                    continue
-                for district in state["districts"]:
-                    districts.append({
-                        "state_code": state["code"],
-                        "state_name": state["name"],
-                        "district_code": district["code"],
-                        "district_name": district["name"],
-                        "total_taluks": len(district.get("taluks", [])),
-                        "court_complexes": district.get("court_complexes", [])
-                    })
-            return districts
+            return list(self.hierarchy.districts(state_code))
         except Exception as e:
             return {"error": f"Error fetching districts: {str(e)}"}
 
     def get_all_taluks(self, state_code=None, district_code=None):
         """Get all taluks with filtering options"""
         try:
-            taluks = []
-            for state in INDIAN_COURTS_DATA["states"]:
-                if state_code and state["code"] != state_code:
-                    continue
-                for district in state["districts"]:
-                    if district_code and district["code"] != district_code:
-                        continue
-                    for taluk in district.get("taluks", []):
-                        taluks.append({
-                            "state_code": state["code"],
-                            "state_name": state["name"],
-                            "district_code": district["code"],
-                            "district_name": district["name"],
-                            "taluk_name": taluk
-                        })
-            return taluks
+            return list(self.hierarchy.taluks(state_code, district_code))
         except Exception as e:
             return {"error": f"Error fetching taluks: {str(e)}"}
 
     def fetch_live_district_data(self, state_name):
-        """Fetch live district data from government sources"""
-        try:
-            # Mock implementation - replace with actual API calls
-            if state_name.lower() == "maharashtra":
-                return [
-                    {"name": "Mumbai City", "taluks": ["Fort", "Colaba"]},
-                    {"name": "Pune", "taluks": ["Pune City", "Haveli"]}
-                ]
-            elif state_name.lower() == "karnataka":
-                return [
-                    {"name": "Bangalore Urban", "taluks": ["Bangalore North", "Bangalore South"]}
-                ]
-            else:
-                return []
-        except Exception as e:
-            print(f"Error fetching live data: {e}")
-            return []
+        """Districts of a state, with taluks, from the (synced) hierarchy"""
+        for state in self.hierarchy.state_rows:
+            if state["name"].lower() == state_name.lower():
+                return [{"name": district["district_name"],
+                         "taluks": [taluk["taluk_name"] for taluk in
+                                    self.hierarchy.taluks(state["code"], district["district_code"])]}
+                        for district in self.hierarchy.districts(state["code"])]
+        return []
 
     def scrape_government_data(self):
         """Scrape data from government portals"""
         try:
             # Example: Scrape district information
             govt_url = "https://lgdirectory.gov.in/"
-            response = self.session.get(govt_url, timeout=10)
+            response = self.transport.get(govt_url, deadline=10)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = bs4.BeautifulSoup(response.content, 'html.parser')
                 # Parse the data based on website structure
                 # This is a placeholder - actual parsing would depend on the site structure
                 return {"message": "Government data scraping placeholder"}
@@ -402,9 +175,137 @@ class ECourtsScraper:
     def get_case_status(self, case_details):
         """Fetch case status using CNR or Case Type, Number, Year"""
         try:
-            return self.get_mock_case_data(case_details)
+            result = self.case_cache.get_or_fetch(
+                case_key(case_details), lambda: self.lookup_case(case_details))
+            return self.apply_listing(case_details, result)
+        except Exception as e:
+            return self.case_error(case_details, e)
+
+    def case_error(self, case_details, error):
+        """The answer to a failed lookup"""
+        if isinstance(error, TransportError):
+            # The portal is failing or overloaded: the last status we stored beats an error
+            stale = self.last_known_case(case_details, str(error))
+            if stale is not None:
+                return stale
+            return {"error": f"Portal unavailable: {error}", "retry_after": getattr(error, "retry_after", 0.0)}
+        return {"error": f"Error fetching case: {str(error)}"}
+
+    def revalidating(self, endpoint):
+        return self.live and self.revalidator is not None and self.revalidator.enabled(endpoint)
+
+    def serve_case_status(self, case_details):
+        """get_case_status for /api/search: (result, fetched_at, how it was served).
+
+        With stale-while-revalidate the case's last stored status is served
+        by its age (see revalidate.py); fetched_at and how are None otherwise.
+        """
+        if not self.revalidating("search"):
+            return self.get_case_status(case_details), None, None
+        try:
+            result, fetched_at, served = self.revalidator.serve(
+                "search", f"case:{case_key(case_details)}",
+                load=lambda: self.stored_case(case_details),
+                fetch=lambda: self.lookup_and_cache(case_details),
+                job=case_job(self, case_details) if self.revalidator.queue is not None else None)
         except Exception as e:
-            return {"error": f"Error fetching case: {str(e)}"}
+            return self.case_error(case_details, e), None, None
+        return self.apply_listing(case_details, result), fetched_at, served
+
+    def stored_case(self, case_details):
+        """(last stored status, stored at) for a case, or None if it was never looked up"""
+        case = self.store.case(cnr=normalize_cnr(case_details.get('cnr')) or None,
+                               case_number=normalize_case_number(case_details.get('case_type'),
+                                                                 case_details.get('case_number'),
+                                                                 case_details.get('case_year')) or None)
+        if case is None:
+            return None
+        return ({name: case[name] for name in ("case_number", "parties", "court", "status", "hearing_date", "cnr")},
+                case["updated_at"])
+
+    def last_known_case(self, case_details, reason):
+        """The case's last stored status, marked stale, or None if it was never looked up"""
+        stored = self.stored_case(case_details)
+        if stored is None:
+            return None
+        result = self.apply_listing(case_details, stored[0])
+        result.update(stale=True, as_of=datetime.fromtimestamp(stored[1]).isoformat(), stale_reason=reason)
+        return result
+
+    def apply_listing(self, case_details, result):
+        """Copy of result with listed_today/listed_tomorrow/serial_number from ingested cause lists"""
+        if "error" in result:
+            return result
+        details = dict(case_details)
+        details.setdefault('cnr', result.get('cnr'))
+        if not details.get('case_number') and result.get('case_number'):
+            details['case_type'], _, rest = result['case_number'].partition('/')
+            details['case_number'], _, details['case_year'] = rest.partition('/')
+
+        today = datetime.now().strftime('%d/%m/%Y')
+        tomorrow = (datetime.now() + timedelta(days=1)).strftime('%d/%m/%Y')
+        listings = [listing for listing in self.listings.listings_for(details)
+                    if listing["date"] in (today, tomorrow)]
+        result = dict(result)
+        result["listed_today"] = any(listing["date"] == today for listing in listings)
+        result["listed_tomorrow"] = any(listing["date"] == tomorrow for listing in listings)
+        result["listings"] = listings
+        if listings:
+            first = min(listings, key=lambda listing: (listing["date"] != today, listing["serial_no"]))
+            result["serial_number"] = first["serial_no"]
+            result["court"] = f"{first['court']}, {first['court_complex']}"
+            result["hearing_date"] = first["date"]
+        return result
+
+    def watch_keys(self, case_details):
+        """Extra keys to watch a case under: a CNR's case number, read from its status page"""
+        if not self.live or not normalize_cnr(case_details.get('cnr')):
+            return []
+        result = self.get_case_status({'cnr': case_details['cnr']})
+        key = normalize_case_number(result.get('case_number', ''))
+        return [key] if key else []
+
+    def lookup_case(self, case_details):
+        """Uncached case lookup (portal in live mode, mock data otherwise)"""
+        if self.live:
+            result = self.fetch_case_status(case_details)
+            self.store.save_case(result)
+            return result
+        return self.get_mock_case_data(case_details)
+
+    def lookup_and_cache(self, case_details):
+        """Uncached case lookup that replaces the cached status; (result, fetched_at)"""
+        result = self.lookup_case(case_details)
+        self.case_cache.set(case_key(case_details), result)
+        return result, time.time()
+
+    def refresh_case(self, case_details):
+        """Re-fetch a case and replace its cached status (the job queue's case handler)"""
+        result, _ = self.lookup_and_cache(case_details)
+        if "error" in result:
+            raise PortalError(result["error"])
+        return result
+
+    def fetch_case_status(self, case_details):
+        """Fetch and parse a case-status page from the portal"""
+        method, url, form = case_status_request(self.base_url, case_details)
+        if self.browsers is not None:
+            self.transport.throttle(url)
+            status = None
+            started = time.monotonic()
+            try:
+                with self.browsers.lease() as browser:
+                    status, text = browser.post(url, form)
+            finally:
+                self.transport.record(url, None if status is None else
+                                      status not in RETRY_STATUSES and status != 0
+                                      and time.monotonic() - started <= self.transport.slow_call_seconds)
+        else:
+            response = self.transport.request(method, url, data=form)
+            status, text = response.status_code, response.text
+        if status != 200:
+            return {"error": f"Portal returned HTTP {status}"}
+        return self.parsers.parse("case_status", text)
 
     def get_mock_case_data(self, case_details):
         """Return mock data for demonstration"""
@@ -435,75 +336,350 @@ class ECourtsScraper:
 
     def get_state_name(self, state_code):
         """Get state name from state code"""
-        for state in INDIAN_COURTS_DATA["states"]:
-            if state["code"] == state_code:
-                return state["name"]
-        return "Unknown State"
+        return self.hierarchy.state_name(state_code, "Unknown State")
 
     def get_states(self):
         """Get list of states"""
-        return [{"code": state["code"], "name": state["name"]} for state in INDIAN_COURTS_DATA["states"]]
+        return list(self.hierarchy.states)
 
     def get_districts(self, state_code):
         """Get districts for a state"""
-        for state in INDIAN_COURTS_DATA["states"]:
-            if state["code"] == state_code:
-                return [{"code": district["code"], "name": district["name"]} for district in state["districts"]]
-        return []
+        return list(self.hierarchy.district_options(state_code))
 
     def get_court_complexes(self, state_code, district_code):
         """Get court complexes for a district"""
-        for state in INDIAN_COURTS_DATA["states"]:
-            if state["code"] == state_code:
-                for district in state["districts"]:
-                    if district["code"] == district_code:
-                        return district["court_complexes"]
-        return []
+        return list(self.hierarchy.court_complexes(state_code, district_code))
 
     def get_courts(self, state_code, district_code, court_complex_code):
         """Get courts for a court complex"""
-        return COURT_TYPES.get(court_complex_code, DEFAULT_COURTS)
+        return list(self.hierarchy.courts(court_complex_code)) or COURT_TYPES.get(court_complex_code, DEFAULT_COURTS)
 
-    def download_cause_list(self, date_type="today"):
-        """Download cause list for today or tomorrow"""
+    def download_cause_list(self, date_type="today", court_complex=None, court=None, date=None):
+        """Download cause list for today or tomorrow (or an explicit YYYY-MM-DD date)"""
         try:
-            if date_type == "today":
-                date_str = datetime.now().strftime('%d/%m/%Y')
+            if date:
+                list_date = datetime.strptime(date, '%Y-%m-%d')
+            elif date_type == "today":
+                list_date = datetime.now()
             else:
-                date_str = (datetime.now() + timedelta(days=1)).strftime('%d/%m/%Y')
-            
-            cause_list = self.generate_mock_cause_list()
-            filename = f"cause_list_{date_type}_{datetime.now().strftime('%Y%m%d')}.json"
-                
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(cause_list, f, indent=2, ensure_ascii=False)
-            
-            return {"success": True, "filename": filename, "data": cause_list}
+                list_date = datetime.now() + timedelta(days=1)
+            date_str = list_date.strftime('%d/%m/%Y')
+            key = f"{court_complex or 'all'}|{court or 'all'}|{list_date.strftime('%Y%m%d')}"
+
+            entries = fetched_at = served = None
+            if court_complex and self.revalidating("cause_list"):
+                entries, fetched_at, served = self.revalidator.serve(
+                    "cause_list", f"cause_list:{court_complex}:{date_str}",
+                    load=lambda: self.cause_list_store.stored(court_complex, date_str),
+                    fetch=lambda: self.fetch_and_store_cause_list(court_complex, date_str),
+                    job=cause_list_job(self, court_complex, date_str) if self.revalidator.queue is not None else None)
+                # Each version of the list gets its own rendered artifacts
+                key = f"{key}|{int(fetched_at)}"
+
+            return {
+                "success": True,
+                "filename": f"cause_list_{date_type}_{list_date.strftime('%Y%m%d')}",
+                "date": date_str,
+                "key": key,
+                "fetched_at": fetched_at,
+                "served": served,
+                "entries": self.iter_cause_list(court_complex, court, date_str, entries)
+            }
+        except TransportError as e:
+            return {"error": f"Portal unavailable: {e}", "retry_after": getattr(e, "retry_after", 0.0)}
         except Exception as e:
             return {"error": f"Error downloading cause list: {str(e)}"}
 
+    def iter_cause_list(self, court_complex=None, court=None, date_str=None, entries=None):
+        """Yield cause-list entries one at a time: the given ones, else from the warm store when pre-fetched"""
+        if entries is None and court_complex:
+            entries = self.cause_list_store.load(court_complex, date_str)
+            if entries is None and self.live:
+                entries = self.fetch_cause_list(court_complex, date_str)
+                self.cause_list_store.save(court_complex, date_str, entries)
+        if entries is None:
+            return iter_mock_cause_list(seed=list_seed(court_complex, court, date_str))
+        if court:
+            court = court.lower()
+            return (entry for entry in entries if court in entry.get("court", "").lower())
+        # A block fetched just now is passed whole, so the encoders can write JSON from its columns
+        return entries if isinstance(entries, CauseListEntries) else iter(entries)
+
+    def fetch_cause_list(self, court_complex, date_str):
+        """Fetch and parse a court complex's cause list (dd/mm/YYYY) from the portal"""
+        state_code, district_code = self.hierarchy.parents_of_complex(court_complex) or (None, None)
+        method, url, form = cause_list_request(
+            self.base_url, state_code, district_code, court_complex, date_str)
+        response = self.transport.request(method, url, data=form)
+        if response.status_code != 200:
+            raise PortalError(f"Portal returned HTTP {response.status_code}")
+        if response.content.startswith(b"%PDF"):
+            with PARSE_SECONDS.time(kind="cause_list_pdf"):
+                return CauseListEntries(parse_cause_list_pdf(response.content, workers=1)["rows"])
+        if 'html' in response.headers.get('Content-Type', ''):
+            return self.parsers.parse("cause_list", response.text)
+        raise PortalError("Cause list response is neither a PDF nor an HTML page")
+
+    def refresh_cause_list(self, court_complex, date_str):
+        """Fetch a complex's list into the store; returns its entry count (the job queue's cause-list handler)"""
+        return self.cause_list_store.save(court_complex, date_str, self.fetch_cause_list(court_complex, date_str))
+
+    def fetch_and_store_cause_list(self, court_complex, date_str):
+        """Fetch a complex's list into the store; (entries, fetched_at)"""
+        entries = self.fetch_cause_list(court_complex, date_str)
+        fetched_at = time.time()
+        self.cause_list_store.save(court_complex, date_str, entries, fetched_at=fetched_at)
+        return entries, fetched_at
+
     def generate_mock_cause_list(self):
         """Generate mock cause list data"""
-        import random
-        courts = ["Court Room 1 - Justice Sharma", "Court Room 2 - Justice Verma"]
-        case_types = ["CIVIL", "CRIMINAL", "FAMILY", "LABOR"]
-        
-        cause_list = []
-        for i in range(20):
-            case_entry = {
-                "serial_no": i + 1,
-                "case_number": f"{random.choice(case_types)}/{random.randint(100, 999)}/{random.randint(2018, 2024)}",
-                "parties": f"Party {random.randint(1, 100)} vs. Party {random.randint(1, 100)}",
-                "court": random.choice(courts),
-                "hearing_time": f"{random.randint(10, 16)}:{random.choice(['00', '15', '30', '45'])}",
-                "purpose": random.choice(["Hearing", "Arguments", "Evidence", "Judgment"])
-            }
-            cause_list.append(case_entry)
-        
-        return cause_list
+        return list(iter_mock_cause_list())
+
+# Static geography bodies are rendered and compressed once per filter combination
+GEO_RESPONSES = GeoResponseCache(HIERARCHY)
+
+# Rendered cause lists, kept briefly so repeat and resumed downloads skip regeneration
+CAUSE_LIST_ARTIFACTS = ArtifactStore(os.environ.get(
+    'CAUSE_LIST_CACHE_DIR', os.path.join(STATIC_DIR, 'cause_lists')))
+
+# Geography tables for /api/export-data; batches are produced per export, not held
+EXPORT_TABLES = geography_tables(HIERARCHY)
+
+# How long one change-feed SSE connection is held open before the client reconnects
+CHANGE_STREAM_SECONDS = float(os.environ.get('CHANGE_STREAM_SECONDS', 300))
+
+# Process-pool size for PDF page parsing (default: one per CPU)
+PDF_PARSE_WORKERS = int(os.environ.get('PDF_PARSE_WORKERS', 0)) or None
+
+# Per-process state: connection pool, SQLite connections, background threads.
+# Never shared across fork, and never built by importing this module: see
+# init_worker(), create_app() and gunicorn.conf.py.
+scraper = None
+BULK_LOOKUP = None
+PREFETCH = None
+METRICS_WRITER = None
+HIERARCHY_SYNC = None
+JOB_QUEUE = None
+HOUSEKEEPING = None
+
+# Under gunicorn each worker publishes its metrics here so /metrics can merge them
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+# Opt-in cProfile of single requests: send X-Profile: <PROFILE_TOKEN>, or sample a fraction
+PROFILER = RequestProfiler(
+    os.environ.get('PROFILE_DIR', os.path.join(STATIC_DIR, 'profiles')),
+    token=os.environ.get('PROFILE_TOKEN'),
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+)
+
+
+def swap_hierarchy(data):
+    """Switch to a new hierarchy and everything rendered from it.
+
+    The replacements are built first and then swapped in by rebinding;
+    requests already holding the old index finish with it.
+    """
+    global HIERARCHY, GEO_RESPONSES, EXPORT_TABLES
+    hierarchy = HierarchyIndex(data)
+    responses = GeoResponseCache(hierarchy)
+    responses.warm()
+    tables = geography_tables(hierarchy)
+    HIERARCHY, GEO_RESPONSES, EXPORT_TABLES = hierarchy, responses, tables
+    if scraper is not None:
+        scraper.hierarchy = hierarchy
+
+
+def init_worker():
+    """Build this process's scraper, transport and background jobs"""
+    global scraper, BULK_LOOKUP, PREFETCH, METRICS_WRITER, HIERARCHY_SYNC, JOB_QUEUE, HOUSEKEEPING
+    # The per-host upstream budget is split across the server's worker processes
+    rate = float(os.environ.get('UPSTREAM_RATE_PER_HOST', 5.0)) / int(os.environ.get('WEB_CONCURRENCY', 1))
+    # Per-host circuit breakers and adaptive concurrency limits; =0 turns either off
+    scraper = ECourtsScraper(transport=Transport(
+        rate_per_host=rate,
+        breaker=None if os.environ.get('UPSTREAM_BREAKER') != '0' else False,
+        limiter=None if os.environ.get('UPSTREAM_ADAPTIVE_LIMIT') != '0' else False,
+        slow_call_seconds=float(os.environ.get('UPSTREAM_SLOW_SECONDS', 10.0))
+    ))
+    # Lists other workers and job workers save reach this worker's listing index within a poll
+    scraper.listings.follow(scraper.cause_list_store, listing_cutoff, poll_interval=LISTING_POLL_SECONDS)
+    # Batch lookups fan out over asyncio instead of one Flask request per case
+    BULK_LOOKUP = BulkCaseLookup(scraper)
+    # With JOB_QUEUE_URL scraping runs as jobs (jobs.py) that workers on any node pick up
+    if os.environ.get('JOB_QUEUE_URL'):
+        JOB_QUEUE = open_queue(host_limit=int(os.environ.get('JOB_HOST_LIMIT', 4)))
+    # Stored cases and cause lists are served by age (SWR_SEARCH, SWR_CAUSE_LIST) and refreshed
+    # in the background, once per key across workers (as jobs, with a job queue)
+    scraper.revalidator = Revalidator(
+        {endpoint: Policy.from_env(endpoint) for endpoint in DEFAULT_POLICIES},
+        leases=RefreshLeases(os.environ.get('SWR_LEASE_DB') or static_path('refresh_leases.db')),
+        queue=JOB_QUEUE,
+        workers=int(os.environ.get('SWR_REFRESH_WORKERS', 4))
+    )
+    # Next-day cause lists are pre-fetched off-peak when PREFETCH_ENABLED=1 (enqueued, with a job queue)
+    PREFETCH = PrefetchScheduler(
+        scraper,
+        workers=int(os.environ.get('PREFETCH_WORKERS', 8)),
+        start_at=os.environ.get('PREFETCH_AT', '21:00'),
+        lock_path=static_path('prefetch.lock'),
+        queue=JOB_QUEUE
+    )
+    if os.environ.get('PREFETCH_ENABLED') == '1':
+        PREFETCH.start()
+    # Every worker follows the stored hierarchy; with HIERARCHY_SYNC_ENABLED=1 one of them crawls it
+    HIERARCHY_SYNC = HierarchySync(
+        scraper.store,
+        base_url=scraper.base_url,
+        rate_per_host=float(os.environ.get('HIERARCHY_SYNC_RATE', 20.0)),
+        interval=float(os.environ.get('HIERARCHY_SYNC_HOURS', 24)) * 3600,
+        lock_path=static_path('hierarchy_sync.lock'),
+        snapshot_path=HIERARCHY_SNAPSHOT
+    )
+    # A tree from the snapshot still at the stored version needs no comparing
+    HIERARCHY_SYNC.watch(swap_hierarchy, current=scraper.hierarchy.data(),
+                         current_version=_snapshot[0] if _snapshot else None)
+    if os.environ.get('HIERARCHY_SYNC_ENABLED') == '1':
+        HIERARCHY_SYNC.start()
+    # Aged-out rows and files are swept every HOUSEKEEPING_MINUTES, by one worker at a time
+    HOUSEKEEPING = Housekeeper(
+        interval=float(os.environ.get('HOUSEKEEPING_MINUTES', 60)) * 60,
+        lock_path=static_path('housekeeping.lock')
+    )
+    change_feed_days = int(os.environ.get('CHANGE_FEED_DAYS', 30))
+    HOUSEKEEPING.register('change_feed', lambda: scraper.change_feed.purge(change_feed_days))
+    HOUSEKEEPING.register('cause_list_artifacts', CAUSE_LIST_ARTIFACTS.purge)
+    HOUSEKEEPING.register('listings', lambda: scraper.listings.drop_before(listing_cutoff()), per_process=True)
+    if scraper.case_cache.disk is not None:
+        HOUSEKEEPING.register('case_cache', scraper.case_cache.disk.purge_expired)
+    HOUSEKEEPING.start()
+    # BROWSER_POOL_SIZE=N keeps N headless browsers per worker for case lookups
+    browsers = int(os.environ.get('BROWSER_POOL_SIZE', 0))
+    if browsers:
+        scraper.browsers = BrowserPool(
+            browsers,
+            warm_url=f"{scraper.base_url}?p=casestatus/index",
+            max_pages=int(os.environ.get('BROWSER_MAX_PAGES', 500)),
+            max_rss_mb=int(os.environ.get('BROWSER_MAX_RSS_MB', 1024)),
+            lease_timeout=float(os.environ.get('BROWSER_LEASE_TIMEOUT', 30)),
+            max_waiting=int(os.environ.get('BROWSER_MAX_WAITING', 4 * browsers))
+        ).start()
+    if METRICS_DIR:
+        METRICS_WRITER = SnapshotWriter(METRICS_DIR).start()
+
+
+def shutdown(timeout=30):
+    """Stop background jobs and let in-flight upstream calls finish; True if drained"""
+    expires = time.monotonic() + timeout
+    drained = True
+    if PREFETCH is not None:
+        drained = PREFETCH.stop(timeout) and drained
+    if HIERARCHY_SYNC is not None:
+        drained = HIERARCHY_SYNC.stop(max(0.0, expires - time.monotonic())) and drained
+        HIERARCHY_SYNC.transport.close()
+    if HOUSEKEEPING is not None:
+        HOUSEKEEPING.stop(max(0.0, expires - time.monotonic()))
+    if scraper is not None:
+        scraper.listings.stop()
+        if scraper.revalidator is not None:
+            scraper.revalidator.close(wait=False)
+        drained = scraper.transport.drain(max(0.0, expires - time.monotonic())) and drained
+        scraper.watchlists.notifier.stop(max(0.0, expires - time.monotonic()))
+        if scraper.browsers is not None:
+            drained = scraper.browsers.close(max(0.0, expires - time.monotonic())) and drained
+        scraper.transport.close()
+        scraper.parsers.close()
+    if METRICS_WRITER is not None:
+        METRICS_WRITER.stop()
+    return drained
+
+
+@REGISTRY.collector
+def scraper_metrics():
+    """Case cache, transport and webhook stats as Prometheus samples"""
+    if scraper is None:
+        return []
+    cache = scraper.case_cache.stats()
+    transport = scraper.transport.metrics.snapshot()
+    notifier = scraper.watchlists.notifier.stats()
+    revalidate = scraper.revalidator.stats() if scraper.revalidator is not None else dict.fromkeys(
+        ("fresh", "stale", "expired", "miss", "refreshes"), 0)
+    return [
+        ("case_cache_lookups_total", "counter", "Case-status cache lookups by outcome", ("result",),
+         [((result,), cache[result]) for result in ("hits", "disk_hits", "misses", "coalesced")]),
+        ("case_cache_entries", "gauge", "Case statuses held in memory", (), [((), cache["memory_entries"])]),
+        ("revalidate_served_total", "counter", "Stale-while-revalidate answers by how they were served", ("served",),
+         [((served,), revalidate[served]) for served in ("fresh", "stale", "expired", "miss")]),
+        ("revalidate_refreshes_total", "counter", "Stale-while-revalidate refreshes fetched by this worker", (),
+         [((), revalidate["refreshes"])]),
+        ("upstream_retries_total", "counter", "Portal request retries", (), [((), transport["retries"])]),
+        ("upstream_deadline_exceeded_total", "counter", "Portal requests that ran out of deadline", (),
+         [((), transport["deadline_exceeded"])]),
+        ("upstream_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection", (),
+         [((), transport["pool_wait_seconds"])]),
+        ("upstream_rate_limit_wait_seconds_total", "counter", "Time spent waiting on per-host rate limits", (),
+         [((), transport["rate_limit_wait_seconds"])]),
+        ("webhook_events_total", "counter", "Watchlist notification events by outcome", ("outcome",),
+         [(("sent",), notifier["sent_events"]), (("dropped",), notifier["dropped_events"])]),
+        # Per worker, so a worker left on an old tree shows up
+        ("hierarchy_version", "gauge", "Version of the court hierarchy this worker serves", (),
+         [((), HIERARCHY_SYNC.version or 0)], "pid"),
+    ]
+
+
+def create_app():
+    """The app with this process's worker state built: flask --app 'app:create_app()' run,
+    or a WSGI server without gunicorn.conf.py (whose post_fork calls init_worker())"""
+    if scraper is None:
+        init_worker()
+    return app
+
+
+@REGISTRY.derived
+def case_cache_hit_ratio(families):
+    """Hit ratio of the case cache over all workers' merged lookups, not a sum of per-worker ratios"""
+    lookups = families.get("case_cache_lookups_total")
+    if lookups is None:
+        return []
+    counts = {key[0]: value for key, value in lookups["samples"].items()}
+    total = sum(counts.values())
+    hits = counts.get("hits", 0) + counts.get("disk_hits", 0)
+    return [("case_cache_hit_ratio", "gauge", "Share of case-status lookups served from cache", (),
+             [((), round(hits / total, 4) if total else 0.0)])]
+
+
+if os.environ.get('ECOURTS_PRELOAD') == '1':
+    # Preloading master: render shared read-only data and import the libraries
+    # other modules defer (lazy.PRELOAD_MODULES) once, before workers fork
+    GEO_RESPONSES.warm()
+    preload_modules()
+
+@app.before_request
+def start_request_metrics():
+    g.started = time.perf_counter()
+    g.route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_IN_FLIGHT.inc(route=g.route)
+    if PROFILER.enabled and PROFILER.wanted(request.headers.get('X-Profile')):
+        g.profiler = PROFILER.start()
 
-# Initialize scraper
-scraper = ECourtsScraper()
+@app.after_request
+def record_request_metrics(response):
+    if 'started' in g:
+        HTTP_LATENCY.observe(time.perf_counter() - g.started, route=g.route, method=request.method,
+                             status=response.status_code)
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        response.headers['X-Profile-Dump'] = PROFILER.finish(profiler, g.route)
+    return response
+
+@app.teardown_request
+def end_request_metrics(error=None):
+    if 'route' in g:
+        HTTP_IN_FLIGHT.dec(route=g.route)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition (all workers when METRICS_DIR is set)"""
+    return Response(REGISTRY.render(METRICS_DIR), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -511,14 +687,26 @@ def index():
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "transport": scraper.transport.metrics.snapshot(),
+        "upstream_hosts": scraper.transport.host_states(),
+        "case_cache": scraper.case_cache.stats(),
+        "watchlists": scraper.watchlists.stats(),
+        "search": scraper.search.stats(),
+        "browsers": scraper.browsers.stats() if scraper.browsers is not None else None,
+        "hierarchy": HIERARCHY_SYNC.status(),
+        "jobs": JOB_QUEUE.stats() if JOB_QUEUE is not None else None,
+        "housekeeping": HOUSEKEEPING.status() if HOUSEKEEPING is not None else None,
+        "revalidate": scraper.revalidator.stats() if scraper.revalidator is not None else None
+    })
 
 # Enhanced API endpoints for geographical data
 @app.route('/api/all-states', methods=['GET'])
 def get_all_states():
     """Get all states with complete information"""
-    states = scraper.get_all_states()
-    return jsonify({"states": states, "total": len(states)})
+    return GEO_RESPONSES.all_states().to_response()
 
 @app.route('/api/all-districts', methods=['GET', 'POST'])
 def get_all_districts():
@@ -529,8 +717,7 @@ def get_all_districts():
     else:
         state_code = request.args.get('state_code')
     
-    districts = scraper.get_all_districts(state_code)
-    return jsonify({"districts": districts, "total": len(districts)})
+    return GEO_RESPONSES.all_districts(state_code).to_response()
 
 @app.route('/api/all-taluks', methods=['GET', 'POST'])
 def get_all_taluks():
@@ -543,37 +730,26 @@ def get_all_taluks():
         state_code = request.args.get('state_code')
         district_code = request.args.get('district_code')
     
-    taluks = scraper.get_all_taluks(state_code, district_code)
-    return jsonify({"taluks": taluks, "total": len(taluks)})
+    return GEO_RESPONSES.all_taluks(state_code, district_code).to_response()
 
 @app.route('/api/geographical-data', methods=['GET'])
 def get_complete_geographical_data():
     """Get complete geographical hierarchy"""
-    complete_data = []
-    
-    for state in INDIAN_COURTS_DATA["states"]:
-        state_data = {
-            "state_code": state["code"],
-            "state_name": state["name"],
-            "districts": []
-        }
-        
-        for district in state["districts"]:
-            district_data = {
-                "district_code": district["code"],
-                "district_name": district["name"],
-                "taluks": district.get("taluks", []),
-                "court_complexes": district.get("court_complexes", [])
-            }
-            state_data["districts"].append(district_data)
-        
-        complete_data.append(state_data)
-    
-    return jsonify({
-        "geographical_data": complete_data,
-        "total_states": len(complete_data),
-        "total_districts": sum(len(state["districts"]) for state in complete_data)
-    })
+    return GEO_RESPONSES.geographical_data().to_response()
+
+def unavailable(result):
+    """503 for a lookup failed fast because the portal is failing, with when to try again"""
+    response = jsonify(result)
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, round(result['retry_after'])))
+    return response
+
+def with_age(response, fetched_at, served):
+    """Age and X-Cache (fresh, stale, expired or miss) on a stale-while-revalidate answer"""
+    if served is not None:
+        response.headers['Age'] = str(max(0, int(time.time() - fetched_at)))
+        response.headers['X-Cache'] = served
+    return response
 
 @app.route('/api/search', methods=['POST'])
 def search_case():
@@ -582,37 +758,233 @@ def search_case():
         search_type = data.get('search_type')
         
         if search_type == 'cnr':
-            result = scraper.get_case_status({'cnr': data.get('cnr')})
+            result, fetched_at, served = scraper.serve_case_status({'cnr': data.get('cnr')})
         else:
-            result = scraper.get_case_status({
+            result, fetched_at, served = scraper.serve_case_status({
                 'case_type': data.get('case_type'),
                 'case_number': data.get('case_number'),
                 'case_year': data.get('case_year')
             })
         
-        return jsonify(result)
+        if result.get('retry_after') is not None:
+            return unavailable(result)
+        return with_age(jsonify(result), fetched_at, served)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/cause-list', methods=['POST'])
-def cause_list():
+@app.route('/api/case-history', methods=['GET'])
+def case_history():
+    """A fetched case, its recorded hearings and every stored cause-list listing of it"""
+    cnr = normalize_cnr(request.args.get('cnr'))
+    case_number = normalize_case_number(request.args.get('case_type'), request.args.get('case_number'),
+                                        request.args.get('case_year'))
+    if not cnr and not case_number:
+        return jsonify({"error": "Give a cnr, or case_type, case_number and case_year"}), 400
+    stored = scraper.store.case(cnr=cnr, case_number=case_number)
+    if stored is not None:
+        cnr = cnr or stored['cnr']
+        case_number = case_number or normalize_case_number(stored['case_number'] or '')
+    return jsonify({
+        "case": stored,
+        "listings": scraper.store.listings(case_number=case_number, cnr=cnr, since=request.args.get('since'))
+    })
+
+@app.route('/api/cause-list/search', methods=['GET'])
+def cause_list_search():
+    """Stored cause-list entries by party (typos and a trailing * allowed) or case-number prefix, newest first"""
+    args = request.args
+    try:
+        page = scraper.search.search(
+            party=args.get('party'),
+            case_number=args.get('case_number'),
+            court_complex=args.get('court_complex'),
+            court=args.get('court'),
+            purpose=args.get('purpose'),
+            since=args.get('since'),
+            until=args.get('until'),
+            fuzzy=args.get('fuzzy', 'auto'),
+            limit=max(1, min(int(args.get('limit', 20)), 100)),
+            cursor=args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page)
+
+@app.route('/api/search/batch', methods=['POST'])
+def search_cases_batch():
+    """Look up many cases at once, streaming one NDJSON line per resolved case"""
     try:
         data = request.json
+        cases = parse_batch(data.get('cases', []))
+    except (AttributeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        for index, case_details, result in BULK_LOOKUP.iter_lookup(cases):
+            yield json.dumps({"index": index, "key": case_key(case_details), "result": result}) + "\n"
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/cause-list', methods=['GET', 'POST'])
+def cause_list():
+    """Stream a cause list as JSON, NDJSON or CSV (GET supports Range on cached lists)"""
+    try:
+        data = request.json if request.method == 'POST' else request.args
         date_type = data.get('date_type', 'today')
-        result = scraper.download_cause_list(date_type)
-        
-        if 'filename' in result:
-            return send_file(
-                result['filename'],
-                as_attachment=True,
-                download_name=result['filename'],
-                mimetype='application/json'
-            )
-        else:
+        export_format = data.get('format', 'json')
+        if export_format not in CAUSE_LIST_FORMATS:
+            return jsonify({"error": f"Unsupported format: {export_format}"}), 400
+
+        result = scraper.download_cause_list(
+            date_type,
+            court_complex=data.get('court_complex_code'),
+            court=data.get('court_code'),
+            date=data.get('date')
+        )
+        if result.get('retry_after') is not None:
+            return unavailable(result)
+        if 'error' in result:
             return jsonify(result), 400
+
+        mimetype, extension = CAUSE_LIST_FORMATS[export_format]
+        download_name = f"{result['filename']}.{extension}"
+        cached = CAUSE_LIST_ARTIFACTS.fresh(result['key'], export_format)
+        if cached:
+            return with_age(send_file(
+                cached,
+                as_attachment=True,
+                download_name=download_name,
+                mimetype=mimetype,
+                conditional=True
+            ), result['fetched_at'], result['served'])
+
+        chunks = CAUSE_LIST_ARTIFACTS.tee(
+            result['key'], export_format, encode_cause_list(result['entries'], export_format))
+        return with_age(Response(chunks, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename={download_name}'
+        }), result['fetched_at'], result['served'])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def change_filters(args):
+    return {
+        'court_complex': args.get('court_complex_code'),
+        'date_str': args.get('date'),
+        'court': args.get('court_code')
+    }
+
+@app.route('/api/cause-list/changes', methods=['GET'])
+def cause_list_changes():
+    """Cause-list entries added, removed or moved since a cursor"""
+    try:
+        cursor = request.args.get('cursor', '0')
+        if cursor == 'latest':
+            return jsonify({"changes": [], "cursor": scraper.change_feed.latest(), "more": False})
+        limit = min(int(request.args.get('limit', 500)), 5000)
+        changes = scraper.change_feed.changes(int(cursor), limit=limit, **change_filters(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "changes": changes,
+        "cursor": changes[-1]["seq"] if changes else int(cursor),
+        "more": len(changes) == limit
+    })
+
+@app.route('/api/cause-list/changes/stream', methods=['GET'])
+def cause_list_change_stream():
+    """Server-Sent Events: one 'change' event per change, resumable via Last-Event-ID"""
+    try:
+        cursor = int(request.headers.get('Last-Event-ID') or request.args.get('cursor', 0))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    filters = change_filters(request.args)
+
+    def generate():
+        yield "retry: 2000\n\n"
+        # Streams are closed after a while so they don't pin server threads; clients reconnect
+        for batch in scraper.change_feed.follow(cursor, duration=CHANGE_STREAM_SECONDS, **filters):
+            if not batch:
+                yield ": keep-alive\n\n"
+            for change in batch:
+                yield f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def watchlist_secret():
+    """The secret a watchlist request is made with: Authorization: Bearer <secret>"""
+    scheme, _, secret = request.headers.get('Authorization', '').partition(' ')
+    return secret.strip() if scheme.lower() == 'bearer' else None
+
+def watchlist_refused(user_id):
+    """404 for an unknown watchlist, 403 without its secret; None if the request may go on"""
+    if scraper.watchlists.webhook(user_id) is None:
+        return jsonify({"error": "Unknown watchlist"}), 404
+    if not scraper.watchlists.authorized(user_id, watchlist_secret()):
+        return jsonify({"error": "Send the watchlist's secret as Authorization: Bearer <secret>"}), 403
+    return None
+
+@app.route('/api/watchlists', methods=['POST'])
+def create_watchlist():
+    """Register a user's webhook: {user_id, webhook_url, secret?}.
+
+    Without a secret one is generated and returned; replacing an existing
+    watchlist needs its current secret (Authorization: Bearer <secret>).
+    """
+    data = request.json or {}
+    if not data.get('user_id') or not data.get('webhook_url'):
+        return jsonify({"error": "user_id and an http(s) webhook_url are required"}), 400
+    secret = str(data.get('secret') or secrets.token_urlsafe(32))
+    try:
+        scraper.watchlists.set_webhook(data['user_id'], str(data['webhook_url']), secret,
+                                       current_secret=watchlist_secret())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    result = {"user_id": data['user_id'], "webhook_url": data['webhook_url']}
+    if not data.get('secret'):
+        result["secret"] = secret
+    return jsonify(result)
+
+@app.route('/api/watchlists/<user_id>', methods=['GET'])
+def get_watchlist(user_id):
+    refused = watchlist_refused(user_id)
+    if refused is not None:
+        return refused
+    return jsonify({"user_id": user_id, "webhook_url": scraper.watchlists.webhook(user_id)[0],
+                    "cases": scraper.watchlists.cases(user_id)})
+
+@app.route('/api/watchlists/<user_id>/cases', methods=['POST', 'DELETE'])
+def update_watchlist(user_id):
+    """Watch (POST) or unwatch (DELETE) cases given as in /api/search/batch"""
+    refused = watchlist_refused(user_id)
+    if refused is not None:
+        return refused
+    try:
+        data = request.get_json(silent=True) or {}
+        cases = parse_batch(data['cases']) if 'cases' in data else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if request.method == 'DELETE':
+        scraper.watchlists.remove(user_id, cases)
+        return jsonify({"user_id": user_id, "cases": scraper.watchlists.cases(user_id)})
+    if cases is None:
+        return jsonify({"error": "'cases' is required"}), 400
+    return jsonify({"user_id": user_id, "watching": scraper.watchlists.add(user_id, cases)})
+
+@app.route('/api/hierarchy/sync', methods=['GET'])
+def hierarchy_sync_status():
+    """Hierarchy version served, the stored tree's provenance and the last crawl's stats"""
+    return jsonify(dict(HIERARCHY_SYNC.status(), stored=scraper.store.hierarchy_state()))
+
+@app.route('/api/prefetch/status', methods=['GET'])
+def prefetch_status():
+    """Cause-list pre-fetch state and how many lists are warm"""
+    return jsonify(PREFETCH.status())
+
 @app.route('/api/states', methods=['GET'])
 def get_states():
     states = scraper.get_states()
@@ -647,57 +1019,73 @@ def get_courts():
 def download_cause_list_pdf():
     try:
         data = request.json
-        filename = f"cause_list_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        
-        with open(filename, 'w') as f:
-            f.write("Mock PDF content - Cause List")
-        
+        result = scraper.download_cause_list(
+            data.get('date_type', 'today'),
+            court_complex=data.get('court_complex_code'),
+            court=data.get('court_code'),
+            date=data.get('date')
+        )
+        if result.get('retry_after') is not None:
+            return unavailable(result)
+        if 'error' in result:
+            return jsonify(result), 400
+
+        # Cause lists are printed court room by court room (rows without one first)
+        entries = sorted(result['entries'], key=lambda entry: entry['court'] or '')
+        pdf = render_cause_list_pdf(entries, result['date'])
         return send_file(
-            filename,
+            io.BytesIO(pdf),
             as_attachment=True,
-            download_name=filename,
+            download_name=f"{result['filename']}.pdf",
             mimetype='application/pdf'
         )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/export-data', methods=['POST'])
+@app.route('/api/parse-cause-list', methods=['POST'])
+def parse_cause_list():
+    """Extract structured rows from an uploaded cause-list PDF"""
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({"error": "Upload a PDF as the 'file' field"}), 400
+    try:
+        # Page workers open the PDF by path, so it needs to be on disk
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+            upload.save(f)
+            f.flush()
+            with PARSE_SECONDS.time(kind="cause_list_pdf"):
+                result = parse_cause_list_pdf(f.name, workers=PDF_PARSE_WORKERS)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": f"Could not parse cause list: {str(e)}"}), 400
+
+@app.route('/api/export-data', methods=['GET', 'POST'])
 def export_geographical_data():
-    """Export geographical data to CSV/JSON"""
+    """Stream geography tables or stored cause lists as CSV, NDJSON, JSON, Parquet or Arrow"""
     try:
-        data = request.json
+        data = (request.json if request.method == 'POST' else request.args) or {}
         export_format = data.get('format', 'json')
-        data_type = data.get('data_type', 'all')  # states, districts, taluks, all
-        
-        if data_type == 'states':
-            export_data = scraper.get_all_states()
-        elif data_type == 'districts':
-            export_data = scraper.get_all_districts()
-        elif data_type == 'taluks':
-            export_data = scraper.get_all_taluks()
-        else:
-            export_data = scraper.get_complete_geographical_data()
-        
-        filename = f"india_geographical_data_{data_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
-        
-        if export_format == 'csv':
-            df = pd.DataFrame(export_data)
-            df.to_csv(filename, index=False)
-            mimetype = 'text/csv'
+        data_type = data.get('data_type', 'all')  # states, districts, taluks, all, cause_lists
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"Unsupported format: {export_format}"}), 400
+
+        if data_type == 'cause_lists':
+            table = cause_list_table(scraper.cause_list_store,
+                                     since=data.get('since') or '1970-01-01',
+                                     until=data.get('until'))
+        elif data_type in EXPORT_TABLES:
+            table = EXPORT_TABLES[data_type]
         else:
-            with open(filename, 'w') as f:
-                json.dump(export_data, f, indent=2)
-            mimetype = 'application/json'
-        
-        return send_file(
-            filename,
-            as_attachment=True,
-            download_name=filename,
-            mimetype=mimetype
-        )
-        
+            return jsonify({"error": f"Unsupported data_type: {data_type}"}), 400
+
+        mimetype, extension, _ = EXPORT_FORMATS[export_format]
+        filename = f"india_geographical_data_{data_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        return Response(export_table(table, export_format), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename={filename}'
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
+    # Development server; for production use: gunicorn -c gunicorn.conf.py app:app
+    create_app().run(debug=os.environ.get('FLASK_DEBUG') == '1', port=5000, host='0.0.0.0')
\ No newline at end of file
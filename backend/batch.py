@@ -0,0 +1,459 @@
+"""Batch fetches of cause lists and case statuses from the command line, resumable.
+
+A manifest - court complexes x dates, or a file of cases (one CNR or
+TYPE/NUMBER/YEAR per line) - is run on a worker pool over ECourtsScraper:
+
+- thread: fetches share one scraper and its connection pool; parsing runs
+  in the scraper's ParserPool, but PDF cause lists are parsed in the
+  fetching thread.
+- process: each worker process has a scraper of its own, with the rate
+  limit split between them, so PDF parsing is spread over the CPUs.
+- async: case lookups only, on BulkCaseLookup's aiohttp session, for
+  tens of thousands of CNRs with a few threads' worth of memory.
+
+Results are written as they arrive: NDJSON appends one row per line,
+Parquet writes a directory of part files, one per checkpoint. Every
+checkpoint_every results (or checkpoint_seconds) the output is synced to
+disk and the finished keys are committed to a SQLite checkpoint in the
+same transaction as the output's position. A run that is killed resumes
+from its last checkpoint: anything written after it is cut off (NDJSON
+truncated to the committed offset, later Parquet parts removed) and
+fetched again, so nothing is lost or written twice. Failed items are
+recorded with their error and re-tried with --retry-failed.
+
+    python batch.py cause-lists --complexes all --dates 20/10/2026..24/10/2026 --out lists.ndjson
+    python batch.py cases --cases cnrs.txt --mode async --workers 64 --out cases.parquet
+
+Running the same command again resumes it.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import time
+from concurrent import futures
+from datetime import datetime, timedelta
+
+from bulk import parse_case
+from cause_lists import iso_date
+from exports import BOOL, CAUSE_LIST_COLUMNS, INT, STRING, ExportTable, batched, cause_list_rows, export
+from portal import case_key
+from records import CASE_RESULT_FIELDS
+
+CAUSE_LISTS, CASES = "cause-lists", "cases"
+MODES = ("thread", "process", "async")
+CASE_COLUMNS = (("key", STRING),) + tuple(
+    (name, BOOL if name in ("listed_today", "listed_tomorrow") else INT if name == "serial_number" else STRING)
+    for name in CASE_RESULT_FIELDS)
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    error TEXT,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class Checkpoint:
+    """Finished manifest items, committed together with the output's position"""
+
+    def __init__(self, path, job):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(CHECKPOINT_SCHEMA)
+        stored = self._meta("job")
+        if stored is None:
+            self._conn.execute("INSERT INTO meta VALUES ('job', ?)", (json.dumps(job, sort_keys=True),))
+        elif json.loads(stored) != job:
+            raise ValueError(f"{path} is the checkpoint of another run ({stored}); pass a new --checkpoint")
+
+    def _meta(self, name):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def sink_state(self):
+        """What the output's sink committed at the last checkpoint, None on a fresh run"""
+        value = self._meta("sink")
+        return json.loads(value) if value else None
+
+    def finished(self, retry_failed=False):
+        """Keys not to fetch again: done ones, and failed ones unless retry_failed"""
+        query = "SELECT key FROM items" + (" WHERE status = 'done'" if retry_failed else "")
+        return {key for key, in self._conn.execute(query)}
+
+    def failures(self):
+        return dict(self._conn.execute("SELECT key, error FROM items WHERE status = 'failed'"))
+
+    def commit(self, items, sink_state):
+        """Record [(key, error or None)] as finished and the sink's state, atomically"""
+        now = time.time()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)",
+                             ((key, "failed" if error else "done", error, now) for key, error in items))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('sink', ?)", (json.dumps(sink_state),))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        self._conn.close()
+
+
+class NdjsonSink:
+    """One JSON row per line, appended; resumes by truncating to the committed offset"""
+
+    def __init__(self, path, state=None):
+        offset = (state or {}).get("offset", 0)
+        self.file = open(path, "r+b" if state and os.path.exists(path) else "wb")
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def write(self, rows):
+        self.file.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8"))
+
+    def checkpoint(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"offset": self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """A directory of Parquet part files, one per checkpoint; resumes by removing later parts"""
+
+    def __init__(self, path, columns, state=None):
+        self.path = path
+        self.columns = columns
+        self.parts = (state or {}).get("parts", 0)
+        self.rows = []
+        os.makedirs(path, exist_ok=True)
+        # Parts written after the last committed checkpoint hold items that will be fetched again
+        for name in os.listdir(path):
+            if name.startswith("part-") and (not name.endswith(".parquet") or int(name[5:-8]) >= self.parts):
+                os.remove(os.path.join(path, name))
+
+    def write(self, rows):
+        self.rows.extend(rows)
+
+    def checkpoint(self):
+        if self.rows:
+            part = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+            rows, self.rows = self.rows, []
+            table = ExportTable("batch", self.columns, lambda: batched(iter(rows), self.columns))
+            with open(part + ".partial", "wb") as f:
+                for chunk in export(table, "parquet"):
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(part + ".partial", part)
+            self.parts += 1
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+
+def open_sink(path, fmt, kind, state=None):
+    if fmt == "parquet":
+        return ParquetSink(path, CAUSE_LIST_COLUMNS if kind == CAUSE_LISTS else CASE_COLUMNS, state)
+    return NdjsonSink(path, state)
+
+
+def fetch_item(scraper, kind, payload, store=True):
+    """(result, None) or (None, error) for one manifest item"""
+    try:
+        if kind == CAUSE_LISTS:
+            court_complex, date_str = payload
+            entries = scraper.fetch_cause_list(court_complex, date_str)
+            if store:
+                scraper.cause_list_store.save(court_complex, date_str, entries)
+            return entries, None
+        result = scraper.get_case_status(payload)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    if "error" in result:
+        return None, result["error"]
+    return result, None
+
+
+# Each process-mode worker's own scraper, built by _start_process
+_process_scraper = None
+
+
+def _start_process(base_url, rate_per_host, pool_size):
+    global _process_scraper
+    from app import ECourtsScraper
+    from transport import Transport
+    _process_scraper = ECourtsScraper(live=True, base_url=base_url,
+                                      transport=Transport(pool_size=pool_size, rate_per_host=rate_per_host))
+
+
+def _process_fetch(kind, payload, store):
+    return fetch_item(_process_scraper, kind, payload, store)
+
+
+class BatchRun:
+    """Runs manifest items on a worker pool, writing results to a sink and checkpointing as it goes"""
+
+    def __init__(self, scraper, kind, sink, checkpoint, mode="thread", workers=8, store=True,
+                 checkpoint_every=1000, checkpoint_seconds=30.0, progress_seconds=10.0, rate_per_host=5.0,
+                 report=None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if mode == "async" and kind != CASES:
+            raise ValueError("async mode looks up cases only; use thread or process for cause lists")
+        self.scraper = scraper
+        self.kind = kind
+        self.sink = sink
+        self.checkpoint = checkpoint
+        self.mode = mode
+        self.workers = workers
+        self.store = store
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.progress_seconds = progress_seconds
+        self.rate_per_host = rate_per_host
+        self.report = report or (lambda line: print(line, file=sys.stderr, flush=True))
+        self._finished = []
+        self._checkpointed_at = self._reported_at = 0.0
+
+    def rows(self, key, payload, result):
+        if self.kind == CAUSE_LISTS:
+            court_complex, date_str = payload
+            return cause_list_rows(court_complex, iso_date(date_str), result)
+        return [dict(result, key=key)]
+
+    def run(self, items, retry_failed=False):
+        """Fetch every (key, payload) not finished in an earlier run; returns run stats"""
+        finished = self.checkpoint.finished(retry_failed)
+        todo = {}
+        for key, payload in items:
+            if key not in finished:
+                todo.setdefault(key, payload)
+        stats = self.stats = {"kind": self.kind, "mode": self.mode, "workers": self.workers,
+                              "planned": len(todo), "already_finished": len(finished), "done": 0, "failed": 0,
+                              "rows": 0, "checkpoints": 0, "interrupted": False}
+        self._started = self._checkpointed_at = self._reported_at = time.monotonic()
+        try:
+            if self.mode == "async":
+                self._run_async(todo)
+            else:
+                self._run_pool(todo)
+        except KeyboardInterrupt:
+            stats["interrupted"] = True
+        finally:
+            self._checkpoint()
+            self.sink.close()
+        stats["duration_seconds"] = round(time.monotonic() - self._started, 3)
+        stats["items_per_second"] = round((stats["done"] + stats["failed"]) / stats["duration_seconds"], 2) \
+            if stats["duration_seconds"] else 0.0
+        stats["failures"] = self.checkpoint.failures()
+        return stats
+
+    def _executor(self):
+        if self.mode == "thread":
+            return futures.ThreadPoolExecutor(self.workers, thread_name_prefix="batch")
+        # Not fork: this process runs threads; each worker builds its scraper in _start_process
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return futures.ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context(method), initializer=_start_process,
+            initargs=(self.scraper.base_url, self.rate_per_host / self.workers, 4))
+
+    def _submit(self, executor, payload):
+        if self.mode == "thread":
+            return executor.submit(fetch_item, self.scraper, self.kind, payload, self.store)
+        return executor.submit(_process_fetch, self.kind, payload, self.store)
+
+    def _run_pool(self, todo):
+        pending = iter(todo.items())
+        in_flight = {}
+        executor = self._executor()
+        try:
+            while True:
+                # Two per worker keeps them busy without queueing the whole manifest
+                while len(in_flight) < 2 * self.workers:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    in_flight[self._submit(executor, item[1])] = item
+                if not in_flight:
+                    return
+                done, _ = futures.wait(in_flight, timeout=self.progress_seconds,
+                                       return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    key, payload = in_flight.pop(future)
+                    result, error = future.result()
+                    self._finish(key, payload, result, error)
+                self._tick()
+        finally:
+            executor.shutdown(wait=not in_flight, cancel_futures=True)
+
+    def _run_async(self, todo):
+        from bulk import BulkCaseLookup
+        keys = list(todo)
+        lookups = BulkCaseLookup(self.scraper, concurrency=self.workers)
+        for index, _, result in lookups.iter_lookup([todo[key] for key in keys]):
+            error = result.get("error")
+            self._finish(keys[index], todo[keys[index]], None if error else result, error)
+            self._tick()
+
+    def _finish(self, key, payload, result, error):
+        if error:
+            self.stats["failed"] += 1
+        else:
+            rows = list(self.rows(key, payload, result))
+            self.sink.write(rows)
+            self.stats["done"] += 1
+            self.stats["rows"] += len(rows)
+        self._finished.append((key, error))
+
+    def _tick(self):
+        now = time.monotonic()
+        if len(self._finished) >= self.checkpoint_every or now - self._checkpointed_at >= self.checkpoint_seconds:
+            self._checkpoint()
+        if now - self._reported_at >= self.progress_seconds:
+            self._reported_at = now
+            self.report(self.progress())
+
+    def _checkpoint(self):
+        # The output is on disk before the keys that produced it are marked finished
+        self.checkpoint.commit(self._finished, self.sink.checkpoint())
+        self._finished = []
+        self._checkpointed_at = time.monotonic()
+        self.stats["checkpoints"] += 1
+
+    def progress(self):
+        """One line: items finished, failures, throughput and time left"""
+        stats = self.stats
+        finished = stats["done"] + stats["failed"]
+        elapsed = time.monotonic() - self._started
+        rate = finished / elapsed if elapsed else 0.0
+        left = stats["planned"] - finished
+        eta = str(timedelta(seconds=round(left / rate))) if rate else "?"
+        return (f"[{timedelta(seconds=round(elapsed))}] {finished:,}/{stats['planned']:,}"
+                f" ({finished / max(1, stats['planned']):.1%}), {stats['failed']:,} failed,"
+                f" {rate:,.1f} items/s, {stats['rows']:,} rows, ETA {eta}")
+
+
+def read_lines(path):
+    """Non-blank, non-comment lines of a file ('-' for stdin)"""
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with handle:
+        return [line.strip() for line in handle if line.strip() and not line.lstrip().startswith("#")]
+
+
+def parse_dates(spec):
+    """dd/mm/YYYY dates from "d1,d2" with "d1..d2" ranges"""
+    dates = []
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("..")
+        start = datetime.strptime(first, "%d/%m/%Y")
+        end = datetime.strptime(last, "%d/%m/%Y") if last else start
+        while start <= end:
+            dates.append(start.strftime("%d/%m/%Y"))
+            start += timedelta(days=1)
+    return dates
+
+
+def cause_list_items(complexes, dates):
+    """(key, (complex, date)) for every complex on every date, a date at a time"""
+    return [(f"{court_complex}|{date_str}", (court_complex, date_str)) for date_str in dates
+            for court_complex in complexes]
+
+
+def case_items(lines):
+    """(key, case_details) for lines holding a CNR or TYPE/NUMBER/YEAR"""
+    items = []
+    for position, line in enumerate(lines):
+        details = parse_case(line.rsplit("/", 2) if "/" in line else line, position)
+        items.append((case_key(details), details))
+    return items
+
+
+def _interrupted(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch cause lists or case statuses in bulk, resumably")
+    commands = parser.add_subparsers(dest="kind", required=True)
+    lists = commands.add_parser(CAUSE_LISTS, help="Cause lists for court complexes x dates")
+    lists.add_argument("--complexes", default="all",
+                       help="'all', comma-separated complex codes, or @file with one per line")
+    lists.add_argument("--dates", help="dd/mm/YYYY list with d1..d2 ranges (default: tomorrow)")
+    lists.add_argument("--no-store", dest="store", action="store_false",
+                       help="Only write the output, not the server's cause-list store")
+    cases = commands.add_parser(CASES, help="Case statuses")
+    cases.add_argument("--cases", required=True, help="File with one CNR or TYPE/NUMBER/YEAR per line ('-': stdin)")
+    for command in (lists, cases):
+        command.add_argument("--out", required=True, help="Output: .ndjson file or .parquet directory")
+        command.add_argument("--format", choices=("ndjson", "parquet"), help="Default: from --out's extension")
+        command.add_argument("--checkpoint", help="Checkpoint database (default: <out>.checkpoint)")
+        command.add_argument("--mode", choices=MODES, default="thread")
+        command.add_argument("--workers", type=int, default=8)
+        command.add_argument("--rate", type=float, default=5.0, help="Portal requests per second per host")
+        command.add_argument("--base-url", help="Portal base URL (e.g. a local fake portal)")
+        command.add_argument("--checkpoint-every", type=int, default=1000, help="Results per checkpoint")
+        command.add_argument("--progress-seconds", type=float, default=10.0)
+        command.add_argument("--retry-failed", action="store_true", help="Fetch items that failed last time again")
+    args = parser.parse_args()
+
+    if args.base_url:
+        os.environ['ECOURTS_BASE_URL'] = args.base_url
+    from app import HIERARCHY, ECourtsScraper
+    from transport import Transport
+
+    fmt = args.format or ("parquet" if args.out.rstrip("/").endswith(".parquet") else "ndjson")
+    if args.kind == CAUSE_LISTS:
+        if args.complexes == "all":
+            complexes = [code for _, _, code in HIERARCHY.iter_complexes()]
+        elif args.complexes.startswith("@"):
+            complexes = read_lines(args.complexes[1:])
+        else:
+            complexes = [code.strip() for code in args.complexes.split(",") if code.strip()]
+        dates = parse_dates(args.dates) if args.dates else [(datetime.now() + timedelta(days=1)).strftime("%d/%m/%Y")]
+        items = cause_list_items(complexes, dates)
+    else:
+        try:
+            items = case_items(read_lines(args.cases))
+        except ValueError as e:
+            parser.error(f"{args.cases}: {e}")
+
+    checkpoint = Checkpoint(args.checkpoint or args.out.rstrip("/") + ".checkpoint",
+                            {"kind": args.kind, "format": fmt, "out": os.path.abspath(args.out)})
+    sink = open_sink(args.out, fmt, args.kind, checkpoint.sink_state())
+    scraper = ECourtsScraper(live=True, transport=Transport(pool_size=max(args.workers, 10),
+                                                            rate_per_host=args.rate))
+    run = BatchRun(scraper, args.kind, sink, checkpoint, mode=args.mode, workers=args.workers,
+                   store=getattr(args, "store", True), checkpoint_every=args.checkpoint_every,
+                   progress_seconds=args.progress_seconds, rate_per_host=args.rate)
+    signal.signal(signal.SIGTERM, _interrupted)
+    stats = run.run(items, retry_failed=args.retry_failed)
+    failures = stats.pop("failures")
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+    for key, error in list(failures.items())[:10]:
+        print(f"  failed {key}: {error}")
+    if len(failures) > 10:
+        print(f"  ... {len(failures) - 10:,} more; --retry-failed fetches them again")
+    checkpoint.close()
+    return 130 if stats["interrupted"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
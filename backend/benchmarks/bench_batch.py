@@ -0,0 +1,99 @@
+"""Batch CLI against the local stub portal: throughput per mode, and kill-and-resume
+
+Runs batch.py as a subprocess the way an operator would, with the stores
+and outputs in a temporary directory:
+
+- cause lists for every built-in complex over a range of dates, in thread
+  and process mode (the stub serves each list as a PDF, so parsing is
+  CPU-bound);
+- case statuses for synthetic CNRs in thread and async mode.
+
+Then starts a case run, SIGKILLs it part-way, runs the same command again
+and checks the output holds every CNR exactly once (NDJSON and Parquet).
+
+    python benchmarks/bench_batch.py [cases] [days] [workers] [latency_seconds]
+
+Exits 1 if a resumed run lost or duplicated rows.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+
+import pyarrow.parquet as pq
+
+from stub_portal import start_stub_portal
+
+
+def batch(directory, base_url, *args, background=False):
+    env = dict(os.environ, COURT_DB=os.path.join(directory, "court.db"),
+               CAUSE_LIST_DB=os.path.join(directory, "cause_lists.db"),
+               WATCHLIST_DB=os.path.join(directory, "watchlists.db"),
+               HIERARCHY_SNAPSHOT=os.path.join(directory, "hierarchy.snapshot"))
+    env.pop("CASE_CACHE_DB", None)
+    command = [sys.executable, os.path.join(BACKEND, "batch.py"), *args, "--base-url", base_url,
+               "--rate", "1000", "--progress-seconds", "1"]
+    if background:
+        return subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"batch.py {' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    return dict(line.split(": ", 1) for line in result.stdout.splitlines() if not line.startswith(" "))
+
+
+def output_keys(path):
+    if path.endswith(".parquet"):
+        return pq.read_table(path, columns=["key"]).column("key").to_pylist()
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["key"] for line in f]
+
+
+def main(cases=3000, days=3, workers=8, latency=0.05):
+    server, base_url = start_stub_portal(latency=latency, fail_rate=0.02)
+    base_url += "/"
+    directory = tempfile.mkdtemp(prefix="bench-batch-")
+    cnrs = os.path.join(directory, "cnrs.txt")
+    with open(cnrs, "w") as f:
+        f.writelines(f"DLHI01{n:06d}2024\n" for n in range(cases))
+    dates = f"20/10/2026..{19 + days}/10/2026"
+    print(f"stub latency ~{latency * 1000:.0f} ms, 2% injected failures, {workers} workers")
+
+    runs = (("cause-lists", "thread", ("--dates", dates)), ("cause-lists", "process", ("--dates", dates)),
+            ("cases", "thread", ("--cases", cnrs)), ("cases", "async", ("--cases", cnrs)))
+    for kind, mode, manifest in runs:
+        out = os.path.join(directory, f"{kind}-{mode}.ndjson")
+        stats = batch(directory, base_url, kind, *manifest, "--out", out, "--mode", mode,
+                      "--workers", str(workers * 4 if mode == "async" else workers))
+        print(f"  {kind:<11} {mode:<7} {stats['done']:>6} done, {stats['failed']:>3} failed,"
+              f" {stats['rows']:>7} rows in {float(stats['duration_seconds']):6.1f} s:"
+              f" {stats['items_per_second']} items/s")
+
+    ok = True
+    for name in ("resume.ndjson", "resume.parquet"):
+        out = os.path.join(directory, name)
+        args = ("cases", "--cases", cnrs, "--out", out, "--mode", "async", "--workers", str(workers * 4),
+                "--checkpoint-every", str(max(1, cases // 10)))
+        run = batch(directory, base_url, *args, background=True)
+        time.sleep(2 + cases / 1000)
+        run.kill()
+        run.wait()
+        stats = batch(directory, base_url, *args, "--retry-failed")
+        keys = output_keys(out)
+        missing = cases - len(set(keys))
+        duplicated = len(keys) - len(set(keys))
+        print(f"  killed and resumed ({name.split('.')[1]}): {stats['already_finished']} kept from the killed run,"
+              f" {stats['done']} fetched on resume; {len(keys)} rows, {duplicated} duplicated, {missing} missing"
+              f" ({stats['failed']} failed twice)")
+        ok = ok and not duplicated and missing == int(stats["failed"])
+    server.shutdown()
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:])))
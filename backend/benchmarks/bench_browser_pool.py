@@ -0,0 +1,111 @@
+"""BrowserPool: case lookups per minute per browser against a JavaScript-gated local portal
+
+Serves the stub portal's case-status pages behind a TokenGate (a script on
+the landing page issues the app_token every lookup must carry), then runs
+CNR lookups for a fixed time each way:
+
+- a fresh browser per lookup: start, load the landing page, look up, quit
+- BrowserPool of each size given, warmed, two lookup threads per browser
+- the largest pool again, recycling every 50 pages
+
+and prints lookups/minute in total and per browser, lease waits and the
+browsers' memory. Needs Chrome or Chromium and a chromedriver that Selenium
+can find (on PATH or via Selenium Manager).
+
+    python benchmarks/bench_browser_pool.py [seconds] [latency_ms] [sizes]
+
+sizes is comma-separated, default 1,2,4.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from browser_pool import Browser, BrowserPool, chrome_driver
+from page_parsers import parse
+from portal import case_status_request
+from stub_portal import TokenGate, start_stub_portal
+
+
+def lookup(browser, base_url, n):
+    method, url, form = case_status_request(base_url, {"cnr": f"DLHI01{n % 10 ** 6:06d}2024"})
+    status, text = browser.post(url, form)
+    result = parse("case_status", text) if status == 200 else {"error": f"HTTP {status}"}
+    if "error" in result:
+        raise RuntimeError(f"Lookup {n} failed: {result['error']}")
+
+
+def browser_per_lookup(base_url, warm_url, seconds):
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        browser = Browser(chrome_driver(), warm_url)
+        try:
+            lookup(browser, base_url, count)
+        finally:
+            browser.quit()
+        count += 1
+    return count, time.perf_counter() - started
+
+
+def pooled(base_url, warm_url, size, seconds, max_pages=10 ** 9):
+    pool = BrowserPool(size, warm_url=warm_url, max_pages=max_pages, health_interval=0).start(wait=True)
+    numbers = itertools.count()
+    waits = []
+    stop = time.perf_counter() + seconds
+
+    def worker():
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            with pool.lease() as browser:
+                waits.append(time.perf_counter() - started)
+                lookup(browser, base_url, next(numbers))
+
+    threads = [threading.Thread(target=worker) for _ in range(2 * size)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    rss = [browser.rss_mb() for browser in list(pool._idle.queue)]
+    stats = pool.stats()
+    pool.close()
+    waits.sort()
+    return stats, elapsed, waits, [mb for mb in rss if mb is not None]
+
+
+def main(seconds=60, latency_ms=100, sizes="1,2,4"):
+    gate = TokenGate()
+    server, base_url = start_stub_portal(latency=latency_ms / 1000, routes=gate.routes())
+    base_url += "/"
+    warm_url = f"{base_url}?p={gate.landing}"
+    method, url, form = case_status_request(base_url, {"cnr": "DLHI010000012024"})
+    print(f"stub portal with {latency_ms} ms latency; plain HTTP lookup without a browser:"
+          f" HTTP {requests.post(url, data=form).status_code}")
+
+    count, elapsed = browser_per_lookup(base_url, warm_url, seconds)
+    print(f"browser per lookup: {count} lookups in {elapsed:.0f}s = {count / elapsed * 60:,.0f}/min")
+
+    sizes = [int(size) for size in str(sizes).split(",")]
+    runs = [(size, 10 ** 9) for size in sizes] + [(sizes[-1], 50)]
+    for size, max_pages in runs:
+        stats, elapsed, waits, rss = pooled(base_url, warm_url, size, seconds, max_pages)
+        per_minute = stats["leases"] / elapsed * 60
+        label = f"pool of {size}" + (f", recycled every {max_pages} pages" if max_pages < 10 ** 9 else "")
+        print(f"{label}: {stats['leases']:,} lookups in {elapsed:.0f}s = {per_minute:,.0f}/min,"
+              f" {per_minute / size:,.0f}/min per browser; lease wait p50 {waits[len(waits) // 2] * 1e3:.1f} ms"
+              f" p99 {waits[int(len(waits) * 0.99)] * 1e3:.1f} ms"
+              + (f"; {sum(rss) / len(rss):.0f} MiB per browser" if rss else "")
+              + (f"; recycled {stats['recycled']}" if stats["recycled"] else ""))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*(int(arg) for arg in args[:2]), *args[2:3])
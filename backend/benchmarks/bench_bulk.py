@@ -0,0 +1,54 @@
+"""Throughput of the bulk CNR engine vs one get_case_status call per case
+
+Both paths hit the local stub portal with the same per-request latency.
+
+    python benchmarks/bench_bulk.py [cases] [latency_seconds]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from stub_portal import start_stub_portal
+
+
+def main(cases=500, latency=0.05):
+    server, base_url = start_stub_portal(latency=latency)
+    os.environ['ECOURTS_BASE_URL'] = base_url + "/"
+    os.environ['ECOURTS_LIVE'] = '1'
+    from app import ECourtsScraper
+    from bulk import BulkCaseLookup
+    from case_cache import CaseStatusCache
+    from transport import Transport
+
+    cnrs = [f"DLHI01{i:010d}" for i in range(cases)]
+    scraper = ECourtsScraper(transport=Transport(rate_per_host=10000, burst_per_host=10000))
+
+    serial_n = min(cases, 100)
+    started = time.perf_counter()
+    for cnr in cnrs[:serial_n]:
+        result = scraper.get_case_status({'cnr': cnr})
+        assert "error" not in result, result
+    serial_rate = serial_n / (time.perf_counter() - started)
+
+    print(f"stub latency ~{latency * 1000:.0f} ms/request")
+    print(f"{'path':<28}{'cases':>8}{'cases/s':>10}")
+    print(f"{'serial get_case_status':<28}{serial_n:>8}{serial_rate:>10.0f}")
+
+    for concurrency in (16, 64, 256):
+        scraper.case_cache = CaseStatusCache()  # every run starts cold
+        engine = BulkCaseLookup(scraper, concurrency=concurrency, per_host=concurrency)
+        started = time.perf_counter()
+        results = engine.lookup([{'cnr': cnr} for cnr in cnrs])
+        elapsed = time.perf_counter() - started
+        errors = sum(1 for result in results if "error" in result)
+        label = f"bulk concurrency={concurrency}"
+        print(f"{label:<28}{cases:>8}{cases / elapsed:>10.0f}"
+              f"   ({cases / elapsed / serial_rate:.0f}x, errors={errors})")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:]))
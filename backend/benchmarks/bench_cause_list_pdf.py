@@ -0,0 +1,71 @@
+"""Cause-list PDF parser: fixture accuracy, pages/second and peak RSS
+
+Checks every fixture in fixtures/cause_lists against its expected rows,
+then parses a synthetic 500-page list serially and with a process pool.
+
+    python benchmarks/bench_cause_list_pdf.py [pages]
+"""
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from cause_list_pdf import ROWS_PER_PAGE, parse_cause_list_pdf, render_cause_list_pdf
+from cause_lists import iter_mock_cause_list
+
+FIXTURE_DIR = os.path.join(HERE, "..", "fixtures", "cause_lists")
+FIELDS = ("serial_no", "case_number", "parties", "purpose", "court")
+
+
+def peak_rss_mb():
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return self_kb / 1024, children_kb / 1024
+
+
+def check_fixtures():
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        if not name.endswith(".pdf"):
+            continue
+        with open(os.path.join(FIXTURE_DIR, name.replace(".pdf", ".expected.json")), encoding="utf-8") as f:
+            expected = json.load(f)
+        parsed = parse_cause_list_pdf(os.path.join(FIXTURE_DIR, name), workers=1)
+        got = [{key: row[key] for key in FIELDS} for row in parsed["rows"]]
+        matched = sum(1 for a, b in zip(got, expected) if a == b)
+        print(f"  {name:<20} pages={parsed['pages']:<4} rows={len(got)}/{len(expected)} "
+              f"exact={matched} no_text_pages={parsed['unreadable_pages'] + parsed['ocr_pages']}")
+
+
+def main(pages=500):
+    print("fixtures:")
+    check_fixtures()
+
+    entries = list(iter_mock_cause_list(pages * ROWS_PER_PAGE, seed=7))
+    for entry in entries:
+        entry["court"] = "Court Room 4 - Justice Khan"
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(render_cause_list_pdf(entries, "21/10/2026"))
+        path = f.name
+
+    print(f"\n{pages}-page list ({len(entries)} rows, {os.path.getsize(path) / 1e6:.1f} MB):")
+    print(f"  {'workers':<8}{'seconds':>9}{'pages/s':>10}{'rows':>8}")
+    try:
+        for workers in sorted({1, 2, os.cpu_count() or 1}):
+            started = time.perf_counter()
+            result = parse_cause_list_pdf(path, workers=workers)
+            elapsed = time.perf_counter() - started
+            print(f"  {workers:<8}{elapsed:>9.2f}{result['pages'] / elapsed:>10.1f}{len(result['rows']):>8}")
+    finally:
+        os.remove(path)
+
+    parent, children = peak_rss_mb()
+    print(f"peak RSS: parent {parent:.0f} MB, largest worker {children:.0f} MB")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,67 @@
+"""Change feed: diff cost per refresh and bytes per poll vs re-downloading
+
+Saves successive versions of a set of cause lists where each refresh adds,
+drops and re-orders a few entries, and compares what a polling client
+downloads: the whole list as JSON vs the change-feed page since its cursor.
+
+    python benchmarks/bench_change_feed.py [lists] [entries_per_list] [refreshes]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cause_lists import CauseListStore, iter_mock_cause_list
+from change_feed import ChangeFeed
+
+
+def refresh(rng, entries):
+    """Next version of a list: two entries dropped, one added, one pair swapped, renumbered"""
+    entries = [dict(entry) for entry in entries]
+    for _ in range(2):
+        entries.pop(rng.randrange(len(entries)))
+    entries.insert(rng.randrange(len(entries)), next(iter_mock_cause_list(1, seed=rng.random())))
+    i, j = rng.randrange(len(entries)), rng.randrange(len(entries))
+    entries[i], entries[j] = entries[j], entries[i]
+    for serial, entry in enumerate(entries, start=1):
+        entry["serial_no"] = serial  # the portal renumbers the whole list
+    return entries
+
+
+def main(lists=50, entries_per_list=300, refreshes=5):
+    path = tempfile.mkstemp(prefix="bench-change-feed-", suffix=".db")[1]
+    store, feed = CauseListStore(path), ChangeFeed(path)
+    store.on_save(feed.record)
+    rng = random.Random(7)
+    versions = {f"Complex {n}": list(iter_mock_cause_list(entries_per_list, seed=n)) for n in range(lists)}
+    for court_complex, entries in versions.items():
+        store.save(court_complex, "21/10/2026", entries)
+    cursor = feed.latest()
+
+    full_bytes = feed_bytes = 0
+    save_seconds = 0.0
+    for _ in range(refreshes):
+        for court_complex in versions:
+            versions[court_complex] = refresh(rng, versions[court_complex])
+            started = time.perf_counter()
+            store.save(court_complex, "21/10/2026", versions[court_complex])
+            save_seconds += time.perf_counter() - started
+            full_bytes += len(json.dumps(versions[court_complex]))
+        changes = feed.changes(cursor, limit=10 ** 9)
+        cursor = changes[-1]["seq"] if changes else cursor
+        feed_bytes += len(json.dumps({"changes": changes, "cursor": cursor}))
+
+    saves = lists * refreshes
+    print(f"{lists} lists x {entries_per_list} entries, {refreshes} refreshes")
+    print(f"  save + diff: {save_seconds / saves * 1e3:.2f} ms per list")
+    print(f"  polling all lists: full lists {full_bytes / 2 ** 20:.1f} MB, "
+          f"change feed {feed_bytes / 2 ** 10:.0f} KB ({full_bytes / feed_bytes:.0f}x less)")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
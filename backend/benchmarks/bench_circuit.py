@@ -0,0 +1,102 @@
+"""Case lookups while the upstream court server fails, with and without per-host breakers and limits
+
+Runs threads doing /api/search-style lookups (get_case_status, uncached)
+against the stub portal through three phases: healthy, then sick
+(injected multi-second latency and failures), then healthy again. The
+lookups are run twice, once on a Transport with the circuit breaker and
+adaptive concurrency limit (the default) and once with both off. For each
+phase the run reports:
+
+- lookup latency (p50/p99);
+- how many lookups were answered from the portal, answered with the last
+  stored status (stale), or failed;
+- the host's breaker state and concurrency limit at the end of the phase.
+
+In the unguarded run a sick host ties up every thread until its deadline.
+
+    python benchmarks/bench_circuit.py [threads] [phase_seconds] [sick_latency_seconds] [sick_fail_rate]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from stub_portal import start_stub_portal
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values[0] if values else 0.0)
+
+
+def run_phase(scraper, cnrs, threads, seconds):
+    """Lookups from `threads` threads for `seconds`: [(latency, outcome)]"""
+    results = []
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def worker(offset):
+        n = offset
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            result = scraper.get_case_status({"cnr": cnrs[n % len(cnrs)]})
+            outcome = "error" if "error" in result else "stale" if result.get("stale") else "fresh"
+            with lock:
+                results.append((time.perf_counter() - started, outcome))
+            n += threads
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results
+
+
+def main(threads=16, phase_seconds=8.0, sick_latency=4.0, sick_fail_rate=0.5):
+    server, base_url = start_stub_portal(latency=0.02)
+    directory = tempfile.mkdtemp(prefix="bench-circuit-")
+    for name in ("COURT_DB", "CAUSE_LIST_DB", "WATCHLIST_DB"):
+        os.environ[name] = os.path.join(directory, name.lower() + ".db")
+    os.environ["HIERARCHY_SNAPSHOT"] = os.path.join(directory, "hierarchy.snapshot")
+    from app import ECourtsScraper
+    from case_cache import CaseStatusCache
+    from transport import Transport
+
+    cnrs = [f"DLHI01{n:06d}2024" for n in range(200)]
+    print(f"{threads} threads, {phase_seconds:.0f} s per phase; sick: ~{sick_latency:.0f} s latency,"
+          f" {sick_fail_rate:.0%} failures; 5 s deadline, 2 s read timeout")
+    for guarded in (True, False):
+        # No caching, so every lookup goes upstream (or to the fallback)
+        transport = Transport(pool_size=threads, rate_per_host=1000, max_retries=1, backoff_base=0.05,
+                              read_timeout=2.0, deadline=5.0, slow_call_seconds=1.5,
+                              breaker={"open_seconds": 2.0} if guarded else False,
+                              limiter=None if guarded else False)
+        scraper = ECourtsScraper(live=True, base_url=base_url + "/", transport=transport,
+                                 case_cache=CaseStatusCache(tiers={"listed": 0, "disposed": 0, "default": 0}))
+        print("with circuit breaker and adaptive limit:" if guarded else "without (fixed pool, no breaker):")
+        for phase, latency, fail_rate in (("healthy", 0.02, 0.0), ("sick", sick_latency, sick_fail_rate),
+                                          ("recovered", 0.02, 0.0)):
+            server.latency, server.fail_rate = latency, fail_rate
+            results = run_phase(scraper, cnrs, threads, phase_seconds)
+            latencies = sorted(seconds for seconds, _ in results)
+            outcomes = {name: sum(1 for _, outcome in results if outcome == name)
+                        for name in ("fresh", "stale", "error")}
+            host = next(iter(transport.host_states().values()))
+            circuit = host["circuit"]["state"] if host["circuit"] else "-"
+            print(f"  {phase:<9} {len(results):>5} lookups: p50 {percentile(latencies, 50) * 1e3:7.0f} ms,"
+                  f" p99 {percentile(latencies, 99) * 1e3:7.0f} ms; {outcomes['fresh']} fresh,"
+                  f" {outcomes['stale']} stale, {outcomes['error']} errors; circuit {circuit},"
+                  f" limit {host['concurrency']['limit']}")
+        scraper.parsers.close()
+        # Let the unguarded run's abandoned requests drain before the next run
+        server.latency, server.fail_rate = 0.02, 0.0
+        transport.drain(10)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:]))
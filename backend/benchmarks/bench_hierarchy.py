@@ -0,0 +1,128 @@
+"""Micro-benchmark: linear scans over INDIAN_COURTS_DATA vs HierarchyIndex
+
+Builds a synthetic national-scale tree (36 states, ~700 districts,
+~3,500 court complexes) and times each cascading-dropdown lookup both ways.
+
+    python benchmarks/bench_hierarchy.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hierarchy import HierarchyIndex
+
+
+def national_data(states=36, districts_per_state=20, complexes_per_district=5, taluks_per_district=6):
+    """Synthetic hierarchy shaped like the full eCourts tree"""
+    data = {"states": []}
+    for s in range(states):
+        state_code = f"S{s:02d}"
+        districts = []
+        for d in range(districts_per_state):
+            district_code = f"{state_code}{d:02d}"
+            districts.append({
+                "code": district_code,
+                "name": f"District {district_code}",
+                "taluks": [f"Taluk {district_code}-{t}" for t in range(taluks_per_district)],
+                "court_complexes": [f"Complex {district_code}-{c}" for c in range(complexes_per_district)]
+            })
+        data["states"].append({"code": state_code, "name": f"State {s}", "districts": districts})
+    return data
+
+
+# The pre-index implementations, kept verbatim for comparison
+def linear_state_name(data, state_code):
+    for state in data["states"]:
+        if state["code"] == state_code:
+            return state["name"]
+    return "Unknown State"
+
+
+def linear_districts(data, state_code):
+    for state in data["states"]:
+        if state["code"] == state_code:
+            return [{"code": district["code"], "name": district["name"]} for district in state["districts"]]
+    return []
+
+
+def linear_court_complexes(data, state_code, district_code):
+    for state in data["states"]:
+        if state["code"] == state_code:
+            for district in state["districts"]:
+                if district["code"] == district_code:
+                    return district["court_complexes"]
+    return []
+
+
+def linear_taluks(data, state_code=None, district_code=None):
+    taluks = []
+    for state in data["states"]:
+        if state_code and state["code"] != state_code:
+            continue
+        for district in state["districts"]:
+            if district_code and district["code"] != district_code:
+                continue
+            for taluk in district.get("taluks", []):
+                taluks.append({
+                    "state_code": state["code"],
+                    "state_name": state["name"],
+                    "district_code": district["code"],
+                    "district_name": district["name"],
+                    "taluk_name": taluk
+                })
+    return taluks
+
+
+def main(number=2000):
+    data = national_data()
+    build = timeit.timeit(lambda: HierarchyIndex(data), number=5) / 5
+    index = HierarchyIndex(data)
+
+    rng = random.Random(42)
+    keys = []
+    for _ in range(256):
+        state = rng.choice(data["states"])
+        district = rng.choice(state["districts"])
+        keys.append((state["code"], district["code"]))
+
+    cases = [
+        ("state_name",
+         lambda s, d: linear_state_name(data, s),
+         lambda s, d: index.state_name(s, "Unknown State")),
+        ("districts",
+         lambda s, d: linear_districts(data, s),
+         lambda s, d: list(index.district_options(s))),
+        ("court_complexes",
+         lambda s, d: linear_court_complexes(data, s, d),
+         lambda s, d: list(index.court_complexes(s, d))),
+        ("taluks(district)",
+         lambda s, d: linear_taluks(data, s, d),
+         lambda s, d: list(index.taluks(s, d))),
+    ]
+
+    complexes = sum(1 for _ in index.iter_complexes())
+    districts = len(index.district_rows)
+    print(f"hierarchy: {len(index)} states, {districts} districts, {complexes} complexes")
+    print(f"index build: {build * 1e3:.2f} ms (once at startup)")
+    print(f"{'lookup':<18}{'linear us':>12}{'indexed us':>12}{'speedup':>10}")
+    for name, linear, indexed in cases:
+        for s, d in keys:
+            assert list(linear(s, d)) == list(indexed(s, d)), name
+
+        def run(fn):
+            def loop():
+                for s, d in keys:
+                    fn(s, d)
+            return timeit.timeit(loop, number=max(1, number // len(keys))) / (
+                max(1, number // len(keys)) * len(keys))
+
+        t_linear = run(linear)
+        t_indexed = run(indexed)
+        print(f"{name:<18}{t_linear * 1e6:>12.2f}{t_indexed * 1e6:>12.2f}{t_linear / t_indexed:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
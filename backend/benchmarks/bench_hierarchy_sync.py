@@ -0,0 +1,79 @@
+"""Hierarchy sync: full national crawl time, incremental re-sync and hot-swap stalls
+
+Serves a synthetic national tree (36 states x 20 districts x 5 complexes x
+8 courts, about 4,400 portal requests per crawl) from the stub portal with
+per-request latency, then times a first sync from the built-in hierarchy,
+a re-sync after a small change, and how long readers of the in-memory
+index stall while a changed tree is swapped in.
+
+    python benchmarks/bench_hierarchy_sync.py [rate_per_second] [latency_ms] [states]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from court_data import INDIAN_COURTS_DATA
+from geo_responses import GeoResponseCache
+from hierarchy import HierarchyIndex
+from hierarchy_sync import HierarchySync
+from storage import CourtStore
+from stub_portal import StubHierarchy, start_stub_portal
+
+
+def main(rate=20, latency_ms=200, states=36):
+    tree = StubHierarchy(states=states)
+    server, base_url = start_stub_portal(latency=latency_ms / 1000, routes=tree.routes())
+    store = CourtStore(tempfile.mkstemp(prefix="bench-hierarchy-", suffix=".db")[1])
+    store.load_hierarchy(HierarchyIndex(INDIAN_COURTS_DATA))
+    sync = HierarchySync(store, base_url=base_url + "/", rate_per_host=rate)
+
+    print(f"{tree.requests():,} portal requests per crawl, {latency_ms} ms latency, {rate}/s rate limit,"
+          f" fan-out {tuple(sync.fan_out.values())}")
+    for label in ("first sync", "re-sync after a change"):
+        stats = sync.run_once()
+        print(f"{label}: {stats['duration_seconds']:.1f}s,"
+              f" {sum(stats['requests'].values()) / stats['duration_seconds']:.1f} requests/s,"
+              f" {stats['changes']:,} changes, {sum(stats['failed'].values())} failed requests")
+        print(f"  per level: {stats['level_seconds']}")
+        tree.revision += 1
+
+    # Readers keep looking up districts while the changed tree is loaded and swapped in
+    current = {"index": HierarchyIndex(INDIAN_COURTS_DATA)}
+    stalls = []
+    stop = threading.Event()
+
+    def reader():
+        # Paced like request threads that spend most of their time on I/O
+        while not stop.wait(0.001):
+            started = time.perf_counter()
+            index = current["index"]
+            index.district_options("1")
+            stalls.append(time.perf_counter() - started)
+
+    def swap(data):
+        hierarchy = HierarchyIndex(data)
+        GeoResponseCache(hierarchy).warm()
+        current["index"] = hierarchy
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    sync.check(swap)
+    swap_seconds = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    stalls.sort()
+    print(f"hot swap: {swap_seconds * 1e3:.0f} ms to load and swap; {len(stalls):,} reads meanwhile,"
+          f" p99 {stalls[int(len(stalls) * 0.99)] * 1e6:.0f} us, max {stalls[-1] * 1e3:.1f} ms"
+          f" (GIL switch interval {sys.getswitchinterval() * 1e3:.0f} ms)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
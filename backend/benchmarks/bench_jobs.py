@@ -0,0 +1,114 @@
+"""Job queue throughput: queue overhead per backend, then N local worker processes against the stub portal
+
+First leases and completes no-op jobs from 8 threads, to show what each
+backend costs per job (Redis too when REDIS_URL is set). Then enqueues
+CNR refreshes into a SQLite queue with `jobs.py enqueue` and drains it
+with 1, 2 and 4 `jobs.py worker` processes, the way nodes would run them,
+checking that every job finished, that enqueueing the batch again adds
+nothing, and that the stub never saw more concurrent requests than the
+per-host limit allows.
+
+    python benchmarks/bench_jobs.py [cases] [threads_per_worker] [host_limit] [latency_seconds]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+
+from jobs import MemoryQueue, RedisQueue, SQLiteQueue, JobWorker, job_spec
+from stub_portal import case_by_cnr_route, start_stub_portal
+
+
+def queue_overhead(queue, count=5000, threads=8):
+    queue.enqueue_many([job_spec("noop", f"noop:{n}", {"n": n}, host=f"court{n % 20}") for n in range(count)])
+    stats = JobWorker(queue, {"noop": lambda payload: None}, threads=threads, poll_seconds=0.01).run(drain=True)
+    return stats["done"] / stats["duration_seconds"]
+
+
+class ConcurrencyProbe:
+    """Wraps a stub route, adding its latency and recording the most requests it was serving at once"""
+
+    def __init__(self, route, latency):
+        self.route = route
+        self.latency = latency
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.latency * (0.5 + random.random()))
+            return self.route(query)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def jobs_cli(directory, queue_url, base_url, host_limit, *args, background=False):
+    env = dict(os.environ, COURT_DB=os.path.join(directory, "court.db"),
+               CAUSE_LIST_DB=os.path.join(directory, "cause_lists.db"),
+               WATCHLIST_DB=os.path.join(directory, "watchlists.db"),
+               HIERARCHY_SNAPSHOT=os.path.join(directory, "hierarchy.snapshot"))
+    env.pop("CASE_CACHE_DB", None)
+    command = [sys.executable, os.path.join(BACKEND, "jobs.py"), "--queue", queue_url, "--base-url", base_url,
+               "--host-limit", str(host_limit), *args]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if background:
+        return process
+    out, err = process.communicate()
+    if process.returncode:
+        raise RuntimeError(f"jobs.py {' '.join(args)} failed:\n{err[-2000:]}")
+    return dict(line.split(": ", 1) for line in out.splitlines() if ": " in line)
+
+
+def main(cases=2000, threads=8, host_limit=16, latency=0.05):
+    print("queue overhead (no-op jobs, 8 threads):")
+    print(f"  memory: {queue_overhead(MemoryQueue(host_limit=0)):,.0f} jobs/s")
+    print(f"  sqlite: {queue_overhead(SQLiteQueue(tempfile.mktemp(suffix='.db'), host_limit=0)):,.0f} jobs/s")
+    if os.environ.get("REDIS_URL"):
+        queue = RedisQueue(os.environ["REDIS_URL"], prefix=f"bench:{os.getpid()}", host_limit=0)
+        print(f"  redis:  {queue_overhead(queue):,.0f} jobs/s")
+
+    probe = ConcurrencyProbe(case_by_cnr_route, latency)
+    server, base_url = start_stub_portal(fail_rate=0.02, routes={"cnr_status/searchByCNR": probe})
+    base_url += "/"
+    print(f"CNR refreshes: {cases:,} jobs, stub latency ~{latency * 1000:.0f} ms, 2% injected failures,"
+          f" {threads} threads per worker, {host_limit} leases per host")
+    ok = True
+    for workers in (1, 2, 4):
+        directory = tempfile.mkdtemp(prefix="bench-jobs-")
+        cnrs = os.path.join(directory, "cnrs.txt")
+        with open(cnrs, "w") as f:
+            f.writelines(f"DLHI{workers:02d}{n:06d}2024\n" for n in range(cases))
+        queue_url = f"sqlite:///{os.path.join(directory, 'jobs.db')}"
+        enqueue = ("enqueue", "cases", "--cases", cnrs)
+        added = int(jobs_cli(directory, queue_url, base_url, host_limit, *enqueue)["enqueued"])
+        probe.peak = 0
+        started = time.perf_counter()
+        processes = [jobs_cli(directory, queue_url, base_url, host_limit, "worker", "--threads", str(threads),
+                              "--rate", "1000", "--drain", background=True) for _ in range(workers)]
+        for process in processes:
+            process.communicate()
+        seconds = time.perf_counter() - started
+        queue = SQLiteQueue(queue_url[len("sqlite:///"):])
+        stats = queue.stats()
+        again = int(jobs_cli(directory, queue_url, base_url, host_limit, *enqueue)["enqueued"])
+        print(f"  {workers} worker process{'es' if workers > 1 else ''}: {stats['done']:,}/{added:,} done,"
+              f" {stats['dead']} dead in {seconds:.1f} s ({stats['done'] / seconds:,.1f} jobs/s);"
+              f" peak {probe.peak} concurrent requests; re-enqueued {again}")
+        ok = ok and stats["done"] + stats["dead"] == added == cases and not again and probe.peak <= host_limit
+    server.shutdown()
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,92 @@
+"""ListingIndex: ingest rate, memory footprint and query latency
+
+Ingests N days of synthetic cause lists (default ~1M entries/day across
+3,500 complexes), then times hit and miss lookups against a linear scan of
+the same lists.
+
+    python benchmarks/bench_listing_index.py [complexes] [entries_per_list] [days]
+"""
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cause_lists import MOCK_CASE_TYPES, MOCK_PURPOSES
+from listing_index import ListingIndex
+
+
+def synthetic_list(rng, entries, courts):
+    return [{
+        "serial_no": i + 1,
+        "case_number": f"{rng.choice(MOCK_CASE_TYPES)}/{rng.randint(1, 99999)}/{rng.randint(2010, 2025)}",
+        "parties": "A vs. B",
+        "court": rng.choice(courts),
+        "purpose": rng.choice(MOCK_PURPOSES)
+    } for i in range(entries)]
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def main(complexes=3500, entries_per_list=300, days=1):
+    rng = random.Random(3)
+    index = ListingIndex()
+    start = datetime.now()
+    lists = []
+
+    gc.collect()
+    tracemalloc.start()
+    ingest_seconds = 0.0
+    total = 0
+    for day in range(days):
+        date_str = (start + timedelta(days=day)).strftime('%d/%m/%Y')
+        for c in range(complexes):
+            courts = [f"Court Room {n} - Complex {c}" for n in range(1, 9)]
+            entries = synthetic_list(rng, entries_per_list, courts)
+            if c % 50 == 0:
+                lists.append((f"Complex {c}", date_str, entries))
+            started = time.perf_counter()
+            index.add_list(f"Complex {c}", date_str, entries)
+            ingest_seconds += time.perf_counter() - started
+            total += len(entries)
+    traced_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = index.stats()
+    print(f"ingested {total:,} entries ({days} day(s) x {complexes} complexes x {entries_per_list})")
+    print(f"  ingest: {total / ingest_seconds:,.0f} entries/s")
+    print(f"  keys={stats['keys']:,} postings={stats['postings']:,} courts={stats['courts']:,}")
+    print(f"  memory: ~{stats['approx_bytes'] / 2 ** 20:.0f} MB by getsizeof "
+          f"({stats['bytes_per_posting']} B/posting); traced incl. test data "
+          f"{traced_current / 2 ** 20:.0f} MB")
+
+    hits = [entry["case_number"] for _, _, entries in lists for entry in entries[:20]]
+    misses = [f"WRIT/{n}/1999" for n in range(len(hits))]
+    for label, keys in (("hit", hits), ("miss", misses)):
+        samples = []
+        for key in keys:
+            started = time.perf_counter()
+            index.listings_for({'case_type': key.split('/')[0], 'case_number': key.split('/')[1],
+                                'case_year': key.split('/')[2]})
+            samples.append(time.perf_counter() - started)
+        print(f"  {label:<5} lookup p50={percentile(samples, 0.5) * 1e6:.1f} us "
+              f"p99={percentile(samples, 0.99) * 1e6:.1f} us")
+
+    # The alternative: scan every ingested list per query (sampled lists only)
+    sample = lists[:20]
+    started = time.perf_counter()
+    for key in hits[:50]:
+        [e for _, _, entries in sample for e in entries if e["case_number"] == key]
+    scan = (time.perf_counter() - started) / 50 * (complexes * days / len(sample))
+    print(f"  linear scan over all lists (extrapolated): {scan * 1e3:.1f} ms/query")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
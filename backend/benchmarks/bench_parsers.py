@@ -0,0 +1,71 @@
+"""Page parsing: BeautifulSoup baseline vs lxml, inline and in the process pool
+
+Parses every saved page in fixtures/pages with the portal.py reference
+parsers and with page_parsers, checks both against the expected results,
+and prints docs/second. Then runs the large cause list from several
+threads, parsed inline vs through ParserPool.
+
+    python benchmarks/bench_parsers.py [seconds_per_case] [threads]
+"""
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from page_parsers import ParserPool, parse_case_status_page, parse_cause_list_page
+from portal import parse_case_status_html, parse_cause_list_html
+
+FIXTURES = os.path.join(HERE, "..", "fixtures", "pages")
+PARSERS = {
+    "case": (parse_case_status_html, parse_case_status_page),
+    "cause_list": (parse_cause_list_html, parse_cause_list_page),
+}
+
+
+def rate(parse, page, seconds):
+    done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        parse(page)
+        done += 1
+    return done / (time.perf_counter() - started)
+
+
+def main(seconds=1.0, threads=8):
+    seconds, threads = float(seconds), int(threads)
+    print(f"{'page':<22}{'bytes':>8}{'bs4 docs/s':>12}{'lxml docs/s':>13}{'speedup':>9}  match")
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        name = os.path.basename(path)[:-5]
+        with open(path, encoding="utf-8") as f:
+            page = f.read()
+        with open(os.path.join(FIXTURES, f"{name}.expected.json"), encoding="utf-8") as f:
+            expected = json.load(f)
+        baseline, fast = PARSERS["cause_list" if name.startswith("cause_list") else "case"]
+        match = baseline(page) == expected and fast(page) == expected
+        slow_rate, fast_rate = rate(baseline, page, seconds), rate(fast, page, seconds)
+        print(f"{name:<22}{len(page):>8,}{slow_rate:>12,.0f}{fast_rate:>13,.0f}"
+              f"{fast_rate / slow_rate:>8.1f}x  {'ok' if match else 'MISMATCH'}")
+
+    with open(os.path.join(FIXTURES, "cause_list_large.html"), encoding="utf-8") as f:
+        page = f.read()
+    total = 20 * threads
+    pool = ParserPool()
+    pool.map("cause_list", [page] * pool.workers)  # start the workers
+    for label, parse in (("inline", parse_cause_list_page),
+                         ("process pool", lambda html: pool.parse("cause_list", html))):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(parse, [page] * total))
+        elapsed = time.perf_counter() - started
+        print(f"{threads} threads x cause_list_large, {label:<13} {total / elapsed:>8,.0f} docs/s")
+    pool.close()
+    print(f"({os.cpu_count()} CPUs; the pool only pulls ahead with spare cores)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
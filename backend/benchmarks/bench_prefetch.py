@@ -0,0 +1,49 @@
+"""Dry-run the cause-list pre-fetcher against the local stub portal
+
+Uses the synthetic national hierarchy from bench_hierarchy (or a slice of
+it), runs one pre-fetch for tomorrow into a throwaway store and reports
+throughput and how many lists would have been warm by 09:00.
+
+    python benchmarks/bench_prefetch.py [complexes] [workers] [latency_seconds]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_hierarchy import national_data
+from stub_portal import start_stub_portal
+
+
+def main(complexes=500, workers=16, latency=0.05):
+    server, base_url = start_stub_portal(latency=latency, fail_rate=0.02)
+    os.environ['ECOURTS_BASE_URL'] = base_url + "/"
+    from app import ECourtsScraper
+    from hierarchy import HierarchyIndex
+    from prefetch import PrefetchScheduler
+    from transport import Transport
+
+    data = national_data(states=36, districts_per_state=20, complexes_per_district=5)
+    districts_needed = max(1, complexes // 5)
+    for state in data["states"]:
+        state["districts"], districts_needed = state["districts"][:districts_needed], \
+            max(0, districts_needed - len(state["districts"]))
+    data["states"] = [state for state in data["states"] if state["districts"]]
+
+    scraper = ECourtsScraper(hierarchy=HierarchyIndex(data), live=True,
+                             transport=Transport(pool_size=workers, rate_per_host=1000,
+                                                 burst_per_host=workers, backoff_base=0.01))
+    scheduler = PrefetchScheduler(scraper, workers=workers, dry_run=True)
+    stats = scheduler.run_once()
+    server.shutdown()
+
+    print(f"stub latency ~{latency * 1000:.0f} ms, {workers} workers, 2% injected failures")
+    for name in ("planned", "fetched", "failed", "retries", "entries",
+                 "duration_seconds", "lists_per_second"):
+        print(f"  {name}: {stats[name]}")
+    print(f"  warm: {scheduler.warm_report(stats['date'])}")
+    print(f"  transport: {scraper.transport.metrics.snapshot()}")
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:]))
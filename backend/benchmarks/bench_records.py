@@ -0,0 +1,97 @@
+"""Compact records: memory per row and conversion speed against plain dicts
+
+Builds synthetic cause lists (realistic parties, a complex's court rooms,
+the usual purposes) two ways: lists of entry dicts as json.loads or a
+parser produce them, and CauseListEntries blocks. It measures memory per
+row with tracemalloc, then times JSON encoding, Arrow conversion,
+iteration and a pickle round trip (what a parser worker sends back).
+Case-status results are compared the same way, as dicts and CaseResult.
+
+    python benchmarks/bench_records.py [entries] [case_results]
+"""
+import gc
+import json
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pyarrow as pa
+
+from bench_search import Parties, synthetic_lists
+from records import CaseResult, CauseListEntries
+
+
+def measured(build):
+    """(result, bytes allocated by build() and still held)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(work, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        work()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def case_results(count):
+    parties = Parties(seed=2)
+    statuses = ("Pending", "Hearing", "Disposed", "Adjourned")
+    for n in range(count):
+        yield json.loads(json.dumps({
+            "case_number": f"CIVIL/{n}/2024", "parties": parties(),
+            "court": f"Court Room {n % 12 + 1} - Justice {('Sharma', 'Verma', 'Iyer')[n % 3]}",
+            "status": statuses[n % 4], "listed_today": n % 5 == 0, "listed_tomorrow": False,
+            "serial_number": None, "hearing_date": f"{n % 28 + 1:02d}/11/2026", "cnr": f"DLHI01{n:06d}2024"}))
+
+
+def main(entries=1_000_000, results=100_000):
+    lists = [(court_complex, date, json.dumps(rows, ensure_ascii=False))
+             for court_complex, date, rows in synthetic_lists(entries, Parties())]
+
+    dicts, dict_bytes = measured(lambda: [json.loads(body) for _, _, body in lists])
+    blocks, block_bytes = measured(lambda: [CauseListEntries(json.loads(body)) for _, _, body in lists])
+    print(f"{entries:,} cause-list entries in {len(lists):,} lists")
+    print(f"  memory: dicts {dict_bytes / entries:,.0f} B/row, CauseListEntries {block_bytes / entries:,.0f} B/row"
+          f" ({dict_bytes / block_bytes:.1f}x smaller)")
+
+    build = timed(lambda: [CauseListEntries(rows) for rows in dicts], repeat=1)
+    print(f"  building blocks from dicts: {build / entries * 1e6:.2f} us/row")
+    cases = (
+        ("JSON array", lambda: [json.dumps(rows, ensure_ascii=False) for rows in dicts],
+         lambda: [block.to_json() for block in blocks]),
+        ("Arrow record batch", lambda: [pa.RecordBatch.from_pylist(rows) for rows in dicts],
+         lambda: [block.to_arrow() for block in blocks]),
+        ("iterate as dicts", lambda: [sum(1 for _ in rows) for rows in dicts],
+         lambda: [sum(1 for _ in block) for block in blocks]),
+        ("pickle round trip", lambda: [pickle.loads(pickle.dumps(rows)) for rows in dicts],
+         lambda: [pickle.loads(pickle.dumps(block)) for block in blocks]),
+    )
+    for name, plain, compact in cases:
+        plain_seconds, compact_seconds = timed(plain), timed(compact)
+        print(f"  {name:<20} dicts {plain_seconds / entries * 1e6:6.2f} us/row,"
+              f" CauseListEntries {compact_seconds / entries * 1e6:6.2f} us/row")
+    pickled = sum(len(pickle.dumps(rows)) for rows in dicts), sum(len(pickle.dumps(block)) for block in blocks)
+    print(f"  pickled size: dicts {pickled[0] / entries:.0f} B/row, CauseListEntries {pickled[1] / entries:.0f} B/row")
+    del dicts, blocks
+
+    plain, plain_bytes = measured(lambda: list(case_results(results)))
+    records, record_bytes = measured(lambda: [CaseResult.from_dict(result) for result in case_results(results)])
+    print(f"{results:,} case results: dicts {plain_bytes / results:,.0f} B each,"
+          f" CaseResult {record_bytes / results:,.0f} B each ({plain_bytes / record_bytes:.1f}x smaller);"
+          f" to_dict {timed(lambda: [record.to_dict() for record in records]) / results * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,190 @@
+"""/api/search and /api/cause-list latency with stale-while-revalidate, against a plain TTL
+
+Requests a set of cases and complexes' cause lists through the Flask app
+from several threads against the stub portal, under two policies that aim
+for equally fresh answers:
+
+- ttl: soft TTL = hard TTL, so a result older than the TTL is fetched while
+  the request waits (how the case cache alone behaves);
+- swr: the same soft TTL but no hard TTL, so the stored result is answered
+  at once and refreshed in the background.
+
+For each endpoint the run reports latency (p50/p99), how answers were
+served (X-Cache), the oldest Age served, and the portal requests made.
+The clients run in the server's process, so tails include their wait for
+the GIL. Under swr the oldest Age is set by how fast the four background
+refresh threads get through the stale keys.
+Then two workers (Revalidators sharing one lease file) are asked for the
+same stale, and then the same expired, case from 16 threads each, to check
+it is fetched from the portal once.
+
+    python benchmarks/bench_revalidate.py [threads] [seconds] [ttl_seconds] [latency_seconds]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from stub_portal import cause_list_route, start_stub_portal
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values[0] if values else 0.0)
+
+
+def memoized(route):
+    """A stub route that renders each distinct query once, so the stub's PDF rendering stays out of the timings"""
+    pages = {}
+
+    def cached(query):
+        key = tuple(sorted(query.items()))
+        if key not in pages:
+            pages[key] = route(query)
+        return pages[key]
+    return cached
+
+
+def run(app_module, requests, threads, seconds):
+    """Random requests from `threads` test clients for `seconds`: [(endpoint, latency, X-Cache, Age)]"""
+    results = []
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def worker(seed):
+        client = app_module.app.test_client()
+        rng = random.Random(seed)
+        while time.monotonic() < stop:
+            endpoint, send = rng.choice(requests)
+            started = time.perf_counter()
+            response = send(client)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f"{endpoint} answered {response.status_code}: {response.get_data()[:200]}")
+            with lock:
+                results.append((endpoint, elapsed, response.headers.get("X-Cache"),
+                                int(response.headers.get("Age", 0))))
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results
+
+
+def dedup_check(latency, threads=16):
+    """Portal fetches when two workers' threads all ask for one stale, then one expired, key at once"""
+    from revalidate import Policy, RefreshLeases, Revalidator
+
+    path = tempfile.mktemp(suffix=".db")
+    fetches = Counter()
+    store = {}
+
+    def fetch(phase):
+        fetches[phase] += 1
+        time.sleep(latency)
+        store["value"] = (phase, time.time())
+        return store["value"]
+
+    counts = {}
+    for phase, stored_at, policy in (("stale", time.time() - 10, Policy(5, 3600)),
+                                     ("expired", time.time() - 10, Policy(5, 5))):
+        store["value"] = ("old", stored_at)
+        workers = [Revalidator({"search": policy}, leases=RefreshLeases(path, owner=f"worker{n}"),
+                               wait_seconds=latency * 20, poll_seconds=0.01) for n in range(2)]
+        barrier = threading.Barrier(2 * threads)
+
+        def ask(revalidator):
+            barrier.wait()
+            revalidator.serve("search", "case:DLHI010000012024", lambda: store["value"], lambda: fetch(phase))
+
+        pool = [threading.Thread(target=ask, args=(workers[n % 2],)) for n in range(2 * threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        for revalidator in workers:
+            revalidator.close()
+        counts[phase] = fetches[phase]
+    return counts
+
+
+def main(threads=16, seconds=10.0, ttl=2.0, latency=0.2):
+    server, base_url = start_stub_portal(latency=latency,
+                                         routes={"cause_list/submitCauseList": memoized(cause_list_route)})
+    directory = tempfile.mkdtemp(prefix="bench-revalidate-")
+    for name in ("COURT_DB", "CAUSE_LIST_DB", "WATCHLIST_DB"):
+        os.environ[name] = os.path.join(directory, name.lower() + ".db")
+    os.environ["HIERARCHY_SNAPSHOT"] = os.path.join(directory, "hierarchy.snapshot")
+    os.environ["CAUSE_LIST_CACHE_DIR"] = os.path.join(directory, "artifacts")
+    os.environ["SWR_LEASE_DB"] = os.path.join(directory, "refresh_leases.db")
+    import app as app_module
+    from case_cache import CaseStatusCache
+    from cause_lists import CauseListStore
+    from revalidate import Policy, RefreshLeases, Revalidator
+    from storage import CourtStore
+    from transport import Transport
+
+    cnrs = [f"DLHI01{n:06d}2024" for n in range(100)]
+    complexes = [code for _, _, code in app_module.HIERARCHY.iter_complexes()][:10]
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    requests = [("search", lambda client, cnr=cnr: client.post("/api/search", json={"search_type": "cnr", "cnr": cnr}))
+                for cnr in cnrs]
+    requests += [("cause_list", lambda client, code=code: client.get(
+        "/api/cause-list", query_string={"court_complex_code": code, "date": tomorrow, "format": "json"}))
+        for code in complexes]
+    # As many list requests as case lookups
+    requests += requests[len(cnrs):] * (len(cnrs) // len(complexes) - 1)
+
+    print(f"{threads} threads for {seconds:.0f} s over {len(cnrs)} cases and {len(complexes)} cause lists;"
+          f" stub latency ~{latency * 1e3:.0f} ms; TTL {ttl:.0f} s")
+    for name, hard_ttl in (("ttl", ttl), ("swr", float("inf"))):
+        run_dir = tempfile.mkdtemp(dir=directory)
+        policy = Policy(ttl, hard_ttl)
+        app_module.scraper = app_module.ECourtsScraper(
+            live=True, base_url=base_url + "/",
+            transport=Transport(pool_size=4 * threads, rate_per_host=10000),
+            case_cache=CaseStatusCache(tiers={"listed": ttl, "disposed": ttl, "default": ttl}),
+            cause_list_store=CauseListStore(os.path.join(run_dir, "cause_lists.db")),
+            store=CourtStore(os.path.join(run_dir, "court.db")),
+            revalidator=Revalidator({"search": policy, "cause_list": policy},
+                                    leases=RefreshLeases(os.path.join(run_dir, "leases.db"))))
+        # First fetches block under either policy; measure what follows
+        for _, send in requests[:len(cnrs) + len(complexes)]:
+            send(app_module.app.test_client()).get_data()
+        hits = server.hits
+        results = run(app_module, requests, threads, seconds)
+        upstream = server.hits - hits
+        print(f"{name} (soft TTL {ttl:.0f} s, hard TTL {'none' if hard_ttl == float('inf') else f'{hard_ttl:.0f} s'}):"
+              f" {len(results) / seconds:,.0f} requests/s, {upstream} portal requests")
+        for endpoint in ("search", "cause_list"):
+            latencies = sorted(seconds for kind, seconds, _, _ in results if kind == endpoint)
+            served = Counter(cache for kind, _, cache, _ in results if kind == endpoint)
+            oldest = max((age for kind, _, _, age in results if kind == endpoint), default=0)
+            print(f"  {endpoint:<10} {len(latencies):>6} requests: p50 {percentile(latencies, 50) * 1e3:7.1f} ms,"
+                  f" p99 {percentile(latencies, 99) * 1e3:7.1f} ms; "
+                  + ", ".join(f"{served[state]} {state}" for state in ("fresh", "stale", "expired", "miss"))
+                  + f"; oldest served {oldest} s")
+        app_module.scraper.revalidator.close()
+        app_module.scraper.transport.drain(10)
+        app_module.scraper.parsers.close()
+
+    counts = dedup_check(latency)
+    print(f"2 workers x 16 threads asking for one case: {counts['stale']} portal fetch(es) when stale,"
+          f" {counts['expired']} when expired")
+    server.shutdown()
+    ok = counts == {"stale": 1, "expired": 1}
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,187 @@
+"""CauseListSearch: ingest cost of the word index and query latency at tens of millions of entries
+
+Bulk-loads synthetic cause lists whose parties look like real ones (a few
+hundred first names, some 60,000 surnames with a long tail, State of X,
+M/s Y Traders), then measures p50/p95/p99 of the queries clerks make:
+one surname exact, with a typo and as a prefix; a full name with a typo;
+a surname in one complex this week; a case-number prefix; and ten pages
+deep through a common surname.
+
+    python benchmarks/bench_search.py [entries] [queries] [path]
+
+The database is deleted afterwards unless a path is given; give the path
+of an existing one to skip the load.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_storage import COMPLEXES, COURTS_PER_COMPLEX, ENTRIES_PER_LIST, Timed, case_number, date_str
+from cause_lists import MOCK_PURPOSES
+from search import CauseListSearch
+from storage import CourtStore
+
+FIRST_NAMES = (
+    "Aarav Abhishek Aditi Ajay Akash Amit Anand Anil Anita Anjali Ankit Arjun Arun Asha Ashok Bharat Chandra"
+    " Deepak Devendra Dinesh Divya Ganesh Geeta Gopal Hari Harish Jagdish Jaya Kamala Kavita Kiran Krishna"
+    " Kumar Lakshmi Lalit Madhu Mahesh Manoj Meena Mohan Mukesh Naresh Neha Nitin Pankaj Pooja Prakash"
+    " Pramod Priya Rahul Raj Rajesh Rakesh Ramesh Ravi Rekha Rohit Sanjay Santosh Sarita Shankar Shanti"
+    " Shiva Sita Sunil Sunita Suresh Sushila Usha Vijay Vikas Vinod Vivek Yogesh"
+).split()
+SURNAMES = (
+    "Sharma Verma Gupta Singh Kumar Yadav Patel Shah Reddy Rao Naidu Nair Menon Iyer Iyengar Pillai Das"
+    " Ghosh Bose Sen Mukherjee Banerjee Chatterjee Joshi Kulkarni Deshpande Patil Jadhav Pawar Shinde"
+    " Agarwal Jain Mehta Khan Ansari Qureshi Siddiqui Chauhan Rathore Thakur Mishra Tiwari Pandey Dubey"
+    " Tripathi Shukla Srivastava Saxena Kapoor Malhotra Khanna Chopra Bhatia Arora Gill Sandhu Grewal"
+).split()
+STATES = ("Karnataka", "Maharashtra", "Delhi", "Uttar Pradesh", "Tamil Nadu", "Kerala", "West Bengal")
+SYLLABLES = ("ka", "ra", "ma", "na", "ta", "la", "sha", "va", "de", "pa", "ri", "ni", "go", "bha", "su", "ya")
+
+
+def surnames(count, seed=1):
+    """The common surnames, then generated ones of two to four syllables"""
+    rng = random.Random(seed)
+    names = dict.fromkeys(SURNAMES)
+    while len(names) < count:
+        names["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()] = None
+    return list(names)
+
+
+class Parties:
+    """Random parties strings; surname popularity falls off like 1/rank"""
+
+    def __init__(self, seed=1, vocabulary=60_000):
+        self.rng = random.Random(seed)
+        self.surnames = surnames(vocabulary)
+        # Cumulative weights, built once; random.choices bisects them
+        total = 0.0
+        self.cumulative = []
+        for rank in range(1, len(self.surnames) + 1):
+            total += 1 / rank
+            self.cumulative.append(total)
+
+    def person(self):
+        rng = self.rng
+        surname = rng.choices(self.surnames, cum_weights=self.cumulative)[0]
+        return f"{rng.choice(FIRST_NAMES)} {surname}"
+
+    def __call__(self):
+        rng = self.rng
+        kind = rng.random()
+        if kind < 0.6:
+            return f"{self.person()} vs. {self.person()}"
+        if kind < 0.85:
+            return f"State of {rng.choice(STATES)} vs. {self.person()}"
+        if kind < 0.95:
+            return f"M/s {self.person().split()[1]} Traders vs. {self.person()} and Ors."
+        return f"{self.person()} vs. Union of India"
+
+
+def synthetic_lists(total, parties, seed=1):
+    rng = random.Random(seed)
+    cases = max(total // 4, 1)
+    lists = (total + ENTRIES_PER_LIST - 1) // ENTRIES_PER_LIST
+    for n in range(lists):
+        complex_no, day_index = n % COMPLEXES, n // COMPLEXES
+        count = min(ENTRIES_PER_LIST, total - n * ENTRIES_PER_LIST)
+        entries = []
+        for serial in range(1, count + 1):
+            entries.append({
+                "serial_no": serial,
+                "case_number": case_number(rng.randrange(cases)),
+                "parties": parties(),
+                "court": f"Complex {complex_no} Court Room {serial % COURTS_PER_COMPLEX + 1}",
+                "hearing_time": "10:30",
+                "purpose": rng.choice(MOCK_PURPOSES)
+            })
+        yield f"Complex {complex_no}", date_str(day_index), entries
+
+
+def typo(word, rng):
+    """word with two neighbouring letters swapped or one letter replaced"""
+    i = rng.randrange(1, len(word) - 1)
+    if rng.random() < 0.5:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice("aeioukrst") + word[i + 1:]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return tuple(samples[min(int(len(samples) * q), len(samples) - 1)] * 1e3 for q in (0.5, 0.95, 0.99))
+
+
+def main(entries=20_000_000, queries=500, path=None):
+    keep = path is not None
+    path = path or tempfile.mkstemp(prefix="bench-search-", suffix=".db")[1]
+    store = CourtStore(path, cache_mb=256)
+    parties = Parties()
+    days = max((entries // ENTRIES_PER_LIST) // COMPLEXES, 1)
+
+    if not store.search_terms(0):
+        lists = Timed(synthetic_lists(entries, parties))
+        started = time.perf_counter()
+        loaded = store.bulk_load(lists, rebuild_indexes=True)
+        load_seconds = time.perf_counter() - started - lists.seconds
+        postings, = store._connection().execute("SELECT COUNT(*) FROM search_postings").fetchone()
+        size = os.path.getsize(path)
+        print(f"bulk load: {loaded:,} entries, {postings:,} word postings in {load_seconds:.1f}s ="
+              f" {loaded / load_seconds:,.0f} rows/s ({lists.seconds:.1f}s generating data not counted),"
+              f" {size / 2 ** 30:.2f} GiB")
+
+    search = CauseListSearch(store)
+    started = time.perf_counter()
+    search.refresh()
+    print(f"word dictionary: {len(search.terms):,} words loaded in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(3)
+    common = [name.lower() for name in SURNAMES[:10]]
+    rare = [name.lower() for name in parties.surnames[5000:] if len(name) >= 6]
+    last_week = (date_str(max(days - 7, 0)), date_str(days - 1))
+
+    def deep_pages():
+        surname = rng.choice(common)
+        page = search.search(party=surname)
+        for _ in range(9):
+            page = search.search(party=surname, cursor=page["next_cursor"])
+
+    cases = {
+        "common surname": lambda: search.search(party=rng.choice(common)),
+        "rare surname": lambda: search.search(party=rng.choice(rare)),
+        "surname with a typo": lambda: search.search(party=typo(rng.choice(common + rare), rng)),
+        "surname prefix (4 letters*)": lambda: search.search(party=rng.choice(common + rare)[:4] + "*"),
+        "first name + typo'd surname": lambda: search.search(
+            party=f"{rng.choice(FIRST_NAMES)} {typo(rng.choice(common), rng)}"),
+        "surname in a complex, last week": lambda: search.search(
+            party=rng.choice(common + rare), court_complex=f"Complex {rng.randrange(COMPLEXES)}",
+            since=last_week[0], until=last_week[1]),
+        "case number prefix": lambda: search.search(
+            case_number=case_number(rng.randrange(entries // 4)).rsplit("/", 1)[0]),
+        "10 pages deep (per page)": deep_pages,
+    }
+    for name, query in cases.items():
+        timings = []
+        found = 0
+        for _ in range(queries):
+            started = time.perf_counter()
+            result = query()
+            timings.append(time.perf_counter() - started)
+            found += len(result["results"]) if result else 0
+        if name.startswith("10 pages"):
+            timings = [seconds / 10 for seconds in timings]
+        p50, p95, p99 = percentiles(timings)
+        print(f"  {name:<32} p50 {p50:6.2f} ms   p95 {p95:6.2f} ms   p99 {p99:6.2f} ms"
+              + (f"   ({found / queries:.1f} results)" if found else ""))
+
+    if not keep:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*(int(arg) for arg in args[:2]), *args[2:3])
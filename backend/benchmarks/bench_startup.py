@@ -0,0 +1,131 @@
+"""Worker cold start: `import app` and init_worker() under python -X importtime, gated on a budget
+
+Byte-compiles the backend first (a deployed worker has its .pyc files),
+then starts app in fresh interpreters the way a non-preloaded worker
+does - module imports plus init_worker() - with the stores in a
+temporary directory. Reports the median of app's cumulative import time
+plus init_worker() (interpreter start-up itself not included), the
+biggest imports under it, and fails if that exceeds the budget or if any
+library other modules defer to first use (lazy.py) was imported at
+start-up.
+
+Then stores a synced national tree (36 states x 20 districts x 5
+complexes x 8 courts) and starts a worker twice: first reading the tree
+from SQLite, which leaves the hierarchy snapshot, then from the snapshot.
+
+    python benchmarks/bench_startup.py [budget_ms] [runs]
+
+Exits 1 when the gate fails, so it can run in CI.
+"""
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+
+from bench_hierarchy import national_data
+from hierarchy import HierarchyIndex
+from hierarchy_sync import diff_trees
+from storage import CourtStore
+
+# Libraries nothing may import at start-up; they load on first use (lazy.py)
+DEFERRED = ("pandas", "requests", "bs4", "lxml", "aiohttp", "pyarrow", "numpy", "selenium")
+
+
+# A worker's start: the import, then its per-process state (timed here, since importtime only sees imports)
+START = ("import time, app; started = time.perf_counter(); app.init_worker();"
+         " print(round((time.perf_counter() - started) * 1e6)); app.shutdown(0)")
+
+
+def import_times(env):
+    """[(module, self_us, cumulative_us, depth)] for one fresh worker start, app last.
+
+    app's line counts init_worker() in its self and cumulative time; modules
+    init_worker() imported are listed before it.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", START], cwd=BACKEND, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"worker start failed:\n{result.stderr[-2000:]}")
+    init_us = int(result.stdout.split()[-1])
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(own), int(cumulative), depth))
+    # importtime lists a module after everything it imported: app's imports are those since the previous top-level line
+    end = next(i for i, (name, _, _, depth) in enumerate(modules) if name == "app" and depth == 0)
+    start = max((i for i in range(end) if modules[i][3] == 0), default=-1) + 1
+    name, own, cumulative, depth = modules[end]
+    return modules[start:end] + modules[end + 1:] + [(name, own + init_us, cumulative + init_us, depth)]
+
+
+def worker_env(directory, **extra):
+    env = dict(os.environ, COURT_DB=os.path.join(directory, "court.db"),
+               CAUSE_LIST_DB=os.path.join(directory, "cause_lists.db"),
+               WATCHLIST_DB=os.path.join(directory, "watchlists.db"),
+               SWR_LEASE_DB=os.path.join(directory, "refresh_leases.db"),
+               HIERARCHY_SNAPSHOT=os.path.join(directory, "hierarchy.snapshot"), **extra)
+    env.pop("ECOURTS_PRELOAD", None)
+    return env
+
+
+def timed_start(env):
+    started = time.perf_counter()
+    app_us = import_times(env)[-1][2]
+    return time.perf_counter() - started, app_us / 1e3
+
+
+def main(budget_ms=200, runs=7):
+    compileall.compile_dir(BACKEND, quiet=1, legacy=False)
+    directory = tempfile.mkdtemp(prefix="bench-startup-")
+    env = worker_env(directory)
+    import_times(env)  # creates the stores, so the runs measure a restart
+    samples = [import_times(env) for _ in range(runs)]
+    totals = sorted(sample[-1][2] / 1e3 for sample in samples)
+    median = statistics.median(totals)
+    last = samples[-1]
+    print(f"import app (worker start-up): median {median:.0f} ms, min {totals[0]:.0f} ms,"
+          f" max {totals[-1]:.0f} ms over {runs} runs; budget {budget_ms} ms")
+    children = sorted(((cumulative, name) for name, _, cumulative, depth in last if depth == 1), reverse=True)
+    print(f"  app's own module body and init_worker(): {last[-1][1] / 1e3:.1f} ms")
+    for cumulative, name in children[:10]:
+        print(f"  {name:<24} {cumulative / 1e3:7.1f} ms")
+    loaded = {name for name, _, _, _ in last}
+    eager = [name for name in DEFERRED if name in loaded]
+    if eager:
+        print(f"  imported at start-up but should be deferred: {', '.join(eager)}")
+
+    # A synced national tree: from SQLite on the first start, from the snapshot it leaves after that
+    national = tempfile.mkdtemp(prefix="bench-startup-national-")
+    env = worker_env(national)
+    import_times(env)
+    data = national_data()
+    data["courts"] = {name: [f"Court {n + 1}" for n in range(8)] for state in data["states"]
+                      for district in state["districts"] for name in district["court_complexes"]}
+    store = CourtStore(env["COURT_DB"])
+    store.apply_hierarchy_changes(diff_trees(store.hierarchy_data(), data))
+    seconds, app_ms = timed_start(env)
+    print(f"synced national tree ({len(HierarchyIndex(data).district_rows):,} districts):"
+          f" first start {seconds * 1e3:,.0f} ms (import app {app_ms:,.0f} ms, tree read from the store"
+          f" and geography responses re-rendered);"
+          f" snapshot {os.path.getsize(env['HIERARCHY_SNAPSHOT']) / 1024:,.0f} KiB")
+    seconds, app_ms = timed_start(env)
+    print(f"  next start from the snapshot: {seconds * 1e3:,.0f} ms (import app {app_ms:,.0f} ms)")
+
+    if median > budget_ms or eager:
+        print("FAIL")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:])))
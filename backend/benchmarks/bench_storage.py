@@ -0,0 +1,148 @@
+"""CourtStore: ingest rows/s and query latency at tens of millions of entries
+
+Bulk-loads synthetic cause lists (250 entries each, 2,000 complexes, a case
+listed about four times, half the entries carrying a CNR), then measures
+incremental saves on the full database and the p50/p99 of the three
+lookups the API makes: listings by CNR, listings by case number, and a
+whole list by complex and date.
+
+    python benchmarks/bench_storage.py [entries] [queries] [path]
+
+The database (several GB at the default 50M entries) is deleted afterwards
+unless a path is given.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from storage import CourtStore
+
+ENTRIES_PER_LIST = 250
+COMPLEXES = 2000
+COURTS_PER_COMPLEX = 10
+CASE_TYPES = ("OS", "CC", "MC", "CRL", "WP", "RFA")
+
+
+def case_number(n):
+    return f"{CASE_TYPES[n % len(CASE_TYPES)]}/{n // len(CASE_TYPES) + 1}/{2000 + n % 25}"
+
+
+def cnr(n):
+    return f"KAB{chr(65 + n % 26)}{n:012d}" if n % 2 else None
+
+
+def date_str(day_index):
+    return time.strftime("%d/%m/%Y", time.gmtime(1767225600 + day_index * 86400))
+
+
+def synthetic_lists(total, cases, seed=1):
+    rng = random.Random(seed)
+    lists = (total + ENTRIES_PER_LIST - 1) // ENTRIES_PER_LIST
+    for n in range(lists):
+        complex_no, day_index = n % COMPLEXES, n // COMPLEXES
+        count = min(ENTRIES_PER_LIST, total - n * ENTRIES_PER_LIST)
+        entries = []
+        for serial in range(1, count + 1):
+            case = rng.randrange(cases)
+            entries.append({
+                "serial_no": serial,
+                "case_number": case_number(case),
+                "cnr": cnr(case),
+                "parties": f"Party {case % 997} vs. Party {case % 991}",
+                "court": f"Complex {complex_no} Court Room {serial % COURTS_PER_COMPLEX + 1}",
+                "hearing_time": "10:30",
+                "purpose": "Hearing"
+            })
+        yield f"Complex {complex_no}", date_str(day_index), entries
+
+
+def refresh(entries):
+    entries = [dict(entry) for entry in entries]
+    for entry in entries[10], entries[100]:
+        entry["purpose"] = "Arguments"
+    entries.append(dict(entries[0], serial_no=len(entries) + 1))
+    return entries
+
+
+class Timed:
+    """Iterator wrapper that adds up the time spent producing items"""
+
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return next(self.iterator)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1e3, samples[int(len(samples) * 0.99)] * 1e3
+
+
+def main(entries=50_000_000, queries=2000, path=None):
+    keep = path is not None
+    path = path or tempfile.mkstemp(prefix="bench-storage-", suffix=".db")[1]
+    store = CourtStore(path, cache_mb=256)
+    cases = max(entries // 4, 1)
+
+    lists = Timed(synthetic_lists(entries, cases))
+    started = time.perf_counter()
+    loaded = store.bulk_load(lists, rebuild_indexes=True)
+    load_seconds = time.perf_counter() - started - lists.seconds
+    size = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+    print(f"bulk load: {loaded:,} entries in {load_seconds:.1f}s = {loaded / load_seconds:,.0f} rows/s"
+          f" (indexes rebuilt; {lists.seconds:.1f}s generating data not counted),"
+          f" {size / 2 ** 30:.2f} GiB, {size / loaded:.0f} B/entry")
+
+    # Incremental saves with both secondary indexes live: 200 lists replaced by different
+    # ones, then the same 200 refreshed with two entries changed and one appended
+    days = max((entries // ENTRIES_PER_LIST) // COMPLEXES, 1)
+    replaced = list(synthetic_lists(min(200 * ENTRIES_PER_LIST, entries), cases, seed=2))
+    refreshed = [(court_complex, list_date, refresh(list_entries))
+                 for court_complex, list_date, list_entries in replaced]
+    for name, saves in (("replaced", replaced), ("refreshed", refreshed)):
+        started = time.perf_counter()
+        rows = sum(store.save_cause_list(*args) for args in saves)
+        save_seconds = time.perf_counter() - started
+        print(f"save_cause_list, {name} lists: {save_seconds / len(saves) * 1e3:.2f} ms per"
+              f" {ENTRIES_PER_LIST}-entry list, {rows / len(saves):.0f} rows written per list")
+
+    rng = random.Random(3)
+    lookups = {
+        "listings by CNR": lambda: store.listings(cnr=cnr(rng.randrange(cases) | 1)),
+        "listings by case number": lambda: store.listings(case_number=case_number(rng.randrange(cases))),
+        "cause list by complex+date": lambda: store.cause_list(
+            f"Complex {rng.randrange(COMPLEXES)}", date_str(rng.randrange(days))),
+    }
+    for name, lookup in lookups.items():
+        timings = []
+        found = 0
+        for _ in range(queries):
+            started = time.perf_counter()
+            result = lookup()
+            timings.append(time.perf_counter() - started)
+            found += len(result or ())
+        p50, p99 = percentiles(timings)
+        print(f"  {name:<28} p50 {p50:6.3f} ms   p99 {p99:6.3f} ms   ({found / queries:.1f} rows/query)")
+
+    if not keep:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*(int(arg) for arg in args[:2]), *args[2:3])
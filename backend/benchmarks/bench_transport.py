@@ -0,0 +1,47 @@
+"""Exercise Transport against the local stub portal
+
+Fires concurrent requests at a stub that injects latency and 503s, then
+prints throughput, the achieved per-host rate and the transport metrics
+(retries, pool wait, rate-limit wait).
+
+    python benchmarks/bench_transport.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from stub_portal import start_stub_portal
+from transport import Transport, TransportError
+
+
+def main(requests_total=400, threads=32, rate=200.0, pool_size=8):
+    server, base_url = start_stub_portal(latency=0.01, fail_rate=0.1, fail_status=503)
+    transport = Transport(pool_size=pool_size, rate_per_host=rate, burst_per_host=10,
+                          backoff_base=0.01, backoff_max=0.2, deadline=5.0)
+
+    def fetch(i):
+        try:
+            return transport.get(f"{base_url}/?i={i}").status_code
+        except TransportError:
+            return None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        statuses = list(pool.map(fetch, range(requests_total)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    ok = sum(1 for status in statuses if status == 200)
+    print(f"{requests_total} requests, {threads} threads, pool={pool_size}, rate={rate}/s")
+    print(f"ok={ok} upstream_hits={server.hits} injected_failures={server.failures}")
+    print(f"elapsed={elapsed:.2f}s throughput={requests_total / elapsed:.0f} req/s "
+          f"(upstream {server.hits / elapsed:.0f} hits/s, limit {rate:.0f}/s)")
+    for name, value in transport.metrics.snapshot().items():
+        print(f"  {name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Watchlist matching at scale
+
+Registers N watched cases spread over users, ingests a day of synthetic
+cause lists (default 3,500 complexes x 300 entries) in one pass, and
+delivers the resulting notifications to a local webhook sink.
+
+    python benchmarks/bench_watchlists.py [watched_cases] [users] [complexes] [entries_per_list]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cause_lists import MOCK_CASE_TYPES, MOCK_PURPOSES
+from watchlists import Watchlists, WebhookNotifier
+
+
+class Sink(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.batches += 1
+            self.server.events += len(body["events"])
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class SinkServer(ThreadingHTTPServer):
+    # The default backlog of 5 refuses connects when the notifier posts in parallel
+    request_queue_size = 1024
+
+
+def case_number(rng):
+    return f"{rng.choice(MOCK_CASE_TYPES)}/{rng.randint(1, 99999)}/{rng.randint(2010, 2025)}"
+
+
+def main(watched=1_000_000, users=100_000, complexes=3500, entries_per_list=300):
+    rng = random.Random(11)
+    sink = SinkServer(("127.0.0.1", 0), Sink)
+    sink.lock, sink.batches, sink.events = threading.Lock(), 0, 0
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{sink.server_address[1]}/hook"
+
+    # The sink is on localhost
+    watchlists = Watchlists(tempfile.mkstemp(prefix="bench-watchlists-", suffix=".db")[1], allow_private_webhooks=True)
+    started = time.perf_counter()
+    per_user = watched // users
+    for user in range(users):
+        watchlists.set_webhook(f"user{user}", url)
+        watchlists.add_keys(f"user{user}", {case_number(rng) for _ in range(per_user)})
+    print(f"registered {watched:,} watched cases for {users:,} users in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    watched_keys = watchlists.stats()["watched_keys"]
+    print(f"  index built: {watched_keys:,} distinct keys in {time.perf_counter() - started:.2f}s")
+
+    lists = [(f"Complex {c}", "21/10/2026", [{
+        "serial_no": i + 1, "case_number": case_number(rng), "parties": "A vs. B",
+        "court": f"Court Room {i % 8 + 1}", "purpose": rng.choice(MOCK_PURPOSES)
+    } for i in range(entries_per_list)]) for c in range(complexes)]
+    entries = complexes * entries_per_list
+
+    started = time.perf_counter()
+    matches = watchlists.match(lists)
+    matched = time.perf_counter() - started
+    events = sum(len(found) for found in matches.values())
+    print(f"matched {entries:,} entries against {watched:,} watched cases in {matched:.2f}s "
+          f"({entries / matched:,.0f} entries/s): {events:,} events for {len(matches):,} users")
+
+    watchlists.notifier = WebhookNotifier(watchlists.webhook, delivered=watchlists.delivered, flush_interval=0.5,
+                                          concurrency=32, allow_private=True)
+    started = time.perf_counter()
+    queued = watchlists.ingest(lists)
+    ingested = time.perf_counter() - started
+    notifier = watchlists.notifier
+    while notifier.stats()["sent_events"] + notifier.stats()["dropped_events"] < queued:
+        time.sleep(0.2)
+    delivered = time.perf_counter() - started
+    print(f"ingest (match + dedup + queue): {ingested:.2f}s; delivered {sink.events:,} events "
+          f"in {sink.batches:,} webhook calls after {delivered:.1f}s "
+          f"(dropped {notifier.stats()['dropped_events']})")
+    notifier.stop()
+    sink.shutdown()
+    os.remove(watchlists.path)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,128 @@
+"""Load test the production server (gunicorn -c gunicorn.conf.py)
+
+Starts the stub portal, launches gunicorn against it with the given number
+of workers, then drives a keep-alive client load over a mix of geography,
+case-status and cause-list requests. Reports req/s overall and per worker
+core, and latency percentiles.
+
+    python benchmarks/loadtest.py [workers] [seconds] [client_threads]
+
+Run with workers = 1, 2, 4 ... to see how throughput scales; the client
+shares the machine, so per-core figures are conservative.
+"""
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, "..")
+sys.path.insert(0, BACKEND)
+
+from stub_portal import start_stub_portal
+
+MIX = [
+    # (weight, method, path, body)
+    (40, "GET", "/api/all-states", None),
+    (20, "GET", "/api/all-districts?state_code=MH", None),
+    (25, "POST", "/api/search", {"search_type": "cnr", "cnr": "MHAU01-000{n:03d}-2021"}),
+    (15, "GET", "/api/cause-list?date_type=today&court_complex_code=Patiala%20House%20Court"
+                "&format=ndjson", None),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30.0):
+    expires = time.monotonic() + timeout
+    while time.monotonic() < expires:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def client(port, seconds, seed, latencies, errors):
+    rng = random.Random(seed)
+    weights = [item[0] for item in MIX]
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    expires = time.monotonic() + seconds
+    while time.monotonic() < expires:
+        _, method, path, body = rng.choices(MIX, weights)[0]
+        payload = None
+        headers = {"Accept-Encoding": "gzip"}
+        if body is not None:
+            payload = json.dumps({k: v.format(n=rng.randint(0, 999)) for k, v in body.items()})
+            headers["Content-Type"] = "application/json"
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def main(workers=2, seconds=10, client_threads=32):
+    stub, base_url = start_stub_portal(latency=0.005)
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    env = dict(os.environ, BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY=str(workers),
+               ECOURTS_BASE_URL=base_url + "/", ECOURTS_LIVE="1", UPSTREAM_RATE_PER_HOST="100000",
+               CAUSE_LIST_DB=os.path.join(workdir, "cause_lists.db"),
+               CAUSE_LIST_CACHE_DIR=os.path.join(workdir, "artifacts"))
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                              cwd=BACKEND, env=env, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        time.sleep(1.0)  # let every worker finish post_fork
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client, args=(port, seconds, i, latencies, errors))
+                   for i in range(client_threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(60)
+        stub.shutdown()
+
+    total = len(latencies)
+    print(f"gunicorn workers={workers} client_threads={client_threads} duration={elapsed:.1f}s "
+          f"(machine has {os.cpu_count()} CPUs)")
+    print(f"  requests={total} errors={len(errors)} upstream_hits={stub.hits}")
+    print(f"  throughput={total / elapsed:,.0f} req/s  per worker core={total / elapsed / workers:,.0f} req/s")
+    if latencies:
+        print(f"  latency p50={percentile(latencies, 0.5) * 1e3:.1f} ms "
+              f"p99={percentile(latencies, 0.99) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
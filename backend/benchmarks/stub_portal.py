@@ -0,0 +1,250 @@
+"""Local stand-in for the eCourts portal used by the benchmarks.
+
+Runs a threaded HTTP server on 127.0.0.1 with injectable latency and
+failures, so transport/scraping code can be exercised without touching the
+real portal:
+
+    server, base_url = start_stub_portal(latency=0.05, fail_rate=0.1)
+    ...
+    server.shutdown()
+"""
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+JUDGES = ["Sharma", "Verma", "Iyer", "Reddy", "Banerjee", "Khan"]
+PARTY_NAMES = ["Ramesh Kumar", "Sunita Sharma", "Anil Mehta", "Priya Nair", "Mohd. Irfan"]
+
+
+class StubPortalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode("utf-8", "replace")
+            query.update({k: v[0] for k, v in parse_qs(body).items()})
+        # The real portal dispatches on ?p=<page>; plain paths work too
+        route_key = query.get("p", parts.path)
+        with server.lock:
+            server.hits += 1
+            server.paths[route_key] = server.paths.get(route_key, 0) + 1
+
+        if server.latency:
+            time.sleep(server.latency * (0.5 + server.rng.random()))
+        if server.fail_rate and server.rng.random() < server.fail_rate:
+            with server.lock:
+                server.failures += 1
+            headers = {"Retry-After": "0"} if server.fail_status == 429 else None
+            return self._send(server.fail_status, json.dumps({"error": "injected"}), headers=headers)
+
+        route = server.routes.get(route_key)
+        if route is None:
+            return self._send(404, json.dumps({"error": "not found"}))
+        status, body, content_type = route(query)
+        return self._send(status, body, content_type)
+
+    do_POST = do_GET
+
+
+class StubPortalServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connects under benchmark fan-out
+    request_queue_size = 1024
+
+
+def echo_route(query):
+    return 200, json.dumps({"ok": True, "query": query}), "application/json"
+
+
+def render_case_page(cnr, case_type="CIVIL", case_number="123", case_year="2024", seed=None):
+    """Case-status page in the markup portal.parse_case_status_html reads"""
+    rng = random.Random(seed if seed is not None else cnr)
+    hearing = (datetime.now() + timedelta(days=rng.randint(0, 3))).strftime("%d/%m/%Y")
+    status = rng.choice(["Pending", "Hearing", "Disposed", "Adjourned"])
+    rows = [
+        ("Case Type", case_type),
+        ("Registration Number", f"{case_type}/{case_number}/{case_year}"),
+        ("CNR Number", cnr),
+        ("Next Hearing Date", hearing),
+        ("Case Status", status),
+        ("Court Number and Judge", f"Court Room {rng.randint(1, 12)} - Justice {rng.choice(JUDGES)}"),
+    ]
+    table = "".join(f"<tr><td>{label}</td><td>{value}</td></tr>" for label, value in rows)
+    return (
+        "<html><head><title>Case Status</title></head><body><div id='caseHistoryDiv'>"
+        f"<table class='case_details_table'>{table}</table>"
+        f"<span class='petitioner'>{rng.choice(PARTY_NAMES)}</span>"
+        f"<span class='respondent'>State of {rng.choice(['Delhi', 'Karnataka', 'Maharashtra'])}</span>"
+        "</div></body></html>"
+    )
+
+
+def case_by_cnr_route(query):
+    cnr = query.get("cino", "")
+    if not cnr:
+        return 200, "<html><body><div class='error'>Invalid CNR</div></body></html>", "text/html"
+    return 200, render_case_page(cnr), "text/html"
+
+
+def case_by_number_route(query):
+    key = "/".join(query.get(name, "") for name in ("case_type", "search_case_no", "rgyear"))
+    cnr = "STUB{:012d}".format(zlib.crc32(key.encode("utf-8")))
+    page = render_case_page(cnr, query.get("case_type", ""), query.get("search_case_no", ""),
+                            query.get("rgyear", ""))
+    return 200, page, "text/html"
+
+
+def cause_list_route(query):
+    """Complex-wide cause list as a PDF; size scales with the complex code"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from cause_list_pdf import render_cause_list_pdf
+    from cause_lists import iter_mock_cause_list, list_seed
+
+    complex_code = query.get("court_complex_code", "")
+    date_str = query.get("causelist_date", "")
+    seed = list_seed(complex_code, None, date_str)
+    entries = sorted(iter_mock_cause_list(20 + seed % 80, seed=seed), key=lambda entry: entry["court"])
+    return 200, render_cause_list_pdf(entries, date_str), "application/pdf"
+
+
+class TokenGate:
+    """Portal pages that only answer requests carrying a JavaScript-issued app_token, like the real site.
+
+    The landing page's script sets window.app_token; guarded routes answer
+    401 without a token the gate issued. The token is only assembled by
+    running the script, so plain HTTP clients are turned away.
+    """
+
+    def __init__(self, landing="casestatus/index"):
+        self.landing = landing
+        self.tokens = set()
+        self.lock = threading.Lock()
+
+    def landing_route(self, query):
+        token = secrets.token_hex(8)
+        with self.lock:
+            self.tokens.add(token)
+        script = f"window.app_token = [{json.dumps(token[8:])}, {json.dumps(token[:8])}].reverse().join('');"
+        page = f"<html><head><script>{script}</script></head><body><form id='caseStatus'></form></body></html>"
+        return 200, page, "text/html"
+
+    def guard(self, route):
+        def guarded(query):
+            with self.lock:
+                valid = query.get("app_token") in self.tokens
+            if not valid:
+                return 401, json.dumps({"error": "invalid app_token"}), "application/json"
+            return route(query)
+        return guarded
+
+    def routes(self, routes=None):
+        """routes (default: the case-status pages) behind the gate, plus its landing page"""
+        routes = routes or {"cnr_status/searchByCNR": case_by_cnr_route,
+                            "casestatus/submitCaseNo": case_by_number_route}
+        guarded = {key: self.guard(route) for key, route in routes.items()}
+        guarded[self.landing] = self.landing_route
+        return guarded
+
+
+class StubHierarchy:
+    """Synthetic national court tree served on the portal's hierarchy pages.
+
+    Bumping `revision` changes a little of it: one complex added per
+    revision in the first district, and the first complex's courts renamed.
+    """
+
+    def __init__(self, states=36, districts=20, complexes=5, courts=8, revision=0):
+        self.states = states
+        self.districts = districts
+        self.complexes = complexes
+        self.courts = courts
+        self.revision = revision
+
+    @staticmethod
+    def _options(key, items):
+        html = "<option value=''>Select</option>" + "".join(
+            f"<option value='{code}'>{name}</option>" for code, name in items)
+        return 200, json.dumps({key: html}), "application/json"
+
+    def states_route(self, query):
+        options = "".join(f"<option value='{n}'>State {n}</option>" for n in range(1, self.states + 1))
+        page = f"<html><body><select id='sess_state_code'><option value='0'>Select State</option>{options}</select>"
+        return 200, page + "</body></html>", "text/html"
+
+    def districts_route(self, query):
+        state = query.get("state_code", "")
+        return self._options("dist_list", [(n, f"District {state}-{n}") for n in range(1, self.districts + 1)])
+
+    def complexes_route(self, query):
+        state, district = query.get("state_code", ""), query.get("dist_code", "")
+        count = self.complexes + (self.revision if (state, district) == ("1", "1") else 0)
+        return self._options("complex_list", [(f"{state}{district:0>3}{n:03d}", f"Complex {state}-{district}-{n}")
+                                              for n in range(1, count + 1)])
+
+    def courts_route(self, query):
+        code = query.get("court_complex_code", "")
+        prefix = f"Rev {self.revision} " if code == "1001001" and self.revision else ""
+        return self._options("cause_list", [(n, f"{prefix}Court Room {n}") for n in range(1, self.courts + 1)])
+
+    def routes(self):
+        return {
+            "casestatus/index": self.states_route,
+            "casestatus/fillDistrict": self.districts_route,
+            "casestatus/fillcomplex": self.complexes_route,
+            "cause_list/fillCauseList": self.courts_route,
+        }
+
+    def requests(self):
+        """Portal requests one full crawl makes"""
+        complexes = self.states * self.districts * self.complexes + self.revision
+        return 1 + self.states + self.states * self.districts + complexes
+
+
+def start_stub_portal(latency=0.0, fail_rate=0.0, fail_status=503, routes=None, seed=0):
+    """Start the stub in a daemon thread; returns (server, base_url)"""
+    server = StubPortalServer(("127.0.0.1", 0), StubPortalHandler)
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.fail_status = fail_status
+    server.routes = {
+        "/": echo_route,
+        "cnr_status/searchByCNR": case_by_cnr_route,
+        "casestatus/submitCaseNo": case_by_number_route,
+        "cause_list/submitCauseList": cause_list_route,
+    }
+    server.routes.update(routes or {})
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.hits = 0
+    server.failures = 0
+    server.paths = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
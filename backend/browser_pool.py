@@ -0,0 +1,354 @@
+"""Long-lived headless browsers for portal pages that need JavaScript and a session.
+
+The portal's case-status pages hand out a session cookie and an app_token
+from JavaScript, and reject form posts that lack them. Starting a browser
+per lookup costs seconds; BrowserPool keeps a few running and leases them
+to lookups:
+
+    with pool.lease() as browser:
+        status, text = browser.post(url, form)
+
+- Warm-up: each browser loads the portal's landing page once when started
+  (and again when its session expires), so a lease gets a live session.
+- Session reuse: lookups are fetch() calls made from inside that page, so
+  the cookie and token carry over and nothing is navigated per lookup.
+- Queue: a lease waits up to lease_timeout for an idle browser, the most
+  recently used first; with max_waiting leases already queued it fails at
+  once with PoolExhausted instead of piling up behind slow lookups.
+- Health: idle browsers are pinged every health_interval, and one whose
+  lease raised is pinged on return; those that don't answer are replaced.
+- Recycling: a browser is replaced after max_pages pages, once its process
+  tree uses more than max_rss_mb, or after max_age seconds. Replacements
+  start on a background thread, never on a lookup's time.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from lazy import LazyModule, optional_module
+from metrics import BROWSER_LEASE_WAIT, BROWSER_LEASES, BROWSER_POOL, BROWSER_RECYCLED
+from transport import TransportError
+
+# Imported when the first browser starts; workers without a pool never load Selenium
+webdriver = LazyModule("selenium.webdriver")
+# psutil is optional; without it browsers are recycled by page count and age only
+psutil = optional_module("psutil")
+
+logger = logging.getLogger(__name__)
+
+# Memory is measured every this many pages; walking the process tree costs about a millisecond
+RSS_CHECK_PAGES = 25
+# Seconds before retrying a browser that failed to start
+RESTART_DELAY = 5.0
+
+# Runs in the warmed page: a same-origin form post carrying the page's session cookie and app_token.
+# The portal rotates the token in its JSON responses; the new one is kept for the next post.
+POST_SCRIPT = """
+const [url, form, done] = arguments;
+const body = new URLSearchParams(form);
+if (window.app_token) body.set('app_token', window.app_token);
+fetch(url, {method: 'POST', body: body, credentials: 'same-origin',
+            headers: {'X-Requested-With': 'XMLHttpRequest'}})
+  .then(response => response.text().then(text => {
+    try {
+      const token = JSON.parse(text).app_token;
+      if (token) window.app_token = token;
+    } catch (e) {}
+    done([response.status, text]);
+  }))
+  .catch(error => done([0, String(error)]));
+"""
+# Statuses meaning the session or token has expired: warm up again and retry once
+SESSION_EXPIRED = frozenset([401, 403, 419])
+
+
+class PoolExhausted(TransportError):
+    """No pooled browser became free in time, or too many lookups were already waiting"""
+
+
+def chrome_driver(headless=True, timeout=30):
+    """A headless Chrome WebDriver: no images, eager page loads, /tmp instead of /dev/shm"""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    for argument in ("--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--disable-extensions",
+                     "--blink-settings=imagesEnabled=false", "--window-size=1280,900"):
+        options.add_argument(argument)
+    options.page_load_strategy = "eager"
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(timeout)
+    driver.set_script_timeout(timeout)
+    return driver
+
+
+class Browser:
+    """One WebDriver session on the portal, with the pages it has loaded counted"""
+
+    def __init__(self, driver, warm_url=None):
+        self.driver = driver
+        self.warm_url = warm_url
+        self.pages = 0
+        self.rss_checked_at = 0
+        self.started = time.monotonic()
+        self.warm()
+
+    def warm(self):
+        """Load the landing page so its scripts set the session cookie and app_token"""
+        if self.warm_url:
+            self.driver.get(self.warm_url)
+            self.pages += 1
+
+    def _post(self, url, form):
+        status, text = self.driver.execute_async_script(POST_SCRIPT, url, form)
+        self.pages += 1
+        return status, text
+
+    def post(self, url, form):
+        """(status, text) of a form POST sent from the page, with its session"""
+        status, text = self._post(url, form)
+        if status in SESSION_EXPIRED and self.warm_url:
+            self.warm()
+            status, text = self._post(url, form)
+        if status == 0:
+            raise TransportError(f"POST {url} from browser: {text}")
+        return status, text
+
+    def get(self, url):
+        """HTML of a page after its scripts have run"""
+        self.driver.get(url)
+        self.pages += 1
+        return self.driver.page_source
+
+    def ping(self):
+        """True if the browser still answers"""
+        return self.driver.execute_script("return document.readyState") is not None
+
+    def rss_mb(self):
+        """Resident memory of the driver and the browser processes under it, or None if unknown"""
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        if psutil is None or process is None:
+            return None
+        try:
+            root = psutil.Process(process.pid)
+            return sum(p.memory_info().rss for p in [root] + root.children(recursive=True)) / 2 ** 20
+        except psutil.Error:
+            return None
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    """A fixed number of warmed browsers, leased one lookup at a time"""
+
+    def __init__(self, size=2, factory=None, warm_url=None, max_pages=500, max_rss_mb=1024,
+                 max_age=3600.0, lease_timeout=30.0, max_waiting=None, health_interval=60.0):
+        self.size = size
+        self.factory = factory or chrome_driver
+        self.warm_url = warm_url
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_age = max_age
+        self.lease_timeout = lease_timeout
+        self.max_waiting = max_waiting
+        self.health_interval = health_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._closed = False
+        self._busy = 0
+        self._starting = 0
+        self._waiting = 0
+        self._stats = {"leases": 0, "errors": 0, "timeouts": 0, "rejected": 0, "started": 0,
+                       "start_failures": 0, "recycled": {}}
+        # Starting and quitting browsers takes seconds; it happens here, off the lookups' threads
+        self._launcher = ThreadPoolExecutor(max_workers=size, thread_name_prefix="browser-launch")
+        self._health = None
+
+    def start(self, wait=False):
+        """Launch the browsers in the background (wait=True: until all are up) and start health checks"""
+        launches = [self._spawn() for _ in range(self.size)]
+        if self.health_interval:
+            self._health = threading.Thread(target=self._health_loop, name="browser-health", daemon=True)
+            self._health.start()
+        if wait:
+            for launch in launches:
+                launch.result()
+        return self
+
+    def _spawn(self):
+        with self._lock:
+            self._starting += 1
+        self._gauge()
+        return self._launcher.submit(self._launch)
+
+    def _launch(self):
+        try:
+            browser = Browser(self.factory(), self.warm_url)
+        except Exception:
+            with self._lock:
+                self._starting -= 1
+                self._stats["start_failures"] += 1
+            self._gauge()
+            logger.exception("Browser failed to start")
+            if not self._stop.wait(RESTART_DELAY):
+                self._spawn()
+            return
+        with self._lock:
+            self._starting -= 1
+            self._stats["started"] += 1
+            closed = self._closed
+        if closed:
+            browser.quit()
+        else:
+            self._idle.put(browser)
+        self._gauge()
+
+    def _gauge(self):
+        BROWSER_POOL.set(self._idle.qsize(), state="idle")
+        BROWSER_POOL.set(self._busy, state="busy")
+        BROWSER_POOL.set(self._starting, state="starting")
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Borrow a browser for one lookup; raises PoolExhausted if none comes free in time"""
+        browser = self._acquire(self.lease_timeout if timeout is None else timeout)
+        failed = False
+        try:
+            yield browser
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(browser, failed)
+
+    def _acquire(self, timeout):
+        with self._lock:
+            if self._closed:
+                raise PoolExhausted("Browser pool is closed")
+            if self.max_waiting is not None and self._idle.empty() and self._waiting >= self.max_waiting:
+                self._stats["rejected"] += 1
+                BROWSER_LEASES.inc(outcome="rejected")
+                raise PoolExhausted(f"{self._waiting} lookups already waiting for a browser")
+            self._waiting += 1
+        started = time.monotonic()
+        try:
+            browser = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            BROWSER_LEASES.inc(outcome="timeout")
+            raise PoolExhausted(f"No browser free within {timeout:.1f}s") from None
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        BROWSER_LEASE_WAIT.observe(time.monotonic() - started)
+        with self._lock:
+            self._busy += 1
+            self._stats["leases"] += 1
+        self._gauge()
+        return browser
+
+    def _release(self, browser, failed):
+        with self._lock:
+            self._busy -= 1
+            if failed:
+                self._stats["errors"] += 1
+        BROWSER_LEASES.inc(outcome="error" if failed else "ok")
+        reason = self._recycle_reason(browser, ping=failed)
+        if reason:
+            self._recycle(browser, reason)
+        else:
+            self._idle.put(browser)
+        self._gauge()
+
+    def _recycle_reason(self, browser, ping=False):
+        """Why browser should be replaced, or None to keep it"""
+        if self._closed:
+            return "closed"
+        if ping:
+            try:
+                if not browser.ping():
+                    return "unhealthy"
+            except Exception:
+                return "unhealthy"
+        if browser.pages >= self.max_pages:
+            return "pages"
+        if time.monotonic() - browser.started >= self.max_age:
+            return "age"
+        if self.max_rss_mb and browser.pages - browser.rss_checked_at >= RSS_CHECK_PAGES:
+            browser.rss_checked_at = browser.pages
+            rss = browser.rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                return "memory"
+        return None
+
+    def _recycle(self, browser, reason):
+        if reason != "closed":
+            with self._lock:
+                recycled = self._stats["recycled"]
+                recycled[reason] = recycled.get(reason, 0) + 1
+            BROWSER_RECYCLED.inc(reason=reason)
+        try:
+            self._launcher.submit(browser.quit)
+        except RuntimeError:  # launcher already shut down
+            browser.quit()
+        if not self._closed:
+            self._spawn()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def check_health(self):
+        """Ping the idle browsers, replacing those that fail or are past a limit; returns how many were replaced"""
+        idle = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        replaced = 0
+        # Oldest first, then put back in the same order so the most recently used stays on top
+        for browser in reversed(idle):
+            reason = self._recycle_reason(browser, ping=True)
+            if reason:
+                self._recycle(browser, reason)
+                replaced += 1
+            else:
+                self._idle.put(browser)
+        self._gauge()
+        return replaced
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, recycled=dict(self._stats["recycled"]))
+            stats.update(size=self.size, idle=self._idle.qsize(), busy=self._busy, starting=self._starting,
+                         waiting=self._waiting)
+        return stats
+
+    def close(self, timeout=10.0):
+        """Quit every browser, waiting up to timeout for leased ones to come back; True if all did"""
+        with self._lock:
+            self._closed = True
+        self._stop.set()
+        expires = time.monotonic() + timeout
+        while True:
+            try:
+                self._idle.get_nowait().quit()
+            except queue.Empty:
+                pass
+            if self._busy == 0 or time.monotonic() >= expires:
+                break
+            time.sleep(0.05)
+        self._launcher.shutdown(wait=True)
+        while not self._idle.empty():
+            self._idle.get_nowait().quit()
+        self._gauge()
+        return self._busy == 0
@@ -0,0 +1,250 @@
+"""Asyncio bulk case lookup.
+
+Looking up 200k tracked cases one /api/search call at a time means 200k
+serial round trips. BulkCaseLookup instead fans a batch out over an
+aiohttp session with a global concurrency bound and a per-host bound, and
+yields each result the moment it resolves (results arrive out of order;
+every item carries the index it had in the batch). Cache misses go through
+the case cache's single flight, like /api/search.
+
+Every attempt goes through the same per-host gates as the scraper
+transport's own requests: circuit breaker, rate limit and adaptive
+concurrency limit, with each response's latency and outcome reported back.
+A failing or saturated host fails the rest of a batch fast; those cases
+get their last stored status, marked stale, where there is one.
+"""
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from lazy import LazyModule
+from metrics import UPSTREAM_ERRORS, UPSTREAM_IN_FLIGHT, UPSTREAM_LATENCY, UPSTREAM_REJECTED, UPSTREAM_RESPONSES
+from portal import case_key, case_status_request, normalize_cnr
+from transport import DEFAULT_USER_AGENT, RETRY_STATUSES, DeadlineExceeded, Overloaded, TransportError
+
+# Imported by the first batch; together they are most of what importing this module would otherwise cost
+asyncio = LazyModule("asyncio")
+aiohttp = LazyModule("aiohttp")
+
+MAX_BATCH_SIZE = 10000
+
+
+def parse_case(item, position=0):
+    """A case_details dict from a CNR string, [case_type, case_number, case_year] or /api/search dict"""
+    if isinstance(item, str):
+        details = {'cnr': item}
+    elif isinstance(item, (list, tuple)) and len(item) == 3:
+        details = {'case_type': item[0], 'case_number': item[1], 'case_year': item[2]}
+    elif isinstance(item, dict):
+        details = {key: item.get(key) for key in ('cnr', 'case_type', 'case_number', 'case_year')
+                   if item.get(key)}
+    else:
+        raise ValueError(f"Case {position}: expected a CNR, [type, number, year] or object")
+    if not normalize_cnr(details.get('cnr')) and not (
+            details.get('case_type') and details.get('case_number') and details.get('case_year')):
+        raise ValueError(f"Case {position}: needs a CNR or case type, number and year")
+    return details
+
+
+def parse_batch(items):
+    """Normalise batch items into case_details dicts.
+
+    Accepts CNR strings, [case_type, case_number, case_year] lists, or the
+    same dicts /api/search takes.
+    """
+    if not isinstance(items, list):
+        raise ValueError("'cases' must be a list")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} cases per batch")
+    return [parse_case(item, position) for position, item in enumerate(items)]
+
+
+class BulkCaseLookup:
+    """Bounded-concurrency async fan-out of case-status lookups"""
+
+    def __init__(self, scraper, concurrency=64, per_host=16, timeout=15.0,
+                 max_retries=2, backoff_base=0.25, backoff_max=4.0):
+        self.scraper = scraper
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    async def _lookup(self, client, case_details):
+        """Serve from the scraper's case cache, else fetch once however many lookups miss it at once.
+
+        Misses share the cache's flights with /api/search, so a case asked
+        for by a batch and a request together goes upstream once.
+        """
+        try:
+            result = await self.scraper.case_cache.get_or_fetch_async(
+                case_key(case_details), lambda: self._fetch(client, case_details))
+        except TransportError as e:
+            stale = self.scraper.last_known_case(case_details, str(e))
+            return stale if stale is not None else {"error": f"Portal unavailable: {e}"}
+        return self.scraper.apply_listing(case_details, result)
+
+    async def _admit(self, transport, host, bucket, guard):
+        """Pass host's breaker, take a rate-limit token and a slot under its concurrency limit.
+
+        The same gates Transport requests go through, waited on without
+        blocking the event loop. Raises CircuitOpen, DeadlineExceeded (no
+        token within the lookup timeout) or Overloaded (no slot within the
+        transport's limit_wait); the caller releases the slot.
+        """
+        transport.check_circuit(host, guard)
+        try:
+            wait = bucket.reserve(timeout=self.timeout)
+        except DeadlineExceeded:
+            transport.record_outcome(guard, None)
+            transport.metrics.record(deadline_exceeded=1, failures=1)
+            raise
+        if wait:
+            await asyncio.sleep(wait)
+        transport.metrics.record(rate_limit_wait_seconds=wait)
+
+        started = time.monotonic()
+        delay = 0.005
+        while not guard.limiter.try_acquire():
+            if time.monotonic() - started >= transport.limit_wait:
+                guard.limiter.reject()
+                transport.record_outcome(guard, None)
+                transport.metrics.record(rejected=1, failures=1, pool_wait_seconds=time.monotonic() - started)
+                UPSTREAM_REJECTED.inc(host=host, reason="concurrency_limit")
+                raise Overloaded(f"{host} is at its concurrency limit")
+            await asyncio.sleep(delay)
+            delay = min(0.05, delay * 2)
+        transport.metrics.record(pool_wait_seconds=time.monotonic() - started, attempts=1)
+
+    async def _fetch(self, client, case_details):
+        if not self.scraper.live:
+            return self.scraper.get_mock_case_data(case_details)
+        if self.scraper.browsers is not None:
+            # The pages need a browser session: lease one from a thread, queued behind other lookups
+            return await asyncio.to_thread(self.scraper.fetch_case_status, case_details)
+
+        method, url, form = case_status_request(self.scraper.base_url, case_details)
+        host = urlsplit(url).netloc
+        transport = self.scraper.transport
+        bucket, guard = transport.limits(host)
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                await asyncio.sleep(random.uniform(0, delay))
+            await self._admit(transport, host, bucket, guard)
+            started = time.monotonic()
+            status = ok = None
+            try:
+                with UPSTREAM_IN_FLIGHT.track(host=host):
+                    async with client.request(method, url, data=form) as response:
+                        status = response.status
+                        body = await response.text() if status == 200 else None
+                ok = status not in RETRY_STATUSES and time.monotonic() - started <= transport.slow_call_seconds
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                ok = False
+                UPSTREAM_ERRORS.inc(host=host, reason=type(e).__name__)
+                error = f"{type(e).__name__}: {e}"
+                continue
+            finally:
+                # None (not judged) when the lookup was cancelled
+                guard.limiter.release(ok)
+                transport.record_outcome(guard, ok)
+                UPSTREAM_LATENCY.observe(time.monotonic() - started, host=host)
+            UPSTREAM_RESPONSES.inc(host=host, status=status)
+            if status in RETRY_STATUSES:
+                UPSTREAM_ERRORS.inc(host=host, reason=status)
+                error = f"Portal returned HTTP {status}"
+                continue
+            if status != 200:
+                return {"error": f"Portal returned HTTP {status}"}
+            return await self.scraper.parsers.parse_async("case_status", body)
+        return {"error": f"Error fetching case: {error}"}
+
+    async def iter_results(self, cases):
+        """Async generator of (index, case_details, result) in completion order"""
+        inbox = asyncio.Queue(maxsize=self.concurrency * 2)
+        outbox = asyncio.Queue(maxsize=self.concurrency * 2)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': DEFAULT_USER_AGENT}) as client:
+            async def feed():
+                for item in enumerate(cases):
+                    await inbox.put(item)
+                for _ in range(self.concurrency):
+                    await inbox.put(None)
+
+            async def work():
+                while True:
+                    item = await inbox.get()
+                    if item is None:
+                        await outbox.put(None)
+                        return
+                    index, case_details = item
+                    try:
+                        result = await self._lookup(client, case_details)
+                    except Exception as e:
+                        result = {"error": f"Error fetching case: {str(e)}"}
+                    await outbox.put((index, case_details, result))
+
+            tasks = [asyncio.create_task(feed())]
+            tasks.extend(asyncio.create_task(work()) for _ in range(self.concurrency))
+            try:
+                finished = 0
+                while finished < self.concurrency:
+                    item = await outbox.get()
+                    if item is None:
+                        finished += 1
+                    else:
+                        yield item
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def iter_lookup(self, cases):
+        """Blocking generator over iter_results, for Flask responses and scripts.
+
+        The event loop runs on its own thread; closing the generator early
+        (e.g. the client disconnected) cancels the outstanding lookups.
+        """
+        results = queue.Queue()
+        stop = threading.Event()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in self.iter_results(cases):
+                    if stop.is_set():
+                        break
+                    results.put(item)
+            except Exception as e:
+                results.put(e)
+            finally:
+                results.put(done)
+
+        thread = threading.Thread(target=asyncio.run, args=(pump(),), daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def lookup(self, cases):
+        """Look up a batch and return results in input order"""
+        ordered = [None] * len(cases)
+        for index, _, result in self.iter_lookup(cases):
+            ordered[index] = result
+        return ordered
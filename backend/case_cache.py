@@ -0,0 +1,260 @@
+"""Cache in front of case-status lookups.
+
+Two tiers: an in-process LRU and an optional SQLite file shared by every
+worker on the box. How long a result lives depends on what it says -- a
+disposed case will not change for days, a case listed today may change
+within minutes. Concurrent misses for the same key are coalesced so only
+one of them goes upstream (single flight); the rest wait for its result.
+Threads (get_or_fetch) and asyncio tasks (get_or_fetch_async) share the
+same flights.
+The in-process tier holds results as slotted CaseResult records, about a
+third the size of the dicts, and hands out a fresh dict on every hit.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from lazy import LazyModule
+from records import CaseResult
+
+asyncio = LazyModule("asyncio")
+
+# Seconds a result stays fresh, by what the result says about the case
+TTL_TIERS = {
+    "listed": 5 * 60,           # listed today/tomorrow: serial numbers move
+    "disposed": 3 * 24 * 3600,  # final; only corrections change it
+    "default": 6 * 3600,
+}
+
+
+def ttl_for(result, tiers=TTL_TIERS):
+    """TTL for a case-status result; 0 means do not cache"""
+    if not isinstance(result, dict) or "error" in result:
+        return 0
+    if result.get("listed_today") or result.get("listed_tomorrow"):
+        return tiers["listed"]
+    if str(result.get("status", "")).strip().lower() == "disposed":
+        return tiers["disposed"]
+    return tiers["default"]
+
+
+class LRUCache:
+    """Thread-safe LRU of key -> (expires_at, value)"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """On-disk tier; one connection per thread, WAL so readers never block"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(
+            "CREATE TABLE IF NOT EXISTS case_cache ("
+            " key TEXT PRIMARY KEY, expires_at REAL NOT NULL, body TEXT NOT NULL);"
+            # purge_expired() runs on a timer; without this it scans the table
+            "CREATE INDEX IF NOT EXISTS case_cache_expires ON case_cache (expires_at);"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        row = self._connection().execute(
+            "SELECT expires_at, body FROM case_cache WHERE key = ? AND expires_at > ?",
+            (key, now)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, key, value, expires_at):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO case_cache (key, expires_at, body) VALUES (?, ?, ?)",
+            (key, expires_at, json.dumps(value)))
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM case_cache WHERE key = ?", (key,))
+
+    def purge_expired(self, now=None):
+        """Delete expired entries; returns how many"""
+        now = time.time() if now is None else now
+        return self._connection().execute(
+            "DELETE FROM case_cache WHERE expires_at <= ?", (now,)).rowcount
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CaseStatusCache:
+    """LRU + optional SQLite cache with status-based TTLs and single flight"""
+
+    def __init__(self, max_entries=10000, db_path=None, tiers=None):
+        self.memory = LRUCache(max_entries)
+        self.disk = SQLiteTier(db_path) if db_path else None
+        self.tiers = dict(TTL_TIERS, **(tiers or {}))
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("hits", "disk_hits", "misses", "coalesced", "stores", "fetch_errors"), 0)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def get(self, key):
+        """Fresh cached result or None (promotes disk hits into memory)"""
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._count("hits")
+            return entry[1].to_dict()
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, CaseResult.from_dict(entry[1]), entry[0])
+                self._count("disk_hits")
+                return entry[1]
+        return None
+
+    def set(self, key, result):
+        ttl = ttl_for(result, self.tiers)
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self.memory.set(key, CaseResult.from_dict(result), expires_at)
+        if self.disk is not None:
+            self.disk.set(key, result, expires_at)
+        self._count("stores")
+
+    def invalidate(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def _join(self, key):
+        """(flight, True if this caller leads it) for a missed key"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self._counters["misses"] += 1
+                return flight, True
+            self._counters["coalesced"] += 1
+            return flight, False
+
+    def _land(self, key, flight, result=None, error=None):
+        if error is not None and not isinstance(error, Exception):
+            # The leader was cancelled or interrupted; its waiters get an error, not its cancellation
+            error = RuntimeError(f"Lookup of {key} was abandoned ({type(error).__name__})")
+        if error is None:
+            flight.result = result
+            self.set(key, result)
+        else:
+            flight.error = error
+            self._count("fetch_errors")
+        with self._lock:
+            del self._flights[key]
+        flight.done.set()
+
+    @staticmethod
+    def _outcome(flight):
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def get_or_fetch(self, key, fetch):
+        """Cached result for key, else fetch() once no matter how many callers miss"""
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        flight, leader = self._join(key)
+        if not leader:
+            flight.done.wait()
+            return self._outcome(flight)
+
+        try:
+            result = fetch()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    async def get_or_fetch_async(self, key, fetch):
+        """get_or_fetch for asyncio: awaits fetch(), and waits for another caller's fetch without blocking the loop"""
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        flight, leader = self._join(key)
+        if not leader:
+            # The leader may be a thread, so there is no future to await; poll its event
+            delay = 0.005
+            while not flight.done.is_set():
+                await asyncio.sleep(delay)
+                delay = min(0.1, delay * 2)
+            return self._outcome(flight)
+
+        try:
+            result = await fetch()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            in_flight = len(self._flights)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"] + stats["coalesced"]
+        stats["in_flight"] = in_flight
+        stats["memory_entries"] = len(self.memory)
+        stats["hit_ratio"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
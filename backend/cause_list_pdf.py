@@ -0,0 +1,196 @@
+"""Cause-list PDFs: a minimal renderer and a page-parallel parser.
+
+The renderer writes plain single-font table PDFs laid out like the
+district court cause lists (court header, then Sr. No. / Case Number /
+Parties / Purpose columns). It backs /api/download-cause-list and the
+synthetic fixtures.
+
+The parser extracts rows from real cause-list PDFs. Pages are split into
+ranges and parsed in a process pool (text extraction is pure-Python and
+CPU bound); pages without a text layer are sent to OCR when pytesseract
+and pdf2image are installed and reported otherwise.
+"""
+import io
+import os
+import re
+from concurrent import futures
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+FONT_SIZE = 9
+LINE_HEIGHT = 15
+ROWS_PER_PAGE = 44
+COLUMNS = (("Sr. No.", 36, 6), ("Case Number", 80, 24), ("Parties", 210, 58), ("Purpose", 500, 16))
+
+
+def _escape(text):
+    return str(text).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x, y, text):
+    return f"BT /F1 {FONT_SIZE} Tf {x} {y} Td ({_escape(text)}) Tj ET"
+
+
+def _page_stream(court, date_str, rows, page_no):
+    ops = [
+        _text(36, PAGE_HEIGHT - 40, f"CAUSE LIST FOR {date_str}"),
+        _text(36, PAGE_HEIGHT - 56, court),
+        _text(PAGE_WIDTH - 90, PAGE_HEIGHT - 40, f"Page {page_no}"),
+    ]
+    y = PAGE_HEIGHT - 84
+    ops.extend(_text(x, y, title) for title, x, _ in COLUMNS)
+    for entry in rows:
+        y -= LINE_HEIGHT
+        values = (entry["serial_no"], entry["case_number"], entry["parties"], entry.get("purpose", ""))
+        for (_, x, width), value in zip(COLUMNS, values):
+            ops.append(_text(x, y, str(value)[:width]))
+    return "\n".join(ops).encode("latin-1", "replace")
+
+
+def render_cause_list_pdf(entries, date_str, court=None, blank_pages=()):
+    """PDF bytes for a cause list, one court room per page group.
+
+    Entries are grouped by their `court` field (or the `court` argument);
+    page numbers in `blank_pages` are emitted without a text layer, which
+    is how scanned pages look to the parser.
+    """
+    pages = []
+    current_court, rows = None, []
+    for entry in entries:
+        entry_court = court or entry.get("court", "")
+        if rows and (entry_court != current_court or len(rows) == ROWS_PER_PAGE):
+            pages.append((current_court, rows))
+            rows = []
+        current_court = entry_court
+        rows.append(entry)
+    if rows or not pages:
+        pages.append((current_court or court or "", rows))
+
+    streams = []
+    for page_court, page_rows in pages:
+        page_no = len(streams) + 1
+        while page_no in blank_pages:
+            streams.append(b"0.9 g 36 36 523 770 re f")
+            page_no += 1
+        streams.append(_page_stream(page_court, date_str, page_rows, page_no))
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for stream in streams:
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, len(objects)))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+CASE_NUMBER = r"[A-Z][A-Z.()&\- ]{0,20}?\s*[/ -]\s*\d{1,7}\s*/\s*(?:19|20)\d{2}"
+ROW_PATTERN = re.compile(
+    rf"^\s*(?P<serial>\d{{1,5}})\s{{2,}}(?P<case>{CASE_NUMBER})\s{{2,}}"
+    r"(?P<parties>.+?)(?:\s{2,}(?P<purpose>\S.*?))?\s*$")
+COURT_PATTERN = re.compile(r"(court\s*(room|no\.?|hall)\s*[-:.]?\s*\d+.*)", re.IGNORECASE)
+
+
+def parse_page_text(text, court=None):
+    """Rows from one page of layout-preserved text; returns (rows, court)"""
+    rows = []
+    for line in text.splitlines():
+        match = ROW_PATTERN.match(line)
+        if match:
+            rows.append({
+                "serial_no": int(match.group("serial")),
+                "case_number": re.sub(r"\s+", "", match.group("case")),
+                "parties": re.sub(r"\s{2,}", " ", match.group("parties")).strip(),
+                "purpose": (match.group("purpose") or "").strip(),
+                "court": court or ""
+            })
+            continue
+        heading = COURT_PATTERN.search(line)
+        if heading and not rows:
+            court = re.sub(r"\s{2,}", " ", heading.group(1)).strip()
+    for row in rows:
+        row["court"] = row["court"] or court or ""
+    return rows, court
+
+
+def _ocr_page(path, page_index):
+    """OCR text of one page, or None when the OCR toolchain is missing"""
+    try:
+        import pytesseract
+        from pdf2image import convert_from_path
+    except ImportError:
+        return None
+    images = convert_from_path(path, dpi=300, first_page=page_index + 1, last_page=page_index + 1)
+    return pytesseract.image_to_string(images[0], config="--psm 6") if images else ""
+
+
+def _reader(source):
+    from pypdf import PdfReader
+    return PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _parse_page_range(path, start, stop, ocr=True):
+    """Worker: parse pages [start, stop) of one PDF (a path or the PDF bytes)"""
+    reader = _reader(path)
+    results = []
+    for index in range(start, stop):
+        text = reader.pages[index].extract_text(extraction_mode="layout") or ""
+        source = "text"
+        if not text.strip():
+            text = _ocr_page(path, index) if ocr and isinstance(path, str) else None
+            source = "ocr" if text is not None else "no_text"
+        rows, court = parse_page_text(text or "")
+        results.append((index, source, court, rows))
+    return results
+
+
+def page_count(path):
+    return len(_reader(path).pages)
+
+
+def parse_cause_list_pdf(path, workers=None, pages_per_task=8, ocr=True):
+    """Parse a cause-list PDF (path or bytes) into rows, fanning page ranges over processes.
+
+    Returns {"rows": [...], "pages": n, "ocr_pages": [...], "unreadable_pages": [...]}.
+    Rows carry the page they came from; a court heading carries over to
+    following pages until the next heading.
+    """
+    total = page_count(path)
+    ranges = [(start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task)]
+    workers = workers or min(len(ranges), os.cpu_count() or 1) or 1
+
+    if workers == 1 or len(ranges) == 1:
+        chunks = [_parse_page_range(path, start, stop, ocr) for start, stop in ranges]
+    else:
+        with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = [pool.submit(_parse_page_range, path, start, stop, ocr) for start, stop in ranges]
+            chunks = [future.result() for future in pending]
+
+    rows, ocr_pages, unreadable = [], [], []
+    court = None
+    for chunk in chunks:
+        for index, source, page_court, page_rows in chunk:
+            if source == "ocr":
+                ocr_pages.append(index + 1)
+            elif source == "no_text":
+                unreadable.append(index + 1)
+            court = page_court or court
+            for row in page_rows:
+                row["court"] = row["court"] or court or ""
+                row["page"] = index + 1
+                rows.append(row)
+    return {"rows": rows, "pages": total, "ocr_pages": ocr_pages, "unreadable_pages": unreadable}
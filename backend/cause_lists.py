@@ -0,0 +1,308 @@
+"""Streaming cause-list pipeline.
+
+Entries flow from a generator straight into the HTTP response as a JSON
+array, NDJSON or CSV, so memory stays flat no matter how long the list is.
+While a list streams out it is also tee'd into an on-disk artifact; later
+requests for the same list are served from that file, which gives clients
+HTTP Range / resumable downloads and conditional GETs for free.
+
+CauseListStore keeps fetched lists (e.g. pre-fetched by the scheduler in
+prefetch.py) so requests for them never wait on the portal.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+logger = logging.getLogger(__name__)
+
+CAUSE_LIST_FIELDS = ("serial_no", "case_number", "parties", "court", "hearing_time", "purpose")
+MOCK_COURTS = ["Court Room 1 - Justice Sharma", "Court Room 2 - Justice Verma"]
+MOCK_CASE_TYPES = ["CIVIL", "CRIMINAL", "FAMILY", "LABOR"]
+MOCK_PURPOSES = ["Hearing", "Arguments", "Evidence", "Judgment"]
+
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+def iter_mock_cause_list(count=20, seed=None):
+    """Yield mock cause-list entries; a seed makes the list reproducible"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "serial_no": i + 1,
+            "case_number": f"{rng.choice(MOCK_CASE_TYPES)}/{rng.randint(100, 999)}/{rng.randint(2018, 2024)}",
+            "parties": f"Party {rng.randint(1, 100)} vs. Party {rng.randint(1, 100)}",
+            "court": rng.choice(MOCK_COURTS),
+            "hearing_time": f"{rng.randint(10, 16)}:{rng.choice(['00', '15', '30', '45'])}",
+            "purpose": rng.choice(MOCK_PURPOSES)
+        }
+
+
+def list_seed(*parts):
+    """Deterministic seed for a (complex, court, date) list"""
+    return zlib.crc32("|".join(str(part or "") for part in parts).encode("utf-8"))
+
+
+def _buffered(pieces):
+    """Coalesce many small string pieces into ~CHUNK_SIZE byte chunks"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def _json_rows(entries):
+    """Each entry as JSON text; a CauseListEntries block writes its own from its columns"""
+    if hasattr(entries, "iter_json"):
+        return entries.iter_json()
+    return (json.dumps(entry, ensure_ascii=False) for entry in entries)
+
+
+def encode_json_array(entries):
+    def pieces():
+        yield "["
+        first = True
+        for row in _json_rows(entries):
+            yield ("\n  " if first else ",\n  ") + row
+            first = False
+        yield "\n]\n" if not first else "]\n"
+    return _buffered(pieces())
+
+
+def encode_ndjson(entries):
+    return _buffered(row + "\n" for row in _json_rows(entries))
+
+
+def encode_csv(entries, fields=CAUSE_LIST_FIELDS):
+    def pieces():
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for entry in entries:
+            writer.writerow(entry)
+            if out.tell() >= CHUNK_SIZE:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+    return _buffered(pieces())
+
+
+ENCODERS = {"json": encode_json_array, "ndjson": encode_ndjson, "csv": encode_csv}
+
+
+def encode(entries, fmt):
+    """Byte chunks of entries in the given format ('json', 'ndjson', 'csv')"""
+    return ENCODERS[fmt](entries)
+
+
+class ArtifactStore:
+    """Rendered cause lists on disk, keyed by list identity and format"""
+
+    def __init__(self, directory, max_age=15 * 60):
+        self.directory = directory
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def path_for(self, key, fmt):
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+        return os.path.join(self.directory, f"{safe}-{zlib.crc32(key.encode('utf-8')):08x}.{fmt}")
+
+    def fresh(self, key, fmt):
+        """Path of a complete, unexpired artifact, or None"""
+        path = self.path_for(key, fmt)
+        try:
+            if time.time() - os.path.getmtime(path) < self.max_age:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def tee(self, key, fmt, chunks):
+        """Pass chunks through while writing them to the artifact.
+
+        The artifact only becomes visible (atomic rename) once the stream
+        completes; an aborted download leaves nothing behind.
+        """
+        path = self.path_for(key, fmt)
+        partial = f"{path}.{uuid.uuid4().hex}.part"
+        complete = False
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(partial, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(partial, path)
+            complete = True
+        finally:
+            if not complete:
+                try:
+                    os.remove(partial)
+                except OSError:
+                    pass
+
+    def purge(self):
+        """Delete expired artifacts and abandoned partial writes; returns how many were removed.
+
+        Each list's key carries its fetched_at, so a refreshed list leaves
+        its old artifacts behind for this to clear.
+        """
+        removed = 0
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                return 0
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+def iso_date(date_str):
+    """dd/mm/YYYY -> YYYY-MM-DD (already-ISO dates pass through)"""
+    if "/" in date_str:
+        day, month, year = date_str.split("/")
+        return f"{year}-{month}-{day}"
+    return date_str
+
+
+class CauseListStore:
+    """Fetched cause lists persisted in SQLite, one row per (complex, date)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._listeners = []
+        conn = self._connection()
+        # saved_seq orders saves across every process writing the file, for saved_since()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cause_lists ("
+            " court_complex TEXT NOT NULL, list_date TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL, entries INTEGER NOT NULL, body TEXT NOT NULL,"
+            " saved_seq INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (court_complex, list_date))"
+        )
+        if "saved_seq" not in {row[1] for row in conn.execute("PRAGMA table_info(cause_lists)")}:
+            # Stores from before saved_seq: number the lists already there in the order they were written
+            conn.execute("ALTER TABLE cause_lists ADD COLUMN saved_seq INTEGER NOT NULL DEFAULT 0")
+            conn.execute("UPDATE cause_lists SET saved_seq = rowid")
+        conn.execute("CREATE INDEX IF NOT EXISTS cause_lists_saved_seq ON cause_lists (saved_seq)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def on_save(self, listener):
+        """Call listener(court_complex, date_str, entries) after every save"""
+        self._listeners.append(listener)
+        return listener
+
+    def save(self, court_complex, date_str, entries, fetched_at=None):
+        # A CauseListEntries block is kept as it is; listeners iterate it like a list of dicts
+        if hasattr(entries, "to_json"):
+            body = entries.to_json(separators=(",", ":"))
+        else:
+            entries = list(entries)
+            body = json.dumps(entries, ensure_ascii=False, separators=(",", ":"))
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cause_lists (court_complex, list_date, fetched_at, entries, body, saved_seq)"
+            " SELECT ?, ?, ?, ?, ?, COALESCE(MAX(saved_seq), 0) + 1 FROM cause_lists",
+            (court_complex, iso_date(date_str), fetched_at or time.time(), len(entries), body))
+        for listener in self._listeners:
+            try:
+                listener(court_complex, date_str, entries)
+            except Exception:
+                logger.exception("Cause list listener failed for %s %s", court_complex, date_str)
+        return len(entries)
+
+    def iter_lists(self, since, until=None):
+        """Yield (court_complex, YYYY-MM-DD, entries) for lists dated since..until (inclusive)"""
+        query = "SELECT court_complex, list_date, body FROM cause_lists WHERE list_date >= ?"
+        params = [iso_date(since)]
+        if until is not None:
+            query += " AND list_date <= ?"
+            params.append(iso_date(until))
+        rows = self._connection().execute(query + " ORDER BY list_date, court_complex", params)
+        for court_complex, list_date, body in rows:
+            yield court_complex, list_date, json.loads(body)
+
+    def saved_since(self, seq, since):
+        """Yield (saved_seq, court_complex, YYYY-MM-DD, entries) for lists dated from since saved after seq, in save order.
+
+        Lists saved by other processes show up here too; pass the last
+        saved_seq seen to pick up only what is new.
+        """
+        rows = self._connection().execute(
+            "SELECT saved_seq, court_complex, list_date, body FROM cause_lists"
+            " WHERE saved_seq > ? AND list_date >= ? ORDER BY saved_seq", (seq, iso_date(since)))
+        for saved_seq, court_complex, list_date, body in rows:
+            yield saved_seq, court_complex, list_date, json.loads(body)
+
+    def load(self, court_complex, date_str):
+        """Stored entries for a complex and date, or None if not fetched"""
+        row = self._connection().execute(
+            "SELECT body FROM cause_lists WHERE court_complex = ? AND list_date = ?",
+            (court_complex, iso_date(date_str))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def stored(self, court_complex, date_str):
+        """(entries, fetched_at) for a complex and date, or None if not fetched"""
+        row = self._connection().execute(
+            "SELECT body, fetched_at FROM cause_lists WHERE court_complex = ? AND list_date = ?",
+            (court_complex, iso_date(date_str))).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def fetched_at(self, court_complex, date_str):
+        row = self._connection().execute(
+            "SELECT fetched_at FROM cause_lists WHERE court_complex = ? AND list_date = ?",
+            (court_complex, iso_date(date_str))).fetchone()
+        return row[0] if row else None
+
+    def complex_sizes(self, days=14):
+        """Average entries per list for each complex over recent dates"""
+        rows = self._connection().execute(
+            "SELECT court_complex, AVG(entries) FROM cause_lists"
+            " WHERE list_date >= date('now', ?) GROUP BY court_complex",
+            (f"-{int(days)} days",)).fetchall()
+        return dict(rows)
+
+    def warm_count(self, date_str, before=None):
+        """How many lists for a date were stored (optionally before a timestamp)"""
+        query = "SELECT COUNT(*) FROM cause_lists WHERE list_date = ?"
+        params = [iso_date(date_str)]
+        if before is not None:
+            query += " AND fetched_at <= ?"
+            params.append(before)
+        return self._connection().execute(query, params).fetchone()[0]
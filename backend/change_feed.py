@@ -0,0 +1,229 @@
+"""Row-level change feed for cause lists.
+
+Clients polling a cause list to see whether it changed should not have to
+download and compare the whole list each time. ChangeFeed listens to
+CauseListStore saves, keeps the last-seen version of every
+(complex, court, date) list as content hashes, and appends only the
+differences to a sequenced log:
+
+    added    an entry that was not in the previous version
+    removed  an entry that is no longer listed
+    moved    an entry that changed place relative to the others
+
+An entry's identity is a hash of its content fields (case number,
+parties, court, hearing time, purpose); the serial number and whatever
+else a source adds, such as the PDF parser's page number, do not count.
+Entries that merely shifted because something above them was added or
+removed are not reported, so one insertion is one event, not a
+renumbering of the whole list. Sequence numbers are the cursors clients
+resume from; the log lives in SQLite so every server process sees the
+same feed.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+
+from cause_lists import CAUSE_LIST_FIELDS, iso_date
+
+# What makes two entries the same listing; serial_no is its place, not its content
+CONTENT_FIELDS = tuple(field for field in CAUSE_LIST_FIELDS if field != "serial_no")
+
+
+def entry_hash(entry):
+    """Content hash of a cause-list entry over CONTENT_FIELDS"""
+    content = {key: entry.get(key) for key in CONTENT_FIELDS}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:20]
+
+
+def _in_order(positions):
+    """Indexes of a longest increasing subsequence of positions"""
+    tails, tail_index, parent = [], [], [None] * len(positions)
+    for i, position in enumerate(positions):
+        k = bisect_left(tails, position)
+        if k == len(tails):
+            tails.append(position)
+            tail_index.append(i)
+        else:
+            tails[k] = position
+            tail_index[k] = i
+        parent[i] = tail_index[k - 1] if k else None
+    keep = set()
+    i = tail_index[-1] if tail_index else None
+    while i is not None:
+        keep.add(i)
+        i = parent[i]
+    return keep
+
+
+def diff_rows(old, new):
+    """Changes from old to new, both [(hash, serial_no, entry)]; returns [(op, old_serial, serial, entry)]
+
+    Entries that kept their order relative to each other are not reported
+    even if their serial numbers shifted; a client replaying the feed
+    numbers its list by position.
+    """
+    previous = defaultdict(deque)
+    for position, (row_hash, serial, entry) in enumerate(old):
+        previous[row_hash].append((position, serial))
+
+    changes = []
+    matched = []  # (old position, old serial, new serial, entry) in new order
+    for row_hash, serial, entry in new:
+        if previous.get(row_hash):
+            position, old_serial = previous[row_hash].popleft()
+            matched.append((position, old_serial, serial, entry))
+        else:
+            changes.append(("added", None, serial, entry))
+    stayed = _in_order([position for position, _, _, _ in matched])
+    changes.extend(("moved", old_serial, serial, entry)
+                   for i, (_, old_serial, serial, entry) in enumerate(matched) if i not in stayed)
+    removed = {position for rows in previous.values() for position, _ in rows}
+    changes.extend(("removed", serial, None, entry)
+                   for position, (_, serial, entry) in enumerate(old) if position in removed)
+    return changes
+
+
+class ChangeFeed:
+    """Last-seen list versions and the change log derived from them"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._changed = threading.Condition()
+        self._connection().executescript(
+            "CREATE TABLE IF NOT EXISTS cause_list_versions ("
+            " court_complex TEXT NOT NULL, list_date TEXT NOT NULL, court TEXT NOT NULL,"
+            " rows TEXT NOT NULL, PRIMARY KEY (court_complex, list_date, court));"
+            "CREATE TABLE IF NOT EXISTS cause_list_changes ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, court_complex TEXT NOT NULL,"
+            " list_date TEXT NOT NULL, court TEXT NOT NULL, op TEXT NOT NULL,"
+            " old_serial_no INTEGER, serial_no INTEGER, entry TEXT NOT NULL, recorded_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS cause_list_changes_list"
+            " ON cause_list_changes (court_complex, list_date, seq);"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, court_complex, date_str, entries):
+        """Diff a freshly saved list against the last-seen version; returns changes logged.
+
+        Signature matches CauseListStore.on_save.
+        """
+        list_date = iso_date(date_str)
+        by_court = defaultdict(list)
+        for entry in entries:
+            by_court[entry.get("court") or ""].append((entry_hash(entry), entry.get("serial_no"), entry))
+
+        conn = self._connection()
+        now = time.time()
+        logged = 0
+        # IMMEDIATE: two processes saving the same list must not both diff against the old version
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = dict(conn.execute(
+                "SELECT court, rows FROM cause_list_versions WHERE court_complex = ? AND list_date = ?",
+                (court_complex, list_date)).fetchall())
+            for court in set(stored) | set(by_court):
+                # Rehashed, so versions stored under an older entry_hash still match
+                old = [(entry_hash(entry), serial, entry) for _, serial, entry in json.loads(stored.get(court, "[]"))]
+                new = by_court.get(court, [])
+                changes = diff_rows(old, new)
+                if not changes:
+                    continue
+                conn.executemany(
+                    "INSERT INTO cause_list_changes (court_complex, list_date, court, op, old_serial_no,"
+                    " serial_no, entry, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(court_complex, list_date, court, op, old_serial, serial,
+                      json.dumps(entry, ensure_ascii=False), now)
+                     for op, old_serial, serial, entry in changes])
+                if new:
+                    conn.execute("INSERT OR REPLACE INTO cause_list_versions VALUES (?, ?, ?, ?)",
+                                 (court_complex, list_date, court,
+                                  json.dumps(new, ensure_ascii=False, separators=(",", ":"))))
+                else:
+                    conn.execute("DELETE FROM cause_list_versions WHERE court_complex = ?"
+                                 " AND list_date = ? AND court = ?", (court_complex, list_date, court))
+                logged += len(changes)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if logged:
+            with self._changed:
+                self._changed.notify_all()
+        return logged
+
+    def changes(self, cursor=0, court_complex=None, date_str=None, court=None, limit=500):
+        """Changes after cursor, oldest first, optionally for one complex / date / court"""
+        query = ("SELECT seq, court_complex, list_date, court, op, old_serial_no, serial_no, entry"
+                 " FROM cause_list_changes WHERE seq > ?")
+        params = [int(cursor)]
+        for column, value in (("court_complex", court_complex), ("court", court)):
+            if value:
+                query += f" AND {column} = ?"
+                params.append(value)
+        if date_str:
+            query += " AND list_date = ?"
+            params.append(iso_date(date_str))
+        query += " ORDER BY seq LIMIT ?"
+        params.append(int(limit))
+        return [{
+            "seq": seq,
+            "court_complex": complex_code,
+            "date": list_date,
+            "court": court_name,
+            "op": op,
+            "old_serial_no": old_serial,
+            "serial_no": serial,
+            "entry": json.loads(entry)
+        } for seq, complex_code, list_date, court_name, op, old_serial, serial, entry
+            in self._connection().execute(query, params)]
+
+    def latest(self):
+        """Cursor of the newest change (0 if none)"""
+        return self._connection().execute("SELECT COALESCE(MAX(seq), 0) FROM cause_list_changes").fetchone()[0]
+
+    def wait(self, timeout):
+        """Block until this process records a change or timeout passes.
+
+        Other processes' changes are only seen by polling changes(); callers
+        should re-query after every wakeup either way.
+        """
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def follow(self, cursor=0, poll_interval=1.0, duration=None, heartbeat=15.0, **filters):
+        """Yield batches of changes as they arrive (empty batches as heartbeats)"""
+        expires = None if duration is None else time.monotonic() + duration
+        idle_since = time.monotonic()
+        while expires is None or time.monotonic() < expires:
+            batch = self.changes(cursor, **filters)
+            if batch:
+                cursor = batch[-1]["seq"]
+                idle_since = time.monotonic()
+                yield batch
+                continue
+            if time.monotonic() - idle_since >= heartbeat:
+                idle_since = time.monotonic()
+                yield []
+            self.wait(poll_interval)
+
+    def purge(self, days=30):
+        """Drop changes and versions for lists dated more than `days` ago"""
+        conn = self._connection()
+        cutoff = (f"-{int(days)} days",)
+        removed = conn.execute("DELETE FROM cause_list_changes WHERE list_date < date('now', ?)", cutoff).rowcount
+        conn.execute("DELETE FROM cause_list_versions WHERE list_date < date('now', ?)", cutoff)
+        return removed
@@ -0,0 +1,179 @@
+"""Per-host circuit breakers and adaptive concurrency limits for upstream calls.
+
+District court servers behind the portal go slow or down independently.
+Transport keeps a HostGuard for every host it calls, and each attempt
+goes through it:
+
+- CircuitBreaker: trips open when at least failure_ratio of the last
+  `window` calls failed (errors, timeouts, 429/5xx, or slower than
+  Transport's slow_call_seconds). While open, calls fail at once instead of
+  holding a thread for a timeout; after open_seconds it lets a single
+  probe through (half-open). A good probe closes it, a bad one re-opens it
+  for twice as long, up to max_open_seconds.
+- AIMDLimiter: caps the calls in flight to the host. The cap grows by one
+  after each good call made while at least half of it was in use, and is
+  cut by backoff_ratio after each bad one, so a host that slows down gets
+  fewer threads, not more. A call that cannot get a slot within Transport's
+  limit_wait is refused.
+
+Both count only what the host did: a 404 is a good call. Their states are
+on /api/health (Transport.host_states) and in /metrics.
+"""
+import threading
+import time
+from collections import deque
+
+from metrics import UPSTREAM_CIRCUIT_STATE, UPSTREAM_CONCURRENCY_LIMIT
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Closed -> open on a high failure ratio -> half-open probe -> closed or open again"""
+
+    def __init__(self, host="", window=20, min_calls=10, failure_ratio=0.5, open_seconds=15.0,
+                 max_open_seconds=300.0):
+        self.host = host
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.state = CLOSED
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes = deque(maxlen=window)
+        self._open_for = open_seconds
+        self._opened_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        self.state = state
+        UPSTREAM_CIRCUIT_STATE.set(STATE_VALUES[state], host=self.host)
+
+    def allow(self):
+        """Whether a call may go out now; in half-open state only one (the probe) at a time.
+
+        Every allowed call must be followed by record(), with None if it was
+        not made after all.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() >= self._opened_until:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._probing):
+                self._probing = self.state == HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self):
+        """Seconds until the breaker lets a probe through (0 unless open)"""
+        with self._lock:
+            return max(0.0, self._opened_until - time.monotonic()) if self.state == OPEN else 0.0
+
+    def _open(self):
+        self._opened_until = time.monotonic() + self._open_for
+        self._outcomes.clear()
+        self.trips += 1
+        self._set_state(OPEN)
+
+    def record(self, ok):
+        """The outcome of an allowed call: True, False, or None when it was not made"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probing:
+                self._probing = False
+                if ok:
+                    self._open_for = self.open_seconds
+                    self._set_state(CLOSED)
+                elif ok is not None:
+                    self._open_for = min(self.max_open_seconds, self._open_for * 2)
+                    self._open()
+                return
+            if self.state != CLOSED or ok is None:
+                return  # a call that started before the breaker opened
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_ratio * len(self._outcomes):
+                self._open()
+
+    def snapshot(self):
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "recent_calls": calls,
+                "recent_failures": self._outcomes.count(False),
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "retry_after": round(max(0.0, self._opened_until - time.monotonic()), 3)
+                if self.state == OPEN else 0.0,
+            }
+
+
+class AIMDLimiter:
+    """Concurrency cap that grows additively while calls succeed and shrinks multiplicatively when they don't"""
+
+    def __init__(self, host="", initial_limit=10, min_limit=1, max_limit=20, backoff_ratio=0.9):
+        self.host = host
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.limit = max(min_limit, min(max_limit, initial_limit))
+        self.in_flight = 0
+        self.rejected = 0
+        self._ready = threading.Condition()
+        UPSTREAM_CONCURRENCY_LIMIT.set(self.limit, host=host)
+
+    def acquire(self, timeout=None):
+        """Take a slot, waiting up to timeout; False if none came free"""
+        with self._ready:
+            if not self._ready.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def try_acquire(self):
+        """Take a slot if one is free now; for callers that poll instead of blocking (asyncio)"""
+        with self._ready:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def reject(self):
+        """Count a caller that polled with try_acquire and gave up"""
+        with self._ready:
+            self.rejected += 1
+
+    def release(self, ok):
+        """Give a slot back: True for a good call, False for a bad one, None if the call was not made"""
+        with self._ready:
+            if ok is not None:
+                if ok and self.in_flight * 2 >= self.limit:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                elif not ok:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                UPSTREAM_CONCURRENCY_LIMIT.set(int(self.limit), host=self.host)
+            self.in_flight -= 1
+            self._ready.notify_all()
+
+    def snapshot(self):
+        with self._ready:
+            return {"limit": int(self.limit), "in_flight": self.in_flight, "rejected": self.rejected}
+
+
+class HostGuard:
+    """One host's breaker (None when disabled) and concurrency limiter"""
+
+    __slots__ = ("breaker", "limiter")
+
+    def __init__(self, breaker, limiter):
+        self.breaker = breaker
+        self.limiter = limiter
+
+    def snapshot(self):
+        return {"circuit": self.breaker.snapshot() if self.breaker is not None else None,
+                "concurrency": self.limiter.snapshot()}
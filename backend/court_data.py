@@ -0,0 +1,280 @@
+# Enhanced Indian Courts Data (Top 10 Major States)
+INDIAN_COURTS_DATA = {
+    "states": [
+        {
+            "code": "DL",
+            "name": "Delhi",
+            "districts": [
+                {
+                    "code": "DL01",
+                    "name": "New Delhi",
+                    "taluks": ["Connaught Place", "Parliament Street", "Chanakyapuri"],
+                    "court_complexes": ["Patiala House Court", "New Delhi District Court"]
+                },
+                {
+                    "code": "DL02",
+                    "name": "Central Delhi",
+                    "taluks": ["Daryaganj", "Paharganj", "Karol Bagh"],
+                    "court_complexes": ["Tis Hazari Court"]
+                },
+                {
+                    "code": "DL03",
+                    "name": "South Delhi",
+                    "taluks": ["Saket", "Hauz Khas", "Mehrauli"],
+                    "court_complexes": ["Saket District Court"]
+                }
+            ]
+        },
+        {
+            "code": "MH",
+            "name": "Maharashtra",
+            "districts": [
+                {
+                    "code": "MH01",
+                    "name": "Mumbai City",
+                    "taluks": ["Fort", "Colaba", "Byculla"],
+                    "court_complexes": ["City Civil Court Mumbai", "Small Causes Court"]
+                },
+                {
+                    "code": "MH02",
+                    "name": "Pune",
+                    "taluks": ["Pune City", "Haveli"],
+                    "court_complexes": ["Pune District Court"]
+                },
+                {
+                    "code": "MH03",
+                    "name": "Nagpur",
+                    "taluks": ["Nagpur Urban", "Kamptee"],
+                    "court_complexes": ["Nagpur District Court"]
+                }
+            ]
+        },
+        {
+            "code": "KA",
+            "name": "Karnataka",
+            "districts": [
+                {
+                    "code": "KA01",
+                    "name": "Bangalore Urban",
+                    "taluks": ["Bangalore North", "Bangalore South", "Anekal"],
+                    "court_complexes": ["City Civil Court Bangalore", "Family Court Bangalore"]
+                },
+                {
+                    "code": "KA02",
+                    "name": "Mysuru",
+                    "taluks": ["Mysore", "Nanjangud"],
+                    "court_complexes": ["Mysuru District Court"]
+                },
+                {
+                    "code": "KA03",
+                    "name": "Mangaluru",
+                    "taluks": ["Mangalore", "Bantwal"],
+                    "court_complexes": ["Dakshina Kannada District Court"]
+                }
+            ]
+        },
+        {
+            "code": "TN",
+            "name": "Tamil Nadu",
+            "districts": [
+                {
+                    "code": "TN01",
+                    "name": "Chennai",
+                    "taluks": ["Egmore", "Saidapet"],
+                    "court_complexes": ["Madras High Court", "City Civil Court Chennai"]
+                },
+                {
+                    "code": "TN02",
+                    "name": "Madurai",
+                    "taluks": ["Madurai North", "Madurai South"],
+                    "court_complexes": ["Madurai District Court"]
+                },
+                {
+                    "code": "TN03",
+                    "name": "Coimbatore",
+                    "taluks": ["Coimbatore North", "Sulur"],
+                    "court_complexes": ["Coimbatore District Court"]
+                }
+            ]
+        },
+        {
+            "code": "UP",
+            "name": "Uttar Pradesh",
+            "districts": [
+                {
+                    "code": "UP01",
+                    "name": "Lucknow",
+                    "taluks": ["Lucknow City", "Mohanlalganj"],
+                    "court_complexes": ["Lucknow District Court"]
+                },
+                {
+                    "code": "UP02",
+                    "name": "Varanasi",
+                    "taluks": ["Varanasi Sadar", "Pindra"],
+                    "court_complexes": ["Varanasi District Court"]
+                },
+                {
+                    "code": "UP03",
+                    "name": "Allahabad",
+                    "taluks": ["Phaphamau", "Karchana"],
+                    "court_complexes": ["Allahabad District Court"]
+                }
+            ]
+        },
+        {
+            "code": "GJ",
+            "name": "Gujarat",
+            "districts": [
+                {
+                    "code": "GJ01",
+                    "name": "Ahmedabad",
+                    "taluks": ["Ahmedabad City", "Daskroi"],
+                    "court_complexes": ["City Civil & Sessions Court Ahmedabad"]
+                },
+                {
+                    "code": "GJ02",
+                    "name": "Surat",
+                    "taluks": ["Surat City", "Olpad"],
+                    "court_complexes": ["Surat District Court"]
+                },
+                {
+                    "code": "GJ03",
+                    "name": "Vadodara",
+                    "taluks": ["Vadodara", "Savli"],
+                    "court_complexes": ["Vadodara District Court"]
+                }
+            ]
+        },
+        {
+            "code": "WB",
+            "name": "West Bengal",
+            "districts": [
+                {
+                    "code": "WB01",
+                    "name": "Kolkata",
+                    "taluks": ["Alipore", "Ballygunge"],
+                    "court_complexes": ["City Civil Court Kolkata", "Alipore Judges Court"]
+                },
+                {
+                    "code": "WB02",
+                    "name": "Howrah",
+                    "taluks": ["Howrah Sadar"],
+                    "court_complexes": ["Howrah District Court"]
+                },
+                {
+                    "code": "WB03",
+                    "name": "Darjeeling",
+                    "taluks": ["Darjeeling", "Siliguri"],
+                    "court_complexes": ["Darjeeling District Court"]
+                }
+            ]
+        },
+        {
+            "code": "RJ",
+            "name": "Rajasthan",
+            "districts": [
+                {
+                    "code": "RJ01",
+                    "name": "Jaipur",
+                    "taluks": ["Jaipur City", "Amer"],
+                    "court_complexes": ["Jaipur District Court"]
+                },
+                {
+                    "code": "RJ02",
+                    "name": "Jodhpur",
+                    "taluks": ["Jodhpur City", "Luni"],
+                    "court_complexes": ["Jodhpur District Court"]
+                },
+                {
+                    "code": "RJ03",
+                    "name": "Udaipur",
+                    "taluks": ["Udaipur", "Girwa"],
+                    "court_complexes": ["Udaipur District Court"]
+                }
+            ]
+        },
+        {
+            "code": "MP",
+            "name": "Madhya Pradesh",
+            "districts": [
+                {
+                    "code": "MP01",
+                    "name": "Bhopal",
+                    "taluks": ["Bhopal Urban", "Huzur"],
+                    "court_complexes": ["Bhopal District Court"]
+                },
+                {
+                    "code": "MP02",
+                    "name": "Indore",
+                    "taluks": ["Indore City", "Mhow"],
+                    "court_complexes": ["Indore District Court"]
+                },
+                {
+                    "code": "MP03",
+                    "name": "Gwalior",
+                    "taluks": ["Gwalior City", "Bhitarwar"],
+                    "court_complexes": ["Gwalior District Court"]
+                }
+            ]
+        },
+        {
+            "code": "KL",
+            "name": "Kerala",
+            "districts": [
+                {
+                    "code": "KL01",
+                    "name": "Thiruvananthapuram",
+                    "taluks": ["Nedumangad", "Neyyattinkara"],
+                    "court_complexes": ["Thiruvananthapuram District Court"]
+                },
+                {
+                    "code": "KL02",
+                    "name": "Ernakulam",
+                    "taluks": ["Kochi", "Aluva"],
+                    "court_complexes": ["Ernakulam District Court"]
+                },
+                {
+                    "code": "KL03",
+                    "name": "Kozhikode",
+                    "taluks": ["Kozhikode", "Vadakara"],
+                    "court_complexes": ["Kozhikode District Court"]
+                }
+            ]
+        },
+        {
+            "code": "TS",
+            "name": "Telangana",
+            "districts": [
+                {
+                    "code": "TS01",
+                    "name": "Hyderabad",
+                    "taluks": ["Secunderabad", "Charminar"],
+                    "court_complexes": ["City Civil Court Hyderabad"]
+                },
+                {
+                    "code": "TS02",
+                    "name": "Ranga Reddy",
+                    "taluks": ["Shamshabad", "Ibrahimpatnam"],
+                    "court_complexes": ["Ranga Reddy District Court"]
+                },
+                {
+                    "code": "TS03",
+                    "name": "Warangal",
+                    "taluks": ["Warangal Urban", "Hanamkonda"],
+                    "court_complexes": ["Warangal District Court"]
+                }
+            ]
+        }
+    ]
+}
+
+COURT_TYPES = {
+    "patiala_house": ["Civil Judge", "Metropolitan Magistrate"],
+    "tis_hazari": ["Metropolitan Magistrate", "Sessions Court", "CBI Court"],
+    "mumbai_civil": ["Civil Judge Senior Division", "Small Causes Court"],
+    "bangalore_city": ["District Judge", "Family Court"],
+    "madras_high": ["Civil Appellate", "Criminal Appellate"],
+    "default": ["District Judge", "Additional District Judge", "Civil Judge"]
+}
+
+DEFAULT_COURTS = ["District Judge", "Additional District Judge", "Civil Judge"]
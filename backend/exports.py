@@ -0,0 +1,224 @@
+"""Chunked, columnar export of geography tables and stored cause lists.
+
+A table is a fixed list of columns plus a generator of column batches
+(dict of column name -> list of up to BATCH_ROWS values). Writers turn the
+batches into CSV, NDJSON, JSON, Parquet or Arrow IPC byte chunks as they
+arrive, so an export of every stored cause list streams to the client in
+constant memory: nothing is materialised whole, no DataFrame is built and
+nothing touches the disk.
+
+Parquet and Arrow output need pyarrow; the text formats do not.
+"""
+import csv
+import io
+import json
+
+from cause_lists import CAUSE_LIST_FIELDS, CHUNK_SIZE, _buffered
+from lazy import optional_module
+
+# pyarrow is optional (text formats still work) and imported by the first Parquet or Arrow export
+pa = optional_module("pyarrow")
+pq = optional_module("pyarrow.parquet")
+
+BATCH_ROWS = 16 * 1024
+
+# name -> (mimetype, file extension, needs pyarrow)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv", False),
+    "ndjson": ("application/x-ndjson", "ndjson", False),
+    "json": ("application/json", "json", False),
+    "parquet": ("application/vnd.apache.parquet", "parquet", True),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", True),
+}
+
+# Column types; "list" columns hold tuples of strings
+STRING, INT, BOOL, LIST = "string", "int", "bool", "list"
+
+
+class ExportTable:
+    """Columns and a factory for their batches"""
+
+    __slots__ = ("name", "columns", "batches")
+
+    def __init__(self, name, columns, batches):
+        self.name = name
+        self.columns = columns  # ((column, type), ...)
+        self.batches = batches  # () -> iterator of {column: [values]}
+
+    @property
+    def column_names(self):
+        return [name for name, _ in self.columns]
+
+
+def batched(rows, columns, size=BATCH_ROWS):
+    """Pivot an iterator of row dicts into column batches of `size` rows"""
+    names = [name for name, _ in columns]
+    batch = {name: [] for name in names}
+    count = 0
+    for row in rows:
+        for name in names:
+            batch[name].append(row.get(name))
+        count += 1
+        if count >= size:
+            yield batch
+            batch = {name: [] for name in names}
+            count = 0
+    if count:
+        yield batch
+
+
+def geography_tables(hierarchy):
+    """states / districts / taluks / all (one row per district with its taluks and complexes)"""
+    def all_rows():
+        for state in hierarchy.tree():
+            for district in state["districts"]:
+                yield {"state_code": state["state_code"], "state_name": state["state_name"],
+                       "district_code": district["district_code"],
+                       "district_name": district["district_name"],
+                       "taluks": tuple(district["taluks"]),
+                       "court_complexes": tuple(district["court_complexes"])}
+
+    states = (("code", STRING), ("name", STRING), ("total_districts", INT))
+    districts = (("state_code", STRING), ("state_name", STRING), ("district_code", STRING),
+                 ("district_name", STRING), ("total_taluks", INT), ("court_complexes", LIST))
+    taluks = (("state_code", STRING), ("state_name", STRING), ("district_code", STRING),
+              ("district_name", STRING), ("taluk_name", STRING))
+    everything = (("state_code", STRING), ("state_name", STRING), ("district_code", STRING),
+                  ("district_name", STRING), ("taluks", LIST), ("court_complexes", LIST))
+    return {
+        "states": ExportTable("states", states, lambda: batched(hierarchy.state_rows, states)),
+        "districts": ExportTable("districts", districts, lambda: batched(hierarchy.districts(), districts)),
+        "taluks": ExportTable("taluks", taluks, lambda: batched(hierarchy.taluks(), taluks)),
+        "all": ExportTable("all", everything, lambda: batched(all_rows(), everything)),
+    }
+
+
+CAUSE_LIST_COLUMNS = (("list_date", STRING), ("court_complex", STRING), ("serial_no", INT)) + \
+    tuple((name, STRING) for name in CAUSE_LIST_FIELDS if name != "serial_no")
+
+
+def cause_list_rows(court_complex, list_date, entries):
+    """One list's entries as CAUSE_LIST_COLUMNS rows"""
+    for entry in entries:
+        row = dict(entry, list_date=list_date, court_complex=court_complex)
+        try:
+            row["serial_no"] = int(row.get("serial_no"))
+        except (TypeError, ValueError):
+            row["serial_no"] = None
+        yield row
+
+
+def cause_list_table(store, since="1970-01-01", until=None):
+    """Every stored cause-list entry dated since..until, one list in memory at a time"""
+    def rows():
+        for court_complex, list_date, entries in store.iter_lists(since, until):
+            yield from cause_list_rows(court_complex, list_date, entries)
+    return ExportTable("cause_lists", CAUSE_LIST_COLUMNS, lambda: batched(rows(), CAUSE_LIST_COLUMNS))
+
+
+def _rows(table):
+    names = table.column_names
+    for batch in table.batches():
+        for values in zip(*(batch[name] for name in names)):
+            yield dict(zip(names, values))
+
+
+def write_csv(table):
+    lists = [name for name, kind in table.columns if kind == LIST]
+
+    def pieces():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(table.column_names)
+        for batch in table.batches():
+            for name in lists:
+                batch[name] = ["; ".join(value or ()) for value in batch[name]]
+            writer.writerows(zip(*(batch[name] for name in table.column_names)))
+            if out.tell() >= CHUNK_SIZE:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+    return _buffered(pieces())
+
+
+def write_ndjson(table):
+    return _buffered(json.dumps(row, ensure_ascii=False) + "\n" for row in _rows(table))
+
+
+def write_json(table):
+    def pieces():
+        yield "["
+        first = True
+        for row in _rows(table):
+            yield ("\n  " if first else ",\n  ") + json.dumps(row, ensure_ascii=False)
+            first = False
+        yield "\n]\n" if not first else "]\n"
+    return _buffered(pieces())
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the caller in pieces"""
+
+    def __init__(self):
+        super().__init__()
+        self._pieces = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._pieces.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b"".join(self._pieces)
+        self._pieces = []
+        return data
+
+
+def arrow_schema(table):
+    types = {STRING: pa.string(), INT: pa.int64(), BOOL: pa.bool_(), LIST: pa.list_(pa.string())}
+    return pa.schema([(name, types[kind]) for name, kind in table.columns])
+
+
+def _write_arrow(table, open_writer):
+    schema = arrow_schema(table)
+    sink = _ChunkSink()
+    writer = open_writer(sink, schema)
+    try:
+        for batch in table.batches():
+            writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+            data = sink.take()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def write_parquet(table):
+    # One row group per batch; the footer goes out with the last chunk
+    return _write_arrow(table, lambda sink, schema: pq.ParquetWriter(
+        sink, schema, compression="zstd"))
+
+
+def write_arrow(table):
+    return _write_arrow(table, lambda sink, schema: pa.ipc.new_stream(sink, schema))
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "json": write_json,
+           "parquet": write_parquet, "arrow": write_arrow}
+
+
+def export(table, fmt):
+    """Byte chunks of the whole table in the given format"""
+    if EXPORT_FORMATS[fmt][2] and pa is None:
+        raise RuntimeError(f"{fmt} export requires pyarrow")
+    return WRITERS[fmt](table)
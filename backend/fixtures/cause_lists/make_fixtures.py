@@ -0,0 +1,45 @@
+"""Regenerate the synthetic cause-list PDF fixtures and their expected rows
+
+    python fixtures/cause_lists/make_fixtures.py
+"""
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+
+from cause_list_pdf import render_cause_list_pdf
+from cause_lists import iter_mock_cause_list
+
+FIXTURES = {
+    # name: (entries, seed, blank_pages, single court)
+    "single_court": (30, 1, (), "Court Room 3 - Justice Iyer"),
+    "multi_page": (150, 2, (), "Court Room 1 - Justice Sharma"),
+    "multi_court": (60, 3, (), None),
+    "scanned_page": (90, 4, (2,), "Court Room 5 - Justice Reddy"),
+}
+
+
+def build(name, count, seed, blank_pages, court):
+    entries = list(iter_mock_cause_list(count, seed=seed))
+    if court:
+        for entry in entries:
+            entry["court"] = court
+    else:
+        entries.sort(key=lambda entry: entry["court"])
+        for serial, entry in enumerate(entries, start=1):
+            entry["serial_no"] = serial
+    pdf = render_cause_list_pdf(entries, "21/10/2026", blank_pages=blank_pages)
+    with open(os.path.join(HERE, f"{name}.pdf"), "wb") as f:
+        f.write(pdf)
+    expected = [{key: entry[key] for key in ("serial_no", "case_number", "parties", "purpose", "court")}
+                for entry in entries]
+    with open(os.path.join(HERE, f"{name}.expected.json"), "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=1)
+
+
+if __name__ == "__main__":
+    for name, spec in FIXTURES.items():
+        build(name, *spec)
+        print(f"wrote {name}.pdf")
@@ -0,0 +1,136 @@
+"""Regenerate the saved portal HTML pages and their expected parse results
+
+Pages carry the chrome a real portal response has (head scripts and
+styles, navigation, case history and orders tables) so parse timings are
+representative, not just the few rows the parsers read.
+
+    python fixtures/pages/make_fixtures.py
+"""
+import html
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+
+from cause_lists import iter_mock_cause_list
+
+JUDGES = ["Sharma", "Verma", "Iyer", "Reddy", "Banerjee", "Khan"]
+PARTIES = ["Ramesh Kumar", "Sunita Sharma", "Anil Mehta", "Priya Nair", "Mohd. Irfan", "Lakshmi Devi"]
+
+
+def chrome(title, body, rng):
+    scripts = "".join(f"<script src='/ecourtindia_v6/js/vendor{n}.js?v={rng.randint(1, 99)}'></script>"
+                      for n in range(12))
+    inline = "<script>var csrf_token='%032x';function go(p){document.forms[0].p.value=p;}</script>" \
+        % rng.getrandbits(128)
+    style = "<style>" + "".join(f".c{n}{{margin:{n}px;padding:{n % 7}px}}" for n in range(150)) + "</style>"
+    nav = "<ul class='nav'>" + "".join(
+        f"<li><a href='?p=menu/{n}' title='Menu item {n}'>Menu item {n}</a></li>" for n in range(60)) + "</ul>"
+    footer = "<div class='footer'>" + "<p>Disclaimer text for the services portal. </p>" * 20 + "</div>"
+    return (f"<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'><title>{title}</title>"
+            f"{scripts}{inline}{style}</head><body><div class='header'>{nav}</div>"
+            f"<div id='main'>{body}</div>{footer}</body></html>")
+
+
+def history_tables(rng, hearings=40):
+    history = "".join(
+        f"<tr><td>Justice {rng.choice(JUDGES)}</td><td>{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2023</td>"
+        f"<td>{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2024</td><td>{rng.choice(['Hearing', 'Evidence', 'Arguments'])}</td></tr>"
+        for _ in range(hearings))
+    orders = "".join(
+        f"<tr><td>{n}</td><td>{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2024</td>"
+        f"<td><a href='/orders/{rng.getrandbits(48):012x}.pdf'>Order/Judgment</a></td></tr>" for n in range(1, 15))
+    return (f"<table class='history_table'><tr><th>Judge</th><th>Business On Date</th><th>Hearing Date</th>"
+            f"<th>Purpose of hearing</th></tr>{history}</table>"
+            f"<table class='order_table'><tr><th>Order Number</th><th>Order Date</th><th>Order Details</th></tr>"
+            f"{orders}</table>")
+
+
+def case_page(seed, table_class, label_suffix, party_classes):
+    rng = random.Random(seed)
+    case_type = rng.choice(["CS", "CRL.A", "MACT", "O.S."])
+    number, year = rng.randint(1, 9999), rng.randint(2015, 2023)
+    cnr = "DLND01%06d%d" % (rng.randint(1, 999999), year)
+    petitioner, respondent = rng.sample(PARTIES, 2)
+    fields = [
+        ("Case Type", case_type),
+        ("Filing Number", f"{number + 10}/{year}"),
+        ("Registration Number", f"{case_type}/{number}/{year}"),
+        ("CNR Number", cnr),
+        ("First Hearing Date", f"{rng.randint(10, 28)}/0{rng.randint(1, 9)}/{year}"),
+        ("Next Hearing Date", f"{rng.randint(10, 28)}/0{rng.randint(1, 9)}/2024"),
+        ("Case Status", rng.choice(["Pending", "Disposed", "Adjourned"])),
+        ("Court Number and Judge", f"Court Room {rng.randint(1, 12)} - Justice {rng.choice(JUDGES)}"),
+    ]
+    rows = "".join(f"<tr><td><label>{label}{label_suffix}</label></td><td>{html.escape(value)}</td></tr>"
+                   for label, value in fields)
+    advocate = f"Advocate- {rng.choice(PARTIES)}"
+    body = (f"<div id='caseHistoryDiv'><h2>Case Details</h2><table class='{table_class} table'>{rows}</table>"
+            f"<div class='{party_classes[0]}'>1) {petitioner}<br>{advocate}</div>"
+            f"<div class='{party_classes[1]}'>1) {respondent}</div>"
+            f"{history_tables(rng)}</div>")
+    values = {label.lower(): value for label, value in fields}
+    expected = {
+        "case_number": values["registration number"],
+        "parties": f"1) {petitioner} {advocate} vs. 1) {respondent}",
+        "court": values["court number and judge"],
+        "status": values["case status"],
+        "listed_today": False,
+        "listed_tomorrow": False,
+        "serial_number": None,
+        "hearing_date": values["next hearing date"],
+        "cnr": cnr
+    }
+    return chrome("Case Status", body, rng), expected
+
+
+def not_found_page(seed):
+    rng = random.Random(seed)
+    body = "<div id='caseHistoryDiv'><div class='alert error'>This Case Code does not exists</div></div>"
+    return chrome("Case Status", body, rng), {"error": "This Case Code does not exists"}
+
+
+def cause_list_page(seed, count, advocates):
+    rng = random.Random(seed)
+    entries = sorted(iter_mock_cause_list(count, seed=seed), key=lambda entry: entry["court"])
+    header = "<tr><th>Sr No</th><th>Cases</th><th>Party Name</th>" + \
+        ("<th>Advocate</th>" if advocates else "") + "<th>Purpose</th></tr>"
+    rows = [header]
+    court = None
+    for serial, entry in enumerate(entries, start=1):
+        entry["serial_no"] = serial
+        if entry["court"] != court:
+            court = entry["court"]
+            rows.append(f"<tr><td colspan='{5 if advocates else 4}' class='court_heading'><b>{court}</b></td></tr>")
+        petitioner, respondent = entry["parties"].split(" vs. ")
+        advocate = f"<td>Adv. {rng.choice(PARTIES)}</td>" if advocates else ""
+        rows.append(f"<tr><td>{serial}</td><td><a href='#'>{entry['case_number']}</a></td>"
+                    f"<td>{petitioner}<br>vs.<br>{respondent}</td>{advocate}<td>{entry['purpose']}</td></tr>")
+        entry["parties"] = f"{petitioner} vs. {respondent}"
+    body = "<h3>Cause List for 21-10-2026</h3><table class='cause_list_table table'>" + "".join(rows) + "</table>"
+    expected = [{key: entry[key] for key in ("serial_no", "case_number", "parties", "purpose", "court")}
+                for entry in entries]
+    return chrome("Cause List", body, rng), expected
+
+
+FIXTURES = {
+    "case_details": lambda: case_page(1, "case_details_table", "", ("petitioner", "respondent")),
+    "case_status_labels": lambda: case_page(2, "case_status_table", ":",
+                                            ("Petitioner_Advocate_table", "Respondent_Advocate_table")),
+    "case_not_found": lambda: not_found_page(3),
+    "cause_list_small": lambda: cause_list_page(4, 25, advocates=False),
+    "cause_list_large": lambda: cause_list_page(5, 400, advocates=True),
+}
+
+
+if __name__ == "__main__":
+    for name, build in FIXTURES.items():
+        page, expected = build()
+        with open(os.path.join(HERE, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write(page)
+        with open(os.path.join(HERE, f"{name}.expected.json"), "w", encoding="utf-8") as f:
+            json.dump(expected, f, indent=1)
+        print(f"wrote {name}.html ({len(page):,} bytes)")
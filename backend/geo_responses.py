@@ -0,0 +1,161 @@
+"""Pre-rendered, compressed and ETag'd bodies for the static geography endpoints.
+
+The geography endpoints only change on deploy, so each (endpoint, filters)
+body is serialised and compressed exactly once, then served straight from
+bytes. Clients revalidating with If-None-Match get a 304 without any body.
+"""
+import gzip
+import hashlib
+import json
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+CACHE_CONTROL = "public, max-age=3600"
+
+
+class PrecomputedResponse:
+    """One JSON body held in identity, gzip and (optionally) brotli form"""
+
+    __slots__ = ("etag", "bodies")
+
+    def __init__(self, payload):
+        body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = digest
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+
+    def variant_etag(self, encoding):
+        # Strong ETags must differ per content-coding of the same resource
+        if encoding == "identity":
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+    def matches(self, if_none_match):
+        """True if an If-None-Match header names any variant of this body"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            tag = tag.strip('"')
+            if tag == self.etag or tag.rsplit("-", 1)[0] == self.etag:
+                return True
+        return False
+
+    def choose_encoding(self, accept_encoding):
+        accepted = set()
+        for part in (accept_encoding or "").split(","):
+            name, _, params = part.partition(";")
+            params = params.replace(" ", "")
+            if params.startswith("q="):
+                try:
+                    if float(params[2:]) <= 0:
+                        continue
+                except ValueError:
+                    continue
+            accepted.add(name.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.bodies:
+                return encoding
+        return "identity"
+
+    def to_response(self):
+        """Flask response for the current request (304 on a matching ETag)"""
+        encoding = self.choose_encoding(request.headers.get("Accept-Encoding"))
+        headers = {
+            "ETag": self.variant_etag(encoding),
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if request.method in ("GET", "HEAD") and self.matches(request.headers.get("If-None-Match")):
+            return Response(status=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.bodies[encoding], status=200, headers=headers,
+                        mimetype="application/json")
+
+
+class GeoResponseCache:
+    """Renders each geography body once per distinct filter combination"""
+
+    def __init__(self, hierarchy):
+        self.hierarchy = hierarchy
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, build):
+        response = self._responses.get(key)
+        if response is None:
+            with self._lock:
+                response = self._responses.get(key)
+                if response is None:
+                    response = PrecomputedResponse(build())
+                    self._responses[key] = response
+        return response
+
+    def all_states(self):
+        def build():
+            states = list(self.hierarchy.state_rows)
+            return {"states": states, "total": len(states)}
+        return self._get(("states",), build)
+
+    def all_districts(self, state_code=None):
+        # Unknown codes all collapse onto one cached empty body, so arbitrary
+        # query strings cannot grow the cache
+        if state_code and self.hierarchy.state_name(state_code) is None:
+            state_code = "?"
+
+        def build():
+            districts = list(self.hierarchy.districts(state_code))
+            return {"districts": districts, "total": len(districts)}
+        return self._get(("districts", state_code or None), build)
+
+    def all_taluks(self, state_code=None, district_code=None):
+        hierarchy = self.hierarchy
+        if district_code:
+            parent = hierarchy.state_of_district(district_code)
+            if parent is None or (state_code and state_code != parent):
+                state_code, district_code = "?", "?"
+            else:
+                state_code = parent
+        elif state_code and hierarchy.state_name(state_code) is None:
+            state_code = "?"
+
+        def build():
+            taluks = list(hierarchy.taluks(state_code, district_code))
+            return {"taluks": taluks, "total": len(taluks)}
+        return self._get(("taluks", state_code or None, district_code or None), build)
+
+    def geographical_data(self):
+        def build():
+            complete_data = self.hierarchy.tree()
+            return {
+                "geographical_data": complete_data,
+                "total_states": len(complete_data),
+                "total_districts": sum(len(state["districts"]) for state in complete_data)
+            }
+        return self._get(("geographical-data",), build)
+
+    def warm(self):
+        """Render every filter combination up front (e.g. before forking workers)"""
+        self.all_states()
+        self.geographical_data()
+        self.all_districts()
+        self.all_taluks()
+        for state in self.hierarchy.states:
+            self.all_districts(state["code"])
+            self.all_taluks(state["code"])
+            for district in self.hierarchy.district_options(state["code"]):
+                self.all_taluks(state["code"], district["code"])
+        return len(self._responses)
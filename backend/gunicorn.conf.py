@@ -0,0 +1,63 @@
+"""Production serving: gunicorn -c gunicorn.conf.py app:app
+
+The master imports the app once (preload_app) so the court hierarchy and
+the pre-rendered geography responses are built, and the libraries the app
+otherwise imports on first use (lazy.py) loaded, before forking and shared
+copy-on-write by every worker. gc.freeze() moves them out of the
+collector's reach so collections in a worker don't touch (and copy) their
+pages. Anything holding sockets, SQLite connections or threads - the
+scraper, its connection pool, the bulk engine, the prefetch scheduler - is
+created per worker in post_fork.
+
+On shutdown each worker stops taking requests, then gets graceful_timeout
+seconds for in-flight requests and upstream scrapes to finish.
+
+Environment: BIND, WEB_CONCURRENCY (workers, default one per CPU),
+WORKER_THREADS (default 8), GRACEFUL_TIMEOUT, MAX_REQUESTS,
+UPSTREAM_RATE_PER_HOST (portal requests/s for the whole server, default 5)
+and METRICS_DIR (where workers share metrics for /metrics).
+"""
+import gc
+import os
+import shutil
+
+# Tells app.py to warm shared data at import; per-worker state is built in post_fork
+os.environ.setdefault('ECOURTS_PRELOAD', '1')
+# Workers publish metrics snapshots here; /metrics on any worker merges them
+os.environ.setdefault('METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                  'static', 'metrics'))
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+os.environ['WEB_CONCURRENCY'] = str(workers)  # app.py splits upstream rate limits by it
+# Requests mostly wait on the portal, so each worker serves several at once
+worker_class = 'gthread'
+threads = int(os.environ.get('WORKER_THREADS', 8))
+preload_app = True
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+timeout = 60
+keepalive = 5
+# Recycle workers now and then so slow leaks can't accumulate
+max_requests = int(os.environ.get('MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('ACCESS_LOG')
+
+
+def on_starting(server):
+    # Counters restart with the server; leftovers from a previous run would be summed in
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+    app.init_worker()
+
+
+def worker_exit(server, worker):
+    import app
+    if not app.shutdown(graceful_timeout):
+        worker.log.warning("Worker %s exited with upstream requests still in flight", worker.pid)
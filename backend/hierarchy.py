@@ -0,0 +1,227 @@
+"""Immutable, indexed view over the State -> District -> Court Complex tree.
+
+INDIAN_COURTS_DATA is a nested list literal, so answering "districts of KA"
+means walking every state. HierarchyIndex walks it exactly once and keeps
+hash maps keyed by code, parent pointers and precomputed child rows, so the
+cascading dropdown endpoints are O(1) + size of the answer.
+
+A synced national tree is a few thousand nodes; rebuilding its dict from
+the SQLite store takes ten times as long as reading it back from a
+marshal snapshot (save_snapshot / load_snapshot), which is how server
+processes pick it up at start-up.
+"""
+import marshal
+import os
+from types import MappingProxyType
+
+# Bumped if the snapshot layout changes; marshal's own format is tied to the Python version
+SNAPSHOT_FORMAT = (1, marshal.version)
+
+
+class HierarchyIndex:
+    """Read-only lookup tables built from a court hierarchy dict"""
+
+    __slots__ = (
+        "states", "state_rows", "district_rows", "taluk_rows",
+        "_states", "_districts", "_complexes",
+        "_districts_by_state", "_district_rows_by_state",
+        "_taluk_rows_by_state", "_taluk_rows_by_district",
+        "_complexes_by_district", "_district_parent", "_complex_parent",
+        "_courts_by_complex",
+    )
+
+    def __init__(self, data):
+        states = {}
+        districts = {}
+        complexes = {}
+        district_parent = {}
+        complex_parent = {}
+        districts_by_state = {}
+        district_rows_by_state = {}
+        taluk_rows_by_state = {}
+        taluk_rows_by_district = {}
+        complexes_by_district = {}
+        state_rows = []
+
+        for state in data["states"]:
+            state_code = state["code"]
+            state_name = state["name"]
+            states[state_code] = state_name
+            state_rows.append({
+                "code": state_code,
+                "name": state_name,
+                "total_districts": len(state["districts"])
+            })
+
+            options = []
+            district_rows = []
+            state_taluk_rows = []
+            for district in state["districts"]:
+                district_code = district["code"]
+                district_name = district["name"]
+                taluks = tuple(district.get("taluks", []))
+                court_complexes = tuple(district.get("court_complexes", []))
+
+                districts[district_code] = district_name
+                district_parent[district_code] = state_code
+                options.append({"code": district_code, "name": district_name})
+                district_rows.append({
+                    "state_code": state_code,
+                    "state_name": state_name,
+                    "district_code": district_code,
+                    "district_name": district_name,
+                    "total_taluks": len(taluks),
+                    "court_complexes": court_complexes
+                })
+
+                rows = tuple({
+                    "state_code": state_code,
+                    "state_name": state_name,
+                    "district_code": district_code,
+                    "district_name": district_name,
+                    "taluk_name": taluk
+                } for taluk in taluks)
+                taluk_rows_by_district[(state_code, district_code)] = rows
+                state_taluk_rows.extend(rows)
+
+                complexes_by_district[(state_code, district_code)] = court_complexes
+                for complex_name in court_complexes:
+                    complexes[complex_name] = complex_name
+                    complex_parent[complex_name] = (state_code, district_code)
+
+            districts_by_state[state_code] = tuple(options)
+            district_rows_by_state[state_code] = tuple(district_rows)
+            taluk_rows_by_state[state_code] = tuple(state_taluk_rows)
+
+        self.state_rows = tuple(state_rows)
+        self.states = tuple({"code": row["code"], "name": row["name"]} for row in state_rows)
+        self.district_rows = tuple(
+            row for rows in district_rows_by_state.values() for row in rows
+        )
+        self.taluk_rows = tuple(
+            row for rows in taluk_rows_by_state.values() for row in rows
+        )
+        self._states = MappingProxyType(states)
+        self._districts = MappingProxyType(districts)
+        self._complexes = MappingProxyType(complexes)
+        self._district_parent = MappingProxyType(district_parent)
+        self._complex_parent = MappingProxyType(complex_parent)
+        self._districts_by_state = MappingProxyType(districts_by_state)
+        self._district_rows_by_state = MappingProxyType(district_rows_by_state)
+        self._taluk_rows_by_state = MappingProxyType(taluk_rows_by_state)
+        self._taluk_rows_by_district = MappingProxyType(taluk_rows_by_district)
+        self._complexes_by_district = MappingProxyType(complexes_by_district)
+        # Court rooms per complex, when the data has them (a synced tree does)
+        self._courts_by_complex = MappingProxyType({
+            complex_code: tuple(courts) for complex_code, courts in data.get("courts", {}).items()})
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"HierarchyIndex is immutable: cannot set {name}")
+        object.__setattr__(self, name, value)
+
+    def state_name(self, state_code, default=None):
+        """Name for a state code"""
+        return self._states.get(state_code, default)
+
+    def district_name(self, district_code, default=None):
+        """Name for a district code"""
+        return self._districts.get(district_code, default)
+
+    def has_complex(self, complex_code):
+        return complex_code in self._complexes
+
+    def state_of_district(self, district_code):
+        """Parent state code of a district, or None"""
+        return self._district_parent.get(district_code)
+
+    def parents_of_complex(self, complex_code):
+        """(state_code, district_code) of a court complex, or None"""
+        return self._complex_parent.get(complex_code)
+
+    def district_options(self, state_code):
+        """[{code, name}] dropdown rows for the districts of a state"""
+        return self._districts_by_state.get(state_code, ())
+
+    def court_complexes(self, state_code, district_code):
+        """Court complex codes for a district"""
+        return self._complexes_by_district.get((state_code, district_code), ())
+
+    def courts(self, complex_code):
+        """Court names of a complex; empty when the hierarchy does not list them"""
+        return self._courts_by_complex.get(complex_code, ())
+
+    def districts(self, state_code=None):
+        """Full district rows, optionally filtered by state"""
+        if state_code:
+            return self._district_rows_by_state.get(state_code, ())
+        return self.district_rows
+
+    def taluks(self, state_code=None, district_code=None):
+        """Taluk rows filtered by state and/or district"""
+        if district_code:
+            if state_code is None:
+                state_code = self._district_parent.get(district_code)
+            return self._taluk_rows_by_district.get((state_code, district_code), ())
+        if state_code:
+            return self._taluk_rows_by_state.get(state_code, ())
+        return self.taluk_rows
+
+    def tree(self):
+        """Nested State -> District rows as served by /api/geographical-data"""
+        return [{
+            "state_code": state["code"],
+            "state_name": state["name"],
+            "districts": [{
+                "district_code": district["district_code"],
+                "district_name": district["district_name"],
+                "taluks": [taluk["taluk_name"] for taluk in
+                           self._taluk_rows_by_district[(state["code"], district["district_code"])]],
+                "court_complexes": district["court_complexes"]
+            } for district in self._district_rows_by_state[state["code"]]]
+        } for state in self.state_rows]
+
+    def data(self):
+        """The hierarchy dict this index was built from (same shape as INDIAN_COURTS_DATA)"""
+        data = {"states": [{
+            "code": state["code"],
+            "name": state["name"],
+            "districts": [{
+                "code": district["district_code"],
+                "name": district["district_name"],
+                "taluks": [taluk["taluk_name"] for taluk in
+                           self._taluk_rows_by_district[(state["code"], district["district_code"])]],
+                "court_complexes": list(district["court_complexes"])
+            } for district in self._district_rows_by_state[state["code"]]]
+        } for state in self.state_rows]}
+        if self._courts_by_complex:
+            data["courts"] = {complex_code: list(courts) for complex_code, courts in self._courts_by_complex.items()}
+        return data
+
+    def iter_complexes(self):
+        """Yield (state_code, district_code, complex_code) for every complex"""
+        for complex_code, (state_code, district_code) in self._complex_parent.items():
+            yield state_code, district_code, complex_code
+
+    def __len__(self):
+        return len(self._states)
+
+
+def save_snapshot(data, path, version=0):
+    """Write a hierarchy dict and the stored version it came from to path, atomically"""
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        marshal.dump((SNAPSHOT_FORMAT, version, data), f)
+    os.replace(partial, path)
+
+
+def load_snapshot(path):
+    """(version, hierarchy dict) from a snapshot, or None if it is missing, unreadable or from another format"""
+    try:
+        with open(path, "rb") as f:
+            snapshot_format, version, data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if snapshot_format != SNAPSHOT_FORMAT:
+        return None
+    return version, data
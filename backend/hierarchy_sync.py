@@ -0,0 +1,331 @@
+"""Live sync of the State -> District -> Court Complex -> Court tree from the portal.
+
+HierarchySync crawls the portal one level at a time, each level's requests
+spread over a bounded thread pool (`fan_out`) on a Transport of its own,
+so a national crawl of a few thousand requests takes minutes without
+going over the per-host rate. The crawled tree is diffed against the one
+in CourtStore and only the differences are written, in one transaction
+that also bumps the stored hierarchy version.
+
+The portal's codes are numeric. Nodes that match an existing one by name
+keep the API's codes ("KA", "KA01"; complexes are keyed by name), so a
+sync does not renumber what clients already hold. A subtree whose request
+failed is carried over from the stored tree rather than read as deleted.
+Taluks are not on the portal and are carried over as they are.
+
+Every server process polls the stored version (watch()) and hot-swaps its
+in-memory HierarchyIndex when it moves; readers keep whichever index they
+already hold and are never blocked. With a snapshot_path, the first
+process to see a version reads the tree from the store once and leaves a
+marshal snapshot of it; the others (and the next start-up) load that.
+
+Report what a sync would change, crawling a local portal:
+
+    python hierarchy_sync.py --dry-run --base-url http://127.0.0.1:8000/
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from hierarchy import load_snapshot, save_snapshot
+from locks import release, try_lock
+from metrics import HIERARCHY_SYNC_CHANGES, HIERARCHY_SYNC_REQUESTS, HIERARCHY_SYNC_SECONDS
+from portal import PortalError, hierarchy_request, parse_options
+from storage import CourtStore
+from transport import Transport, TransportError
+
+logger = logging.getLogger(__name__)
+
+
+def tree_nodes(data):
+    """Flatten a hierarchy dict into {node key: value} for diffing.
+
+    ("state", code) -> name, ("district", code) -> (state code, name),
+    ("complex", name) -> district code, ("court", complex, name) -> None
+    """
+    nodes = {}
+    courts = data.get("courts", {})
+    for state in data["states"]:
+        nodes[("state", state["code"])] = state["name"]
+        for district in state["districts"]:
+            nodes[("district", district["code"])] = (state["code"], district["name"])
+            for complex_name in district.get("court_complexes", []):
+                nodes[("complex", complex_name)] = district["code"]
+                for court in courts.get(complex_name, ()):
+                    nodes[("court", complex_name, court)] = None
+    return nodes
+
+
+def diff_trees(old, new):
+    """[(op, key, value)] turning hierarchy dict old into new; op is add, update or remove.
+
+    Parents come before their children in adds and after them in removes.
+    """
+    before, after = tree_nodes(old), tree_nodes(new)
+    order = {"state": 0, "district": 1, "complex": 2, "court": 3}
+    changes = [("remove", key, before[key]) for key in before if key not in after]
+    changes.sort(key=lambda change: -order[change[1][0]])
+    for key, value in after.items():
+        if key not in before:
+            changes.append(("add", key, value))
+        elif before[key] != value:
+            changes.append(("update", key, value))
+    return changes
+
+
+def _new_code(preferred, taken):
+    code = preferred
+    suffix = 1
+    while code in taken:
+        suffix += 1
+        code = f"{preferred}-{suffix}"
+    taken.add(code)
+    return code
+
+
+class HierarchySync:
+    """Crawls the portal's court hierarchy and applies what changed to a CourtStore"""
+
+    def __init__(self, store, transport=None, base_url=None, fan_out=(8, 16, 32), rate_per_host=20.0,
+                 interval=24 * 3600, lock_path=None, dry_run=False, snapshot_path=None):
+        self.store = store
+        self.transport = transport or Transport(rate_per_host=rate_per_host, pool_size=max(fan_out))
+        self.base_url = base_url or os.environ.get(
+            'ECOURTS_BASE_URL', "https://services.ecourts.gov.in/ecourtindia_v6/")
+        self.fan_out = dict(zip(("districts", "complexes", "courts"), fan_out))
+        self.interval = interval
+        # With several server processes only the one holding this lock crawls
+        self.lock_path = lock_path
+        self.dry_run = dry_run
+        # Where the stored tree is kept as a marshal snapshot for fast loading; None to always read the store
+        self.snapshot_path = snapshot_path
+        self.last_run = None
+        self.running = False
+        self.version = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _options(self, level, **codes):
+        """[(portal code, name)] listed by the portal for one node's children"""
+        method, url, form = hierarchy_request(self.base_url, level, **codes)
+        try:
+            response = self.transport.request(method, url, data=form)
+            if response.status_code != 200:
+                raise PortalError(f"Portal returned HTTP {response.status_code}")
+            options = parse_options(response.text)
+        except (TransportError, PortalError):
+            HIERARCHY_SYNC_REQUESTS.inc(level=level, outcome="error")
+            raise
+        HIERARCHY_SYNC_REQUESTS.inc(level=level, outcome="ok")
+        return options
+
+    def _fetch_level(self, level, requests, stats):
+        """Run [(node, codes)] requests for one level; returns [(node, options or None)]"""
+        def fetch(item):
+            node, codes = item
+            try:
+                return node, self._options(level, **codes)
+            except (TransportError, PortalError) as e:
+                stats["errors"].append(f"{level} {codes}: {e}")
+                return node, None
+        started = time.monotonic()
+        with ThreadPoolExecutor(self.fan_out.get(level, 1)) as executor:
+            results = list(executor.map(fetch, requests))
+        stats["requests"][level] = len(requests)
+        stats["failed"][level] = sum(1 for _, options in results if options is None)
+        stats["level_seconds"][level] = round(time.monotonic() - started, 3)
+        return results
+
+    def crawl(self, current):
+        """The portal's hierarchy as a dict shaped like `current`, which supplies codes and carry-overs"""
+        stats = {"requests": {}, "failed": {}, "level_seconds": {}, "errors": []}
+        old_states = {state["name"].lower(): state for state in current["states"]}
+        old_courts = current.get("courts", {})
+        state_codes = {state["code"] for state in current["states"]}
+        district_codes = {district["code"] for state in current["states"] for district in state["districts"]}
+
+        states = []
+        for portal_code, name in self._fetch_level("states", [(None, {})], stats)[0][1] or ():
+            old = old_states.get(name.lower())
+            code = old["code"] if old else _new_code(portal_code, state_codes)
+            states.append(({"code": code, "name": name, "districts": []}, portal_code, old))
+        if not states:
+            raise PortalError("Portal listed no states")
+
+        districts = []
+        for (state, portal_state, old_state), options in self._fetch_level(
+                "districts", [((state, portal_code, old), {"state_code": portal_code})
+                              for state, portal_code, old in states], stats):
+            old_districts = {d["name"].lower(): d for d in (old_state or {}).get("districts", [])}
+            if options is None:
+                state["districts"] = [dict(d) for d in old_districts.values()]
+                continue
+            for portal_code, name in options:
+                old = old_districts.get(name.lower())
+                code = old["code"] if old else _new_code(f"{state['code']}{portal_code:0>2}", district_codes)
+                district = {"code": code, "name": name, "taluks": list(old["taluks"]) if old else [],
+                            "court_complexes": []}
+                state["districts"].append(district)
+                districts.append((district, {"state_code": portal_state, "dist_code": portal_code}, old))
+
+        complexes = []
+        for (district, codes, old_district), options in self._fetch_level(
+                "complexes", [((district, codes, old), codes) for district, codes, old in districts], stats):
+            if options is None:
+                district["court_complexes"] = list((old_district or {}).get("court_complexes", []))
+                continue
+            for portal_code, name in options:
+                district["court_complexes"].append(name)
+                complexes.append((name, dict(codes, court_complex_code=portal_code)))
+
+        courts = {name: list(old_courts.get(name, ())) for state, _, _ in states
+                  for district in state["districts"] for name in district["court_complexes"]}
+        for complex_name, options in self._fetch_level(
+                "courts", [(name, codes) for name, codes in complexes], stats):
+            if options is not None:
+                courts[complex_name] = [name for _, name in options]
+        tree = {"states": [state for state, _, _ in states],
+                "courts": {name: names for name, names in courts.items() if names}}
+        return tree, stats
+
+    def run_once(self):
+        """Crawl, diff against the stored tree and apply the changes; returns run stats"""
+        started = time.monotonic()
+        self.running = True
+        try:
+            current = self.store.hierarchy_data()
+            tree, stats = self.crawl(current)
+            changes = diff_trees(current, tree)
+            if not self.dry_run:
+                stats["version"] = self.store.apply_hierarchy_changes(changes)
+        finally:
+            self.running = False
+            HIERARCHY_SYNC_SECONDS.observe(time.monotonic() - started)
+        stats["changes"] = len(changes)
+        stats["changes_by_level"] = {}
+        for op, key, _ in changes:
+            HIERARCHY_SYNC_CHANGES.inc(op=op, level=key[0])
+            name = f"{key[0]}_{op}"
+            stats["changes_by_level"][name] = stats["changes_by_level"].get(name, 0) + 1
+        stats["duration_seconds"] = round(time.monotonic() - started, 3)
+        stats["finished_at"] = datetime.now().isoformat()
+        stats["errors"] = stats["errors"][:20]
+        self.last_run = stats
+        return stats
+
+    def _due(self):
+        synced_at = self.store.hierarchy_state()["synced_at"]
+        # Another process may have just synced; workers start at different times
+        return synced_at is None or time.time() - synced_at >= self.interval / 2
+
+    def _loop(self):
+        while not self._stop.is_set():
+            lock = try_lock(self.lock_path) if self._due() else None
+            if lock:
+                try:
+                    self.run_once()
+                except Exception:
+                    logger.exception("Hierarchy sync failed")
+                finally:
+                    release(lock)
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        """Sync now and then every `interval` seconds on a background thread"""
+        thread = threading.Thread(target=self._loop, name="hierarchy-sync", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def check(self, on_change, current=None, current_version=None):
+        """Call on_change(data) if the stored tree moved since the last check (or differs from current).
+
+        current_version is the stored version current was loaded at, if known: when it is
+        still the stored one the first check need not load the tree to compare.
+        """
+        version = self.store.hierarchy_version()
+        if version == self.version:
+            return False
+        first = self.version is None
+        if first and current_version == version:
+            self.version = version
+            return False
+        data = self.load(version)
+        self.version = version
+        if first and data == current:
+            return False
+        on_change(data)
+        return True
+
+    def load(self, version):
+        """The stored tree at version: from the snapshot if it holds that version, else from the store"""
+        if self.snapshot_path:
+            snapshot = load_snapshot(self.snapshot_path)
+            if snapshot is not None and snapshot[0] == version:
+                return snapshot[1]
+        data = self.store.hierarchy_data()
+        if self.snapshot_path:
+            try:
+                save_snapshot(data, self.snapshot_path, version)
+            except OSError:
+                logger.exception("Hierarchy snapshot not written to %s", self.snapshot_path)
+        return data
+
+    def watch(self, on_change, current=None, poll_interval=30.0, current_version=None):
+        """Check now, then poll the stored version on a background thread"""
+        self.check(on_change, current, current_version)
+
+        def loop():
+            while not self._stop.wait(poll_interval):
+                try:
+                    self.check(on_change)
+                except Exception:
+                    logger.exception("Hierarchy reload failed")
+        thread = threading.Thread(target=loop, name="hierarchy-watch", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Stop syncing and watching; waits up to timeout for a crawl in progress"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        return not self.running
+
+    def status(self):
+        return {
+            "running": self.running,
+            "version": self.version,
+            "last_run": self.last_run,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the court hierarchy from the portal")
+    parser.add_argument("--base-url", help="Portal base URL (e.g. a local fake portal)")
+    parser.add_argument("--fan-out", default="8,16,32", help="Parallel requests for districts,complexes,courts")
+    parser.add_argument("--rate", type=float, default=20.0, help="Portal requests per second")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without applying them")
+    args = parser.parse_args()
+
+    store = CourtStore(os.environ.get('COURT_DB', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'static', 'court.db')))
+    if store.hierarchy_version() == 0:
+        from court_data import INDIAN_COURTS_DATA
+        from hierarchy import HierarchyIndex
+        store.load_hierarchy(HierarchyIndex(INDIAN_COURTS_DATA))
+    sync = HierarchySync(store, base_url=args.base_url, rate_per_host=args.rate, dry_run=args.dry_run,
+                         fan_out=tuple(int(n) for n in args.fan_out.split(",")))
+    stats = sync.run_once()
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
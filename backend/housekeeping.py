@@ -0,0 +1,99 @@
+"""Periodic clean-up of the stores that only ever grow.
+
+The change feed, cause-list artifacts, listing index, job queue and case
+cache each know how to drop what has aged out, but nothing in a request's
+path calls that. Housekeeper runs the registered tasks on one background
+thread every `interval` seconds, the first run a random part of an
+interval after start so workers started together do not all sweep at once.
+Tasks on shared stores (SQLite files, directories) run in one process on
+the box at a time when there is a lock_path; the others skip them until
+their next sweep. Tasks registered with per_process=True, such as
+trimming an in-memory index, run in every process. A task that fails is
+logged and the rest still run.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+
+from locks import release, try_lock
+
+logger = logging.getLogger(__name__)
+
+
+class Housekeeper:
+    """Named clean-up tasks run together on a timer"""
+
+    def __init__(self, interval=3600.0, lock_path=None):
+        self.interval = interval
+        self.lock_path = lock_path
+        self.tasks = {}
+        self._per_process = set()
+        self.last_run = None
+        self.running = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, task, per_process=False):
+        """Run task() on every sweep; what it returns (e.g. rows removed) is kept in last_run"""
+        self.tasks[name] = task
+        if per_process:
+            self._per_process.add(name)
+        return self
+
+    def run_once(self, shared=True):
+        """Run every task once (only the per-process ones unless shared); returns {name: result or error}"""
+        started = time.monotonic()
+        self.running = True
+        results = {}
+        try:
+            for name, task in list(self.tasks.items()):
+                if not shared and name not in self._per_process:
+                    continue
+                try:
+                    results[name] = task()
+                except Exception as e:
+                    logger.exception("Housekeeping task %s failed", name)
+                    results[name] = {"error": str(e)}
+        finally:
+            self.running = False
+        self.last_run = {
+            "results": results,
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "finished_at": datetime.now().isoformat(),
+        }
+        return results
+
+    def _loop(self):
+        if self._stop.wait(random.uniform(0, self.interval)):
+            return
+        while True:
+            lock = try_lock(self.lock_path)
+            try:
+                self.run_once(shared=bool(lock))
+            finally:
+                release(lock)
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        """Sweep every `interval` seconds on a background thread"""
+        self._thread = threading.Thread(target=self._loop, name="housekeeping", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop sweeping; waits up to timeout for a sweep in progress"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.running
+
+    def status(self):
+        return {
+            "tasks": sorted(self.tasks),
+            "interval_seconds": self.interval,
+            "running": self.running,
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,835 @@
+"""Scraping work as jobs on a shared queue, run by worker processes on any number of nodes.
+
+A night's cause lists for ~3,500 complexes, CNR refreshes and hierarchy
+syncs are enqueued as jobs, each with a key: a job whose key is already
+queued or running is not enqueued again, and one that finished is only
+re-run with refresh=True. Workers lease a job for lease_seconds and keep
+extending the lease while the handler runs; a worker that dies stops
+extending, and its job is handed to another worker when the lease runs
+out. Failed jobs are retried with exponential backoff up to max_attempts
+(counted per lease, so a job that keeps killing its worker dies too), then
+kept as dead with their last error. Workers purge done and dead jobs once
+they are older than the retention period (JOB_RETENTION_DAYS, default 7);
+after that a job's key can be enqueued again without refresh.
+
+Each job names the upstream host it calls, and a lease is only granted
+while fewer than the host's limit of jobs for it are leased, across all
+workers on all nodes: adding nodes adds throughput without piling more
+concurrent requests on one court server. Each worker's Transport still
+applies its own per-host rate limit on top.
+
+Backends, chosen by URL (JOB_QUEUE_URL):
+
+    memory://                  in-process, for tests and single-process runs
+    sqlite:///path/jobs.db     processes on one host (or a shared filesystem with working locks)
+    redis://host:6379/0        nodes anywhere; needs the redis package
+
+Handlers are ECourtsScraper methods (see handlers()). From the command line:
+
+    python jobs.py enqueue cause-lists --date 21/10/2026
+    python jobs.py enqueue cases --cases cnrs.txt --refresh
+    python jobs.py enqueue hierarchy
+    python jobs.py worker --threads 16
+    python jobs.py stats
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+from lazy import optional_module
+from portal import case_key, case_status_request, cause_list_request
+
+redis = optional_module("redis")
+
+logger = logging.getLogger(__name__)
+
+CAUSE_LIST, CASE, HIERARCHY = "cause_list", "case", "hierarchy"
+QUEUED, LEASED, DONE, DEAD = "queued", "leased", "done", "dead"
+# What fail() did with the job: queued it for another attempt, or gave up on it
+RETRY = "retry"
+
+
+class Job:
+    """A leased job: what to run and the lease token that proves this worker holds it"""
+
+    __slots__ = ("key", "kind", "payload", "host", "attempts", "max_attempts", "token")
+
+    def __init__(self, key, kind, payload, host, attempts, max_attempts, token):
+        self.key = key
+        self.kind = kind
+        self.payload = payload
+        self.host = host
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.token = token
+
+    def __repr__(self):
+        return f"<Job {self.key} attempt {self.attempts}/{self.max_attempts}>"
+
+
+def job_spec(kind, key, payload, host="", priority=0, max_attempts=3):
+    """A job description for JobQueue.enqueue_many"""
+    return {"kind": kind, "key": key, "payload": payload, "host": host, "priority": priority,
+            "max_attempts": max_attempts}
+
+
+class JobQueue:
+    """What every backend implements.
+
+    host_limit caps the leased jobs per upstream host (host_limits
+    overrides it per host; 0 means no cap). Higher priority jobs are
+    leased first; among equal priorities the order is up to the backend.
+    """
+
+    def __init__(self, host_limit=4, host_limits=None, retry_base=5.0, retry_max=600.0):
+        self.host_limit = host_limit
+        self.host_limits = dict(host_limits or {})
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+    def limit_for(self, host):
+        return self.host_limits.get(host, self.host_limit)
+
+    def retry_delay(self, attempts):
+        """Full-jitter exponential backoff before a failed job's next attempt"""
+        return random.uniform(0, min(self.retry_max, self.retry_base * (2 ** (attempts - 1))))
+
+    def enqueue(self, kind, key, payload, host="", priority=0, max_attempts=3, refresh=False):
+        """Queue a job; False if its key is queued or running (or finished, unless refresh)"""
+        return self.enqueue_many([job_spec(kind, key, payload, host, priority, max_attempts)], refresh) == 1
+
+    def enqueue_many(self, jobs, refresh=False):
+        """Queue job_spec() dicts; returns how many were new"""
+        raise NotImplementedError
+
+    def lease(self, worker, lease_seconds=60.0):
+        """The next runnable job whose host is under its limit, leased to worker; None if there is none"""
+        raise NotImplementedError
+
+    def extend(self, job, lease_seconds=60.0):
+        """Push a held lease's expiry out; False if the lease was lost"""
+        raise NotImplementedError
+
+    def complete(self, job):
+        """Mark a held job done; False if the lease was lost (another worker may be running it)"""
+        raise NotImplementedError
+
+    def fail(self, job, error):
+        """Release a held job after a failure: RETRY, DEAD, or None if the lease was lost"""
+        raise NotImplementedError
+
+    def stats(self):
+        """Jobs by state, leased jobs by host, and the dead jobs' last errors"""
+        raise NotImplementedError
+
+    def purge(self, before):
+        """Forget done and dead jobs finished before the `before` timestamp; returns how many"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryQueue(JobQueue):
+    """In-process queue, for tests, benchmarks and single-process runs"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._jobs = {}
+        # Heaps of (-priority, seq, key) due now and (run_at, seq, key) waiting for a retry;
+        # entries whose seq no longer matches their job's are stale and skipped
+        self._ready = []
+        self._delayed = []
+        self._held = {}
+        self._leased = Counter()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _queue(self, record, run_at):
+        record["status"], record["seq"] = QUEUED, next(self._seq)
+        if run_at > time.time():
+            heapq.heappush(self._delayed, (run_at, record["seq"], record["key"]))
+        else:
+            heapq.heappush(self._ready, (-record["priority"], record["seq"], record["key"]))
+
+    def enqueue_many(self, jobs, refresh=False):
+        now = time.time()
+        added = 0
+        with self._lock:
+            for item in jobs:
+                record = self._jobs.get(item["key"])
+                if record is not None and (record["status"] in (QUEUED, LEASED) or not refresh):
+                    continue
+                record = self._jobs[item["key"]] = dict(item, attempts=0, token=None, expires=None, error=None,
+                                                        finished_at=None)
+                self._queue(record, now)
+                added += 1
+        return added
+
+    def _release(self, record, now, error, run_at):
+        del self._held[record["key"]]
+        self._leased[record["host"]] -= 1
+        record["token"] = record["expires"] = None
+        record["error"] = error
+        if record["attempts"] >= record["max_attempts"]:
+            record["status"], record["finished_at"] = DEAD, now
+            return DEAD
+        self._queue(record, run_at)
+        return RETRY
+
+    def _reclaim(self, now):
+        for record in [record for record in self._held.values() if record["expires"] < now]:
+            self._release(record, now, "lease expired", now)
+        while self._delayed and self._delayed[0][0] <= now:
+            _, seq, key = heapq.heappop(self._delayed)
+            record = self._jobs.get(key)
+            if record is not None and record["seq"] == seq:
+                heapq.heappush(self._ready, (-record["priority"], seq, key))
+
+    def lease(self, worker, lease_seconds=60.0):
+        now = time.time()
+        with self._lock:
+            self._reclaim(now)
+            skipped = []
+            try:
+                while self._ready:
+                    entry = heapq.heappop(self._ready)
+                    record = self._jobs.get(entry[2])
+                    if record is None or record["seq"] != entry[1] or record["status"] != QUEUED:
+                        continue
+                    limit = self.limit_for(record["host"])
+                    if limit and self._leased[record["host"]] >= limit:
+                        skipped.append(entry)
+                        continue
+                    record.update(status=LEASED, token=uuid.uuid4().hex, expires=now + lease_seconds, worker=worker)
+                    record["attempts"] += 1
+                    self._held[record["key"]] = record
+                    self._leased[record["host"]] += 1
+                    return Job(record["key"], record["kind"], record["payload"], record["host"], record["attempts"],
+                               record["max_attempts"], record["token"])
+                return None
+            finally:
+                for entry in skipped:
+                    heapq.heappush(self._ready, entry)
+
+    def _holding(self, job):
+        record = self._held.get(job.key)
+        return record if record is not None and record["token"] == job.token else None
+
+    def extend(self, job, lease_seconds=60.0):
+        with self._lock:
+            record = self._holding(job)
+            if record is not None:
+                record["expires"] = time.time() + lease_seconds
+            return record is not None
+
+    def complete(self, job):
+        with self._lock:
+            record = self._holding(job)
+            if record is None:
+                return False
+            del self._held[record["key"]]
+            self._leased[record["host"]] -= 1
+            record.update(status=DONE, token=None, expires=None, error=None, finished_at=time.time())
+            return True
+
+    def fail(self, job, error):
+        now = time.time()
+        with self._lock:
+            record = self._holding(job)
+            if record is None:
+                return None
+            return self._release(record, now, error, now + self.retry_delay(record["attempts"]))
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            self._reclaim(now)
+            records = list(self._jobs.values())
+            leased = +self._leased
+            delayed = {key for _, seq, key in self._delayed if self._jobs.get(key, {}).get("seq") == seq}
+        counts = Counter("delayed" if record["status"] == QUEUED and record["key"] in delayed else record["status"]
+                         for record in records)
+        return _stats(counts, leased, {record["key"]: record["error"] for record in records
+                                       if record["status"] == DEAD})
+
+    def purge(self, before):
+        with self._lock:
+            old = [key for key, record in self._jobs.items()
+                   if record["status"] in (DONE, DEAD) and record["finished_at"] < before]
+            for key in old:
+                del self._jobs[key]
+        return len(old)
+
+
+def _stats(counts, leased_by_host, dead):
+    return {"queued": counts.get(QUEUED, 0), "delayed": counts.get("delayed", 0), "leased": counts.get(LEASED, 0),
+            "done": counts.get(DONE, 0), "dead": counts.get(DEAD, 0), "leased_by_host": dict(leased_by_host),
+            "dead_errors": dict(list(dead.items())[:20])}
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    host TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    token TEXT,
+    expires REAL,
+    worker TEXT,
+    error TEXT,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (status, priority DESC, run_at);
+CREATE INDEX IF NOT EXISTS jobs_leased ON jobs (status, host);
+"""
+
+
+class SQLiteQueue(JobQueue):
+    """Jobs in a SQLite table; every process opening the same file shares the queue"""
+
+    def __init__(self, path, **options):
+        super().__init__(**options)
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(SQLITE_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, work):
+        """Run work(conn) in a write transaction, so leases and limits are checked atomically"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def enqueue_many(self, jobs, refresh=False):
+        now = time.time()
+        finished = "" if not refresh else f" WHERE jobs.status IN ('{DONE}', '{DEAD}')"
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO jobs (key, kind, payload, host, priority, status, attempts, max_attempts, run_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?) ON CONFLICT (key) DO "
+                + ("NOTHING" if not refresh else
+                   "UPDATE SET kind = excluded.kind, payload = excluded.payload, host = excluded.host,"
+                   " priority = excluded.priority, status = excluded.status, attempts = 0,"
+                   " max_attempts = excluded.max_attempts, run_at = excluded.run_at, token = NULL, expires = NULL,"
+                   " error = NULL, finished_at = NULL" + finished),
+                ((item["key"], item["kind"], json.dumps(item["payload"]), item["host"], item["priority"], QUEUED,
+                  item["max_attempts"], now) for item in jobs))
+            return conn.total_changes - before
+        return self._write(insert)
+
+    def _reclaim(self, conn, now):
+        conn.execute(f"UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN '{DEAD}' ELSE '{QUEUED}' END,"
+                     " finished_at = CASE WHEN attempts >= max_attempts THEN ? END, run_at = ?, token = NULL,"
+                     " expires = NULL, error = 'lease expired' WHERE status = ? AND expires < ?",
+                     (now, now, LEASED, now))
+
+    def lease(self, worker, lease_seconds=60.0):
+        now = time.time()
+        token = uuid.uuid4().hex
+
+        def take(conn):
+            self._reclaim(conn, now)
+            full = [host for host, leased in conn.execute(
+                "SELECT host, COUNT(*) FROM jobs WHERE status = ? GROUP BY host", (LEASED,))
+                if self.limit_for(host) and leased >= self.limit_for(host)]
+            row = conn.execute(
+                f"SELECT key, kind, payload, host, attempts, max_attempts FROM jobs WHERE status = ? AND run_at <= ?"
+                f" AND host NOT IN ({', '.join('?' * len(full))}) ORDER BY priority DESC, run_at LIMIT 1",
+                (QUEUED, now, *full)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, token = ?, expires = ?, worker = ?"
+                         " WHERE key = ?", (LEASED, token, now + lease_seconds, worker, row[0]))
+            key, kind, payload, host, attempts, max_attempts = row
+            return Job(key, kind, json.loads(payload), host, attempts + 1, max_attempts, token)
+        return self._write(take)
+
+    def extend(self, job, lease_seconds=60.0):
+        return self._write(lambda conn: conn.execute(
+            "UPDATE jobs SET expires = ? WHERE key = ? AND token = ?",
+            (time.time() + lease_seconds, job.key, job.token)).rowcount == 1)
+
+    def complete(self, job):
+        return self._write(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, token = NULL, expires = NULL, error = NULL, finished_at = ?"
+            " WHERE key = ? AND token = ?", (DONE, time.time(), job.key, job.token)).rowcount == 1)
+
+    def fail(self, job, error):
+        now = time.time()
+
+        def release(conn):
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE key = ? AND token = ?",
+                               (job.key, job.token)).fetchone()
+            if row is None:
+                return None
+            if row[0] >= row[1]:
+                conn.execute("UPDATE jobs SET status = ?, token = NULL, expires = NULL, error = ?, finished_at = ?"
+                             " WHERE key = ?", (DEAD, error, now, job.key))
+                return DEAD
+            conn.execute("UPDATE jobs SET status = ?, token = NULL, expires = NULL, error = ?, run_at = ?"
+                         " WHERE key = ?", (QUEUED, error, now + self.retry_delay(row[0]), job.key))
+            return RETRY
+        return self._write(release)
+
+    def stats(self):
+        now = time.time()
+        conn = self._connection()
+        counts = Counter(dict(conn.execute(
+            "SELECT CASE WHEN status = ? AND run_at > ? THEN 'delayed' ELSE status END, COUNT(*) FROM jobs"
+            " GROUP BY 1", (QUEUED, now))))
+        # Expired leases are counted as leased until the next lease() reclaims them
+        leased = dict(conn.execute("SELECT host, COUNT(*) FROM jobs WHERE status = ? GROUP BY host", (LEASED,)))
+        dead = dict(conn.execute("SELECT key, error FROM jobs WHERE status = ? LIMIT 20", (DEAD,)))
+        return _stats(counts, leased, dead)
+
+    def purge(self, before):
+        return self._write(lambda conn: conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, DEAD, before)).rowcount)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Redis layout under a prefix: <p>:job:<key> hashes; <p>:ready (score -priority), <p>:delayed (run_at),
+# <p>:leased (lease expiry), <p>:done and <p>:dead (finished_at) sorted sets; <p>:active leased jobs per host.
+# Scripts read the server's clock, so nodes' clocks need not agree.
+REDIS_COMMON = """
+local p = KEYS[1]
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1e6
+local function job_key(key) return p .. ':job:' .. key end
+local function release(key, error, delay)
+    local job = job_key(key)
+    redis.call('ZREM', p .. ':leased', key)
+    redis.call('HINCRBY', p .. ':active', redis.call('HGET', job, 'host'), -1)
+    redis.call('HDEL', job, 'token')
+    redis.call('HSET', job, 'error', error)
+    if tonumber(redis.call('HGET', job, 'attempts')) >= tonumber(redis.call('HGET', job, 'max_attempts')) then
+        redis.call('HSET', job, 'status', 'dead', 'finished_at', now)
+        redis.call('ZADD', p .. ':dead', now, key)
+        return 'dead'
+    end
+    redis.call('HSET', job, 'status', 'queued')
+    redis.call('ZADD', p .. ':delayed', now + delay, key)
+    return 'retry'
+end
+local function held(key, token)
+    local job = job_key(key)
+    return redis.call('HGET', job, 'status') == 'leased' and redis.call('HGET', job, 'token') == token
+end
+"""
+
+REDIS_SCRIPTS = {
+    # ARGV: refresh, then kind, key, payload, host, priority, max_attempts per job
+    "enqueue": """
+local added = 0
+for i = 2, #ARGV, 6 do
+    local key = ARGV[i + 1]
+    local job = job_key(key)
+    local status = redis.call('HGET', job, 'status')
+    if not status or (ARGV[1] == '1' and (status == 'done' or status == 'dead')) then
+        redis.call('DEL', job)
+        redis.call('ZREM', p .. ':done', key)
+        redis.call('ZREM', p .. ':dead', key)
+        redis.call('HSET', job, 'kind', ARGV[i], 'payload', ARGV[i + 2], 'host', ARGV[i + 3],
+                   'priority', ARGV[i + 4], 'max_attempts', ARGV[i + 5], 'attempts', 0, 'status', 'queued')
+        redis.call('ZADD', p .. ':ready', -tonumber(ARGV[i + 4]), key)
+        added = added + 1
+    end
+end
+return added
+""",
+    "reclaim": """
+for _, key in ipairs(redis.call('ZRANGEBYSCORE', p .. ':delayed', '-inf', now, 'LIMIT', 0, 1000)) do
+    redis.call('ZREM', p .. ':delayed', key)
+    redis.call('ZADD', p .. ':ready', -tonumber(redis.call('HGET', job_key(key), 'priority')), key)
+end
+for _, key in ipairs(redis.call('ZRANGEBYSCORE', p .. ':leased', '-inf', now, 'LIMIT', 0, 1000)) do
+    release(key, 'lease expired', 0)
+end
+""",
+    # ARGV: lease seconds, token, worker, default host limit, JSON host limits
+    "lease": """
+local limits = cjson.decode(ARGV[5])
+local default = tonumber(ARGV[4])
+local full = {}
+for _, key in ipairs(redis.call('ZRANGE', p .. ':ready', 0, 499)) do
+    local job = job_key(key)
+    local host = redis.call('HGET', job, 'host')
+    if not full[host] then
+        local limit = limits[host] or default
+        if limit == 0 or (tonumber(redis.call('HGET', p .. ':active', host)) or 0) < limit then
+            redis.call('ZREM', p .. ':ready', key)
+            redis.call('HINCRBY', p .. ':active', host, 1)
+            local attempts = redis.call('HINCRBY', job, 'attempts', 1)
+            redis.call('HSET', job, 'status', 'leased', 'token', ARGV[2], 'worker', ARGV[3])
+            redis.call('ZADD', p .. ':leased', now + tonumber(ARGV[1]), key)
+            local fields = redis.call('HMGET', job, 'kind', 'payload', 'host', 'max_attempts')
+            return {key, fields[1], fields[2], fields[3], attempts, fields[4]}
+        end
+        full[host] = true
+    end
+end
+return false
+""",
+    # ARGV: key, token, lease seconds
+    "extend": """
+if not held(ARGV[1], ARGV[2]) then return 0 end
+redis.call('ZADD', p .. ':leased', now + tonumber(ARGV[3]), ARGV[1])
+return 1
+""",
+    # ARGV: key, token
+    "complete": """
+if not held(ARGV[1], ARGV[2]) then return 0 end
+local job = job_key(ARGV[1])
+redis.call('ZREM', p .. ':leased', ARGV[1])
+redis.call('HINCRBY', p .. ':active', redis.call('HGET', job, 'host'), -1)
+redis.call('HDEL', job, 'token', 'error')
+redis.call('HSET', job, 'status', 'done', 'finished_at', now)
+redis.call('ZADD', p .. ':done', now, ARGV[1])
+return 1
+""",
+    # ARGV: key, token, error, retry delay
+    "fail": """
+if not held(ARGV[1], ARGV[2]) then return false end
+return release(ARGV[1], ARGV[3], tonumber(ARGV[4]))
+""",
+    # ARGV: before
+    "purge": """
+local purged = 0
+for _, name in ipairs({'done', 'dead'}) do
+    local old = redis.call('ZRANGEBYSCORE', p .. ':' .. name, '-inf', '(' .. ARGV[1], 'LIMIT', 0, 10000)
+    for _, key in ipairs(old) do
+        redis.call('DEL', job_key(key))
+        redis.call('ZREM', p .. ':' .. name, key)
+    end
+    purged = purged + #old
+end
+return purged
+""",
+}
+
+
+class RedisQueue(JobQueue):
+    """Jobs in Redis, for workers on many nodes; every state change is one Lua script, so atomic"""
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="ecourts:jobs", client=None, **options):
+        if client is None and redis is None:
+            raise RuntimeError("The Redis job queue requires the redis package")
+        super().__init__(**options)
+        self.prefix = prefix
+        self.client = client or redis.Redis.from_url(url)
+        self._scripts = {name: self.client.register_script(REDIS_COMMON + body) for name, body in REDIS_SCRIPTS.items()}
+
+    def _run(self, name, *args):
+        return self._scripts[name](keys=[self.prefix], args=args)
+
+    def enqueue_many(self, jobs, refresh=False):
+        args = ["1" if refresh else "0"]
+        for item in jobs:
+            args.extend((item["kind"], item["key"], json.dumps(item["payload"]), item["host"], item["priority"],
+                         item["max_attempts"]))
+        return self._run("enqueue", *args)
+
+    def lease(self, worker, lease_seconds=60.0):
+        token = uuid.uuid4().hex
+        self._run("reclaim")
+        row = self._run("lease", lease_seconds, token, worker, self.host_limit, json.dumps(self.host_limits))
+        if not row:
+            return None
+        key, kind, payload, host, attempts, max_attempts = (
+            value.decode("utf-8") if isinstance(value, bytes) else value for value in row)
+        return Job(key, kind, json.loads(payload), host, int(attempts), int(max_attempts), token)
+
+    def extend(self, job, lease_seconds=60.0):
+        return self._run("extend", job.key, job.token, lease_seconds) == 1
+
+    def complete(self, job):
+        return self._run("complete", job.key, job.token) == 1
+
+    def fail(self, job, error):
+        result = self._run("fail", job.key, job.token, error, self.retry_delay(job.attempts))
+        return result.decode("utf-8") if result else None
+
+    def stats(self):
+        p = self.prefix
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zcard(f"{p}:ready")
+        pipe.zcount(f"{p}:delayed", "-inf", now)
+        pipe.zcount(f"{p}:delayed", f"({now}", "+inf")
+        for name in ("leased", "done", "dead"):
+            pipe.zcard(f"{p}:{name}")
+        pipe.hgetall(f"{p}:active")
+        pipe.zrange(f"{p}:dead", 0, 19)
+        ready, due, delayed, leased, done, dead, active, dead_keys = pipe.execute()
+        errors = {}
+        for key in dead_keys:
+            key = key.decode("utf-8")
+            error = self.client.hget(f"{p}:job:{key}", "error")
+            errors[key] = error.decode("utf-8") if error else None
+        counts = {QUEUED: ready + due, "delayed": delayed, LEASED: leased, DONE: done, DEAD: dead}
+        return _stats(counts, {host.decode("utf-8"): int(count) for host, count in active.items() if int(count)},
+                      errors)
+
+    def purge(self, before):
+        return self._run("purge", before)
+
+    def close(self):
+        self.client.close()
+
+
+def open_queue(url=None, **options):
+    """A JobQueue from a memory://, sqlite:///path or redis:// URL (default: JOB_QUEUE_URL)"""
+    url = url or os.environ.get("JOB_QUEUE_URL") or "sqlite:///" + os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "static", "jobs.db")
+    scheme = urlsplit(url).scheme
+    if scheme == "memory":
+        return MemoryQueue(**options)
+    if scheme == "sqlite":
+        return SQLiteQueue(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite://"):],
+                           **options)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisQueue(url, **options)
+    raise ValueError(f"Unknown job queue URL {url!r}: use memory://, sqlite:///path or redis://host:port/db")
+
+
+def host_of(request):
+    """The upstream host a portal request (method, url, form) goes to"""
+    return urlsplit(request[1]).netloc
+
+
+def cause_list_job(scraper, court_complex, date_str, priority=0):
+    state_code, district_code = scraper.hierarchy.parents_of_complex(court_complex) or (None, None)
+    request = cause_list_request(scraper.base_url, state_code, district_code, court_complex, date_str)
+    return job_spec(CAUSE_LIST, f"{CAUSE_LIST}:{court_complex}:{date_str}",
+                    {"court_complex": court_complex, "date": date_str}, host_of(request), priority)
+
+
+def case_job(scraper, case_details, priority=0):
+    return job_spec(CASE, f"{CASE}:{case_key(case_details)}", case_details,
+                    host_of(case_status_request(scraper.base_url, case_details)), priority)
+
+
+def hierarchy_job(scraper, rate_per_host=20.0):
+    return job_spec(HIERARCHY, HIERARCHY, {"rate_per_host": rate_per_host}, urlsplit(scraper.base_url).netloc,
+                    priority=1, max_attempts=2)
+
+
+def handlers(scraper):
+    """Job kind -> handler(payload), each running the job on scraper; a handler raises to fail its job"""
+    from hierarchy_sync import HierarchySync
+
+    def sync_hierarchy(payload):
+        return HierarchySync(scraper.store, base_url=scraper.base_url,
+                             rate_per_host=payload.get("rate_per_host", 20.0)).run_once()
+
+    return {
+        CAUSE_LIST: lambda payload: scraper.refresh_cause_list(payload["court_complex"], payload["date"]),
+        CASE: scraper.refresh_case,
+        HIERARCHY: sync_hierarchy,
+    }
+
+
+class JobWorker:
+    """Threads leasing and running jobs from a queue; one heartbeat thread keeps their leases alive"""
+
+    def __init__(self, queue, handlers, threads=8, lease_seconds=60.0, poll_seconds=1.0, name=None,
+                 retention_seconds=7 * 24 * 3600, purge_seconds=3600.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.threads = threads
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.name = name or f"{os.uname().nodename}:{os.getpid()}"
+        # Done and dead jobs older than retention_seconds are purged about every purge_seconds (None: never)
+        self.retention_seconds = retention_seconds
+        self.purge_seconds = purge_seconds
+        self.stats = {"done": 0, "retried": 0, "dead": 0, "lost_leases": 0, "purged": 0, "by_kind": Counter()}
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _record(self, name, kind=None):
+        with self._lock:
+            self.stats[name] += 1
+            if kind is not None:
+                self.stats["by_kind"][kind] += 1
+
+    def run_job(self, job):
+        handler = self.handlers.get(job.kind)
+        with self._lock:
+            self._held[job.token] = job
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for {job.kind!r} jobs")
+            handler(job.payload)
+        except Exception as e:
+            outcome = self.queue.fail(job, f"{type(e).__name__}: {e}")
+            self._record({RETRY: "retried", DEAD: "dead"}.get(outcome, "lost_leases"))
+        else:
+            if self.queue.complete(job):
+                self._record("done", job.kind)
+            else:
+                self._record("lost_leases")
+        finally:
+            with self._lock:
+                self._held.pop(job.token, None)
+
+    def _work(self, drain):
+        while not self._stop.is_set():
+            job = self.queue.lease(self.name, self.lease_seconds)
+            if job is not None:
+                self.run_job(job)
+                continue
+            if drain:
+                stats = self.queue.stats()
+                if not (stats["queued"] or stats["delayed"] or stats["leased"]):
+                    return
+            self._stop.wait(self.poll_seconds * random.uniform(0.5, 1.5))
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._lock:
+                held = list(self._held.values())
+            for job in held:
+                self.queue.extend(job, self.lease_seconds)
+
+    def purge(self):
+        """Purge finished jobs older than the retention period; returns how many"""
+        purged = self.queue.purge(time.time() - self.retention_seconds)
+        with self._lock:
+            self.stats["purged"] += purged
+        return purged
+
+    def _purge_loop(self):
+        # Jittered, so a fleet of workers started together does not purge together
+        while not self._stop.wait(self.purge_seconds * random.uniform(0.5, 1.5)):
+            try:
+                self.purge()
+            except Exception:
+                logger.exception("Job purge failed")
+
+    def run(self, drain=False):
+        """Work until stop() (or, with drain, until nothing is queued or running); returns this worker's stats"""
+        started = time.monotonic()
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        if self.retention_seconds is not None:
+            threading.Thread(target=self._purge_loop, name="job-purge", daemon=True).start()
+        threads = [threading.Thread(target=self._work, args=(drain,), name=f"job-worker-{n}", daemon=True)
+                   for n in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            self._stop.set()
+        stats = dict(self.stats, by_kind=dict(self.stats["by_kind"]))
+        stats["duration_seconds"] = round(time.monotonic() - started, 3)
+        stats["jobs_per_second"] = round(stats["done"] / stats["duration_seconds"], 2) \
+            if stats["duration_seconds"] else 0.0
+        return stats
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enqueue scraping jobs, or run a worker for them")
+    parser.add_argument("--queue", help="memory://, sqlite:///path or redis://host:port/db (default: JOB_QUEUE_URL)")
+    parser.add_argument("--host-limit", type=int, default=4, help="Leased jobs per upstream host, across workers")
+    parser.add_argument("--base-url", help="Portal base URL (e.g. a local fake portal)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue", help="Queue jobs")
+    enqueue.add_argument("kind", choices=("cause-lists", "cases", "hierarchy"))
+    enqueue.add_argument("--date", help="Cause-list date as dd/mm/YYYY (default: tomorrow)")
+    enqueue.add_argument("--complexes", help="Comma-separated complex codes (default: all)")
+    enqueue.add_argument("--cases", help="File with one CNR or TYPE/NUMBER/YEAR per line ('-': stdin)")
+    enqueue.add_argument("--refresh", action="store_true", help="Run jobs that already finished again")
+    worker = commands.add_parser("worker", help="Run jobs until stopped")
+    worker.add_argument("--threads", type=int, default=8)
+    worker.add_argument("--rate", type=float, default=5.0, help="This worker's portal requests per second per host")
+    worker.add_argument("--lease-seconds", type=float, default=60.0)
+    worker.add_argument("--drain", action="store_true", help="Exit once nothing is queued or running")
+    worker.add_argument("--retention-days", type=float, default=float(os.environ.get("JOB_RETENTION_DAYS", 7)),
+                        help="Purge done and dead jobs older than this (default: JOB_RETENTION_DAYS or 7)")
+    commands.add_parser("stats", help="Jobs by state")
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue, host_limit=args.host_limit)
+    if args.command == "stats":
+        print(json.dumps(queue.stats(), indent=2))
+        return 0
+
+    if args.base_url:
+        os.environ['ECOURTS_BASE_URL'] = args.base_url
+    from app import ECourtsScraper
+    from transport import Transport
+
+    if args.command == "enqueue":
+        scraper = ECourtsScraper(live=True)
+        if args.kind == "cause-lists":
+            from prefetch import tomorrow_str
+            complexes = args.complexes.split(",") if args.complexes else [
+                code for _, _, code in scraper.hierarchy.iter_complexes()]
+            jobs = [cause_list_job(scraper, code, args.date or tomorrow_str()) for code in complexes]
+        elif args.kind == "cases":
+            from batch import case_items, read_lines
+            jobs = [case_job(scraper, details) for _, details in case_items(read_lines(args.cases))]
+        else:
+            jobs = [hierarchy_job(scraper)]
+        added = queue.enqueue_many(jobs, refresh=args.refresh)
+        print(f"enqueued: {added}")
+        print(f"already_queued_or_done: {len(jobs) - added}")
+        return 0
+
+    scraper = ECourtsScraper(live=True, transport=Transport(pool_size=max(args.threads, 10),
+                                                            rate_per_host=args.rate))
+    runner = JobWorker(queue, handlers(scraper), threads=args.threads, lease_seconds=args.lease_seconds,
+                       retention_seconds=args.retention_days * 24 * 3600)
+    stats = runner.run(drain=args.drain)
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
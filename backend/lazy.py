@@ -0,0 +1,61 @@
+"""Deferred imports for the heavy libraries only some requests need.
+
+pyarrow, requests, BeautifulSoup, aiohttp, lxml and Selenium together cost
+several times the rest of a worker's start-up to import, while a worker
+serving geography endpoints may never touch any of them. A module-level
+
+    pa = LazyModule("pyarrow")
+
+reads like the import it replaces, but the import happens on the first
+attribute access (pa.array(...)) and is a dict lookup after that.
+optional_module() is the lazy form of the try/except ImportError pattern
+for optional dependencies: None when the package is not installed, found
+without importing it.
+
+The preloading gunicorn master imports PRELOAD_MODULES before forking (see
+preload()), so under gunicorn workers share them copy-on-write rather than
+each paying for them on its first request.
+"""
+import importlib
+import importlib.util
+
+# Imported by preload(): everything deferred with LazyModule that requests end up using
+PRELOAD_MODULES = ("requests", "bs4", "lxml.html", "aiohttp", "pyarrow", "pyarrow.compute",
+                   "pyarrow.parquet")
+
+
+class LazyModule:
+    """Stands in for a module, importing it when an attribute is first used"""
+
+    __slots__ = ("_name",)
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self._name), attribute)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+def installed(name):
+    """True if name's top-level package can be imported; does not import it"""
+    return importlib.util.find_spec(name.partition(".")[0]) is not None
+
+
+def optional_module(name):
+    """A LazyModule for name, or None if it is not installed"""
+    return LazyModule(name) if installed(name) else None
+
+
+def preload(names=PRELOAD_MODULES):
+    """Import names now, skipping any not installed; returns those imported"""
+    loaded = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        loaded.append(name)
+    return loaded
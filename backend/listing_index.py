@@ -0,0 +1,233 @@
+"""Inverted index from case to where it is listed.
+
+Answering "is my case listed today/tomorrow, where, at what serial?" by
+scanning cause lists costs O(entries ingested). ListingIndex maps each
+normalised case number (and CNR, when a list carries one) to its postings,
+so the check is one dict lookup however many lists have landed.
+
+To stay small at millions of entries per day a posting is a single int:
+date ordinal, court complex id, court id and serial number packed
+together, with complex and court names dictionary-encoded. A key with one
+posting stores the bare int; more postings become a tuple. Values are
+replaced, never mutated, so readers need no lock.
+
+Every server process keeps its own index. follow() keeps it current with
+lists saved to the cause-list store by any process, such as another
+worker's prefetch or jobs.py workers, by polling the store for saves past
+the last one it indexed.
+"""
+import logging
+import sys
+import threading
+from datetime import date as Date, datetime
+
+from portal import normalize_case_number, normalize_cnr
+
+SERIAL_BITS = 16
+COURT_BITS = 20
+COMPLEX_BITS = 16
+
+logger = logging.getLogger(__name__)
+
+
+def _to_date(date_str):
+    if isinstance(date_str, Date):
+        return date_str
+    if "/" in date_str:
+        return datetime.strptime(date_str, '%d/%m/%Y').date()
+    return datetime.strptime(date_str, '%Y-%m-%d').date()
+
+
+class ListingIndex:
+    """Case number / CNR -> (date, court complex, court room, serial no.)"""
+
+    def __init__(self):
+        self._postings = {}
+        self._lists = {}  # (complex_id, ordinal) -> keys it contributed
+        self._complexes = []
+        self._complex_ids = {}
+        self._courts = []
+        self._court_ids = {}
+        self._lock = threading.Lock()
+        self._seq = 0  # last store save indexed by catch_up()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _intern(self, value, names, ids):
+        code = ids.get(value)
+        if code is None:
+            code = ids[value] = len(names)
+            names.append(value)
+        return code
+
+    def _pack(self, ordinal, complex_id, court_id, serial):
+        return ((((ordinal << COMPLEX_BITS) | complex_id) << COURT_BITS | court_id)
+                << SERIAL_BITS) | serial
+
+    def _unpack(self, posting):
+        serial = posting & 0xFFFF
+        posting >>= SERIAL_BITS
+        court_id = posting & ((1 << COURT_BITS) - 1)
+        posting >>= COURT_BITS
+        complex_id = posting & ((1 << COMPLEX_BITS) - 1)
+        ordinal = posting >> COMPLEX_BITS
+        return {
+            "date": Date.fromordinal(ordinal).strftime('%d/%m/%Y'),
+            "court_complex": self._complexes[complex_id],
+            "court": self._courts[court_id],
+            "serial_no": serial
+        }
+
+    @staticmethod
+    def entry_keys(entry):
+        """Index keys for one cause-list entry"""
+        keys = []
+        case_number = normalize_case_number(entry.get("case_number", ""))
+        if case_number:
+            keys.append(case_number)
+        cnr = normalize_cnr(entry.get("cnr"))
+        if cnr:
+            keys.append(cnr)
+        return keys
+
+    def _remove(self, list_id, posting_prefix):
+        for key in self._lists.pop(list_id, ()):
+            value = self._postings.get(key)
+            if value is None:
+                continue
+            kept = tuple(p for p in (value if isinstance(value, tuple) else (value,))
+                         if p >> (COURT_BITS + SERIAL_BITS) != posting_prefix)
+            if not kept:
+                del self._postings[key]
+            else:
+                self._postings[key] = kept[0] if len(kept) == 1 else kept
+
+    def add_list(self, court_complex, date_str, entries):
+        """Index one cause list, replacing whatever was indexed for it before"""
+        ordinal = _to_date(date_str).toordinal()
+        with self._lock:
+            complex_id = self._intern(court_complex, self._complexes, self._complex_ids)
+            if complex_id >> COMPLEX_BITS:
+                raise OverflowError("Too many distinct court complexes for the posting layout")
+            list_id = (complex_id, ordinal)
+            prefix = (ordinal << COMPLEX_BITS) | complex_id
+            self._remove(list_id, prefix)
+
+            keys = []
+            postings = self._postings
+            try:
+                for entry in entries:
+                    court_id = self._intern(entry.get("court", ""), self._courts, self._court_ids)
+                    if court_id >> COURT_BITS:
+                        raise OverflowError("Too many distinct court names for the posting layout")
+                    serial = int(entry.get("serial_no") or 0)
+                    if not 0 <= serial < 1 << SERIAL_BITS:
+                        raise OverflowError(f"Serial number {serial} does not fit the posting layout")
+                    posting = self._pack(ordinal, complex_id, court_id, serial)
+                    for key in self.entry_keys(entry):
+                        key = sys.intern(key)
+                        value = postings.get(key)
+                        if value is None:
+                            postings[key] = posting
+                        elif isinstance(value, tuple):
+                            postings[key] = value + (posting,)
+                        else:
+                            postings[key] = (value, posting)
+                        keys.append(key)
+            finally:
+                # Postings added before an overflow are still dropped with the list
+                self._lists[list_id] = tuple(keys)
+            return len(keys)
+
+    def drop_before(self, date_str):
+        """Forget every list dated before date_str; returns how many were dropped"""
+        cutoff = _to_date(date_str).toordinal()
+        with self._lock:
+            dropped = [list_id for list_id in self._lists if list_id[1] < cutoff]
+            for complex_id, ordinal in dropped:
+                self._remove((complex_id, ordinal), (ordinal << COMPLEX_BITS) | complex_id)
+        return len(dropped)
+
+    def catch_up(self, store, since):
+        """Index the lists saved to a CauseListStore since the last catch_up (all of them the first time)
+        that are dated from `since` on; returns how many were indexed"""
+        indexed = 0
+        for seq, court_complex, list_date, entries in store.saved_since(self._seq, since):
+            try:
+                self.add_list(court_complex, list_date, entries)
+            except OverflowError:
+                logger.exception("Cause list %s %s only partly indexed", court_complex, list_date)
+            self._seq = seq
+            indexed += 1
+        return indexed
+
+    def follow(self, store, cutoff, poll_interval=30.0):
+        """Catch up with store now, then every poll_interval seconds on a background thread.
+
+        cutoff() gives the earliest list date to index, as for drop_before.
+        """
+        self.catch_up(store, cutoff())
+
+        def loop():
+            while not self._stop.wait(poll_interval):
+                try:
+                    self.catch_up(store, cutoff())
+                except Exception:
+                    logger.exception("Listing index catch-up failed")
+        self._thread = threading.Thread(target=loop, name="listing-index", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop following the store"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def lookup(self, key):
+        """All listings for a normalised case number or CNR"""
+        value = self._postings.get(key)
+        if value is None:
+            return []
+        return [self._unpack(p) for p in (value if isinstance(value, tuple) else (value,))]
+
+    def listings_for(self, case_details, date_str=None):
+        """Listings for a case (by CNR and/or type/number/year), optionally on one date"""
+        keys = []
+        cnr = normalize_cnr(case_details.get('cnr'))
+        if cnr:
+            keys.append(cnr)
+        if case_details.get('case_number'):
+            keys.append(normalize_case_number(case_details.get('case_type'), case_details.get('case_number'),
+                                              case_details.get('case_year')))
+        listings = []
+        seen = set()
+        for key in keys:
+            for listing in self.lookup(key):
+                identity = (listing["date"], listing["court_complex"], listing["serial_no"])
+                if identity not in seen and (date_str is None or listing["date"] == date_str):
+                    seen.add(identity)
+                    listings.append(listing)
+        return listings
+
+    def stats(self):
+        """Counts and an estimate of the index's memory footprint"""
+        postings = 0
+        size = sys.getsizeof(self._postings) + sys.getsizeof(self._lists)
+        for key, value in self._postings.items():
+            size += sys.getsizeof(key)
+            if isinstance(value, tuple):
+                postings += len(value)
+                size += sys.getsizeof(value) + sum(sys.getsizeof(p) for p in value)
+            else:
+                postings += 1
+                size += sys.getsizeof(value)
+        size += sum(sys.getsizeof(keys) for keys in self._lists.values())
+        return {
+            "keys": len(self._postings),
+            "postings": postings,
+            "lists": len(self._lists),
+            "courts": len(self._courts),
+            "approx_bytes": size,
+            "bytes_per_posting": round(size / postings, 1) if postings else 0.0
+        }
@@ -0,0 +1,45 @@
+"""Run-in-one-process-at-a-time locks for the background jobs.
+
+Every server process starts the same background threads, but some work -
+the nightly prefetch, hierarchy crawls, housekeeping sweeps - should only
+happen in one of them at a time. Each round the job takes a non-blocking
+flock on a shared lock file: the process that gets it does the work, the
+others skip the round. shared() lets readers of files that a lock holder
+rewrites (merged metrics) keep it out while they read.
+"""
+from contextlib import contextmanager
+
+
+def try_lock(path):
+    """Exclusive, non-blocking lock on path; the open file (release() it when done) or None.
+
+    With no path there is nothing to share and the lock is always had: True.
+    """
+    if not path:
+        return True
+    import fcntl
+    handle = open(path, "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return handle
+    except OSError:
+        handle.close()
+        return None
+
+
+def release(lock):
+    """Give up a lock from try_lock (no-op for True or None)"""
+    if lock and lock is not True:
+        lock.close()
+
+
+@contextmanager
+def shared(path):
+    """Hold a shared lock on path for the block, waiting out an exclusive holder.
+
+    Any number of processes hold it together; try_lock(path) fails while any does.
+    """
+    import fcntl
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_SH)
+        yield
@@ -0,0 +1,462 @@
+"""Prometheus-compatible metrics and an opt-in request profiler.
+
+A small, dependency-free take on prometheus_client: Counter, Gauge and
+Histogram objects with labels, registered in REGISTRY and rendered in the
+text exposition format by /metrics. Collectors (callables registered with
+REGISTRY.collector) turn existing stats - case cache, transport - into
+samples at scrape time, so those modules keep their own counters.
+
+Under gunicorn each worker process has its own registry. With METRICS_DIR
+set, every worker writes a snapshot there every few seconds and /metrics
+merges them. Counters and histograms are summed across all processes,
+including ones that have exited: a live worker folds exited workers'
+snapshots into one retired.json and removes them, so the directory holds
+one file per live worker however often workers are recycled. Gauges only
+count for live workers and are merged by what they measure (`merge`):
+summed (requests in flight), the max or min (a state, a version), or kept
+per process under a pid label. Values derived from the merged totals,
+such as a hit ratio, come from REGISTRY.derived functions.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from locks import release, shared, try_lock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# How a gauge's samples from several processes combine; "pid" keeps one sample per process
+GAUGE_MERGES = ("sum", "max", "min", "pid")
+
+# Counters and histograms of exited workers, kept in METRICS_DIR beside the live workers' snapshots;
+# readers hold RETIRED_LOCK shared so a snapshot is never read both on its own and in RETIRED
+RETIRED = "retired.json"
+RETIRED_LOCK = "retired.lock"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+    merge = "sum"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [(list(key), value) for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), merge="sum", registry=None):
+        if merge not in GAUGE_MERGES:
+            raise ValueError(f"{name}: merge must be one of {GAUGE_MERGES}, got {merge!r}")
+        self.merge = merge
+        super().__init__(name, documentation, labelnames, registry)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            return [(list(key), [list(state[0]), state[1], state[2]]) for key, state in self._values.items()]
+
+
+class Registry:
+    """Metrics of this process, plus collectors evaluated at scrape time"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._derived = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def collector(self, function):
+        """function() -> iterable of (name, kind, help, labelnames, [(label values, value)][, gauge merge])"""
+        self._collectors.append(function)
+        return function
+
+    def derived(self, function):
+        """function(merged families) -> iterable as from a collector, computed after the workers are merged"""
+        self._derived.append(function)
+        return function
+
+    def snapshot(self):
+        """JSON-able state of every metric and collector"""
+        families = {}
+        for metric in list(self._metrics.values()):
+            families[metric.name] = {
+                "kind": metric.kind, "help": metric.documentation, "labels": list(metric.labelnames),
+                "merge": metric.merge, "buckets": list(getattr(metric, "buckets", ())),
+                "samples": metric.samples()}
+        for function in self._collectors:
+            try:
+                collected = list(function())
+            except Exception:
+                logger.exception("Metrics collector %s failed", function.__name__)
+                continue
+            families.update(_families(collected))
+        return families
+
+    def write_snapshot(self, directory):
+        """Publish this process's snapshot for the other workers' /metrics to merge"""
+        _write_json(os.path.join(directory, f"{os.getpid()}.json"),
+                    {"pid": os.getpid(), "families": self.snapshot()})
+
+    def render(self, directory=None):
+        """Prometheus text exposition of this process (merged with METRICS_DIR peers)"""
+        snapshots = [(os.getpid(), self.snapshot())]
+        if directory:
+            with shared(os.path.join(directory, RETIRED_LOCK)):
+                snapshots.extend(_peer_snapshots(directory))
+        merged = _merge(snapshots)
+        for function in self._derived:
+            try:
+                merged.update(_merge([(None, _families(function(merged)))]))
+            except Exception:
+                logger.exception("Derived metric %s failed", function.__name__)
+        return _render(merged)
+
+
+def _families(collected):
+    """Collector output as snapshot families"""
+    families = {}
+    for name, kind, documentation, labelnames, samples, *merge in collected:
+        families[name] = {"kind": kind, "help": documentation, "labels": list(labelnames),
+                          "merge": merge[0] if merge else "sum", "buckets": [],
+                          "samples": [[list(key), value] for key, value in samples]}
+    return families
+
+
+def _write_json(path, data):
+    partial = f"{path}.tmp"
+    with open(partial, "w") as f:
+        json.dump(data, f)
+    os.replace(partial, path)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _counts(families):
+    """An exited worker's families that still mean something: its counts happened, its gauges are gone"""
+    return {name: family for name, family in families.items() if family["kind"] != "gauge"}
+
+
+def _peer_snapshots(directory):
+    """[(pid, families)] of every other worker, live ones' gauges included, and the retired counts"""
+    peers = []
+    for name in os.listdir(directory):
+        if not name.endswith(".json") or name == f"{os.getpid()}.json":
+            continue
+        peer = _load(os.path.join(directory, name))
+        if peer is None:
+            continue
+        if name == RETIRED:
+            peers.append((None, peer["families"]))
+        elif _alive(peer["pid"]):
+            peers.append((peer["pid"], peer["families"]))
+        else:
+            # Not folded into retired.json yet
+            peers.append((None, _counts(peer["families"])))
+    return peers
+
+
+def retire_exited(directory):
+    """Fold exited workers' snapshots into retired.json and delete them; how many were retired.
+
+    Skipped while another process is retiring or rendering (see RETIRED_LOCK).
+    """
+    lock = try_lock(os.path.join(directory, RETIRED_LOCK))
+    if not lock:
+        return 0
+    try:
+        exited = []
+        for name in os.listdir(directory):
+            if not name.endswith(".json") or name == RETIRED:
+                continue
+            peer = _load(os.path.join(directory, name))
+            if peer is not None and not _alive(peer["pid"]):
+                exited.append((name, peer))
+        if not exited:
+            return 0
+        retired = _load(os.path.join(directory, RETIRED)) or {"families": {}}
+        merged = _merge([(None, retired["families"])] + [(None, _counts(peer["families"])) for _, peer in exited])
+        families = {name: dict(family, samples=[[list(key), value] for key, value in family["samples"].items()])
+                    for name, family in merged.items()}
+        _write_json(os.path.join(directory, RETIRED), {"pid": None, "families": families})
+        for name, _ in exited:
+            os.remove(os.path.join(directory, name))
+        return len(exited)
+    finally:
+        release(lock)
+
+
+def _combine(kind, merge, current, value):
+    if kind == "histogram":
+        return [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2]]
+    if merge == "max":
+        return max(current, value)
+    if merge == "min":
+        return min(current, value)
+    return current + value
+
+
+def _merge(snapshots):
+    """Merge [(pid, families)] into {name: family with samples {label values: value}}"""
+    merged = {}
+    for pid, families in snapshots:
+        for name, family in families.items():
+            merge = family.get("merge", "sum")
+            per_process = family["kind"] == "gauge" and merge == "pid"
+            target = merged.get(name)
+            if target is None:
+                labels = family["labels"] + ["pid"] if per_process else family["labels"]
+                target = merged[name] = dict(family, labels=labels, samples={})
+            for key, value in family["samples"]:
+                key = tuple(key) + (str(pid),) if per_process else tuple(key)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                else:
+                    target["samples"][key] = _combine(family["kind"], merge, current, value)
+    return merged
+
+
+def _render(families):
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        labelnames = family["labels"]
+        for key, value in sorted(family["samples"].items()):
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_labels(labelnames, key)} {_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket in zip(family["buckets"], counts):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{_labels(labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labelnames, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_labels(labelnames, key)} {_number(float(total))}")
+            lines.append(f"{name}_count{_labels(labelnames, key)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Time to produce a response (streamed bodies excluded)",
+                         ("route", "method", "status"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled", ("route",))
+UPSTREAM_LATENCY = Histogram("upstream_request_duration_seconds", "Portal request latency per attempt",
+                             ("host",))
+UPSTREAM_RESPONSES = Counter("upstream_responses_total", "Portal responses by status", ("host", "status"))
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Portal attempts that failed or got a retryable status",
+                          ("host", "reason"))
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Portal requests (scrapes) in progress", ("host",))
+# The most open of the workers' breakers: a sum would read 6 for an open circuit in three workers
+UPSTREAM_CIRCUIT_STATE = Gauge("upstream_circuit_state",
+                               "Per-host circuit breaker, most open worker: 0 closed, 1 half-open, 2 open",
+                               ("host",), merge="max")
+UPSTREAM_CONCURRENCY_LIMIT = Gauge("upstream_concurrency_limit", "Adaptive cap on concurrent requests per host",
+                                   ("host",))
+UPSTREAM_REJECTED = Counter("upstream_rejected_total", "Portal requests failed fast without being sent",
+                            ("host", "reason"))
+PARSE_SECONDS = Histogram("page_parse_seconds", "Time to parse one portal page, including pool hand-off",
+                          ("kind",), buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+HIERARCHY_SYNC_SECONDS = Histogram("hierarchy_sync_duration_seconds", "Time for one full hierarchy crawl and apply",
+                                  buckets=(5, 15, 30, 60, 120, 180, 300, 600, 1200, 3600))
+HIERARCHY_SYNC_REQUESTS = Counter("hierarchy_sync_requests_total", "Portal requests made by hierarchy crawls",
+                                  ("level", "outcome"))
+HIERARCHY_SYNC_CHANGES = Counter("hierarchy_sync_changes_total", "Hierarchy nodes added, updated or removed by syncs",
+                                 ("level", "op"))
+BROWSER_LEASE_WAIT = Histogram("browser_lease_wait_seconds", "Time lookups waited for a pooled browser",
+                               buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+BROWSER_LEASES = Counter("browser_leases_total", "Pooled-browser leases by outcome", ("outcome",))
+BROWSER_RECYCLED = Counter("browser_recycled_total", "Pooled browsers replaced, by reason", ("reason",))
+BROWSER_POOL = Gauge("browser_pool_browsers", "Pooled browsers by state", ("state",))
+
+
+class SnapshotWriter:
+    """Writes REGISTRY's snapshot to a directory every `interval` seconds"""
+
+    def __init__(self, directory, interval=5.0, registry=None):
+        self.directory = directory
+        self.interval = interval
+        self.registry = registry or REGISTRY
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            self.registry.write_snapshot(self.directory)
+            retire_exited(self.directory)
+        except OSError:
+            logger.exception("Could not write metrics snapshot to %s", self.directory)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="metrics-snapshot", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.write()
+
+
+class RequestProfiler:
+    """cProfile individual requests: on a matching X-Profile header, or a random sample.
+
+    Disabled unless a token or a sample rate is configured. Dumps go to
+    `directory` as <timestamp>-<route>.prof, readable with pstats or snakeviz.
+    """
+
+    def __init__(self, directory, token=None, sample_rate=0.0):
+        self.directory = directory
+        self.token = token
+        self.sample_rate = sample_rate
+        self.dumps = 0
+
+    @property
+    def enabled(self):
+        return bool(self.token) or self.sample_rate > 0
+
+    def wanted(self, header):
+        if self.token and header and header == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish(self, profiler, route):
+        """Stop profiling and write the dump; returns its file name"""
+        profiler.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        safe = "".join(c if c.isalnum() else "_" for c in route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.dumps}-{safe}.prof"
+        profiler.dump_stats(os.path.join(self.directory, name))
+        self.dumps += 1
+        return name
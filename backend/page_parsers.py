@@ -0,0 +1,175 @@
+"""Fast parsing of portal pages, off the request threads.
+
+The parsers here read the same markup as the BeautifulSoup reference
+parsers in portal.py and return the same results, but use lxml with XPath
+expressions compiled once, on first use (lxml itself is imported by the
+first parse). Without lxml installed they fall back to the portal.py
+versions.
+
+ParserPool runs them in worker processes, so a Flask thread (or the bulk
+engine's event loop) waiting on a parse does not hold the GIL that every
+other request in the process needs. Pages below `inline_below` bytes are
+parsed in the calling thread: for a small case-status page the round trip
+to another process costs more than the parse itself. Cause lists come
+back as a CauseListEntries block, which crosses the process boundary as a
+few flat buffers rather than thousands of pickled dicts.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent import futures  # futures.ProcessPoolExecutor loads multiprocessing's machinery when first used
+
+from lazy import LazyModule, optional_module
+from metrics import PARSE_SECONDS
+from records import CauseListEntries
+from portal import (case_status_result, cause_list_row, parse_case_status_html as parse_case_status_soup,
+                    parse_cause_list_html as parse_cause_list_soup)
+
+# Only parse_async needs the event loop machinery
+asyncio = LazyModule("asyncio")
+# lxml is optional; BeautifulSoup does the same job slower
+lxml = optional_module("lxml.html")
+etree = LazyModule("lxml.etree")
+
+
+class _XPath:
+    """An XPath expression, compiled the first time it is evaluated"""
+
+    __slots__ = ("expression", "compiled")
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.compiled = None
+
+    def __call__(self, node):
+        if self.compiled is None:
+            self.compiled = etree.XPath(self.expression)
+        return self.compiled(node)
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+CASE_FIELD_ROWS = _XPath(f"//table[{_has_class('case_details_table')} or {_has_class('case_status_table')}]"
+                         "//tr[count(td|th) >= 2]")
+ROW_CELLS = _XPath("td|th")
+ERROR = _XPath(f"(//*[{_has_class('error')} or @id = 'errorMessage'])[1]")
+PETITIONER = _XPath(f"(//*[{_has_class('Petitioner_Advocate_table')} or {_has_class('petitioner')}])[1]")
+RESPONDENT = _XPath(f"(//*[{_has_class('Respondent_Advocate_table')} or {_has_class('respondent')}])[1]")
+CAUSE_LIST_ROWS = _XPath(f"//table[{_has_class('cause_list_table')}]//tr")
+ROW_TDS = _XPath("td")
+
+
+def _text(element, sep=" "):
+    """BeautifulSoup's get_text(sep, strip=True)"""
+    return sep.join(s for s in (piece.strip() for piece in element.itertext()) if s)
+
+
+def _document(html):
+    try:
+        return lxml.document_fromstring(html)
+    except etree.ParserError:  # empty document
+        return None
+
+
+def parse_case_status_page(html):
+    """Same result as portal.parse_case_status_html"""
+    if lxml is None:
+        return parse_case_status_soup(html)
+    doc = _document(html)
+    fields = {}
+    if doc is not None:
+        for row in CASE_FIELD_ROWS(doc):
+            cells = ROW_CELLS(row)
+            fields[_text(cells[0]).rstrip(':').strip().lower()] = _text(cells[1])
+
+    if not fields:
+        error = ERROR(doc) if doc is not None else None
+        return {"error": _text(error[0], "") if error else "Case not found"}
+
+    petitioner, respondent = PETITIONER(doc), RESPONDENT(doc)
+    return case_status_result(fields,
+                              petitioner and _text(petitioner[0]),
+                              respondent and _text(respondent[0]))
+
+
+def parse_cause_list_page(html):
+    """Same rows as portal.parse_cause_list_html"""
+    if lxml is None:
+        return parse_cause_list_soup(html)
+    doc = _document(html)
+    rows = []
+    court = None
+    for tr in CAUSE_LIST_ROWS(doc) if doc is not None else ():
+        cells = [_text(td) for td in ROW_TDS(tr)]
+        if len(cells) == 1 and cells[0]:
+            court = cells[0]
+            continue
+        row = cause_list_row(cells, court)
+        if row:
+            rows.append(row)
+    return rows
+
+
+def parse_cause_list_entries(html):
+    """parse_cause_list_page's rows as a CauseListEntries block"""
+    return CauseListEntries(parse_cause_list_page(html))
+
+
+PARSERS = {
+    "case_status": parse_case_status_page,
+    "cause_list": parse_cause_list_entries,
+}
+
+
+def parse(kind, html):
+    return PARSERS[kind](html)
+
+
+class ParserPool:
+    """Process pool for page parsing, started on first use"""
+
+    def __init__(self, workers=None, inline_below=32 * 1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.inline_below = inline_below
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Not fork: the parent is multi-threaded, and children only need this module
+                    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                    self._executor = futures.ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def _inline(self, html):
+        return len(html) < self.inline_below
+
+    def parse(self, kind, html):
+        """Parse a page, in a worker process unless it is small"""
+        with PARSE_SECONDS.time(kind=kind):
+            if self._inline(html):
+                return parse(kind, html)
+            return self.executor.submit(parse, kind, html).result()
+
+    def map(self, kind, pages):
+        """Parse many pages across the pool, results in input order"""
+        return list(self.executor.map(parse, [kind] * len(pages), pages, chunksize=8))
+
+    async def parse_async(self, kind, html):
+        """parse() for event-loop callers"""
+        with PARSE_SECONDS.time(kind=kind):
+            if self._inline(html):
+                return parse(kind, html)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, parse, kind, html)
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
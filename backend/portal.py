@@ -0,0 +1,229 @@
+"""Request builders and page parsers for the eCourts services portal.
+
+Kept separate from ECourtsScraper so the sync scraper, the async bulk
+engine and the benchmarks' stub portal all agree on what a case-status
+request looks like and how its page is read.
+"""
+import html
+import json
+import re
+from datetime import datetime, timedelta
+
+from lazy import LazyModule
+
+# The reference parsers below are the only users; most processes parse with lxml (page_parsers)
+bs4 = LazyModule("bs4")
+
+CNR_PATTERN = re.compile(r"^[A-Z]{4}\d{12}$")
+CASE_NUMBER_PATTERN = re.compile(r"^([A-Za-z][A-Za-z.()&\- ]*?)\s*[/ -]\s*(\d+)\s*[/ -]\s*(\d{4})$")
+# Already normalised; most cause-list entries are, so they skip the rewriting
+NORMALIZED_CASE_NUMBER = re.compile(r"[A-Z]+/[1-9]\d*/\d{4}")
+OPTION_PATTERN = re.compile(r"<option\b[^>]*?\bvalue\s*=\s*(?:['\"]([^'\"]*)['\"]|([^\s>]+))[^>]*>(.*?)</option>",
+                            re.I | re.S)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+WORD_PATTERN = re.compile(r"[^\W_]+")
+# Words in almost every parties string ("A vs. State of B and Ors.") that say nothing about who is in it
+PARTY_STOPWORDS = frozenset(("vs", "v", "versus", "and", "of", "the", "ors", "anr", "others", "another",
+                             "through", "by", "mr", "mrs", "ms", "smt", "sri", "shri", "dr", "m", "s"))
+
+# Hierarchy level -> (portal page, form fields it takes)
+HIERARCHY_PAGES = {
+    "states": ("casestatus/index", ()),
+    "districts": ("casestatus/fillDistrict", ("state_code",)),
+    "complexes": ("casestatus/fillcomplex", ("state_code", "dist_code")),
+    "courts": ("cause_list/fillCauseList", ("state_code", "dist_code", "court_complex_code")),
+}
+
+
+class PortalError(Exception):
+    """The portal answered, but not with the page we asked for"""
+
+
+def normalize_cnr(cnr):
+    """Upper-case and strip separators from a CNR; '' if empty"""
+    if not cnr:
+        return ""
+    if CNR_PATTERN.match(cnr):
+        return cnr
+    return re.sub(r"[^A-Za-z0-9]", "", cnr).upper()
+
+
+def normalize_case_number(case_type, case_number=None, case_year=None):
+    """TYPE/NUMBER/YEAR with punctuation and leading zeros dropped.
+
+    Takes either the three parts or one string such as 'O.S. 0123/2020',
+    'CIVIL-123-2020' or 'civil/123/2020'; returns '' if it cannot be read.
+    """
+    if case_number is None and case_year is None:
+        if isinstance(case_type, str) and NORMALIZED_CASE_NUMBER.fullmatch(case_type):
+            return case_type
+        match = CASE_NUMBER_PATTERN.match(str(case_type or "").strip())
+        if not match:
+            return ""
+        case_type, case_number, case_year = match.groups()
+    case_type = re.sub(r"[^A-Za-z0-9]", "", str(case_type or "")).upper()
+    case_number = str(case_number or "").strip().lstrip('0') or '0'
+    return f"{case_type}/{case_number}/{str(case_year or '').strip()}"
+
+
+def party_terms(parties):
+    """Distinct lower-case words of a parties string, without 'vs', 'and', 'ors' and titles"""
+    if not parties:
+        return set()
+    return {word for word in WORD_PATTERN.findall(parties.lower()) if word not in PARTY_STOPWORDS}
+
+
+def case_number_prefix(text):
+    """A partly typed case number in normalised form, for prefix search: 'o.s. 012' -> 'OS/12'"""
+    text = str(text or "").strip()
+    match = re.match(r"([^\d]*)(.*)", text)
+    case_type = re.sub(r"[^A-Za-z0-9]", "", match.group(1)).upper()
+    numbers = re.findall(r"\d+", match.group(2))[:2]
+    if numbers:
+        numbers[0] = numbers[0].lstrip('0') or '0'
+    prefix = "/".join([case_type] + numbers)
+    # 'OS/12/' means case 12 exactly, not 12, 120, 1234...
+    if prefix and len(numbers) < 2 and not text[-1].isalnum():
+        prefix += "/"
+    return prefix
+
+
+def case_key(case_details):
+    """Stable identity for a case lookup (CNR, else TYPE/NUMBER/YEAR)"""
+    cnr = normalize_cnr(case_details.get('cnr'))
+    if cnr:
+        return cnr
+    return normalize_case_number(case_details.get('case_type'), case_details.get('case_number'),
+                                 case_details.get('case_year'))
+
+
+def case_status_request(base_url, case_details):
+    """(method, url, form data) for a case-status lookup"""
+    cnr = normalize_cnr(case_details.get('cnr'))
+    if cnr:
+        return "POST", f"{base_url}?p=cnr_status/searchByCNR", {"cino": cnr}
+    return "POST", f"{base_url}?p=casestatus/submitCaseNo", {
+        "case_type": case_details.get('case_type') or '',
+        "search_case_no": case_details.get('case_number') or '',
+        "rgyear": case_details.get('case_year') or ''
+    }
+
+
+def cause_list_request(base_url, state_code, district_code, court_complex, date_str):
+    """(method, url, form data) for a court complex's cause list on a dd/mm/YYYY date"""
+    return "POST", f"{base_url}?p=cause_list/submitCauseList", {
+        "state_code": state_code or '',
+        "dist_code": district_code or '',
+        "court_complex_code": court_complex or '',
+        "causelist_date": date_str,
+        "cicri": "both"
+    }
+
+
+def hierarchy_request(base_url, level, **codes):
+    """(method, url, form data) listing the children of one hierarchy node (states: the whole country)"""
+    page, fields = HIERARCHY_PAGES[level]
+    if not fields:
+        return "GET", f"{base_url}?p={page}", None
+    return "POST", f"{base_url}?p={page}", {field: codes.get(field) or '' for field in fields}
+
+
+def parse_options(text):
+    """[(value, label)] of the <option>s in a page, or in a JSON body of option HTML.
+
+    Placeholders ("Select District", value '' or '0') are left out.
+    """
+    if text.lstrip().startswith("{"):
+        text = " ".join(str(value) for value in json.loads(text).values())
+    options = []
+    for quoted, bare, label in OPTION_PATTERN.findall(text):
+        value = (quoted or bare).strip()
+        label = html.unescape(TAG_PATTERN.sub("", label)).strip()
+        if value not in ("", "0") and label:
+            options.append((value, label))
+    return options
+
+
+def _listing_flags(hearing_date):
+    today = datetime.now().strftime('%d/%m/%Y')
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%d/%m/%Y')
+    return hearing_date == today, hearing_date == tomorrow
+
+
+def case_status_result(fields, petitioner=None, respondent=None):
+    """The /api/search result shape from a case-status page's label -> value fields"""
+    if petitioner and respondent:
+        parties = f"{petitioner} vs. {respondent}"
+    else:
+        parties = fields.get('parties', '')
+
+    hearing_date = fields.get('next hearing date', '')
+    listed_today, listed_tomorrow = _listing_flags(hearing_date)
+    return {
+        "case_number": fields.get('registration number') or fields.get('case number', ''),
+        "parties": parties,
+        "court": fields.get('court number and judge') or fields.get('court', ''),
+        "status": fields.get('case status') or fields.get('case stage', ''),
+        "listed_today": listed_today,
+        "listed_tomorrow": listed_tomorrow,
+        "serial_number": None,
+        "hearing_date": hearing_date,
+        "cnr": fields.get('cnr number', '')
+    }
+
+
+def cause_list_row(cells, court):
+    """A cause-list entry from one table row's cell texts, or None for non-entry rows"""
+    if len(cells) < 4 or not cells[0].rstrip('.').isdigit():
+        return None
+    return {
+        "serial_no": int(cells[0].rstrip('.')),
+        "case_number": cells[1],
+        "parties": cells[2],
+        "purpose": cells[-1],
+        "court": court
+    }
+
+
+def parse_case_status_html(html):
+    """Parse a case-status page into the /api/search result shape.
+
+    BeautifulSoup reference implementation; page_parsers has the fast one.
+    """
+    soup = bs4.BeautifulSoup(html, 'html.parser')
+    fields = {}
+    for row in soup.select('table.case_details_table tr, table.case_status_table tr'):
+        cells = row.find_all(['td', 'th'])
+        if len(cells) >= 2:
+            label = cells[0].get_text(" ", strip=True).rstrip(':').strip().lower()
+            fields[label] = cells[1].get_text(" ", strip=True)
+
+    if not fields:
+        error = soup.select_one('.error, #errorMessage')
+        return {"error": error.get_text(strip=True) if error else "Case not found"}
+
+    petitioner = soup.select_one('.Petitioner_Advocate_table, .petitioner')
+    respondent = soup.select_one('.Respondent_Advocate_table, .respondent')
+    return case_status_result(fields,
+                              petitioner and petitioner.get_text(' ', strip=True),
+                              respondent and respondent.get_text(' ', strip=True))
+
+
+def parse_cause_list_html(html):
+    """Rows of an HTML cause list (table.cause_list_table): court headings span the
+    table, entries are Sr. No. / Case Number / Parties / [Advocate /] Purpose.
+
+    BeautifulSoup reference implementation; page_parsers has the fast one.
+    """
+    soup = bs4.BeautifulSoup(html, 'html.parser')
+    rows = []
+    court = None
+    for tr in soup.select('table.cause_list_table tr'):
+        cells = [td.get_text(" ", strip=True) for td in tr.find_all('td')]
+        if len(cells) == 1 and cells[0]:
+            court = cells[0]
+            continue
+        row = cause_list_row(cells, court)
+        if row:
+            rows.append(row)
+    return rows
@@ -0,0 +1,232 @@
+"""Off-peak pre-fetch of tomorrow's cause lists for every court complex.
+
+Courts publish the next day's lists in the evening and everyone asks for
+them the next morning. PrefetchScheduler walks every complex in the
+hierarchy during an off-peak window, fetches and parses its list for the
+next day and stores it in the scraper's CauseListStore, which
+download_cause_list reads before going to the portal.
+
+Busiest complexes (largest recent lists) are fetched first so that if the
+window runs short it is the small ones that miss out. Failures are retried
+at the back of the queue.
+
+With a job queue (jobs.py) the run only enqueues the lists, busiest first,
+and workers on any number of nodes fetch them; every server process may
+enqueue the same night's lists, since jobs are deduplicated by key.
+
+Dry run against a local portal (nothing is written to the real store):
+
+    python prefetch.py --dry-run --base-url http://127.0.0.1:8000/
+"""
+import argparse
+import itertools
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from cause_lists import CauseListStore
+from locks import release, try_lock
+
+logger = logging.getLogger(__name__)
+
+def tomorrow_str(now=None):
+    return ((now or datetime.now()) + timedelta(days=1)).strftime('%d/%m/%Y')
+
+
+class PrefetchScheduler:
+    """Pre-fetches next-day cause lists across all court complexes"""
+
+    def __init__(self, scraper, workers=8, start_at="21:00", max_attempts=3,
+                 priorities=None, dry_run=False, store=None, lock_path=None, queue=None):
+        self.scraper = scraper
+        self.workers = workers
+        self.start_at = start_at
+        self.max_attempts = max_attempts
+        self.priorities = dict(priorities or {})
+        self.dry_run = dry_run
+        # With several server processes only the one holding this lock runs
+        self.lock_path = lock_path
+        # A JobQueue to hand the lists to instead of fetching them here
+        self.queue = queue
+        # A dry run's throwaway store lives here until stop()
+        self._scratch = None
+        if store is not None:
+            self.store = store
+        elif dry_run:
+            self._scratch = tempfile.TemporaryDirectory(prefix="prefetch-dry-run-")
+            self.store = CauseListStore(os.path.join(self._scratch.name, "cause_lists.db"))
+        else:
+            self.store = scraper.cause_list_store
+        self.last_run = None
+        self.running = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def plan(self):
+        """[(weight, complex)] busiest first; weight = configured or recent list size"""
+        sizes = self.store.complex_sizes()
+        weighted = [(self.priorities.get(code, sizes.get(code, 0)), code)
+                    for _, _, code in self.scraper.hierarchy.iter_complexes()]
+        weighted.sort(key=lambda item: -item[0])
+        return weighted
+
+    def run_once(self, date_str=None, refresh=False):
+        """Fetch every complex's list for date_str (default tomorrow); returns run stats"""
+        date_str = date_str or tomorrow_str()
+        order = itertools.count()
+        work = queue.PriorityQueue()
+        stats = {"date": date_str, "started_at": datetime.now().isoformat(), "planned": 0,
+                 "fetched": 0, "skipped_warm": 0, "failed": 0, "retries": 0, "entries": 0,
+                 "errors": {}}
+
+        for weight, complex_code in self.plan():
+            if not refresh and self.store.fetched_at(complex_code, date_str) is not None:
+                stats["skipped_warm"] += 1
+                continue
+            work.put((-weight, next(order), complex_code, 1))
+            stats["planned"] += 1
+
+        if self.queue is not None:
+            from jobs import cause_list_job
+            jobs = [cause_list_job(self.scraper, complex_code, date_str, priority=-priority)
+                    for priority, _, complex_code, _ in sorted(work.queue)]
+            stats["enqueued"] = self.queue.enqueue_many(jobs, refresh=refresh)
+            self.last_run = stats
+            return stats
+
+        def worker():
+            while not self._stop.is_set():
+                try:
+                    priority, _, complex_code, attempt = work.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    entries = self.scraper.fetch_cause_list(complex_code, date_str)
+                    count = self.store.save(complex_code, date_str, entries)
+                    with self._lock:
+                        stats["fetched"] += 1
+                        stats["entries"] += count
+                except Exception as e:
+                    with self._lock:
+                        if attempt < self.max_attempts:
+                            stats["retries"] += 1
+                            # Back of the queue, so one bad server cannot hog the window
+                            work.put((priority + 10 ** 9, next(order), complex_code, attempt + 1))
+                        else:
+                            stats["failed"] += 1
+                            stats["errors"][complex_code] = str(e)
+                finally:
+                    work.task_done()
+
+        started = time.monotonic()
+        self.running = True
+        try:
+            threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.running = False
+        stats["duration_seconds"] = round(time.monotonic() - started, 3)
+        stats["lists_per_second"] = round(stats["fetched"] / stats["duration_seconds"], 2) \
+            if stats["duration_seconds"] else 0.0
+        self.last_run = stats
+        return stats
+
+    def next_run(self, now=None):
+        now = now or datetime.now()
+        hour, minute = (int(part) for part in self.start_at.split(":"))
+        run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return run_at if run_at > now else run_at + timedelta(days=1)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            wait = (self.next_run() - datetime.now()).total_seconds()
+            if self._stop.wait(max(0.0, wait)):
+                return
+            lock = try_lock(self.lock_path)
+            if not lock:
+                continue  # another process is running today's prefetch
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Cause list prefetch failed")
+            finally:
+                release(lock)
+
+    def start(self):
+        """Run every day at start_at on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="cause-list-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop scheduling; waits up to timeout for a run in progress to finish.
+
+        A dry run's throwaway store is removed once no run is using it.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._scratch is not None and not self.running:
+            self._scratch.cleanup()
+            self._scratch = None
+        return not self.running
+
+    def warm_report(self, date_str, at="09:00"):
+        """How many complexes had date_str's list stored by `at` on that date, and now"""
+        day = datetime.strptime(date_str, '%d/%m/%Y')
+        hour, minute = (int(part) for part in at.split(":"))
+        cutoff = day.replace(hour=hour, minute=minute).timestamp()
+        total = sum(1 for _ in self.scraper.hierarchy.iter_complexes())
+        return {
+            "date": date_str,
+            "complexes": total,
+            "warm": self.store.warm_count(date_str),
+            f"warm_by_{at.replace(':', '')}": self.store.warm_count(date_str, before=cutoff),
+        }
+
+    def status(self):
+        today = datetime.now().strftime('%d/%m/%Y')
+        return {
+            "running": self.running,
+            "dry_run": self.dry_run,
+            "next_run": self.next_run().isoformat() if self._thread else None,
+            "last_run": self.last_run,
+            "today": self.warm_report(today),
+            "tomorrow": self.warm_report(tomorrow_str()),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fetch next-day cause lists for every court complex")
+    parser.add_argument("--base-url", help="Portal base URL (e.g. a local fake portal)")
+    parser.add_argument("--date", help="List date as dd/mm/YYYY (default: tomorrow)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dry-run", action="store_true", help="Store results in a throwaway database")
+    parser.add_argument("--refresh", action="store_true", help="Re-fetch lists that are already warm")
+    args = parser.parse_args()
+
+    if args.base_url:
+        os.environ['ECOURTS_BASE_URL'] = args.base_url
+    from app import ECourtsScraper
+
+    scheduler = PrefetchScheduler(ECourtsScraper(live=True), workers=args.workers, dry_run=args.dry_run)
+    try:
+        stats = scheduler.run_once(args.date, refresh=args.refresh)
+        for name, value in stats.items():
+            print(f"{name}: {value}")
+        print(scheduler.warm_report(stats["date"]))
+    finally:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+"""Compact in-memory forms of cause-list entries and case results.
+
+A list of entry dicts costs about 600 bytes a row: a dict, and a string
+object per value, with the same court name and purpose decoded afresh on
+every row. CauseListEntries holds a whole list
+column by column instead:
+
+- serial numbers in one int64 array;
+- parties (and other free text) as UTF-8 in one growing buffer with int64
+  offsets, Arrow's layout, so a string costs its bytes plus eight;
+- court, purpose, hearing time and case type dictionary-encoded: a uint32
+  code per row and each distinct value once. Case numbers are split into
+  their type (categorical) and the rest.
+
+Iterating a block yields ordinary entry dicts, so code that reads entries
+is unchanged. to_json() and iter_json() write JSON from the columns
+directly (each distinct court or purpose is JSON-encoded once), and
+to_arrow() hands the arrays to pyarrow without copying them (the case
+number column excepted, which is joined back together). Blocks pickle as
+a few flat buffers, which is what crosses the process boundary when a
+page is parsed in a worker.
+
+CaseResult is a slotted record for case-status results, with its
+categorical strings (court, status, hearing date) interned.
+"""
+import json
+import sys
+from array import array
+from itertools import accumulate, islice, repeat
+
+from cause_lists import CAUSE_LIST_FIELDS
+from lazy import optional_module
+
+# pyarrow is optional and only to_arrow needs it, so it is imported on first use
+pa = optional_module("pyarrow")
+pc = optional_module("pyarrow.compute")
+
+
+class _Missing:
+    """Marks a field an entry does not have (as opposed to one that is None)"""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __reduce__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+# Rows converted to dicts or JSON at a time
+CHUNK_ROWS = 4096
+encode_string = json.encoder.encode_basestring
+
+
+def _mark_missing(values, missing, start):
+    """Put MISSING (or None) in values, rows start.., at the rows listed in missing"""
+    stop = start + len(values)
+    for i in missing:
+        if start <= i < stop:
+            values[i - start] = MISSING
+    return values
+
+
+class ObjectColumn:
+    """Any values, one pointer per row: the fallback when a typed column meets a value it can't hold"""
+
+    __slots__ = ("items",)
+
+    def __init__(self, items=None):
+        self.items = items if items is not None else []
+
+    def __len__(self):
+        return len(self.items)
+
+    def extend(self, values):
+        self.items.extend(values)
+        return True
+
+    def get(self, i):
+        return self.items[i]
+
+    def values(self, start, stop):
+        return self.items[start:stop]
+
+    def has_missing(self, start, stop):
+        return MISSING in self.items[start:stop]
+
+    def json_values(self, start, stop):
+        return [None if value is MISSING else json.dumps(value, ensure_ascii=False)
+                for value in self.items[start:stop]]
+
+    def nbytes(self):
+        return sys.getsizeof(self.items) + sum(sys.getsizeof(value) for value in self.items if value is not MISSING)
+
+    def to_arrow(self):
+        return pa.array([None if value is MISSING else value for value in self.items])
+
+
+class IntColumn:
+    """int64 values in an array; missing rows listed apart"""
+
+    __slots__ = ("ints", "missing")
+
+    def __init__(self):
+        self.ints = array("q")
+        self.missing = set()
+
+    def __len__(self):
+        return len(self.ints)
+
+    def extend(self, values):
+        # Not bools (array would take True as 1) and nothing past int64
+        if not all(type(value) is int and -2 ** 63 <= value < 2 ** 63 or value is MISSING for value in values):
+            return False
+        start = len(self.ints)
+        self.missing.update(start + n for n, value in enumerate(values) if value is MISSING)
+        self.ints.extend(0 if value is MISSING else value for value in values)
+        return True
+
+    def get(self, i):
+        return MISSING if i in self.missing else self.ints[i]
+
+    def values(self, start, stop):
+        return _mark_missing(self.ints[start:stop].tolist(), self.missing, start)
+
+    def has_missing(self, start, stop):
+        return any(start <= i < stop for i in self.missing)
+
+    def json_values(self, start, stop):
+        return _mark_missing(list(map(str, self.ints[start:stop])), self.missing, start)
+
+    def nbytes(self):
+        return self.ints.itemsize * len(self.ints) + sys.getsizeof(self.missing)
+
+    def to_arrow(self):
+        return pa.Array.from_buffers(pa.int64(), len(self.ints), [_validity(self.missing, len(self.ints)),
+                                                                  pa.py_buffer(self.ints)])
+
+
+class StringColumn:
+    """Distinct strings as UTF-8 in one buffer, with int64 offsets (Arrow's large_string layout)"""
+
+    __slots__ = ("data", "offsets", "missing")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("q", [0])
+        self.missing = set()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def extend(self, values):
+        if not all(type(value) is str or value is MISSING for value in values):
+            return False
+        start = len(self)
+        self.missing.update(start + n for n, value in enumerate(values) if value is MISSING)
+        encoded = [b"" if value is MISSING else value.encode("utf-8", "surrogatepass") for value in values]
+        self.data += b"".join(encoded)
+        self.offsets.extend(accumulate(map(len, encoded), initial=self.offsets[-1]))
+        # accumulate repeats the starting offset first
+        del self.offsets[start + 1]
+        return True
+
+    def get(self, i):
+        if i in self.missing:
+            return MISSING
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode("utf-8", "surrogatepass")
+
+    def values(self, start, stop):
+        offsets = self.offsets[start:stop + 1]
+        base = offsets[0]
+        chunk = bytes(self.data[base:offsets[-1]])
+        text = chunk.decode("utf-8", "surrogatepass")
+        if len(text) == len(chunk):
+            # ASCII: byte offsets are character offsets
+            values = [text[a - base:b - base] for a, b in zip(offsets, offsets[1:])]
+        else:
+            values = [chunk[a - base:b - base].decode("utf-8", "surrogatepass") for a, b in zip(offsets, offsets[1:])]
+        return _mark_missing(values, self.missing, start)
+
+    def json_values(self, start, stop):
+        return [None if value is MISSING else encode_string(value) for value in self.values(start, stop)]
+
+    def has_missing(self, start, stop):
+        return any(start <= i < stop for i in self.missing)
+
+    def nbytes(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets) + sys.getsizeof(self.missing)
+
+    def to_arrow(self):
+        return pa.Array.from_buffers(pa.large_string(), len(self), [_validity(self.missing, len(self)),
+                                                                    pa.py_buffer(self.offsets), pa.py_buffer(self.data)])
+
+
+class CategoryColumn:
+    """Dictionary-encoded values: a uint32 code per row, each distinct value stored once"""
+
+    __slots__ = ("codes", "categories", "ids", "_json")
+
+    def __init__(self):
+        self.codes = array("I")
+        # Code 0 is a missing field
+        self.categories = [MISSING]
+        # Strings by themselves, anything else as (type, value), so 1, 1.0 and True stay apart
+        self.ids = {(_Missing, MISSING): 0}
+        self._json = [None]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _add(self, key, value):
+        if isinstance(value, str):
+            value = sys.intern(value)
+        code = self.ids[key] = len(self.categories)
+        self.categories.append(value)
+        self._json.append(json.dumps(value, ensure_ascii=False))
+        return code
+
+    def extend(self, values):
+        ids = self.ids
+        try:
+            keys = [value if value.__class__ is str else (value.__class__, value) for value in values]
+            self.codes.extend([ids[key] if key in ids else self._add(key, value) for key, value in zip(keys, values)])
+        except TypeError:  # unhashable; any categories added stay unused
+            return False
+        return True
+
+    def get(self, i):
+        return self.categories[self.codes[i]]
+
+    def values(self, start, stop):
+        return list(map(self.categories.__getitem__, self.codes[start:stop]))
+
+    def json_values(self, start, stop):
+        return list(map(self._json.__getitem__, self.codes[start:stop]))
+
+    def has_missing(self, start, stop):
+        return 0 in self.codes[start:stop]
+
+    def nbytes(self):
+        return (self.codes.itemsize * len(self.codes) + sys.getsizeof(self.categories)
+                + sum(sys.getsizeof(value) for value in self.categories[1:]))
+
+    def to_arrow(self):
+        # The codes as they are; code 0 points at a null dictionary entry, which reads as null
+        indices = pa.Array.from_buffers(pa.uint32(), len(self.codes), [None, pa.py_buffer(self.codes)])
+        return pa.DictionaryArray.from_arrays(indices, pa.array([None] + self.categories[1:]))
+
+
+class CaseNumberColumn:
+    """Case numbers as their type (categorical: "CIVIL" in "CIVIL/123/2024") and the rest"""
+
+    __slots__ = ("types", "rest")
+
+    def __init__(self):
+        self.types = CategoryColumn()
+        self.rest = StringColumn()
+
+    def __len__(self):
+        return len(self.rest)
+
+    def extend(self, values):
+        if not all(type(value) is str or value is MISSING for value in values):
+            return False
+        types, rest = [], []
+        for value in values:
+            case_type, slash, tail = value.partition("/") if value is not MISSING else ("", "", "")
+            if slash:
+                types.append(case_type)
+                rest.append(tail)
+            else:
+                types.append(None)
+                rest.append(value)
+        self.types.extend(types)
+        self.rest.extend(rest)
+        return True
+
+    def get(self, i):
+        case_type, rest = self.types.get(i), self.rest.get(i)
+        return rest if case_type is None else f"{case_type}/{rest}"
+
+    def values(self, start, stop):
+        return [rest if case_type is None else f"{case_type}/{rest}"
+                for case_type, rest in zip(self.types.values(start, stop), self.rest.values(start, stop))]
+
+    def json_values(self, start, stop):
+        return [None if value is MISSING else encode_string(value) for value in self.values(start, stop)]
+
+    def has_missing(self, start, stop):
+        return self.rest.has_missing(start, stop)
+
+    def nbytes(self):
+        return self.types.nbytes() + self.rest.nbytes()
+
+    def to_arrow(self):
+        # Type and rest are joined by Arrow compute rather than row by row in Python
+        rest = self.rest.to_arrow()
+        types = self.types.to_arrow().dictionary_decode().cast(pa.large_string())
+        joined = pc.binary_join_element_wise(types, rest, pa.scalar("/", pa.large_string()))
+        return pc.if_else(pc.is_null(types), rest, joined)
+
+
+def _validity(missing, rows):
+    """Arrow validity bitmap for the rows not in missing, or None if every row is present"""
+    if not missing:
+        return None
+    bitmap = bytearray(b"\xff" * ((rows + 7) // 8))
+    for i in missing:
+        bitmap[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+    return pa.py_buffer(bitmap)
+
+
+# How each field of an entry is held; fields not listed (e.g. a PDF row's page) are categorical
+CAUSE_LIST_COLUMNS = {
+    "serial_no": IntColumn,
+    "case_number": CaseNumberColumn,
+    "parties": StringColumn,
+    "court": CategoryColumn,
+    "hearing_time": CategoryColumn,
+    "purpose": CategoryColumn,
+}
+
+
+class CauseListEntries:
+    """One cause list's entries held column by column; iterates as entry dicts"""
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, entries=()):
+        self.columns = {}
+        self.rows = 0
+        self.extend(entries)
+
+    def _fill(self, name, values):
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = CAUSE_LIST_COLUMNS.get(name, CategoryColumn)()
+            column.extend([MISSING] * self.rows)
+        if not column.extend(values):
+            column = self.columns[name] = ObjectColumn(column.values(0, len(column)))
+            column.extend(values)
+
+    def extend(self, entries):
+        """Append entry dicts (any iterable of them)"""
+        entries = iter(entries)
+        while True:
+            batch = list(islice(entries, CHUNK_ROWS))
+            if not batch:
+                return
+            names = dict.fromkeys(CAUSE_LIST_FIELDS)
+            names.update(self.columns)
+            names.update(dict.fromkeys(name for entry in batch for name in entry if name not in names))
+            for name in names:
+                self._fill(name, [entry.get(name, MISSING) for entry in batch])
+            self.rows += len(batch)
+
+    def append(self, entry):
+        self.extend((entry,))
+
+    def __len__(self):
+        return self.rows
+
+    def entry(self, i):
+        """Row i as an entry dict (fields it lacks left out)"""
+        entry = {}
+        for name, column in self.columns.items():
+            value = column.get(i)
+            if value is not MISSING:
+                entry[name] = value
+        return entry
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.entry(n) for n in range(*i.indices(self.rows))]
+        if i < 0:
+            i += self.rows
+        if not 0 <= i < self.rows:
+            raise IndexError("entry index out of range")
+        return self.entry(i)
+
+    def __iter__(self):
+        names = list(self.columns)
+        for start in range(0, self.rows, CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, self.rows)
+            rows = zip(*(column.values(start, stop) for column in self.columns.values()))
+            if any(column.has_missing(start, stop) for column in self.columns.values()):
+                for row in rows:
+                    yield {name: value for name, value in zip(names, row) if value is not MISSING}
+            else:
+                yield from map(dict, map(zip, repeat(names), rows))
+
+    def iter_json(self, separators=(", ", ": ")):
+        """Each entry as the JSON text json.dumps(entry, separators=...) gives, built from the columns"""
+        item, key = separators
+        keys = [json.dumps(name) + key for name in self.columns]
+        # One %-format per row when it has every field
+        template = "{" + item.join(name.replace("%", "%%") + "%s" for name in keys) + "}"
+        for start in range(0, self.rows, CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, self.rows)
+            for row in zip(*(column.json_values(start, stop) for column in self.columns.values())):
+                if None in row:
+                    yield "{" + item.join(name + text for name, text in zip(keys, row) if text is not None) + "}"
+                else:
+                    yield template % row
+
+    def to_json(self, separators=(", ", ": ")):
+        """The entries as a JSON array"""
+        return "[" + separators[0].join(self.iter_json(separators)) + "]"
+
+    def to_arrow(self):
+        """A pyarrow RecordBatch over the columns' own buffers (categoricals as dictionary arrays).
+
+        The batch shares memory with this block: appending to the block
+        while the batch is alive raises BufferError.
+        """
+        if pa is None:
+            raise RuntimeError("Arrow conversion requires pyarrow")
+        return pa.RecordBatch.from_arrays([column.to_arrow() for column in self.columns.values()],
+                                          names=list(self.columns))
+
+    def nbytes(self):
+        """Approximate memory held by the columns"""
+        return sum(column.nbytes() for column in self.columns.values())
+
+
+CASE_RESULT_FIELDS = ("case_number", "parties", "court", "status", "listed_today", "listed_tomorrow",
+                      "serial_number", "hearing_date", "cnr")
+# Fields few distinct values repeat across results; one shared string each
+CASE_RESULT_CATEGORIES = frozenset(("court", "status", "hearing_date"))
+
+
+class CaseResult:
+    """A case-status result in slots; other keys (e.g. listings) go in extra"""
+
+    __slots__ = CASE_RESULT_FIELDS + ("present", "extra")
+
+    @classmethod
+    def from_dict(cls, result):
+        record = cls()
+        present = 0
+        for bit, name in enumerate(CASE_RESULT_FIELDS):
+            if name in result:
+                value = result[name]
+                if name in CASE_RESULT_CATEGORIES and type(value) is str:
+                    value = sys.intern(value)
+                setattr(record, name, value)
+                present |= 1 << bit
+        record.present = present
+        extra = {key: value for key, value in result.items() if key not in CASE_RESULT_FIELDS}
+        record.extra = extra or None
+        return record
+
+    def to_dict(self):
+        result = {}
+        present = self.present
+        for bit, name in enumerate(CASE_RESULT_FIELDS):
+            if present >> bit & 1:
+                result[name] = getattr(self, name)
+        if self.extra:
+            result.update(self.extra)
+        return result
@@ -0,0 +1,281 @@
+"""Stale-while-revalidate serving for /api/search and /api/cause-list.
+
+A stored result (the case's last status in CourtStore, the complex's list
+in CauseListStore) is answered at once, with its age, as long as it is
+younger than the endpoint's hard TTL. Once it is older than the soft TTL
+the same request also starts a refresh in the background, so the next one
+gets the new result. Only a first lookup, or a result past the hard TTL,
+waits for the portal.
+
+Refreshes are deduplicated. Within a worker, concurrent requests for one
+key share one fetch (a request that has to wait joins a background
+refresh already running). Across workers, a refresh first takes a lease
+row in a SQLite file: a worker that finds the lease held skips its
+background refresh, or, when it has to wait, watches the store for the
+holder's result for up to wait_seconds before fetching itself. With a job
+queue the background refreshes are enqueued instead, where the job key
+keeps one per case or list across all nodes.
+
+Policies are per endpoint, from SWR_SEARCH and SWR_CAUSE_LIST
+("<soft>,<hard>" seconds; "inf" for no hard TTL, "off" to always go to
+the portal as before).
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# How a result was served (the X-Cache header)
+FRESH, STALE, EXPIRED, MISS = "fresh", "stale", "expired", "miss"
+
+# Endpoint -> (soft TTL, hard TTL) in seconds. A case's status is served for a day
+# and refreshed after five minutes; a stored cause list (often pre-fetched the
+# night before) is always served, and refreshed after half an hour.
+DEFAULT_POLICIES = {
+    "search": (5 * 60, 24 * 3600),
+    "cause_list": (30 * 60, float("inf")),
+}
+
+
+class Policy:
+    """When a stored result is served as it is, served while refreshed, or waited on"""
+
+    __slots__ = ("soft_ttl", "hard_ttl")
+
+    def __init__(self, soft_ttl, hard_ttl):
+        if not 0 <= soft_ttl <= hard_ttl:
+            raise ValueError(f"Need 0 <= soft TTL <= hard TTL, got {soft_ttl}, {hard_ttl}")
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+
+    @classmethod
+    def parse(cls, text):
+        """A Policy from "<soft>,<hard>" seconds (hard defaults to inf); None for "off" or "0\""""
+        text = text.strip().lower()
+        if text in ("", "0", "off"):
+            return None
+        soft, _, hard = text.partition(",")
+        return cls(float(soft), float(hard or "inf"))
+
+    @classmethod
+    def from_env(cls, endpoint):
+        """The endpoint's policy from SWR_<ENDPOINT>, else DEFAULT_POLICIES"""
+        text = os.environ.get(f"SWR_{endpoint.upper()}")
+        return cls(*DEFAULT_POLICIES[endpoint]) if text is None else cls.parse(text)
+
+    def to_dict(self):
+        return {"soft_ttl": self.soft_ttl, "hard_ttl": None if self.hard_ttl == float("inf") else self.hard_ttl}
+
+
+class RefreshLeases:
+    """Short leases on refresh keys in a SQLite file, so one worker on the box refreshes a key at a time"""
+
+    def __init__(self, path, owner=None):
+        self.path = path
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS refresh_leases ("
+            " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def claim(self, key, seconds):
+        """Take the key's lease for seconds; False if another owner holds an unexpired one"""
+        now = time.time()
+        return self._connection().execute(
+            "INSERT INTO refresh_leases (key, owner, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE refresh_leases.expires_at <= ? OR refresh_leases.owner = excluded.owner",
+            (key, self.owner, now + seconds, now)).rowcount == 1
+
+    def release(self, key):
+        self._connection().execute("DELETE FROM refresh_leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+
+class _Flight:
+    __slots__ = ("done", "value", "fetched_at", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = self.fetched_at = self.error = None
+
+
+class Revalidator:
+    """Serves stored results by their age and refreshes them, once per key, per its endpoint's Policy"""
+
+    def __init__(self, policies, leases=None, queue=None, workers=4, max_pending=256, lease_seconds=60.0,
+                 wait_seconds=10.0, poll_seconds=0.05):
+        self.policies = policies
+        self.leases = leases
+        self.queue = queue
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._executor = None
+        self._flights = {}
+        self._enqueued = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            (FRESH, STALE, EXPIRED, MISS, "refreshes", "coalesced", "leased_elsewhere", "enqueued", "dropped",
+             "refresh_errors"), 0)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def enabled(self, endpoint):
+        return self.policies.get(endpoint) is not None
+
+    def serve(self, endpoint, key, load, fetch, job=None):
+        """(value, fetched_at, how it was served) for key.
+
+        load() returns the stored (value, fetched_at) or None; fetch() gets
+        it from the portal, stores it and returns (value, fetched_at). job is
+        the job_spec() to enqueue for a background refresh when there is a
+        queue. Errors from a fetch that had to be waited on are raised.
+        """
+        policy = self.policies[endpoint]
+        stored = load()
+        if stored is not None:
+            age = time.time() - stored[1]
+            if age < policy.hard_ttl:
+                if age < policy.soft_ttl:
+                    self._count(FRESH)
+                    return stored[0], stored[1], FRESH
+                self._count(STALE)
+                self.refresh(key, fetch, job)
+                return stored[0], stored[1], STALE
+        state = MISS if stored is None else EXPIRED
+        self._count(state)
+        value, fetched_at = self._wait(key, load, fetch, since=None if stored is None else stored[1])
+        return value, fetched_at, state
+
+    def refresh(self, key, fetch, job=None):
+        """Refresh key in the background unless that is already happening; False if skipped"""
+        if self.queue is not None and job is not None:
+            return self._enqueue(key, job)
+        with self._lock:
+            if key in self._flights:
+                self._counters["coalesced"] += 1
+                return False
+            if len(self._flights) >= self.max_pending:
+                self._counters["dropped"] += 1
+                return False
+            flight = self._flights[key] = _Flight()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="revalidate")
+        self._executor.submit(self._run, key, flight, fetch)
+        return True
+
+    def _enqueue(self, key, job):
+        # The queue skips keys already queued or running; this only saves it the write
+        now = time.monotonic()
+        with self._lock:
+            if now - self._enqueued.get(key, -self.lease_seconds) < self.lease_seconds:
+                self._counters["coalesced"] += 1
+                return False
+            self._enqueued[key] = now
+            if len(self._enqueued) > self.max_pending:
+                self._enqueued = {k: t for k, t in self._enqueued.items() if now - t < self.lease_seconds}
+        try:
+            added = self.queue.enqueue_many([job], refresh=True)
+        except Exception:
+            self._count("refresh_errors")
+            logger.exception("Could not enqueue a refresh of %s", key)
+            return False
+        self._count("enqueued" if added else "coalesced")
+        return bool(added)
+
+    def _run(self, key, flight, fetch, load=None, since=None):
+        """Fetch key as its flight's leader, under the cross-worker lease when there are leases.
+
+        A background refresh (no load) gives up when another worker holds
+        the lease; a waiting request first watches the store for that
+        worker's result (stored after since), and fetches itself only if
+        none lands within wait_seconds.
+        """
+        leased = False
+        try:
+            leased = self.leases is None or self.leases.claim(key, self.lease_seconds)
+            if not leased:
+                self._count("leased_elsewhere")
+                if load is None:
+                    return
+                stored = self._watch(load, since)
+                if stored is not None:
+                    flight.value, flight.fetched_at = stored
+                    return
+            self._count("refreshes")
+            flight.value, flight.fetched_at = fetch()
+        except Exception as e:
+            flight.error = e
+            self._count("refresh_errors")
+            if load is None:
+                logger.exception("Background refresh of %s failed", key)
+        finally:
+            if leased and self.leases is not None:
+                try:
+                    self.leases.release(key)
+                except sqlite3.Error:
+                    pass  # the lease expires by itself
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _watch(self, load, since):
+        expires = time.monotonic() + self.wait_seconds
+        while time.monotonic() < expires:
+            time.sleep(self.poll_seconds)
+            stored = load()
+            if stored is not None and (since is None or stored[1] > since):
+                return stored
+        return None
+
+    def _wait(self, key, load, fetch, since):
+        """(value, fetched_at) from a fetch of key, sharing one already running here or in another worker"""
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                else:
+                    self._counters["coalesced"] += 1
+            if leader:
+                self._run(key, flight, fetch, load, since)
+            else:
+                flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.fetched_at is not None:
+                return flight.value, flight.fetched_at
+            # Joined a background refresh that left the key to another worker
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._flights)
+        stats["policies"] = {endpoint: policy.to_dict() if policy is not None else None
+                             for endpoint, policy in self.policies.items()}
+        return stats
+
+    def close(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
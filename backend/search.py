@@ -0,0 +1,330 @@
+"""Typo-tolerant search over stored cause-list entries.
+
+Finds entries by the words of their parties ("sharma", a prefix "sharm*",
+or a typo "shrama"), or by a partly typed case number ("OS/12"), narrowed
+by court complex, court, purpose and dates: "cases with a party like
+Sharma in Tis Hazari this week".
+
+The index has two halves. CourtStore's search_postings maps every word to
+the entries containing it, newest list first, and is kept in step with
+each saved list. TermDictionary holds the distinct words in memory (a few
+hundred thousand, against tens of millions of entries) with a trigram
+index, so expanding a query word to the words within one or two edits, or
+sharing its prefix, never touches the database. A query then merges the
+postings of its rarest word's expansions lazily, newest first, and checks
+each candidate entry against the other words and the filters until the
+page is full; the rest of the postings are never read. Pages continue
+from an opaque cursor rather than an offset, so a deep page costs what
+the first one does.
+"""
+import bisect
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from heapq import merge
+
+from portal import PARTY_STOPWORDS, case_number_prefix, party_terms
+from storage import day
+
+# A query word matches at most this many dictionary words
+MAX_EXPANSIONS = 50
+# Most trigram-similar words checked with edit_distance per query word
+MAX_CANDIDATES = 500
+# Entries examined per request; past this a short page is returned with a cursor to continue
+MAX_SCAN = 50_000
+QUERY_WORD = re.compile(r"([^\W_]+)(\*?)")
+
+
+def trigrams(word):
+    """Distinct trigrams of word padded with ^ and $, so that its ends count"""
+    padded = f"^{word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Insertions, deletions, substitutions and adjacent swaps turning a into b; limit + 1 if more"""
+    return distance_from(a, limit)(b)
+
+
+def distance_from(a, limit):
+    """edit_distance(a, b, limit) as a function of b, for checking one word against many.
+
+    Bit-parallel (Myers, with Hyyro's swap extension): one pass over b,
+    each step a few integer operations on bitmasks of a's positions,
+    which are built once here.
+    """
+    masks = {}
+    for i, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | 1 << i
+    full = (1 << len(a)) - 1
+    high = 1 << (len(a) - 1) if a else 0
+
+    def distance(b):
+        if abs(len(a) - len(b)) > limit:
+            return limit + 1
+        if not a:
+            return len(b)
+        vp, vn, d0, previous = full, 0, 0, 0
+        score = len(a)
+        for char in b:
+            pm = masks.get(char, 0)
+            d0 = (((pm & vp) + vp) ^ vp) | pm | vn | ((~d0 & pm) << 1 & previous)
+            hp = vn | ~(d0 | vp) & full
+            hn = d0 & vp
+            if hp & high:
+                score += 1
+            elif hn & high:
+                score -= 1
+            hp = (hp << 1 | 1) & full
+            hn = hn << 1 & full
+            vp = hn | ~(d0 | hp) & full
+            vn = d0 & hp
+            previous = pm
+        return min(score, limit + 1)
+    return distance
+
+
+def word_edits(word, fuzzy="auto"):
+    """Edits tolerated in a query word: fuzzy 0-2, or 'auto' (none under 4 letters or in numbers, 2 from 8)"""
+    if fuzzy == "auto":
+        if word.isdigit() or len(word) < 4:
+            return 0
+        return 1 if len(word) < 8 else 2
+    if str(fuzzy) not in ("0", "1", "2"):
+        raise ValueError("fuzzy must be auto, 0, 1 or 2")
+    return 0 if word.isdigit() else int(fuzzy)
+
+
+def _order(key):
+    list_date, complex_id, position = key
+    return -list_date, complex_id, position
+
+
+def _cursor(key):
+    return "{}.{}.{}".format(*key)
+
+
+def _parse_cursor(cursor):
+    if not cursor:
+        return None
+    parts = cursor.split(".")
+    if len(parts) != 3:
+        raise ValueError(f"Invalid cursor {cursor!r}")
+    return tuple(int(part) for part in parts)
+
+
+class TermDictionary:
+    """The distinct search words in memory, for exact, prefix and edit-distance lookups"""
+
+    def __init__(self):
+        self.last_id = 0
+        self._ids = {}
+        self._words = {}
+        self._sorted = []
+        # (trigram, word length) -> term ids; lengths let a lookup skip words too long or short to match
+        self._grams = defaultdict(list)
+        # Every character in any word, for generating a query word's one-edit neighbours
+        self._letters = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, rows):
+        """Add (term_id, term) rows; returns how many words were new"""
+        with self._lock:
+            new = [(term_id, term) for term_id, term in rows if term not in self._ids]
+            for term_id, term in new:
+                self._ids[term] = term_id
+                self._words[term_id] = term
+                self._letters.update(term)
+                for gram in trigrams(term):
+                    self._grams[(gram, len(term))].append(term_id)
+            if rows:
+                self.last_id = max(self.last_id, rows[-1][0])
+            if len(new) > 100:
+                self._sorted = sorted(self._ids)
+            else:
+                for _, term in new:
+                    bisect.insort(self._sorted, term)
+            return len(new)
+
+    def expand(self, word, edits=0, prefix=False):
+        """{term: term_id} of the words equal to word, starting with it (prefix) or within edits of it"""
+        found = {}
+        term_id = self._ids.get(word)
+        if term_id is not None:
+            found[word] = term_id
+        if prefix:
+            terms = self._sorted
+            for i in range(bisect.bisect_left(terms, word), len(terms)):
+                if len(found) >= MAX_EXPANSIONS or not terms[i].startswith(word):
+                    break
+                found[terms[i]] = self._ids[terms[i]]
+        if edits:
+            for _, term, term_id in self._similar(word, edits):
+                if len(found) >= MAX_EXPANSIONS:
+                    break
+                found[term] = term_id
+        return found
+
+    def _similar(self, word, edits):
+        """[(distance, term, term_id)] of the words within edits of word, closest first"""
+        if edits == 1:
+            return [(1, term, self._ids[term]) for term in sorted(self._neighbours(word))]
+        grams = trigrams(word)
+        shared = Counter()
+        for length in range(max(1, len(word) - edits), len(word) + edits + 1):
+            for gram in grams:
+                ids = self._grams.get((gram, length))
+                if ids:
+                    shared.update(ids)
+        # An insertion, deletion or substitution changes at most three trigrams, so a match shares at
+        # least this many. A swap can change four: a swap plus another edit may be missed.
+        need = max(1, len(grams) - 3 * edits)
+        by_count = defaultdict(list)
+        for term_id, count in shared.items():
+            if count >= need:
+                by_count[count].append(term_id)
+        # In a crowded neighbourhood only the words sharing most trigrams, the likeliest matches, are checked
+        candidates = []
+        for count in sorted(by_count, reverse=True):
+            candidates.extend(by_count[count])
+            if len(candidates) >= MAX_CANDIDATES:
+                del candidates[MAX_CANDIDATES:]
+                break
+        distance = distance_from(word, edits)
+        words = self._words
+        matches = []
+        for term_id in candidates:
+            term = words[term_id]
+            found = distance(term)
+            if 0 < found <= edits:
+                matches.append((found, term, term_id))
+        matches.sort()
+        return matches
+
+    def _neighbours(self, word):
+        """Words one deletion, swap, substitution or insertion away from word"""
+        ids = self._ids
+        letters = self._letters
+        found = set()
+        for i in range(len(word) + 1):
+            head, tail = word[:i], word[i:]
+            candidates = [head + char + tail for char in letters]
+            if tail:
+                rest = tail[1:]
+                candidates.append(head + rest)
+                candidates.extend(head + char + rest for char in letters)
+                if rest:
+                    candidates.append(head + rest[0] + tail[0] + rest[1:])
+            found.update(candidate for candidate in candidates if candidate in ids)
+        found.discard(word)
+        return found
+
+
+class CauseListSearch:
+    """Stored cause-list entries by party words or case-number prefix, with filters and cursor paging"""
+
+    def __init__(self, store):
+        self.store = store
+        self.terms = TermDictionary()
+
+    def refresh(self):
+        """Load the words stored (by any process) since the last refresh; returns how many were new"""
+        return self.terms.add(self.store.search_terms(self.terms.last_id))
+
+    def _query_words(self, party, fuzzy):
+        """[(word, prefix, edits)] from a party query; a trailing * makes a word a prefix"""
+        words = []
+        for word, star in QUERY_WORD.findall(party.lower()):
+            if word in PARTY_STOPWORDS and not star:
+                continue
+            words.append((word, bool(star), word_edits(word, fuzzy)))
+        return words
+
+    def search(self, party=None, case_number=None, court_complex=None, court=None, purpose=None,
+               since=None, until=None, fuzzy="auto", limit=20, cursor=None):
+        """One page of matching entries, newest list first.
+
+        Every party word must match (exactly, by prefix or within its
+        edits). Returns {results, next_cursor, terms, scanned, truncated,
+        took_ms}: terms lists the words each query word matched;
+        next_cursor is None on the last page.
+        """
+        started = time.perf_counter()
+        # One rowid range seek; a list saved a moment ago is searchable at once
+        self.refresh()
+        since = day(since) if since else None
+        until = day(until) if until else None
+        after = _parse_cursor(cursor)
+        prefix = case_number_prefix(case_number) if case_number else ""
+        groups = []
+        terms = {}
+        for word, is_prefix, edits in self._query_words(party or "", fuzzy):
+            found = self.terms.expand(word, edits, is_prefix)
+            terms[word + "*" * is_prefix] = sorted(found)
+            groups.append(found)
+        if not groups and not prefix:
+            raise ValueError("Give a party name or a case number")
+
+        page = {"results": [], "next_cursor": None, "terms": terms, "scanned": 0, "truncated": False}
+        complex_ids = self.store.complex_ids(court_complex) if court_complex else None
+        court_ids = self.store.court_ids(court) if court else None
+        if not all(groups) or complex_ids == set() or court_ids == set():
+            return self._finish(page, [], started)
+
+        if after is not None:
+            until = min(until or after[0], after[0])
+        if prefix:
+            keys = self.store.case_number_keys(prefix, since, until, cap=MAX_SCAN)
+            page["truncated"] = len(keys) == MAX_SCAN
+            keys.sort(key=_order)
+        else:
+            # Walk the rarest word's postings and check the other words on each candidate
+            if len(groups) > 1:
+                groups.sort(key=lambda found: self.store.count_postings(list(found.values()), since, until))
+            driver = groups.pop(0)
+            keys = merge(*(self.store.postings(term_id, since, until, complex_ids)
+                           for term_id in driver.values()), key=_order)
+        wanted = [set(found) for found in groups]
+        purpose = purpose.lower() if purpose else None
+
+        rows = []
+        last = None
+        for key in keys:
+            if key == last or (after is not None and _order(key) <= _order(after)):
+                continue
+            if page["scanned"] == MAX_SCAN:
+                page["next_cursor"] = _cursor(last)
+                break
+            page["scanned"] += 1
+            last = key
+            list_date, complex_id, position = key
+            if complex_ids is not None and complex_id not in complex_ids:
+                continue
+            entry = self.store.entry(complex_id, list_date, position)
+            if entry is None:
+                continue
+            if court_ids is not None and entry[0] not in court_ids:
+                continue
+            if purpose and purpose not in (entry[5] or "").lower():
+                continue
+            if wanted:
+                words = party_terms(entry[3])
+                if not all(words & group for group in wanted):
+                    continue
+            if len(rows) == limit:
+                page["next_cursor"] = _cursor(rows[-1][:2] + (rows[-1][-1],))
+                break
+            rows.append((list_date, complex_id) + entry + (position,))
+        return self._finish(page, rows, started)
+
+    def _finish(self, page, rows, started):
+        page["results"] = self.store.describe_entries([row[:-1] for row in rows])
+        page["took_ms"] = round((time.perf_counter() - started) * 1e3, 2)
+        return page
+
+    def stats(self):
+        return {"words": len(self.terms), "last_term_id": self.terms.last_id}
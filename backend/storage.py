@@ -0,0 +1,635 @@
+"""Relational store for the court hierarchy, cases, hearings and cause-list entries.
+
+CauseListStore keeps each list as one JSON body, which is right for serving
+a whole list but cannot answer "every listing of this case" without reading
+every list. CourtStore keeps the same data one row per entry in SQLite
+(WAL, one connection per thread, so a worker's Flask threads read while
+another process writes), with indexes shaped after the API's lookups:
+
+    cause_list_entries   clustered on (complex, date, position): a whole
+                         list is one contiguous range
+    ..._by_case_number   (case_number, date, complex, court, serial)
+    ..._by_cnr           (cnr, date, complex, court, serial)
+
+The two secondary indexes cover the listing lookups, so those never touch
+the table. search_postings maps each word of an entry's parties to the
+entry, clustered on (word, date newest first), and is kept in step with
+the entries in the same transaction; search.CauseListSearch reads it. Complex and court names are dictionary-encoded to integer ids
+and dates are stored as YYYYMMDD integers, which keeps a row (and every
+index entry) small at tens of millions of entries.
+
+save_cause_list() is the CauseListStore.on_save listener; bulk_load()
+ingests many lists per transaction and can drop and rebuild the secondary
+indexes around a large initial load.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from cause_lists import iso_date
+from portal import normalize_case_number, normalize_cnr, party_terms
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS states ("
+    " state_code TEXT PRIMARY KEY, name TEXT NOT NULL);"
+    "CREATE TABLE IF NOT EXISTS districts ("
+    " district_code TEXT PRIMARY KEY, state_code TEXT NOT NULL, name TEXT NOT NULL);"
+    "CREATE TABLE IF NOT EXISTS taluks ("
+    " district_code TEXT NOT NULL, name TEXT NOT NULL, UNIQUE (district_code, name));"
+    "CREATE TABLE IF NOT EXISTS court_complexes ("
+    " complex_id INTEGER PRIMARY KEY, code TEXT NOT NULL UNIQUE, district_code TEXT);"
+    "CREATE TABLE IF NOT EXISTS complex_courts ("
+    " complex_id INTEGER NOT NULL, name TEXT NOT NULL, UNIQUE (complex_id, name));"
+    "CREATE TABLE IF NOT EXISTS store_meta (name TEXT PRIMARY KEY, value);"
+    "CREATE TABLE IF NOT EXISTS courts ("
+    " court_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);"
+    "CREATE TABLE IF NOT EXISTS cases ("
+    " case_id INTEGER PRIMARY KEY, cnr TEXT UNIQUE, case_number TEXT, display_number TEXT,"
+    " parties TEXT, court TEXT, status TEXT, next_hearing INTEGER, updated_at REAL NOT NULL);"
+    "CREATE INDEX IF NOT EXISTS cases_by_case_number ON cases (case_number) WHERE case_number IS NOT NULL;"
+    "CREATE TABLE IF NOT EXISTS hearings ("
+    " case_id INTEGER NOT NULL, hearing_date INTEGER NOT NULL, court TEXT, status TEXT,"
+    " recorded_at REAL NOT NULL, PRIMARY KEY (case_id, hearing_date)) WITHOUT ROWID;"
+    "CREATE TABLE IF NOT EXISTS cause_list_entries ("
+    " complex_id INTEGER NOT NULL, list_date INTEGER NOT NULL, position INTEGER NOT NULL,"
+    " court_id INTEGER NOT NULL, serial_no INTEGER, case_number TEXT, cnr TEXT,"
+    " display_number TEXT, parties TEXT, hearing_time TEXT, purpose TEXT,"
+    " PRIMARY KEY (complex_id, list_date, position)) WITHOUT ROWID;"
+    # Words of each entry's parties (portal.party_terms), for search.CauseListSearch
+    "CREATE TABLE IF NOT EXISTS search_terms (term_id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE);"
+    "CREATE TABLE IF NOT EXISTS search_postings ("
+    " term_id INTEGER NOT NULL, list_date INTEGER NOT NULL, complex_id INTEGER NOT NULL, position INTEGER NOT NULL,"
+    " PRIMARY KEY (term_id, list_date DESC, complex_id, position)) WITHOUT ROWID;"
+)
+
+# Secondary indexes on cause_list_entries; bulk_load() may drop and rebuild them
+ENTRY_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS cause_list_entries_by_case_number"
+    " ON cause_list_entries (case_number, list_date, complex_id, court_id, serial_no)"
+    " WHERE case_number IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS cause_list_entries_by_cnr"
+    " ON cause_list_entries (cnr, list_date, complex_id, court_id, serial_no)"
+    " WHERE cnr IS NOT NULL",
+)
+
+ENTRY_COLUMNS = ("complex_id", "list_date", "position", "court_id", "serial_no", "case_number", "cnr",
+                 "display_number", "parties", "hearing_time", "purpose")
+
+
+def day(date_str):
+    """dd/mm/YYYY or YYYY-MM-DD -> YYYYMMDD int"""
+    return int(iso_date(date_str).replace("-", ""))
+
+
+def day_str(value):
+    """YYYYMMDD int -> dd/mm/YYYY, the API's date format"""
+    return f"{value % 100:02d}/{value // 100 % 100:02d}/{value // 10000}"
+
+
+def _days_back(until, since):
+    """YYYYMMDD ints from until down to since"""
+    current = datetime.strptime(str(until), "%Y%m%d")
+    first = datetime.strptime(str(since), "%Y%m%d")
+    while current >= first:
+        yield int(current.strftime("%Y%m%d"))
+        current -= timedelta(days=1)
+
+
+def _like(text):
+    """LIKE pattern matching text anywhere, with its own % and _ escaped"""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _serial(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CourtStore:
+    """Hierarchy, cases, hearings and cause-list entries in one SQLite database"""
+
+    def __init__(self, path, cache_mb=64):
+        self.path = path
+        self.cache_mb = cache_mb
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # name -> id for complexes and courts; ids are never reused, so every process may cache them
+        self._complex_ids = {}
+        self._court_ids = {}
+        self._complex_codes = {}
+        self._court_names = {}
+        self._term_ids = {}
+        self._terms = {}
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        for statement in ENTRY_INDEXES:
+            conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{int(self.cache_mb) * 1024}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            # Index pages touched by one list save are scattered; checkpoint them in bigger batches
+            conn.execute("PRAGMA wal_autocheckpoint=10000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            # Ids handed out inside the transaction were rolled back with it
+            with self._lock:
+                for names in (self._complex_ids, self._court_ids, self._complex_codes, self._court_names,
+                              self._term_ids, self._terms):
+                    names.clear()
+            raise
+
+    def _id(self, conn, table, column, id_column, value, ids, names):
+        found = ids.get(value)
+        if found is None:
+            conn.execute(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (value,))
+            found = conn.execute(f"SELECT {id_column} FROM {table} WHERE {column} = ?", (value,)).fetchone()[0]
+            with self._lock:
+                ids[value] = found
+                names[found] = value
+        return found
+
+    def _complex_id(self, conn, court_complex):
+        return self._id(conn, "court_complexes", "code", "complex_id", court_complex,
+                        self._complex_ids, self._complex_codes)
+
+    def _court_id(self, conn, court):
+        return self._id(conn, "courts", "name", "court_id", court or "", self._court_ids, self._court_names)
+
+    def _term_id(self, conn, term):
+        return self._id(conn, "search_terms", "term", "term_id", term, self._term_ids, self._terms)
+
+    def _names(self, conn, table, id_column, column, wanted, names):
+        """{id: name} for wanted ids, read through the per-process cache"""
+        found = {value: name for value in wanted if (name := names.get(value)) is not None}
+        missing = [value for value in wanted if value not in found]
+        if missing:
+            rows = conn.execute(f"SELECT {id_column}, {column} FROM {table} WHERE {id_column} IN"
+                                f" ({','.join('?' * len(missing))})", missing).fetchall()
+            found.update(rows)
+            with self._lock:
+                names.update(rows)
+        return found
+
+    # Hierarchy
+
+    def _hierarchy_meta(self, conn, source, bump=True):
+        """Record who last wrote the tree; returns the (possibly bumped) version"""
+        if bump:
+            conn.execute("INSERT INTO store_meta VALUES ('hierarchy_version', 1) ON CONFLICT (name)"
+                         " DO UPDATE SET value = value + 1")
+        conn.executemany("INSERT OR REPLACE INTO store_meta VALUES (?, ?)",
+                         [("hierarchy_source", source), (f"hierarchy_{source}ed_at", time.time())])
+        return self.hierarchy_state(conn)["version"]
+
+    def hierarchy_state(self, conn=None):
+        """{version, source ('seed' or 'sync'), seeded_at, synced_at} of the stored tree"""
+        meta = dict((conn or self._connection()).execute(
+            "SELECT name, value FROM store_meta WHERE name LIKE 'hierarchy%'").fetchall())
+        return {
+            "version": meta.get("hierarchy_version", 0),
+            "source": meta.get("hierarchy_source"),
+            "seeded_at": meta.get("hierarchy_seeded_at"),
+            "synced_at": meta.get("hierarchy_synced_at"),
+        }
+
+    def hierarchy_version(self):
+        """Bumped by every write to the tree; 0 if it was never stored"""
+        row = self._connection().execute(
+            "SELECT value FROM store_meta WHERE name = 'hierarchy_version'").fetchone()
+        return row[0] if row else 0
+
+    def load_hierarchy(self, hierarchy):
+        """Replace the stored tree with a HierarchyIndex's"""
+        with self._transaction() as conn:
+            for table in ("states", "districts", "taluks", "complex_courts"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("UPDATE court_complexes SET district_code = NULL")
+            conn.executemany("INSERT INTO states VALUES (?, ?)",
+                             ((row["code"], row["name"]) for row in hierarchy.state_rows))
+            conn.executemany("INSERT INTO districts VALUES (?, ?, ?)",
+                             ((row["district_code"], row["state_code"], row["district_name"])
+                              for row in hierarchy.districts()))
+            conn.executemany("INSERT OR IGNORE INTO taluks VALUES (?, ?)",
+                             ((row["district_code"], row["taluk_name"]) for row in hierarchy.taluks()))
+            for _, district_code, complex_code in hierarchy.iter_complexes():
+                complex_id = self._complex_id(conn, complex_code)
+                conn.execute("UPDATE court_complexes SET district_code = ? WHERE complex_id = ?",
+                             (district_code, complex_id))
+                conn.executemany("INSERT OR IGNORE INTO complex_courts VALUES (?, ?)",
+                                 ((complex_id, court) for court in hierarchy.courts(complex_code)))
+            self._hierarchy_meta(conn, "seed")
+
+    def seed_hierarchy(self, hierarchy):
+        """Store the built-in tree unless a sync has replaced it or it is already stored; True if written"""
+        state = self.hierarchy_state()
+        if state["source"] == "sync" or (state["version"] and self.hierarchy_data() == hierarchy.data()):
+            return False
+        self.load_hierarchy(hierarchy)
+        return True
+
+    def hierarchy_data(self):
+        """The stored tree as a hierarchy dict (INDIAN_COURTS_DATA's shape, plus "courts")"""
+        conn = self._connection()
+        taluks, complexes, courts = {}, {}, {}
+        for district_code, name in conn.execute("SELECT district_code, name FROM taluks ORDER BY rowid"):
+            taluks.setdefault(district_code, []).append(name)
+        for code, district_code in conn.execute(
+                "SELECT code, district_code FROM court_complexes WHERE district_code IS NOT NULL"
+                " ORDER BY complex_id"):
+            complexes.setdefault(district_code, []).append(code)
+        for code, name in conn.execute(
+                "SELECT code, name FROM complex_courts JOIN court_complexes USING (complex_id)"
+                " ORDER BY complex_courts.rowid"):
+            courts.setdefault(code, []).append(name)
+        states = {code: {"code": code, "name": name, "districts": []} for code, name in conn.execute(
+            "SELECT state_code, name FROM states ORDER BY rowid")}
+        for code, state_code, name in conn.execute(
+                "SELECT district_code, state_code, name FROM districts ORDER BY rowid"):
+            if state_code in states:
+                states[state_code]["districts"].append({
+                    "code": code, "name": name, "taluks": taluks.get(code, []),
+                    "court_complexes": complexes.get(code, [])})
+        data = {"states": list(states.values())}
+        if courts:
+            data["courts"] = courts
+        return data
+
+    def apply_hierarchy_changes(self, changes):
+        """Apply hierarchy_sync.diff_trees() changes in one transaction; returns the new version.
+
+        With no changes only the sync time is recorded.
+        """
+        with self._transaction() as conn:
+            for op, key, value in changes:
+                kind, code = key[0], key[1]
+                if kind == "state":
+                    if op == "remove":
+                        conn.execute("DELETE FROM states WHERE state_code = ?", (code,))
+                    else:
+                        conn.execute("INSERT INTO states VALUES (?, ?) ON CONFLICT (state_code)"
+                                     " DO UPDATE SET name = excluded.name", (code, value))
+                elif kind == "district":
+                    if op == "remove":
+                        conn.execute("DELETE FROM districts WHERE district_code = ?", (code,))
+                        conn.execute("DELETE FROM taluks WHERE district_code = ?", (code,))
+                    else:
+                        conn.execute("INSERT INTO districts VALUES (?, ?, ?) ON CONFLICT (district_code)"
+                                     " DO UPDATE SET state_code = excluded.state_code, name = excluded.name",
+                                     (code,) + tuple(value))
+                elif kind == "complex":
+                    # Complex ids stay (cause-list entries refer to them); removal only detaches
+                    complex_id = self._complex_id(conn, code)
+                    conn.execute("UPDATE court_complexes SET district_code = ? WHERE complex_id = ?",
+                                 (None if op == "remove" else value, complex_id))
+                elif kind == "court":
+                    complex_id = self._complex_id(conn, code)
+                    if op == "remove":
+                        conn.execute("DELETE FROM complex_courts WHERE complex_id = ? AND name = ?",
+                                     (complex_id, key[2]))
+                    else:
+                        conn.execute("INSERT OR IGNORE INTO complex_courts VALUES (?, ?)", (complex_id, key[2]))
+            return self._hierarchy_meta(conn, "sync", bump=bool(changes))
+
+    def complexes(self, district_code):
+        return [code for code, in self._connection().execute(
+            "SELECT code FROM court_complexes WHERE district_code = ? ORDER BY code", (district_code,))]
+
+    # Cause lists
+
+    def _entry_rows(self, conn, complex_id, list_date, entries):
+        court_ids = self._court_ids
+        for position, entry in enumerate(entries):
+            get = entry.get
+            court = get("court") or ""
+            court_id = court_ids.get(court)
+            if court_id is None:
+                court_id = self._court_id(conn, court)
+            serial = get("serial_no")
+            if serial.__class__ is not int:
+                serial = _serial(serial)
+            display = get("case_number") or None
+            cnr = get("cnr")
+            yield (complex_id, list_date, position, court_id, serial,
+                   normalize_case_number(display) or None if display else None,
+                   normalize_cnr(cnr) or None if cnr else None,
+                   display, get("parties"), get("hearing_time"), get("purpose"))
+
+    def _replace_list(self, conn, court_complex, date_str, entries):
+        complex_id = self._complex_id(conn, court_complex)
+        list_date = day(date_str)
+        rows = list(self._entry_rows(conn, complex_id, list_date, entries))
+        count = len(rows)
+        stored = {row[0]: row[1:] for row in conn.execute(
+            f"SELECT {', '.join(ENTRY_COLUMNS[2:])} FROM cause_list_entries"
+            f" WHERE complex_id = ? AND list_date = ?", (complex_id, list_date))}
+        if stored:
+            # A refreshed list mostly repeats the last version; rewrite only the rows that differ
+            conn.execute("DELETE FROM cause_list_entries WHERE complex_id = ? AND list_date = ? AND position >= ?",
+                         (complex_id, list_date, count))
+            rows = [row for row in rows if stored.get(row[2]) != row[3:]]
+        conn.executemany(f"INSERT OR REPLACE INTO cause_list_entries ({', '.join(ENTRY_COLUMNS)})"
+                         f" VALUES ({', '.join('?' * len(ENTRY_COLUMNS))})", rows)
+        self._index_parties(conn, complex_id, list_date, rows, stored, count)
+        return len(rows)
+
+    def _index_parties(self, conn, complex_id, list_date, rows, stored, count):
+        """Update search_postings for the rows just written and the positions at and past count"""
+        term_ids = self._term_ids
+        added = []
+        removed = []
+        for row in rows:
+            position, parties = row[2], row[8]
+            old = stored.get(position)
+            old_parties = old[5] if old else None
+            if parties == old_parties:
+                continue
+            terms = party_terms(parties)
+            if old_parties:
+                old_terms = party_terms(old_parties)
+                removed.extend((term, position) for term in old_terms - terms)
+                terms -= old_terms
+            for term in terms:
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = self._term_id(conn, term)
+                added.append((term_id, list_date, complex_id, position))
+        for position, old in stored.items():
+            if position >= count:
+                removed.extend((term, position) for term in party_terms(old[5]))
+        if removed:
+            conn.executemany("DELETE FROM search_postings"
+                             " WHERE term_id = ? AND list_date = ? AND complex_id = ? AND position = ?",
+                             [(self._term_id(conn, term), list_date, complex_id, position)
+                              for term, position in removed])
+        conn.executemany("INSERT OR IGNORE INTO search_postings VALUES (?, ?, ?, ?)", added)
+
+    def save_cause_list(self, court_complex, date_str, entries):
+        """Replace one list's entries; returns rows written. Signature matches CauseListStore.on_save."""
+        with self._transaction() as conn:
+            return self._replace_list(conn, court_complex, date_str, entries)
+
+    def bulk_load(self, lists, batch_rows=200_000, rebuild_indexes=False):
+        """Ingest (court_complex, date_str, entries) lists, many per transaction; returns rows.
+
+        With rebuild_indexes the secondary indexes are dropped first and
+        built once at the end, which is much faster for a large initial
+        load but leaves case-number and CNR lookups unindexed meanwhile.
+        """
+        conn = self._connection()
+        if rebuild_indexes:
+            conn.execute("DROP INDEX IF EXISTS cause_list_entries_by_case_number")
+            conn.execute("DROP INDEX IF EXISTS cause_list_entries_by_cnr")
+        total = pending = 0
+        try:
+            with self._transaction():
+                for court_complex, date_str, entries in lists:
+                    written = self._replace_list(conn, court_complex, date_str, entries)
+                    total += written
+                    pending += written
+                    if pending >= batch_rows:
+                        conn.execute("COMMIT")
+                        conn.execute("BEGIN IMMEDIATE")
+                        pending = 0
+        finally:
+            if rebuild_indexes:
+                for statement in ENTRY_INDEXES:
+                    conn.execute(statement)
+                conn.execute("ANALYZE cause_list_entries")
+            # Fold the load into the database now rather than on some later request's commit
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return total
+
+    def cause_list(self, court_complex, date_str, court=None):
+        """Stored entries of one list in list order, or None if it was never saved"""
+        conn = self._connection()
+        complex_id = self._complex_ids.get(court_complex)
+        if complex_id is None:
+            row = conn.execute("SELECT complex_id FROM court_complexes WHERE code = ?", (court_complex,)).fetchone()
+            if row is None:
+                return None
+            complex_id = row[0]
+        rows = conn.execute(
+            "SELECT court_id, serial_no, display_number, parties, hearing_time, purpose"
+            " FROM cause_list_entries WHERE complex_id = ? AND list_date = ? ORDER BY position",
+            (complex_id, day(date_str))).fetchall()
+        if not rows:
+            return None
+        courts = self._names(conn, "courts", "court_id", "name", {row[0] for row in rows}, self._court_names)
+        entries = [{
+            "serial_no": serial,
+            "case_number": display,
+            "parties": parties,
+            "court": courts[court_id],
+            "hearing_time": hearing_time,
+            "purpose": purpose
+        } for court_id, serial, display, parties, hearing_time, purpose in rows]
+        if court:
+            court = court.lower()
+            entries = [entry for entry in entries if court in entry["court"].lower()]
+        return entries
+
+    def listings(self, case_number=None, cnr=None, since=None):
+        """Where a case is listed, by normalised case number and/or CNR, oldest first.
+
+        Rows match ListingIndex.lookup: {date, court_complex, court, serial_no}.
+        """
+        conn = self._connection()
+        rows = []
+        for column, value in (("case_number", case_number), ("cnr", cnr)):
+            if not value:
+                continue
+            query = (f"SELECT list_date, complex_id, court_id, serial_no FROM cause_list_entries"
+                     f" WHERE {column} = ?")
+            params = [value]
+            if since:
+                query += " AND list_date >= ?"
+                params.append(day(since))
+            rows.extend(conn.execute(query, params).fetchall())
+        rows = sorted(set(rows))
+        complexes = self._names(conn, "court_complexes", "complex_id", "code", {row[1] for row in rows},
+                                self._complex_codes)
+        courts = self._names(conn, "courts", "court_id", "name", {row[2] for row in rows}, self._court_names)
+        return [{
+            "date": day_str(list_date),
+            "court_complex": complexes[complex_id],
+            "court": courts[court_id],
+            "serial_no": serial
+        } for list_date, complex_id, court_id, serial in rows]
+
+    # Search
+
+    def search_terms(self, after=0):
+        """[(term_id, term)] of search words added after term_id `after`"""
+        return self._connection().execute(
+            "SELECT term_id, term FROM search_terms WHERE term_id > ? ORDER BY term_id", (after,)).fetchall()
+
+    def postings(self, term_id, since=None, until=None, complex_ids=None):
+        """Yield (list_date, complex_id, position) of entries whose parties contain a word, newest first.
+
+        Dates are YYYYMMDD ints. Given complex_ids and a range of up to
+        two months, each day is one index seek per complex; otherwise
+        the word's postings are scanned and the caller filters complexes.
+        """
+        conn = self._connection()
+        if complex_ids and since and until and (
+                datetime.strptime(str(until), "%Y%m%d") - datetime.strptime(str(since), "%Y%m%d")).days <= 62:
+            complex_ids = sorted(complex_ids)
+            query = (f"SELECT list_date, complex_id, position FROM search_postings"
+                     f" WHERE term_id = ? AND list_date = ? AND complex_id IN ({','.join('?' * len(complex_ids))})"
+                     f" ORDER BY complex_id, position")
+            for list_date in _days_back(until, since):
+                yield from conn.execute(query, (term_id, list_date, *complex_ids))
+            return
+        query = "SELECT list_date, complex_id, position FROM search_postings WHERE term_id = ?"
+        params = [term_id]
+        if since:
+            query += " AND list_date >= ?"
+            params.append(since)
+        if until:
+            query += " AND list_date <= ?"
+            params.append(until)
+        yield from conn.execute(query + " ORDER BY list_date DESC, complex_id, position", params)
+
+    def count_postings(self, term_ids, since=None, until=None, cap=10_000):
+        """Entries containing any of term_ids, counted up to cap (a selectivity estimate)"""
+        query = (f"SELECT 1 FROM search_postings WHERE term_id IN ({','.join('?' * len(term_ids))})"
+                 f" AND list_date BETWEEN ? AND ? LIMIT ?")
+        return self._connection().execute(f"SELECT COUNT(*) FROM ({query})",
+                                          (*term_ids, since or 0, until or 99999999, cap)).fetchone()[0]
+
+    def case_number_keys(self, prefix, since=None, until=None, cap=100_000):
+        """(list_date, complex_id, position) of up to cap entries whose normalised case number starts with prefix"""
+        query = ("SELECT list_date, complex_id, position FROM cause_list_entries"
+                 " WHERE case_number >= ? AND case_number < ?")
+        params = [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+        if since:
+            query += " AND list_date >= ?"
+            params.append(since)
+        if until:
+            query += " AND list_date <= ?"
+            params.append(until)
+        return self._connection().execute(query + " LIMIT ?", params + [cap]).fetchall()
+
+    def entry(self, complex_id, list_date, position):
+        """(court_id, serial_no, display_number, parties, hearing_time, purpose) of one entry, or None"""
+        return self._connection().execute(
+            "SELECT court_id, serial_no, display_number, parties, hearing_time, purpose FROM cause_list_entries"
+            " WHERE complex_id = ? AND list_date = ? AND position = ?", (complex_id, list_date, position)).fetchone()
+
+    def complex_ids(self, text):
+        """Ids of the complex named text or, failing that, of complexes whose name contains it"""
+        conn = self._connection()
+        return {complex_id for complex_id, in conn.execute(
+            "SELECT complex_id FROM court_complexes WHERE code = ?", (text,)).fetchall() or conn.execute(
+            "SELECT complex_id FROM court_complexes WHERE code LIKE ? ESCAPE '\\'", (_like(text),))}
+
+    def court_ids(self, text):
+        """Ids of courts whose name contains text (case-insensitive)"""
+        return {court_id for court_id, in self._connection().execute(
+            "SELECT court_id FROM courts WHERE name LIKE ? ESCAPE '\\'", (_like(text),))}
+
+    def describe_entries(self, rows):
+        """API rows, with complex and court names, for (list_date, complex_id, court_id, serial_no,
+        display_number, parties, hearing_time, purpose) tuples"""
+        conn = self._connection()
+        complexes = self._names(conn, "court_complexes", "complex_id", "code", {row[1] for row in rows},
+                                self._complex_codes)
+        courts = self._names(conn, "courts", "court_id", "name", {row[2] for row in rows}, self._court_names)
+        return [{
+            "date": day_str(list_date),
+            "court_complex": complexes[complex_id],
+            "court": courts[court_id],
+            "serial_no": serial,
+            "case_number": display,
+            "parties": parties,
+            "hearing_time": hearing_time,
+            "purpose": purpose
+        } for list_date, complex_id, court_id, serial, display, parties, hearing_time, purpose in rows]
+
+    # Cases and hearings
+
+    def save_case(self, result, fetched_at=None):
+        """Upsert a case from an /api/search result and record its next hearing; returns case_id"""
+        if "error" in result:
+            return None
+        cnr = normalize_cnr(result.get("cnr")) or None
+        display = result.get("case_number") or None
+        case_number = normalize_case_number(display or "") or None
+        if cnr is None and case_number is None:
+            return None
+        hearing = result.get("hearing_date")
+        try:
+            next_hearing = day(hearing) if hearing else None
+        except ValueError:
+            next_hearing = None
+        now = fetched_at or time.time()
+        values = (case_number, display, result.get("parties"), result.get("court"), result.get("status"),
+                  next_hearing, now)
+
+        with self._transaction() as conn:
+            if cnr is not None:
+                row = conn.execute("SELECT case_id FROM cases WHERE cnr = ?", (cnr,)).fetchone()
+            else:
+                row = conn.execute("SELECT case_id FROM cases WHERE case_number = ? AND cnr IS NULL",
+                                   (case_number,)).fetchone()
+            if row is None:
+                case_id = conn.execute(
+                    "INSERT INTO cases (cnr, case_number, display_number, parties, court, status, next_hearing,"
+                    " updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (cnr,) + values).lastrowid
+            else:
+                case_id = row[0]
+                conn.execute("UPDATE cases SET case_number = ?, display_number = ?, parties = ?, court = ?,"
+                             " status = ?, next_hearing = ?, updated_at = ? WHERE case_id = ?", values + (case_id,))
+            if next_hearing is not None:
+                conn.execute("INSERT OR REPLACE INTO hearings VALUES (?, ?, ?, ?, ?)",
+                             (case_id, next_hearing, result.get("court"), result.get("status"), now))
+        return case_id
+
+    def case(self, cnr=None, case_number=None):
+        """A stored case with its hearings, by CNR or normalised case number; None if unknown"""
+        conn = self._connection()
+        columns = "case_id, cnr, case_number, display_number, parties, court, status, next_hearing, updated_at"
+        if cnr:
+            row = conn.execute(f"SELECT {columns} FROM cases WHERE cnr = ?", (cnr,)).fetchone()
+        elif case_number:
+            row = conn.execute(f"SELECT {columns} FROM cases WHERE case_number = ?"
+                               f" ORDER BY updated_at DESC LIMIT 1", (case_number,)).fetchone()
+        else:
+            row = None
+        if row is None:
+            return None
+        case_id, cnr, case_number, display, parties, court, status, next_hearing, updated_at = row
+        return {
+            "cnr": cnr,
+            "case_number": display or case_number,
+            "parties": parties,
+            "court": court,
+            "status": status,
+            "hearing_date": day_str(next_hearing) if next_hearing else None,
+            "updated_at": updated_at,
+            "hearings": [{"date": day_str(hearing_date), "court": hearing_court, "status": hearing_status}
+                         for hearing_date, hearing_court, hearing_status in conn.execute(
+                             "SELECT hearing_date, court, status FROM hearings WHERE case_id = ?"
+                             " ORDER BY hearing_date", (case_id,))]
+        }
@@ -0,0 +1,33 @@
+"""Shared fixtures: the backend and its benchmarks' stub portal on sys.path, SQLite files under tmp_path"""
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
+
+from stub_portal import start_stub_portal  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    """A stub portal with no latency or failures; tests add routes to server.routes"""
+    server, base_url = start_stub_portal()
+    server.base_url = base_url
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def sequence_route(*statuses, body="ok"):
+    """A stub route answering with each status in turn, then the last one; .calls counts requests"""
+    remaining = list(statuses)
+
+    def route(query):
+        route.calls += 1
+        status = remaining.pop(0) if len(remaining) > 1 else remaining[0]
+        return status, body, "text/plain"
+    route.calls = 0
+    return route
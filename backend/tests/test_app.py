@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BACKEND
+
+IMPORT_ONLY = """
+import threading, app
+assert app.scraper is None and app.HOUSEKEEPING is None
+assert threading.active_count() == 1, threading.enumerate()
+"""
+
+
+def test_importing_app_builds_no_worker_state(tmp_path):
+    env = dict(os.environ, CAUSE_LIST_DB=str(tmp_path / "cause_lists.db"), COURT_DB=str(tmp_path / "court.db"),
+               WATCHLIST_DB=str(tmp_path / "watchlists.db"), HIERARCHY_SNAPSHOT=str(tmp_path / "hierarchy.snapshot"))
+    env.pop("ECOURTS_PRELOAD", None)
+    static = os.path.join(BACKEND, "static")
+    before = sorted(os.listdir(static)) if os.path.isdir(static) else None
+    subprocess.run([sys.executable, "-c", IMPORT_ONLY], cwd=BACKEND, env=env, check=True)
+    assert os.listdir(tmp_path) == []
+    assert (sorted(os.listdir(static)) if os.path.isdir(static) else None) == before
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The app's test client, on a mock-data scraper with its stores under tmp_path"""
+    import app
+    from cause_lists import CauseListStore
+    from storage import CourtStore
+    from watchlists import Watchlists
+    scraper = app.ECourtsScraper(
+        live=False, cause_list_store=CauseListStore(str(tmp_path / "cause_lists.db")),
+        store=CourtStore(str(tmp_path / "court.db")),
+        watchlists=Watchlists(str(tmp_path / "watchlists.db"), allow_private_webhooks=True))
+    monkeypatch.setattr(app, "scraper", scraper)
+    yield app.app.test_client()
+    scraper.watchlists.notifier.stop()
+    scraper.parsers.close()
+
+
+def test_watchlists_are_managed_with_their_secret(client):
+    created = client.post("/api/watchlists", json={"user_id": "u1", "webhook_url": "http://localhost/hook"})
+    secret = created.get_json()["secret"]
+    owner = {"Authorization": f"Bearer {secret}"}
+    takeover = {"user_id": "u1", "webhook_url": "http://localhost/theirs", "secret": "theirs"}
+    assert client.post("/api/watchlists", json=takeover).status_code == 403
+    assert client.post("/api/watchlists", json=takeover, headers={"Authorization": "Bearer theirs"}).status_code == 403
+    assert client.get("/api/watchlists/u1").status_code == 403
+    assert client.post("/api/watchlists/u1/cases", json={"cases": ["DLHI010001232024"]}).status_code == 403
+    assert client.get("/api/watchlists/nobody", headers=owner).status_code == 404
+
+    assert client.post("/api/watchlists/u1/cases", json={"cases": ["DLHI010001232024"]},
+                       headers=owner).status_code == 200
+    assert client.get("/api/watchlists/u1", headers=owner).get_json()["cases"] == ["DLHI010001232024"]
+    moved = client.post("/api/watchlists", json=dict(takeover, webhook_url="http://localhost/moved"), headers=owner)
+    assert moved.status_code == 200 and "secret" not in moved.get_json()
+    assert client.get("/api/watchlists/u1", headers={"Authorization": "Bearer theirs"}).get_json()[
+        "webhook_url"] == "http://localhost/moved"
+
+
+def test_cause_list_pdfs_allow_rows_without_a_court_and_pass_on_portal_outages(client, monkeypatch):
+    import app
+    rows = [{"serial_no": 1, "case_number": "OS/1/2024", "parties": "A vs. B", "purpose": "Hearing", "court": "Court 2"},
+            {"serial_no": 2, "case_number": "OS/2/2024", "parties": "C vs. D", "purpose": "Hearing", "court": None}]
+    listed = {"success": True, "filename": "cause_list_today", "date": "20/10/2026", "entries": iter(rows)}
+    monkeypatch.setattr(app.scraper, "download_cause_list", lambda *args, **kwargs: listed)
+    pdf = client.post("/api/download-cause-list", json={"date_type": "today"})
+    assert pdf.status_code == 200 and pdf.mimetype == "application/pdf"
+
+    down = {"error": "Portal unavailable: circuit open", "retry_after": 12.4}
+    monkeypatch.setattr(app.scraper, "download_cause_list", lambda *args, **kwargs: down)
+    response = client.post("/api/download-cause-list", json={"date_type": "today"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "12"
@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from batch import CAUSE_LISTS, BatchRun, Checkpoint, cause_list_items, open_sink
+
+
+class Lists:
+    """Stands in for the scraper: two entries per list, and KA03's portal is down"""
+
+    base_url = "http://portal.invalid/"
+
+    def __init__(self):
+        self.fetched = []
+
+    def fetch_cause_list(self, court_complex, date_str):
+        self.fetched.append((court_complex, date_str))
+        if court_complex == "KA03":
+            raise ConnectionError("portal down")
+        return [{"serial_no": n, "case_number": f"OS/{n}/2024", "parties": f"{court_complex} party {n}",
+                 "court": "Court 1", "purpose": "Hearing"} for n in (1, 2)]
+
+
+ITEMS = cause_list_items(["KA01", "KA02", "KA03", "KA04"], ["20/10/2026"])
+JOB = {"kind": CAUSE_LISTS}
+
+
+def run(tmp_path, out, fmt, items=ITEMS, retry_failed=False):
+    """One batch run over items into out, resuming from the checkpoint beside it; (scraper, stats)"""
+    checkpoint = Checkpoint(str(tmp_path / "run.checkpoint"), dict(JOB, format=fmt))
+    scraper = Lists()
+    sink = open_sink(str(out), fmt, CAUSE_LISTS, checkpoint.sink_state())
+    stats = BatchRun(scraper, CAUSE_LISTS, sink, checkpoint, workers=2, store=False, checkpoint_every=1,
+                     report=lambda line: None).run(items, retry_failed)
+    checkpoint.close()
+    return scraper, stats
+
+
+def test_ndjson_resumes_from_the_committed_offset(tmp_path):
+    out = tmp_path / "lists.ndjson"
+    _, stats = run(tmp_path, out, "ndjson", ITEMS[:2])
+    assert (stats["done"], stats["rows"]) == (2, 4)
+    # A run killed after writing rows it never checkpointed
+    with open(out, "a", encoding="utf-8") as f:
+        f.write('{"list_date": "2026-10-20", "court_complex": "KA04", "serial_no": 1}\n{"list_da')
+
+    scraper, stats = run(tmp_path, out, "ndjson")
+    assert sorted(scraper.fetched) == [("KA03", "20/10/2026"), ("KA04", "20/10/2026")]
+    assert stats["failures"] == {"KA03|20/10/2026": "ConnectionError: portal down"}
+    with open(out, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert sorted((row["court_complex"], row["serial_no"]) for row in rows) == [
+        (code, n) for code in ("KA01", "KA02", "KA04") for n in (1, 2)]
+
+    scraper, _ = run(tmp_path, out, "ndjson")
+    assert scraper.fetched == []
+    scraper, _ = run(tmp_path, out, "ndjson", retry_failed=True)
+    assert scraper.fetched == [("KA03", "20/10/2026")]
+
+
+def test_parquet_resumes_without_parts_written_after_the_checkpoint(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = tmp_path / "lists.parquet"
+    run(tmp_path, out, "parquet", ITEMS[:2])
+    assert sorted(os.listdir(out)) == ["part-00000.parquet", "part-00001.parquet"]
+    # Parts from a killed run: one finished after the last checkpoint, one half written
+    (out / "part-00002.parquet").write_bytes((out / "part-00001.parquet").read_bytes())
+    (out / "part-00003.parquet.partial").write_bytes(b"PAR1")
+
+    run(tmp_path, out, "parquet")
+    assert sorted(os.listdir(out)) == ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet"]
+    table = pq.read_table(str(out))
+    assert sorted(zip(table.column("court_complex").to_pylist(), table.column("serial_no").to_pylist())) == [
+        (code, n) for code in ("KA01", "KA02", "KA04") for n in (1, 2)]
+
+
+def test_a_checkpoint_belongs_to_one_run(tmp_path):
+    Checkpoint(str(tmp_path / "run.checkpoint"), dict(JOB, format="ndjson")).close()
+    with pytest.raises(ValueError):
+        Checkpoint(str(tmp_path / "run.checkpoint"), dict(JOB, format="parquet"))
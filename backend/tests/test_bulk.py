@@ -0,0 +1,114 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+from conftest import sequence_route
+from transport import Transport
+
+
+@pytest.fixture
+def make_scraper(stub, tmp_path):
+    """A live scraper on the stub portal, with a Transport built from the given options and stores under tmp_path"""
+    from app import ECourtsScraper
+    from cause_lists import CauseListStore
+    from storage import CourtStore
+    from watchlists import Watchlists
+    built = []
+
+    def make(**transport_options):
+        n = len(built)
+        scraper = ECourtsScraper(
+            live=True, base_url=stub.base_url + "/",
+            transport=Transport(**dict({"rate_per_host": 1000, "burst_per_host": 1000}, **transport_options)),
+            cause_list_store=CauseListStore(str(tmp_path / f"cause_lists{n}.db")),
+            store=CourtStore(str(tmp_path / f"court{n}.db")),
+            watchlists=Watchlists(str(tmp_path / f"watchlists{n}.db")))
+        built.append(scraper)
+        return scraper
+    yield make
+    for scraper in built:
+        scraper.watchlists.notifier.stop()
+        scraper.transport.close()
+        scraper.parsers.close()
+
+
+@pytest.fixture
+def scraper(make_scraper):
+    return make_scraper()
+
+
+def cnr_batch(count):
+    from bulk import parse_batch
+    return parse_batch([f"DLHI01{n:06d}2024" for n in range(count)])
+
+
+def concurrency_route(stub):
+    """Wraps the stub's CNR page to record the most requests it had in flight at once"""
+    from stub_portal import case_by_cnr_route
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0}
+
+    def route(query):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.05)
+        with lock:
+            state["now"] -= 1
+        return case_by_cnr_route(query)
+    stub.routes["cnr_status/searchByCNR"] = route
+    return state
+
+
+def test_duplicate_cases_in_a_batch_go_upstream_once(stub, scraper):
+    from bulk import BulkCaseLookup, parse_batch
+    stub.latency = 0.05
+    cases = parse_batch(["DLHI010000012024"] * 20 + ["DLHI010000022024"] * 20)
+    results = BulkCaseLookup(scraper, concurrency=16).lookup(cases)
+    assert all("error" not in result for result in results), results[0]
+    assert stub.paths["cnr_status/searchByCNR"] == 2
+    stats = scraper.case_cache.stats()
+    assert (stats["misses"], stats["coalesced"] + stats["hits"]) == (2, 38)
+
+
+def test_attempts_stay_under_the_hosts_concurrency_limit(stub, make_scraper):
+    from bulk import BulkCaseLookup
+    state = concurrency_route(stub)
+    scraper = make_scraper(limiter={"initial_limit": 3, "min_limit": 3, "max_limit": 3}, limit_wait=10.0)
+    results = BulkCaseLookup(scraper, concurrency=16).lookup(cnr_batch(24))
+    assert all("error" not in result for result in results)
+    assert state["peak"] == 3
+    host = urlsplit(stub.base_url).netloc
+    assert scraper.transport.host_states()[host]["concurrency"]["in_flight"] == 0
+
+
+def test_lookups_refused_a_slot_get_an_error(stub, make_scraper):
+    from bulk import BulkCaseLookup
+    concurrency_route(stub)
+    scraper = make_scraper(limiter={"initial_limit": 1, "min_limit": 1, "max_limit": 1}, limit_wait=0.01)
+    results = BulkCaseLookup(scraper, concurrency=8).lookup(cnr_batch(8))
+    refused = [result for result in results if "concurrency limit" in result.get("error", "")]
+    assert refused and len(refused) < 8
+    assert scraper.transport.metrics.snapshot()["rejected"] == len(refused)
+
+
+def test_attempts_take_the_hosts_rate_limit_tokens(make_scraper):
+    from bulk import BulkCaseLookup
+    scraper = make_scraper(rate_per_host=40, burst_per_host=1)
+    started = time.monotonic()
+    results = BulkCaseLookup(scraper, concurrency=16).lookup(cnr_batch(9))
+    assert all("error" not in result for result in results)
+    assert time.monotonic() - started >= 8 / 40
+
+
+def test_failing_host_trips_the_breaker_for_the_rest_of_the_batch(stub, make_scraper):
+    from bulk import BulkCaseLookup
+    stub.routes["cnr_status/searchByCNR"] = sequence_route(503)
+    scraper = make_scraper(breaker={"window": 4, "min_calls": 4, "open_seconds": 60})
+    results = BulkCaseLookup(scraper, concurrency=2, max_retries=0).lookup(cnr_batch(20))
+    assert all("error" in result for result in results)
+    host = urlsplit(stub.base_url).netloc
+    assert scraper.transport.host_states()[host]["circuit"]["state"] == "open"
+    assert stub.routes["cnr_status/searchByCNR"].calls < 20
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from case_cache import CaseStatusCache, ttl_for
+
+CASE = {"cnr": "DLHI010000012024", "status": "Pending"}
+
+
+def test_ttl_follows_what_the_result_says():
+    assert ttl_for({"status": "Disposed"}) == 3 * 24 * 3600
+    assert ttl_for({"status": "Pending", "listed_today": True}) == 5 * 60
+    assert ttl_for({"error": "Portal returned HTTP 500"}) == 0
+
+
+def test_concurrent_threads_share_one_fetch():
+    cache = CaseStatusCache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return dict(CASE)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [CASE] * 8
+    assert cache.get("k") == CASE
+
+
+def test_tasks_and_threads_share_one_flight():
+    cache = CaseStatusCache()
+    calls = []
+
+    def fetch():
+        calls.append("thread")
+        time.sleep(0.2)
+        return dict(CASE)
+
+    async def fetch_async():
+        calls.append("task")
+        return dict(CASE)
+
+    leader = threading.Thread(target=cache.get_or_fetch, args=("k", fetch))
+    leader.start()
+    time.sleep(0.05)
+
+    async def batch():
+        return await asyncio.gather(*(cache.get_or_fetch_async("k", fetch_async) for _ in range(5)))
+
+    assert asyncio.run(batch()) == [CASE] * 5
+    leader.join()
+    assert calls == ["thread"]
+    assert cache.stats()["coalesced"] == 5
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = CaseStatusCache()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise ValueError("portal down")
+
+    async def batch():
+        return await asyncio.gather(*(cache.get_or_fetch_async("k", fail) for _ in range(3)),
+                                    return_exceptions=True)
+
+    assert [str(error) for error in asyncio.run(batch())] == ["portal down"] * 3
+    assert cache.get("k") is None
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_cancelled_leader_fails_its_waiters_without_cancelling_them():
+    cache = CaseStatusCache()
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_fetch_async("k", slow))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_fetch_async("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(RuntimeError, match="abandoned"):
+            await waiter
+        assert leader.cancelled()
+
+    asyncio.run(run())
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_disk_tier_is_shared_and_purged(tmp_path):
+    path = str(tmp_path / "cases.db")
+    CaseStatusCache(db_path=path).set("k", dict(CASE))
+    other = CaseStatusCache(db_path=path)
+    assert other.get("k") == CASE
+    assert other.stats()["disk_hits"] == 1
+    assert other.disk.purge_expired() == 0
+    assert other.disk.purge_expired(now=time.time() + 7 * 3600) == 1
+    assert CaseStatusCache(db_path=path).get("k") is None
@@ -0,0 +1,30 @@
+import glob
+import json
+import os
+
+import pytest
+
+from cause_list_pdf import parse_cause_list_pdf, render_cause_list_pdf
+from cause_lists import iter_mock_cause_list
+from conftest import BACKEND
+
+FIXTURES = sorted(glob.glob(os.path.join(BACKEND, "fixtures", "cause_lists", "*.pdf")))
+FIELDS = ("serial_no", "case_number", "parties", "purpose", "court")
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_fixture_lists_parse_to_their_expected_rows(path):
+    with open(path[:-len(".pdf")] + ".expected.json", encoding="utf-8") as f:
+        expected = json.load(f)
+    parsed = parse_cause_list_pdf(path, workers=1)
+    assert [{key: row[key] for key in FIELDS} for row in parsed["rows"]] == expected
+
+
+def test_parses_page_ranges_in_worker_processes():
+    entries = sorted(iter_mock_cause_list(200, seed=1), key=lambda entry: entry["court"])
+    pdf = render_cause_list_pdf(entries, "20/10/2026")
+    inline = parse_cause_list_pdf(pdf, workers=1, pages_per_task=2)
+    pooled = parse_cause_list_pdf(pdf, workers=2, pages_per_task=2)
+    assert inline["pages"] > 2
+    assert pooled == inline
+    assert [row["case_number"] for row in pooled["rows"]] == [entry["case_number"] for entry in entries]
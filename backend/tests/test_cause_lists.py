@@ -0,0 +1,42 @@
+import logging
+import os
+import time
+
+from cause_lists import ArtifactStore, CauseListStore, iter_mock_cause_list
+
+
+def test_artifacts_appear_only_when_complete(tmp_path):
+    artifacts = ArtifactStore(str(tmp_path))
+    stream = artifacts.tee("KA01:2026-10-20", "json", iter([b"[", b"]"]))
+    next(stream)
+    assert artifacts.fresh("KA01:2026-10-20", "json") is None
+    stream.close()
+    assert os.listdir(tmp_path) == []
+    assert b"".join(artifacts.tee("KA01:2026-10-20", "json", iter([b"[", b"]"]))) == b"[]"
+    assert artifacts.fresh("KA01:2026-10-20", "json") is not None
+
+
+def test_purge_removes_expired_artifacts(tmp_path):
+    artifacts = ArtifactStore(str(tmp_path), max_age=60)
+    for key in ("old", "new"):
+        b"".join(artifacts.tee(key, "csv", iter([b"x"])))
+    expired = time.time() - 120
+    os.utime(artifacts.path_for("old", "csv"), (expired, expired))
+    assert artifacts.purge() == 1
+    assert artifacts.fresh("old", "csv") is None
+    assert artifacts.fresh("new", "csv") is not None
+
+
+def test_failing_listener_is_logged_and_save_goes_on(tmp_path, caplog):
+    store = CauseListStore(str(tmp_path / "lists.db"))
+    heard = []
+
+    def broken(*args):
+        raise ValueError("boom")
+
+    store.on_save(broken)
+    store.on_save(lambda court_complex, date_str, entries: heard.append(court_complex))
+    with caplog.at_level(logging.ERROR, logger="cause_lists"):
+        assert store.save("KA01", "20/10/2026", iter_mock_cause_list(3, seed=1)) == 3
+    assert heard == ["KA01"]
+    assert "Cause list listener failed for KA01 20/10/2026" in caplog.text
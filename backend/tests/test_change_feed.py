@@ -0,0 +1,92 @@
+import json
+import sqlite3
+
+import pytest
+
+from change_feed import ChangeFeed, diff_rows, entry_hash
+
+
+def entry(serial, case_number, **fields):
+    return dict({"serial_no": serial, "case_number": case_number, "parties": f"{case_number} parties",
+                 "court": "Court 1", "hearing_time": "10:30", "purpose": "Hearing"}, **fields)
+
+
+def numbered(entries):
+    return [dict(item, serial_no=n) for n, item in enumerate(entries, 1)]
+
+
+def rows(entries):
+    return [(entry_hash(item), item["serial_no"], item) for item in entries]
+
+
+@pytest.fixture
+def feed(tmp_path):
+    return ChangeFeed(str(tmp_path / "feed.db"))
+
+
+def test_entry_hash_covers_only_content_fields():
+    base = entry(1, "OS/1/2024")
+    assert entry_hash(dict(base, serial_no=7)) == entry_hash(base)
+    assert entry_hash(dict(base, page=3)) == entry_hash(base)
+    assert entry_hash(dict(base, purpose="Arguments")) != entry_hash(base)
+    assert entry_hash(dict(base, court="Court 2")) != entry_hash(base)
+
+
+def test_insertion_is_one_added_event():
+    old = numbered([entry(0, f"OS/{n}/2024") for n in range(5)])
+    new = numbered(old[:2] + [entry(0, "CS/9/2024")] + old[2:])
+    assert diff_rows(rows(old), rows(new)) == [("added", None, 3, new[2])]
+
+
+def test_removal_and_move():
+    old = numbered([entry(0, f"OS/{n}/2024") for n in range(5)])
+    new = numbered([old[4], old[0], old[1], old[3]])
+    changes = diff_rows(rows(old), rows(new))
+    assert sorted((op, old_serial, serial) for op, old_serial, serial, _ in changes) == [
+        ("moved", 5, 1), ("removed", 3, None)]
+
+
+def test_duplicate_entries_match_one_for_one():
+    same = entry(0, "OS/1/2024")
+    old = numbered([same, same])
+    new = numbered([same, same, same])
+    assert [op for op, _, _, _ in diff_rows(rows(old), rows(new))] == ["added"]
+
+
+def test_page_numbers_from_the_pdf_parser_are_not_changes(feed):
+    listed = numbered([entry(0, f"OS/{n}/2024") for n in range(40)])
+    assert feed.record("KA01", "20/10/2026", listed) == 40
+    # The same list parsed from a PDF, with one case inserted and page numbers shifting after it
+    parsed = numbered(listed[:10] + [entry(0, "CS/9/2024")] + listed[10:])
+    parsed = [dict(item, page=1 + n // 15) for n, item in enumerate(parsed)]
+    assert feed.record("KA01", "20/10/2026", parsed) == 1
+    change = feed.changes(cursor=40)
+    assert [(c["op"], c["serial_no"], c["entry"]["case_number"]) for c in change] == [("added", 11, "CS/9/2024")]
+
+
+def test_versions_stored_under_an_older_hash_still_match(feed):
+    listed = numbered([entry(0, f"OS/{n}/2024") for n in range(3)])
+    feed.record("KA01", "20/10/2026", listed)
+    conn = sqlite3.connect(feed.path)
+    conn.execute("UPDATE cause_list_versions SET rows = ?",
+                 (json.dumps([["stale-hash", item["serial_no"], item] for item in listed]),))
+    conn.commit()
+    assert feed.record("KA01", "20/10/2026", listed) == 0
+
+
+def test_changes_filter_and_cursor(feed):
+    feed.record("KA01", "20/10/2026", numbered([entry(0, "OS/1/2024")]))
+    feed.record("KA02", "20/10/2026", numbered([entry(0, "OS/2/2024", court="Court 2")]))
+    assert feed.latest() == 2
+    assert [c["court_complex"] for c in feed.changes(0, court_complex="KA02")] == ["KA02"]
+    assert [c["seq"] for c in feed.changes(1)] == [2]
+    assert feed.changes(0, date_str="2026-10-21") == []
+
+
+def test_purge_drops_lists_dated_before_the_window(feed):
+    feed.record("KA01", "01/01/2020", numbered([entry(0, "OS/1/2024")]))
+    feed.record("KA01", "20/10/2099", numbered([entry(0, "OS/2/2024")]))
+    assert feed.purge(days=30) == 1
+    assert [c["date"] for c in feed.changes()] == ["2099-10-20"]
+    # The old list's version went too, so it starts over as all added
+    assert feed.record("KA01", "01/01/2020", numbered([entry(0, "OS/1/2024")])) == 1
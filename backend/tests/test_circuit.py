@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from circuit import CLOSED, HALF_OPEN, OPEN, AIMDLimiter, CircuitBreaker
+
+
+def tripped(**options):
+    breaker = CircuitBreaker("host", **dict({"window": 4, "min_calls": 4, "open_seconds": 0.05}, **options))
+    for ok in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(ok)
+    return breaker
+
+
+def test_opens_once_enough_recent_calls_failed():
+    breaker = CircuitBreaker("host", window=4, min_calls=4)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record(False)
+    assert breaker.state == CLOSED  # fewer than min_calls so far
+    breaker.allow()
+    breaker.record(True)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["rejected"] == 1
+    assert 0 < breaker.retry_after() <= 15.0
+
+
+def test_calls_not_made_do_not_count():
+    breaker = CircuitBreaker("host", window=4, min_calls=4)
+    for _ in range(10):
+        breaker.allow()
+        breaker.record(None)
+    assert breaker.snapshot()["recent_calls"] == 0
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = tripped()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # the probe is still out
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_for_twice_as_long_up_to_the_cap():
+    breaker = tripped(max_open_seconds=0.15)
+    for expected in (0.1, 0.15, 0.15):
+        time.sleep(breaker.retry_after() + 0.01)
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == OPEN
+        assert expected - 0.02 < breaker.retry_after() <= expected
+    assert breaker.snapshot()["trips"] == 4
+
+
+def test_probe_not_made_frees_the_half_open_slot():
+    breaker = tripped()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(None)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_limit_grows_while_busy_and_shrinks_on_failure():
+    limiter = AIMDLimiter("host", initial_limit=4, min_limit=1, max_limit=5)
+    assert limiter.acquire(0) and limiter.acquire(0)
+    limiter.release(True)  # two in flight of four: busy enough to grow
+    assert limiter.limit == 5
+    limiter.release(True)  # the last one in flight: not busy, stays
+    assert limiter.limit == 5
+    for _ in range(3):
+        assert limiter.acquire(0)
+        limiter.release(False)
+    assert limiter.limit == pytest.approx(5 * 0.9 ** 3)
+    assert limiter.snapshot() == {"limit": 3, "in_flight": 0, "rejected": 0}
+
+
+def test_acquire_waits_for_a_slot_then_gives_up():
+    limiter = AIMDLimiter("host", initial_limit=1, min_limit=1, max_limit=1)
+    assert limiter.acquire(0)
+    threading.Timer(0.05, limiter.release, (None,)).start()
+    assert limiter.acquire(1.0)
+    assert not limiter.acquire(0.05)
+    assert not limiter.try_acquire()
+    limiter.reject()
+    assert limiter.snapshot() == {"limit": 1, "in_flight": 1, "rejected": 2}
+
+
+def test_circuit_state_metric_reports_the_most_open_worker():
+    from metrics import UPSTREAM_CIRCUIT_STATE, _merge
+    tripped()  # this process's breaker for "host" is open
+    workers = [(pid, {"upstream_circuit_state": {"kind": "gauge", "labels": ["host"],
+                                                 "merge": UPSTREAM_CIRCUIT_STATE.merge, "samples": samples}})
+               for pid, samples in ((1, [[["host"], 0]]), (2, UPSTREAM_CIRCUIT_STATE.samples()), (3, [[["host"], 1]]))]
+    assert _merge(workers)["upstream_circuit_state"]["samples"][("host",)] == 2
@@ -0,0 +1,52 @@
+import gzip
+import json
+
+from flask import Flask
+
+from court_data import INDIAN_COURTS_DATA
+from geo_responses import GeoResponseCache, PrecomputedResponse
+from hierarchy import HierarchyIndex
+
+
+def cache():
+    return GeoResponseCache(HierarchyIndex(INDIAN_COURTS_DATA))
+
+
+def test_every_encoding_holds_the_json_of_the_payload():
+    index = HierarchyIndex(INDIAN_COURTS_DATA)
+    state = index.states[0]["code"]
+    response = GeoResponseCache(index).all_districts(state)
+    expected = {"districts": list(index.districts(state)), "total": len(index.districts(state))}
+    assert json.loads(response.bodies["identity"]) == json.loads(json.dumps(expected))
+    assert gzip.decompress(response.bodies["gzip"]) == response.bodies["identity"]
+    if "br" in response.bodies:
+        import brotli
+        assert brotli.decompress(response.bodies["br"]) == response.bodies["identity"]
+
+
+def test_unknown_codes_share_one_empty_body():
+    responses = cache()
+    assert responses.all_districts("NOPE") is responses.all_districts("ALSO-NOPE")
+    assert json.loads(responses.all_districts("NOPE").bodies["identity"]) == {"districts": [], "total": 0}
+    state = INDIAN_COURTS_DATA["states"][0]
+    other = INDIAN_COURTS_DATA["states"][1]["districts"][0]["code"]
+    assert responses.all_taluks(state["code"], other) is responses.all_taluks(None, "NOPE")
+    assert responses.warm() == len(responses._responses)
+
+
+def test_responses_negotiate_encoding_and_revalidate_by_etag():
+    response = PrecomputedResponse({"states": [], "total": 0})
+    app = Flask(__name__)
+    with app.test_request_context(headers={"Accept-Encoding": "gzip;q=1, br;q=0"}):
+        served = response.to_response()
+    assert served.headers["Content-Encoding"] == "gzip"
+    assert served.get_data() == response.bodies["gzip"]
+    etag = served.headers["ETag"]
+    assert etag == f'"{response.etag}-gzip"'
+
+    with app.test_request_context(headers={"If-None-Match": f'W/{etag}'}):
+        revalidated = response.to_response()
+    assert revalidated.status_code == 304 and revalidated.get_data() == b""
+    assert revalidated.headers["ETag"] == f'"{response.etag}"'
+    with app.test_request_context(headers={"If-None-Match": '"something-else"'}):
+        assert response.to_response().status_code == 200
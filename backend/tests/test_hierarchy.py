@@ -0,0 +1,52 @@
+import marshal
+
+import pytest
+
+import hierarchy
+from court_data import INDIAN_COURTS_DATA
+from hierarchy import HierarchyIndex, load_snapshot, save_snapshot
+from hierarchy_sync import HierarchySync
+from storage import CourtStore
+
+
+def test_index_answers_lookups_and_gives_back_its_data():
+    index = HierarchyIndex(INDIAN_COURTS_DATA)
+    state = INDIAN_COURTS_DATA["states"][0]
+    district = state["districts"][0]
+    assert index.state_name(state["code"]) == state["name"]
+    assert index.state_of_district(district["code"]) == state["code"]
+    assert [option["code"] for option in index.district_options(state["code"])] == [
+        row["code"] for row in state["districts"]]
+    assert list(index.court_complexes(state["code"], district["code"])) == district["court_complexes"]
+    assert index.data() == INDIAN_COURTS_DATA
+    with pytest.raises(AttributeError):
+        index.states = ()
+
+
+def test_snapshots_round_trip_and_refuse_other_formats(tmp_path, monkeypatch):
+    path = str(tmp_path / "hierarchy.snapshot")
+    assert load_snapshot(path) is None
+    save_snapshot(INDIAN_COURTS_DATA, path, version=3)
+    assert load_snapshot(path) == (3, INDIAN_COURTS_DATA)
+    assert [p.name for p in tmp_path.iterdir()] == ["hierarchy.snapshot"]
+
+    monkeypatch.setattr(hierarchy, "SNAPSHOT_FORMAT", (hierarchy.SNAPSHOT_FORMAT[0] + 1, marshal.version))
+    assert load_snapshot(path) is None
+    (tmp_path / "hierarchy.snapshot").write_bytes(b"\x00truncated")
+    assert load_snapshot(path) is None
+
+
+def test_a_snapshot_of_an_older_version_is_replaced_from_the_store(tmp_path):
+    store = CourtStore(str(tmp_path / "court.db"))
+    store.load_hierarchy(HierarchyIndex(INDIAN_COURTS_DATA))
+    path = str(tmp_path / "hierarchy.snapshot")
+    sync = HierarchySync(store, snapshot_path=path)
+    version = store.hierarchy_version()
+    assert sync.load(version) == store.hierarchy_data()
+    assert load_snapshot(path)[0] == version
+
+    new_version = store.apply_hierarchy_changes([("add", ("state", "ZZ"), "Test State")])
+    assert new_version == version + 1
+    data = sync.load(new_version)
+    assert data["states"][-1] == {"code": "ZZ", "name": "Test State", "districts": []}
+    assert load_snapshot(path) == (new_version, data)
@@ -0,0 +1,59 @@
+import time
+
+from housekeeping import Housekeeper
+from locks import release, try_lock
+
+
+def test_run_once_runs_every_task_past_failures():
+    ran = []
+
+    def broken():
+        raise OSError("disk gone")
+
+    housekeeper = Housekeeper().register("first", broken).register("second", lambda: ran.append(1) or 5)
+    results = housekeeper.run_once()
+    assert results == {"first": {"error": "disk gone"}, "second": 5}
+    assert ran == [1]
+    assert housekeeper.status()["last_run"]["results"]["second"] == 5
+
+
+def test_one_process_sweeps_at_a_time(tmp_path):
+    lock_path = str(tmp_path / "housekeeping.lock")
+    lock = try_lock(lock_path)
+    assert lock
+    assert try_lock(lock_path) is None
+    release(lock)
+    assert try_lock(lock_path)
+    assert try_lock(None) is True
+
+
+def test_a_sweep_without_the_lock_skips_shared_tasks(tmp_path):
+    ran = []
+    lock_path = str(tmp_path / "housekeeping.lock")
+    housekeeper = Housekeeper(interval=0.02, lock_path=lock_path).register("shared", lambda: ran.append(1))
+    held = try_lock(lock_path)
+    housekeeper.start()
+    time.sleep(0.1)
+    housekeeper.stop(1)
+    release(held)
+    assert ran == []
+    assert housekeeper.last_run["results"] == {}
+
+
+def test_sweeps_on_a_timer_until_stopped():
+    calls = []
+    housekeeper = Housekeeper(interval=0.02).register("count", lambda: calls.append(1)).start()
+    time.sleep(0.2)
+    assert housekeeper.stop(1)
+    swept = len(calls)
+    assert swept >= 2
+    time.sleep(0.05)
+    assert len(calls) == swept
+
+
+def test_per_process_tasks_run_without_the_lock():
+    ran = []
+    housekeeper = Housekeeper().register("shared", lambda: ran.append("shared"))
+    housekeeper.register("local", lambda: ran.append("local"), per_process=True)
+    assert housekeeper.run_once(shared=False) == {"local": None}
+    assert ran == ["local"]
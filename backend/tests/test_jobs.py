@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from jobs import DEAD, RETRY, JobWorker, MemoryQueue, SQLiteQueue, job_spec
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    options = {"host_limit": 2, "retry_base": 0.0}
+    if request.param == "memory":
+        return MemoryQueue(**options)
+    return SQLiteQueue(str(tmp_path / "jobs.db"), **options)
+
+
+def specs(count, host="portal", **options):
+    return [job_spec("case", f"case:{n}", {"n": n}, host, **options) for n in range(count)]
+
+
+def test_keys_are_enqueued_once_until_refreshed(queue):
+    assert queue.enqueue_many(specs(3)) == 3
+    assert queue.enqueue_many(specs(4)) == 1
+    job = queue.lease("w1")
+    assert queue.complete(job)
+    assert queue.enqueue_many(specs(1)) == 0  # finished, and not a refresh
+    assert queue.enqueue_many([job_spec("case", job.key, {}, "portal")], refresh=True) == 1
+
+
+def test_leases_go_by_priority_and_respect_the_host_limit(queue):
+    queue.enqueue_many(specs(3) + [job_spec("case", "urgent", {}, "portal", priority=5),
+                                   job_spec("case", "elsewhere", {}, "other")])
+    first = queue.lease("w1")
+    assert first.key == "urgent"
+    assert queue.lease("w2").host == "portal"
+    # Two leased for "portal" is its limit; only the other host's job is left to lease
+    assert queue.lease("w3").key == "elsewhere"
+    assert queue.lease("w3") is None
+    queue.complete(first)
+    assert queue.lease("w3").host == "portal"
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue):
+    queue.enqueue_many(specs(1))
+    lost = queue.lease("dead-worker", lease_seconds=0.05)
+    assert queue.lease("w2") is None
+    time.sleep(0.1)
+    job = queue.lease("w2")
+    assert (job.key, job.attempts) == (lost.key, 2)
+    # The first worker's token no longer holds the job
+    assert not queue.extend(lost)
+    assert not queue.complete(lost)
+    assert queue.fail(lost, "late") is None
+    assert queue.complete(job)
+    assert queue.stats()["done"] == 1
+
+
+def test_extended_lease_is_not_reclaimed(queue):
+    queue.enqueue_many(specs(1))
+    job = queue.lease("w1", lease_seconds=0.1)
+    for _ in range(3):
+        time.sleep(0.05)
+        assert queue.extend(job, lease_seconds=0.1)
+    assert queue.lease("w2") is None
+    assert queue.complete(job)
+
+
+def test_failures_retry_until_max_attempts_then_die(queue):
+    queue.enqueue_many(specs(1, max_attempts=2))
+    assert queue.fail(queue.lease("w1"), "HTTP 503") == RETRY
+    assert queue.fail(queue.lease("w1"), "HTTP 503") == DEAD
+    assert queue.lease("w1") is None
+    stats = queue.stats()
+    assert stats["dead"] == 1
+
+
+def test_expired_leases_count_as_attempts(queue):
+    queue.enqueue_many(specs(1, max_attempts=1))
+    queue.lease("dying", lease_seconds=0.01)
+    time.sleep(0.05)
+    assert queue.lease("w2") is None
+    assert queue.stats()["dead"] == 1
+
+
+def test_purge_forgets_only_old_finished_jobs(queue):
+    queue.enqueue_many(specs(3, max_attempts=1))
+    queue.complete(queue.lease("w1"))
+    queue.fail(queue.lease("w1"), "gone")
+    cutoff = time.time() + 1
+    assert queue.purge(time.time() - 60) == 0
+    assert queue.purge(cutoff) == 2
+    stats = queue.stats()
+    assert (stats["queued"], stats["done"], stats["dead"]) == (1, 0, 0)
+    # Purged keys can be enqueued again
+    assert queue.enqueue_many(specs(3)) == 2
+
+
+def test_worker_runs_jobs_and_purges_finished_ones(queue):
+    ran = []
+    queue.enqueue_many(specs(5))
+    worker = JobWorker(queue, {"case": lambda payload: ran.append(payload["n"])}, threads=2, poll_seconds=0.01,
+                       retention_seconds=0.0, purge_seconds=0.05)
+    threading.Timer(0.3, worker.stop).start()
+    stats = worker.run()
+    assert sorted(ran) == list(range(5))
+    assert (stats["done"], stats["purged"]) == (5, 5)
+    assert queue.stats()["done"] == 0
+
+
+def test_worker_retries_failing_handlers(queue):
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise ValueError("portal hiccup")
+
+    queue.enqueue_many(specs(1))
+    stats = JobWorker(queue, {"case": flaky}, threads=1, poll_seconds=0.01).run(drain=True)
+    assert (stats["retried"], stats["done"], len(calls)) == (1, 1, 2)
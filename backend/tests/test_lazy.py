@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND
+from lazy import PRELOAD_MODULES, LazyModule, installed, optional_module, preload
+
+NOTHING_HEAVY = f"""
+import sys, app
+heavy = [name for name in {PRELOAD_MODULES + ("selenium",)!r} if name in sys.modules]
+assert not heavy, heavy
+"""
+
+
+def test_modules_are_imported_on_first_attribute_use(tmp_path, monkeypatch):
+    (tmp_path / "lazy_probe.py").write_text("VALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazy_probe", raising=False)
+    probe = LazyModule("lazy_probe")
+    assert installed("lazy_probe") and "lazy_probe" not in sys.modules
+    assert repr(probe) == "<lazy module 'lazy_probe'>"
+    assert probe.VALUE == 42
+    assert "lazy_probe" in sys.modules
+
+
+def test_missing_packages_are_none_and_skipped_by_preload():
+    assert optional_module("no_such_package_here") is None
+    assert not installed("no_such_package_here.submodule")
+    assert preload(("no_such_package_here", "json")) == ["json"]
+
+
+def test_importing_the_app_leaves_heavy_libraries_unloaded():
+    env = dict(os.environ)
+    env.pop("ECOURTS_PRELOAD", None)
+    subprocess.run([sys.executable, "-c", NOTHING_HEAVY], cwd=BACKEND, env=env, check=True)
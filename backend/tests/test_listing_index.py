@@ -0,0 +1,87 @@
+import sqlite3
+import time
+
+import pytest
+
+import listing_index
+from cause_lists import CauseListStore
+from listing_index import ListingIndex
+
+
+def listed(*serials, court="Court 1"):
+    return [{"serial_no": serial, "case_number": f"OS/{serial}/2024", "court": court} for serial in serials]
+
+
+def test_lookup_and_replace():
+    index = ListingIndex()
+    index.add_list("KA01", "20/10/2026", listed(1, 2))
+    [listing] = index.lookup("OS/2/2024")
+    assert listing == {"date": "20/10/2026", "court_complex": "KA01", "court": "Court 1", "serial_no": 2}
+    index.add_list("KA01", "20/10/2026", listed(3))
+    assert index.lookup("OS/2/2024") == []
+    assert [listing["serial_no"] for listing in index.lookup("OS/3/2024")] == [3]
+
+
+def test_drop_before_forgets_older_lists():
+    index = ListingIndex()
+    index.add_list("KA01", "19/10/2026", listed(1))
+    index.add_list("KA01", "20/10/2026", listed(1))
+    assert index.drop_before("2026-10-20") == 1
+    assert [listing["date"] for listing in index.lookup("OS/1/2024")] == ["20/10/2026"]
+    assert index.stats()["lists"] == 1
+
+
+@pytest.mark.parametrize("serial", [-1, 1 << listing_index.SERIAL_BITS])
+def test_serial_numbers_outside_the_layout_are_refused(serial):
+    index = ListingIndex()
+    with pytest.raises(OverflowError):
+        index.add_list("KA01", "20/10/2026", listed(1, serial))
+    # What was indexed before the overflow still goes with the list
+    index.drop_before("2026-10-21")
+    assert index.stats()["keys"] == 0
+
+
+def test_court_complexes_past_the_layout_are_refused(monkeypatch):
+    monkeypatch.setattr(listing_index, "COMPLEX_BITS", 1)
+    index = ListingIndex()
+    index.add_list("KA01", "20/10/2026", listed(1))
+    index.add_list("KA02", "20/10/2026", listed(1))
+    with pytest.raises(OverflowError):
+        index.add_list("KA03", "20/10/2026", listed(1))
+
+
+def test_lists_saved_by_other_processes_are_caught_up(tmp_path):
+    path = str(tmp_path / "cause_lists.db")
+    index = ListingIndex()
+    index.follow(CauseListStore(path), lambda: "2026-10-20", poll_interval=0.02)
+    try:
+        # Another worker's store on the same file; nothing tells this index about its saves
+        other = CauseListStore(path)
+        other.save("KA01", "19/10/2026", listed(1))
+        other.save("KA01", "20/10/2026", listed(1))
+        other.save("KA02", "20/10/2026", listed(2))
+        time.sleep(0.1)
+        assert sorted(listing["court_complex"] for listing in index.lookup("OS/1/2024")) == ["KA01"]
+        other.save("KA01", "20/10/2026", listed(3))
+        time.sleep(0.1)
+        assert index.lookup("OS/1/2024") == []
+        assert [listing["serial_no"] for listing in index.lookup("OS/3/2024")] == [3]
+    finally:
+        index.stop(1)
+
+
+def test_catch_up_reads_stores_from_before_save_order_was_kept(tmp_path):
+    path = str(tmp_path / "cause_lists.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cause_lists (court_complex TEXT NOT NULL, list_date TEXT NOT NULL,"
+                 " fetched_at REAL NOT NULL, entries INTEGER NOT NULL, body TEXT NOT NULL,"
+                 " PRIMARY KEY (court_complex, list_date))")
+    conn.execute("INSERT INTO cause_lists VALUES ('KA01', '2026-10-20', 0, 1, ?)",
+                 ('[{"serial_no": 4, "case_number": "OS/4/2024", "court": "Court 1"}]',))
+    conn.commit()
+    store = CauseListStore(path)
+    index = ListingIndex()
+    assert index.catch_up(store, "2026-10-20") == 1
+    store.save("KA02", "20/10/2026", listed(5))
+    assert index.catch_up(store, "2026-10-20") == 1
+    assert index.catch_up(store, "2026-10-20") == 0
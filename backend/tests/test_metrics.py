@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from metrics import RETIRED, Counter, Gauge, Histogram, Registry, retire_exited
+
+
+def exited_pid():
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def worker(directory, pid, hits=0, state=0, version=0):
+    """Write the snapshot another worker (pid) would have published"""
+    registry = Registry()
+    Counter("lookups_total", "Lookups", ("result",), registry=registry).inc(hits, result="hits")
+    Gauge("in_flight", "In flight", registry=registry).inc(2)
+    Gauge("circuit_state", "State", ("host",), merge="max", registry=registry).set(state, host="portal")
+    Gauge("version", "Version", merge="pid", registry=registry).set(version)
+    Histogram("seconds", "Seconds", buckets=(1.0,), registry=registry).observe(0.5)
+    with open(os.path.join(directory, f"{pid}.json"), "w") as f:
+        json.dump({"pid": pid, "families": registry.snapshot()}, f)
+
+
+def scrape(directory, registry=None):
+    """{sample line name and labels: value} of a /metrics render over directory"""
+    lines = (registry or Registry()).render(str(directory)).splitlines()
+    return dict(line.rsplit(" ", 1) for line in lines if not line.startswith("#"))
+
+
+def test_gauges_merge_by_what_they_measure(tmp_path):
+    for pid, state, version in ((1, 2, 7), (os.getppid(), 0, 8)):
+        worker(tmp_path, pid, hits=3, state=state, version=version)
+    samples = scrape(tmp_path)
+    assert samples['lookups_total{result="hits"}'] == "6"
+    assert samples["in_flight"] == "4"
+    assert samples['circuit_state{host="portal"}'] == "2"
+    assert (samples['version{pid="1"}'], samples[f'version{{pid="{os.getppid()}"}}']) == ("7", "8")
+    assert samples["seconds_count"] == "2"
+
+
+def test_derived_values_come_from_the_merged_totals(tmp_path):
+    for pid in (1, os.getppid()):
+        worker(tmp_path, pid, hits=3)
+    registry = Registry()
+    registry.derived(lambda families: [("share", "gauge", "Share", (),
+                                        [((), families["lookups_total"]["samples"][("hits",)] / 12)])])
+    assert scrape(tmp_path, registry)["share"] == "0.5"
+
+
+def test_exited_workers_keep_their_counts_and_lose_their_gauges(tmp_path):
+    worker(tmp_path, 1, hits=3, state=2)
+    first, second = exited_pid(), exited_pid()
+    worker(tmp_path, first, hits=5, state=2, version=9)
+    samples = scrape(tmp_path)
+    assert samples['lookups_total{result="hits"}'] == "8"
+    assert samples["in_flight"] == "2"
+    assert f'version{{pid="{first}"}}' not in samples
+
+    assert retire_exited(str(tmp_path)) == 1
+    worker(tmp_path, second, hits=4)
+    assert retire_exited(str(tmp_path)) == 1
+    assert sorted(os.listdir(tmp_path)) == ["1.json", RETIRED, "retired.lock"]
+    samples = scrape(tmp_path)
+    assert samples['lookups_total{result="hits"}'] == "12"
+    assert samples["seconds_count"] == "3"
+    assert samples["in_flight"] == "2"
+
+
+def test_gauge_merge_must_be_known():
+    with pytest.raises(ValueError):
+        Gauge("ratio", "Ratio", merge="average", registry=Registry())
@@ -0,0 +1,41 @@
+import glob
+import json
+import os
+
+import pytest
+
+from conftest import BACKEND
+from page_parsers import ParserPool, parse_case_status_page, parse_cause_list_page
+from portal import parse_case_status_html, parse_cause_list_html
+
+FIXTURES = sorted(glob.glob(os.path.join(BACKEND, "fixtures", "pages", "*.html")))
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        page = f.read()
+    with open(path[:-len(".html")] + ".expected.json", encoding="utf-8") as f:
+        return page, json.load(f)
+
+
+def is_cause_list(path):
+    return os.path.basename(path).startswith("cause_list")
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_saved_pages_parse_to_their_expected_results(path):
+    page, expected = load(path)
+    fast, reference = ((parse_cause_list_page, parse_cause_list_html) if is_cause_list(path)
+                       else (parse_case_status_page, parse_case_status_html))
+    assert fast(page) == expected
+    assert reference(page) == expected
+
+
+def test_cause_lists_parse_the_same_in_worker_processes():
+    pool = ParserPool(workers=1, inline_below=0)
+    try:
+        for path in filter(is_cause_list, FIXTURES):
+            page, expected = load(path)
+            assert list(pool.parse("cause_list", page)) == expected
+    finally:
+        pool.close()
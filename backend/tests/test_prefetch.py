@@ -0,0 +1,12 @@
+import os
+
+from prefetch import PrefetchScheduler
+
+
+def test_dry_runs_write_to_a_throwaway_store_removed_on_stop():
+    scheduler = PrefetchScheduler(None, dry_run=True)
+    scheduler.store.save("KA01", "21/10/2026", [{"serial_no": 1, "case_number": "OS/1/2024"}])
+    directory = os.path.dirname(scheduler.store.path)
+    assert scheduler.store.fetched_at("KA01", "21/10/2026") is not None
+    assert scheduler.stop()
+    assert not os.path.exists(directory)
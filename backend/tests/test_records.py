@@ -0,0 +1,40 @@
+import json
+import pickle
+
+from records import CaseResult, CategoryColumn, CauseListEntries
+
+
+def test_category_columns_keep_equal_values_of_different_types_apart():
+    values = [1, True, 1.0, "1", None, 0, False, 1]
+    column = CategoryColumn()
+    assert column.extend(values)
+    assert [(type(value), value) for value in column.values(0, len(column))] == [
+        (type(value), value) for value in values]
+    assert column.json_values(0, len(column)) == [json.dumps(value) for value in values]
+
+
+def test_entries_round_trip_through_columns_json_and_pickle():
+    entries = [
+        {"serial_no": 1, "case_number": "CIVIL/12/2024", "parties": "Asha vs. Ravi", "court": "Court 1",
+         "purpose": "Hearing", "urgent": True},
+        {"serial_no": 2, "case_number": "OS 7/2023", "parties": "Meena ✓ vs. State", "court": "Court 1",
+         "purpose": "Orders", "urgent": 1},
+        {"serial_no": "3A", "case_number": "CRL/9/2022", "court": "Court 2", "purpose": None, "urgent": 1.0},
+    ]
+    block = CauseListEntries(entries)
+    assert list(block) == entries
+    assert [type(entry["urgent"]) for entry in block] == [bool, int, float]
+    assert block[-1] == entries[-1] and block[:2] == entries[:2]
+    assert json.loads(block.to_json()) == entries
+    assert block.to_json() == json.dumps(entries, ensure_ascii=False)
+    assert list(pickle.loads(pickle.dumps(block))) == entries
+
+
+def test_case_results_round_trip():
+    result = {"case_number": "CRL.A/9326/2016", "court": "Court Room 8", "status": "Pending",
+              "listed_today": True, "listed_tomorrow": False, "serial_number": None,
+              "listings": [{"date": "20/10/2026"}]}
+    record = CaseResult.from_dict(result)
+    assert record.to_dict() == result
+    assert list(record.to_dict()) == list(result)
+    assert CaseResult.from_dict({}).to_dict() == {}
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from revalidate import EXPIRED, FRESH, MISS, STALE, Policy, RefreshLeases, Revalidator
+
+
+class Store:
+    """One stored result and a portal fetch that replaces it; fetches block while `gate` is clear"""
+
+    def __init__(self, value=None, age=None):
+        self.stored = None if value is None else (value, time.time() - age)
+        self.fetches = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def load(self):
+        return self.stored
+
+    def fetch(self):
+        self.gate.wait(5)
+        self.fetches += 1
+        self.stored = (f"fetch {self.fetches}", time.time())
+        return self.stored
+
+
+@pytest.fixture
+def revalidator():
+    revalidator = Revalidator({"search": Policy(60, 3600)})
+    yield revalidator
+    revalidator.close()
+
+
+def serve(revalidator, store, key="case"):
+    return revalidator.serve("search", key, store.load, store.fetch)
+
+
+def test_fresh_results_are_served_as_they_are(revalidator):
+    store = Store("old", age=10)
+    value, fetched_at, served = serve(revalidator, store)
+    assert (value, served, store.fetches) == ("old", FRESH, 0)
+    assert fetched_at == store.stored[1]
+
+
+def test_stale_results_are_served_while_one_refresh_runs(revalidator):
+    store = Store("old", age=600)
+    store.gate.clear()
+    assert serve(revalidator, store)[::2] == ("old", STALE)
+    assert serve(revalidator, store)[::2] == ("old", STALE)
+    store.gate.set()
+    revalidator.close()
+    assert store.fetches == 1
+    assert serve(revalidator, store)[::2] == ("fetch 1", FRESH)
+    stats = revalidator.stats()
+    assert (stats[STALE], stats["coalesced"], stats["refreshes"]) == (2, 1, 1)
+
+
+def test_expired_and_missing_results_wait_for_one_shared_fetch(revalidator):
+    store = Store("old", age=7200)
+    store.gate.clear()
+    answers = []
+    waiters = [threading.Thread(target=lambda: answers.append(serve(revalidator, store))) for _ in range(3)]
+    for waiter in waiters:
+        waiter.start()
+    time.sleep(0.1)
+    store.gate.set()
+    for waiter in waiters:
+        waiter.join()
+    assert store.fetches == 1
+    assert [(value, served) for value, _, served in answers] == [("fetch 1", EXPIRED)] * 3
+
+    assert serve(revalidator, Store(), key="new")[2] == MISS
+
+
+def test_errors_of_a_waited_fetch_are_raised(revalidator):
+    def fetch():
+        raise ConnectionError("portal down")
+    with pytest.raises(ConnectionError):
+        revalidator.serve("search", "case", lambda: None, fetch)
+    assert revalidator.stats()["refresh_errors"] == 1
+
+
+def test_a_leased_key_waits_for_the_holders_result(tmp_path):
+    path = str(tmp_path / "leases.db")
+    holder = RefreshLeases(path, owner="worker-1")
+    assert holder.claim("case", 60)
+    store = Store("old", age=7200)
+    revalidator = Revalidator({"search": Policy(60, 3600)}, leases=RefreshLeases(path, owner="worker-2"),
+                              wait_seconds=5, poll_seconds=0.01)
+    threading.Timer(0.1, lambda: setattr(store, "stored", ("holder's", time.time()))).start()
+    assert serve(revalidator, store)[::2] == ("holder's", EXPIRED)
+    assert store.fetches == 0 and revalidator.stats()["leased_elsewhere"] == 1
+
+    # A background refresh leaves a leased key to its holder
+    store.stored = ("holder's", time.time() - 600)
+    assert serve(revalidator, store)[2] == STALE
+    revalidator.close()
+    assert store.fetches == 0
+
+
+def test_policies_parse_from_their_settings():
+    assert Policy.parse("off") is None
+    assert Policy.parse("30").to_dict() == {"soft_ttl": 30.0, "hard_ttl": None}
+    assert Policy.parse("30, 600").to_dict() == {"soft_ttl": 30.0, "hard_ttl": 600.0}
+    with pytest.raises(ValueError):
+        Policy.parse("600,30")
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from search import CauseListSearch, TermDictionary, edit_distance, word_edits
+from storage import CourtStore
+
+
+def reference_distance(a, b):
+    """Textbook optimal-string-alignment distance"""
+    rows = [[i + j if not i * j else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            rows[i][j] = min(rows[i - 1][j] + 1, rows[i][j - 1] + 1, rows[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                rows[i][j] = min(rows[i][j], rows[i - 2][j - 2] + 1)
+    return rows[-1][-1]
+
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("sharma", "sharma", 2, 0),
+    ("sharma", "shrama", 2, 1),
+    ("sharma", "sharmaa", 2, 1),
+    ("sharma", "sarma", 2, 1),
+    ("sharma", "shurma", 2, 1),
+    ("sharma", "sharmila", 2, 2),
+    ("sharma", "verma", 2, 3),
+    ("sharma", "khan", 2, 3),
+    ("", "ab", 2, 2),
+])
+def test_edit_distance(a, b, limit, expected):
+    assert edit_distance(a, b, limit) == expected
+
+
+def test_edit_distance_matches_the_reference_within_its_limit():
+    generator = random.Random(3)
+    for _ in range(2000):
+        a = "".join(generator.choices("abcd", k=generator.randint(1, 9)))
+        b = "".join(generator.choices("abcd", k=generator.randint(1, 9)))
+        assert edit_distance(a, b, 2) == min(reference_distance(a, b), 3), (a, b)
+
+
+def test_word_edits():
+    assert [word_edits(word) for word in ("rao", "2024", "sharma", "srinivasan")] == [0, 0, 1, 2]
+    assert word_edits("2024", 2) == 0
+    with pytest.raises(ValueError):
+        word_edits("sharma", 3)
+
+
+def test_terms_expand_by_prefix_and_edits():
+    terms = TermDictionary()
+    words = ["sharma", "sharmila", "shrama", "sarma", "verma", "sharp", "khan"]
+    assert terms.add(list(enumerate(words, 1))) == len(words)
+    assert terms.add([(8, "sharma")]) == 0 and terms.last_id == 8
+    assert terms.expand("sharma") == {"sharma": 1}
+    assert sorted(terms.expand("shar", prefix=True)) == ["sharma", "sharmila", "sharp"]
+    assert sorted(terms.expand("sharma", edits=1)) == ["sarma", "sharma", "shrama"]
+    assert sorted(terms.expand("sharma", edits=2)) == ["sarma", "sharma", "sharmila", "sharp", "shrama"]
+    assert terms.expand("nobody", edits=2, prefix=True) == {}
+
+
+@pytest.fixture
+def search(tmp_path):
+    store = CourtStore(str(tmp_path / "court.db"))
+    for day, complex_code in ((19, "DL01"), (20, "DL01"), (20, "DL02")):
+        store.save_cause_list(complex_code, f"{day}/10/2026", [
+            {"serial_no": n, "case_number": f"OS/{n}/2024", "court": f"Court {n % 2}",
+             "parties": "Ravi Sharma vs. State" if n % 3 else "Anil Verma vs. Union", "purpose": "Hearing"}
+            for n in range(1, 11)])
+    return CauseListSearch(store)
+
+
+def test_typos_find_the_party(search):
+    page = search.search(party="shrama", limit=100)
+    assert page["terms"] == {"shrama": ["sharma"]}
+    assert len(page["results"]) == 21 and page["next_cursor"] is None
+    assert all("Sharma" in row["parties"] for row in page["results"])
+    assert not search.search(party="shrama", fuzzy=0)["results"]
+
+
+def test_cursor_pages_cover_the_results_in_order(search):
+    everything = search.search(party="ravi sharma", court="Court 1", limit=100)["results"]
+    assert [row["date"] for row in everything][:1] == ["20/10/2026"] and len(everything) == 9
+    pages, cursor = [], None
+    while True:
+        page = search.search(party="ravi sharma", court="Court 1", limit=4, cursor=cursor)
+        pages.extend(page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == everything
+    by_number = search.search(case_number="os/1", court_complex="DL02", limit=100)["results"]
+    assert sorted(row["case_number"] for row in by_number) == ["OS/1/2024", "OS/10/2024"]
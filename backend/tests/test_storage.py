@@ -0,0 +1,52 @@
+import pytest
+
+from storage import CourtStore
+
+
+def entry(serial, parties, court="Court 1"):
+    return {"serial_no": serial, "case_number": f"O.S. {serial}/2024", "parties": parties, "court": court,
+            "hearing_time": None, "purpose": "Hearing"}
+
+
+def words(store, complex_code, position):
+    """Search words posted for one entry of complex_code's 20/10/2026 list"""
+    [complex_id] = store.complex_ids(complex_code)
+    return {term for term_id, term in store.search_terms()
+            if (20261020, complex_id, position) in store.postings(term_id)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CourtStore(str(tmp_path / "court.db"))
+
+
+def test_refreshed_lists_rewrite_only_what_changed(store):
+    first = [entry(1, "Asha Rao vs. State"), entry(2, "Vikram Das vs. Meena Das"), entry(3, "Union vs. Kiran")]
+    assert store.save_cause_list("KA01", "20/10/2026", first) == 3
+    assert store.cause_list("KA01", "20/10/2026") == first
+
+    refreshed = [first[0], entry(2, "Vikram Das vs. Leela Das", court="Court 2")]
+    assert store.save_cause_list("KA01", "20/10/2026", refreshed) == 1
+    assert store.cause_list("KA01", "20/10/2026") == refreshed
+    assert store.save_cause_list("KA01", "20/10/2026", refreshed) == 0
+
+    assert words(store, "KA01", 0) == {"asha", "rao", "state"}
+    assert words(store, "KA01", 1) == {"vikram", "das", "leela"}
+    assert words(store, "KA01", 2) == set()
+    assert [listing["court"] for listing in store.listings(case_number="OS/2/2024")] == ["Court 2"]
+
+
+def test_ids_handed_out_in_a_rolled_back_transaction_are_forgotten(store):
+    with pytest.raises(RuntimeError):
+        with store._transaction() as conn:
+            store._complex_id(conn, "KA01")
+            store._court_id(conn, "Court 1")
+            raise RuntimeError("save failed")
+    assert "KA01" not in store._complex_ids
+
+    # The rolled-back ids go to whichever names are written next
+    store.save_cause_list("KA02", "20/10/2026", [entry(1, "Asha Rao vs. State", court="Court 9")])
+    store.save_cause_list("KA01", "20/10/2026", [entry(2, "Vikram Das vs. State")])
+    assert store.cause_list("KA02", "20/10/2026")[0]["court"] == "Court 9"
+    assert [(listing["court_complex"], listing["court"]) for listing in store.listings(case_number="OS/2/2024")] == [
+        ("KA01", "Court 1")]
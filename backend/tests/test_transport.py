@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from conftest import sequence_route
+from transport import DeadlineExceeded, TokenBucket, Transport, TransportError
+
+
+def fast_transport(**options):
+    return Transport(**dict({"rate_per_host": 1000, "backoff_base": 0.01, "backoff_max": 0.05, "deadline": 5.0},
+                            **options))
+
+
+def test_retries_5xx_until_success(stub):
+    stub.routes["/flaky"] = route = sequence_route(503, 502, 200)
+    transport = fast_transport()
+    response = transport.get(f"{stub.base_url}/flaky")
+    assert response.status_code == 200
+    assert route.calls == 3
+    stats = transport.metrics.snapshot()
+    assert stats["retries"] == 2
+    assert stats["retries_by_status"] == {"503": 1, "502": 1}
+
+
+def test_returns_last_response_when_retries_run_out(stub):
+    stub.routes["/down"] = route = sequence_route(503)
+    transport = fast_transport(max_retries=2, breaker=False)
+    assert transport.get(f"{stub.base_url}/down").status_code == 503
+    assert route.calls == 3
+    assert transport.metrics.snapshot()["failures"] == 1
+
+
+def test_does_not_retry_client_errors(stub):
+    stub.routes["/missing"] = route = sequence_route(404)
+    assert fast_transport().get(f"{stub.base_url}/missing").status_code == 404
+    assert route.calls == 1
+
+
+def test_connection_errors_raise_after_retries():
+    transport = fast_transport(max_retries=1, connect_timeout=0.5)
+    with pytest.raises(TransportError):
+        transport.get("http://127.0.0.1:9/")
+    assert transport.metrics.snapshot()["retries"] == 1
+
+
+def test_deadline_bounds_slow_responses(stub):
+    stub.latency = 1.0
+    transport = fast_transport(max_retries=5)
+    started = time.monotonic()
+    with pytest.raises(TransportError):
+        transport.get(f"{stub.base_url}/", deadline=0.3)
+    assert time.monotonic() - started < 1.0
+
+
+def test_deadline_bounds_backoff(stub):
+    stub.routes["/down"] = sequence_route(503)
+    transport = fast_transport(max_retries=10, backoff_base=1.0, backoff_max=1.0, breaker=False)
+    transport.backoff = lambda attempt, retry_after=None: 1.0
+    started = time.monotonic()
+    response = transport.get(f"{stub.base_url}/down", deadline=0.5)
+    # Sleeping for the backoff would overrun the deadline, so the last answer comes back at once
+    assert response.status_code == 503
+    assert time.monotonic() - started < 0.5
+    assert transport.metrics.snapshot()["deadline_exceeded"] == 1
+
+
+def test_backoff_honours_retry_after_up_to_the_cap():
+    transport = fast_transport(backoff_max=3.0)
+    assert transport.backoff(0, retry_after=2.0) == 2.0
+    assert transport.backoff(0, retry_after=60.0) == 3.0
+    assert all(0 <= transport.backoff(attempt) <= min(3.0, 0.01 * 2 ** attempt) for attempt in range(10))
+
+
+def test_token_bucket_refuses_waits_past_the_budget():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire() == 0.0
+    with pytest.raises(DeadlineExceeded):
+        bucket.acquire(timeout=0.1)
+    # The refused reservation was given back: the next token is ~1 s away, not ~2 s
+    assert 0.8 < bucket._reserve() <= 1.0
@@ -0,0 +1,189 @@
+import hashlib
+import hmac
+import json
+import socket
+import sqlite3
+
+import pytest
+
+from conftest import sequence_route
+from watchlists import Watchlists, WebhookNotifier, check_webhook_url, pin_webhook_url
+
+LIST = ("KA01", "20/10/2026", [{"serial_no": 4, "case_number": "OS/12/2024", "court": "Court 1"}])
+
+
+def resolving_to(monkeypatch, *addresses):
+    monkeypatch.setattr(socket, "getaddrinfo", lambda host, port, **kwargs: [
+        (socket.AF_INET6 if ":" in address else socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))
+        for address in addresses])
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "10.1.2.3", "172.16.0.9", "192.168.1.1", "169.254.169.254",
+                                     "100.64.0.1", "0.0.0.0", "224.0.0.1", "::1", "fe80::1", "fd00::1",
+                                     "::ffff:127.0.0.1"])
+def test_webhooks_to_non_public_addresses_are_refused(monkeypatch, address):
+    resolving_to(monkeypatch, address)
+    with pytest.raises(ValueError, match="non-public"):
+        check_webhook_url("https://hooks.example.com/notify")
+
+
+def test_one_non_public_address_among_several_is_enough_to_refuse(monkeypatch):
+    resolving_to(monkeypatch, "93.184.216.34", "10.0.0.1")
+    with pytest.raises(ValueError):
+        check_webhook_url("https://hooks.example.com/notify")
+
+
+def test_public_http_urls_pass(monkeypatch):
+    resolving_to(monkeypatch, "93.184.216.34", "2606:2800:220:1:248:1893:25c8:1946")
+    assert check_webhook_url("https://hooks.example.com:8443/notify") == "https://hooks.example.com:8443/notify"
+
+
+@pytest.mark.parametrize("url", ["file:///etc/passwd", "gopher://hooks.example.com/", "https:///no-host",
+                                 "http://hooks.example.com:99999/", "not a url"])
+def test_other_schemes_and_malformed_urls_are_refused(url):
+    with pytest.raises(ValueError):
+        check_webhook_url(url)
+
+
+def test_set_webhook_checks_the_url(tmp_path, monkeypatch):
+    resolving_to(monkeypatch, "127.0.0.1")
+    watchlists = Watchlists(str(tmp_path / "watchlists.db"))
+    with pytest.raises(ValueError):
+        watchlists.set_webhook("user", "http://localhost:8080/hook")
+    assert watchlists.webhook("user") is None
+    Watchlists(str(tmp_path / "dev.db"), allow_private_webhooks=True).set_webhook("user", "http://localhost/hook")
+
+
+def test_replacing_a_webhook_needs_the_current_secret(tmp_path):
+    watchlists = Watchlists(str(tmp_path / "watchlists.db"), allow_private_webhooks=True)
+    watchlists.set_webhook("user", "http://localhost/mine", secret="s3cret")
+    for given in (None, "", "guess"):
+        with pytest.raises(PermissionError):
+            watchlists.set_webhook("user", "http://localhost/theirs", secret="theirs", current_secret=given)
+    assert watchlists.webhook("user") == ("http://localhost/mine", "s3cret")
+    assert not watchlists.authorized("user", "guess") and not watchlists.authorized("nobody", "s3cret")
+    watchlists.set_webhook("user", "http://localhost/moved", secret="new", current_secret="s3cret")
+    assert watchlists.authorized("user", "new")
+
+
+def test_deliveries_connect_to_the_address_that_was_checked(monkeypatch):
+    resolving_to(monkeypatch, "93.184.216.34", "2606:2800:220:1:248:1893:25c8:1946")
+    assert pin_webhook_url("https://hooks.example.com/notify?a=1") == (
+        "https://93.184.216.34:443/notify?a=1", "hooks.example.com")
+    resolving_to(monkeypatch, "2606:2800:220:1:248:1893:25c8:1946")
+    assert pin_webhook_url("http://user:pw@hooks.example.com:8080") == (
+        "http://user:pw@[2606:2800:220:1:248:1893:25c8:1946]:8080/", "hooks.example.com:8080")
+    assert pin_webhook_url("http://localhost:8080/hook", allow_private=True) == ("http://localhost:8080/hook", None)
+
+
+@pytest.fixture
+def watched(tmp_path, stub):
+    """A watchlist on OS/12/2024 posting to the stub's /hook, with a notifier flushed by hand"""
+    watchlists = Watchlists(str(tmp_path / "watchlists.db"), allow_private_webhooks=True)
+    watchlists.set_webhook("user", f"{stub.base_url}/hook", secret="s3cret")
+    watchlists.add_keys("user", {"OS/12/2024"})
+    watchlists.notifier = WebhookNotifier(watchlists.webhook, delivered=watchlists.delivered, allow_private=True,
+                                          max_attempts=2, backoff_base=0.0)
+    yield watchlists
+    watchlists.notifier.stop()
+
+
+def test_events_are_marked_sent_only_after_delivery(stub, watched):
+    stub.routes["/hook"] = route = sequence_route(503, 204)
+    assert watched.ingest([LIST]) == 1
+    # Queued and not yet delivered: a refreshed list does not queue it again
+    assert watched.ingest([LIST]) == 0
+    watched.notifier.flush()
+    assert watched.notifier.stats()["retries"] == 1
+    watched.notifier.flush()
+    assert route.calls == 2
+    assert watched.notifier.stats()["sent_events"] == 1
+    assert watched.ingest([LIST]) == 0
+
+
+def test_undelivered_events_notify_again_on_the_next_ingest(stub, watched):
+    stub.routes["/hook"] = sequence_route(503)
+    watched.ingest([LIST])
+    watched.notifier.flush()
+    watched.notifier.flush()
+    assert watched.notifier.stats()["dropped_events"] == 1
+    assert watched.ingest([LIST]) == 1
+
+
+def test_stale_claims_are_taken_over(watched):
+    watched.claim_seconds = 0.0
+    assert watched.ingest([LIST]) == 1
+    assert watched.ingest([LIST]) == 1
+
+
+def test_webhooks_are_signed_and_redirects_not_followed(watched, monkeypatch):
+    sent = []
+    monkeypatch.setattr(WebhookNotifier, "session", property(lambda self: Recorder(sent)))
+    watched.ingest([LIST])
+    watched.notifier.flush()
+    [(url, body, headers, options)] = sent
+    assert json.loads(body)["events"][0]["case"] == "OS/12/2024"
+    assert headers["X-Signature"] == "sha256=" + hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert options["allow_redirects"] is False
+
+
+def test_public_webhooks_are_posted_to_the_checked_address(monkeypatch):
+    sent = []
+    monkeypatch.setattr(WebhookNotifier, "session", property(lambda self: Recorder(sent)))
+    resolving_to(monkeypatch, "93.184.216.34")
+    notifier = WebhookNotifier(lambda user_id: ("https://hooks.example.com/notify", None))
+    notifier.enqueue("user", [{"case": "OS/12/2024"}])
+    notifier.flush()
+    notifier.stop()
+    [(url, body, headers, options)] = sent
+    assert (url, headers["Host"]) == ("https://93.184.216.34:443/notify", "hooks.example.com")
+
+
+def test_pinned_https_connections_verify_the_webhook_host():
+    import requests
+    from watchlists import _pinned_adapter
+    request = requests.Request("POST", "https://93.184.216.34:443/notify",
+                               headers={"Host": "hooks.example.com"}).prepare()
+    host_params, pool_kwargs = _pinned_adapter()().build_connection_pool_key_attributes(request, True)
+    assert host_params["host"] == "93.184.216.34"
+    assert pool_kwargs["server_hostname"] == pool_kwargs["assert_hostname"] == "hooks.example.com"
+
+
+def test_webhooks_refused_at_delivery_are_released(watched, monkeypatch):
+    watched.notifier.allow_private = False
+    resolving_to(monkeypatch, "10.0.0.1")
+    watched.ingest([LIST])
+    watched.notifier.flush()
+    assert watched.notifier.stats()["refused_url"] == 1
+    assert watched.ingest([LIST]) == 1
+
+
+def test_notifications_recorded_before_delivery_tracking_count_as_sent(tmp_path):
+    path = str(tmp_path / "watchlists.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE watch_notifications (user_id TEXT NOT NULL, case_key TEXT NOT NULL,"
+                 " court_complex TEXT NOT NULL, list_date TEXT NOT NULL, serial_no INTEGER,"
+                 " PRIMARY KEY (user_id, case_key, court_complex, list_date))")
+    conn.execute("INSERT INTO watch_notifications VALUES ('user', 'OS/12/2024', 'KA01', '2026-10-20', 4)")
+    conn.commit()
+    watchlists = Watchlists(path, notifier=WebhookNotifier(lambda user_id: None))
+    watchlists.add_keys("user", {"OS/12/2024"})
+    assert watchlists.ingest([LIST]) == 0
+
+
+class Recorder:
+    """Stands in for the notifier's session, keeping what was posted"""
+
+    def __init__(self, sent):
+        self.sent = sent
+
+    def post(self, url, data, headers, **options):
+        self.sent.append((url, data, headers, options))
+        return Response()
+
+
+class Response:
+    status_code = 204
+
+    def close(self):
+        pass
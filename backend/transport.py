@@ -0,0 +1,373 @@
+"""HTTP transport for everything ECourtsScraper fetches upstream.
+
+One connection pool shared by all Flask threads (each thread keeps its own
+cookie jar), a token bucket per upstream host, exponential backoff with full
+jitter on 429/5xx and connection errors, and a deadline budget per request
+that bounds connect/read timeouts *and* the time spent backing off.
+
+Each host also has a circuit breaker and an adaptive concurrency limit
+(circuit.py): requests to a host that is failing, or already has as many
+requests in flight as it is handling well, fail fast with CircuitOpen or
+Overloaded instead of tying up a thread until their deadline.
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from circuit import AIMDLimiter, CircuitBreaker, HostGuard
+from lazy import LazyModule
+from metrics import UPSTREAM_ERRORS, UPSTREAM_IN_FLIGHT, UPSTREAM_LATENCY, UPSTREAM_REJECTED, UPSTREAM_RESPONSES
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Imported when the first request goes out, so building a Transport at start-up costs nothing
+requests = LazyModule("requests")
+
+
+class TransportError(Exception):
+    """Upstream request failed after exhausting retries"""
+
+
+class DeadlineExceeded(TransportError):
+    """The request's deadline budget ran out"""
+
+
+class CircuitOpen(TransportError):
+    """The host's circuit breaker is open; retry_after is when it next lets a request through"""
+
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Overloaded(TransportError):
+    """The host already has as many requests in flight as its concurrency limit allows"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token, returning how long the caller must wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def reserve(self, timeout=None):
+        """Take a token without waiting; returns how long the caller must wait before using it"""
+        wait = self._reserve()
+        if timeout is not None and wait > timeout:
+            with self._lock:
+                self._tokens += 1  # give the reservation back
+            raise DeadlineExceeded(f"rate limit wait {wait:.2f}s exceeds budget")
+        return wait
+
+    def acquire(self, timeout=None):
+        """Block until a token is available; returns seconds waited"""
+        wait = self.reserve(timeout)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class TransportMetrics:
+    """Counters for pool waits, rate-limit waits and retries"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.attempts = 0
+            self.retries = 0
+            self.failures = 0
+            self.deadline_exceeded = 0
+            self.rejected = 0
+            self.in_flight = 0
+            self.pool_wait_seconds = 0.0
+            self.pool_wait_max = 0.0
+            self.rate_limit_wait_seconds = 0.0
+            self.retries_by_status = {}
+
+    def record(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+            wait = deltas.get("pool_wait_seconds")
+            if wait and wait > self.pool_wait_max:
+                self.pool_wait_max = wait
+
+    def record_retry(self, reason):
+        with self._lock:
+            self.retries += 1
+            self.retries_by_status[reason] = self.retries_by_status.get(reason, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "retries_by_status": dict(self.retries_by_status),
+                "failures": self.failures,
+                "deadline_exceeded": self.deadline_exceeded,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "pool_wait_seconds": round(self.pool_wait_seconds, 6),
+                "pool_wait_max": round(self.pool_wait_max, 6),
+                "rate_limit_wait_seconds": round(self.rate_limit_wait_seconds, 6),
+            }
+
+
+class Transport:
+    """Pooled, retrying, rate-limited HTTP client"""
+
+    def __init__(self, pool_size=20, rate_per_host=5.0, burst_per_host=None,
+                 max_retries=3, backoff_base=0.25, backoff_max=8.0,
+                 connect_timeout=5.0, read_timeout=15.0, deadline=30.0,
+                 headers=None, host_rates=None, breaker=None, limiter=None, slow_call_seconds=10.0,
+                 limit_wait=2.0):
+        self.pool_size = pool_size
+        self.rate_per_host = rate_per_host
+        self.burst_per_host = burst_per_host
+        self.host_rates = dict(host_rates or {})
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.headers = {'User-Agent': DEFAULT_USER_AGENT}
+        self.headers.update(headers or {})
+        # CircuitBreaker / AIMDLimiter options per host; breaker=False turns breakers off,
+        # limiter=False keeps a fixed pool_size requests per host
+        self.breaker = {} if breaker is None else breaker
+        self.limiter = {} if limiter is None else limiter
+        # Attempts slower than this count as failures for the breaker and limiter
+        self.slow_call_seconds = slow_call_seconds
+        # How long a request waits for a slot under the host's concurrency limit before Overloaded
+        self.limit_wait = limit_wait
+        self.metrics = TransportMetrics()
+
+        self._adapter = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._guards = {}
+
+    @property
+    def adapter(self):
+        """The connection pool every thread's Session mounts, created by the first request"""
+        if self._adapter is None:
+            with self._lock:
+                if self._adapter is None:
+                    # Retries are ours (so they respect the deadline); urllib3 does none
+                    self._adapter = requests.adapters.HTTPAdapter(
+                        pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                        max_retries=0, pool_block=True)
+        return self._adapter
+
+    @property
+    def session(self):
+        """Per-thread Session sharing this transport's connection pool"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self._local.session = session
+        return session
+
+    def _host_limits(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate = self.host_rates.get(host, self.rate_per_host)
+                bucket = self._buckets[host] = TokenBucket(rate, self.burst_per_host)
+                breaker = CircuitBreaker(host, **self.breaker) if self.breaker is not False else None
+                if self.limiter is False:
+                    limiter = AIMDLimiter(host, self.pool_size, self.pool_size, self.pool_size)
+                else:
+                    limiter = AIMDLimiter(host, **dict({"initial_limit": max(1, self.pool_size // 2),
+                                                        "max_limit": self.pool_size}, **self.limiter))
+                self._guards[host] = HostGuard(breaker, limiter)
+            return bucket, self._guards[host]
+
+    def limits(self, host):
+        """host's (TokenBucket, HostGuard), for requests sent some other way (aiohttp)"""
+        return self._host_limits(host)
+
+    def host_states(self):
+        """Circuit and concurrency-limit state of every host called so far"""
+        with self._lock:
+            guards = dict(self._guards)
+        return {host: guard.snapshot() for host, guard in guards.items()}
+
+    def check_circuit(self, host, guard):
+        """Raise CircuitOpen if host's breaker is refusing requests"""
+        if guard.breaker is not None and not guard.breaker.allow():
+            self.metrics.record(rejected=1, failures=1)
+            UPSTREAM_REJECTED.inc(host=host, reason="circuit_open")
+            retry_after = guard.breaker.retry_after()
+            raise CircuitOpen(f"{host} is failing; not retrying for {retry_after:.0f}s", retry_after)
+
+    def record_outcome(self, guard, ok):
+        if guard.breaker is not None:
+            guard.breaker.record(ok)
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring a numeric Retry-After"""
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, url, deadline=None, **kwargs):
+        """Send a request, retrying on 429/5xx and connection errors.
+
+        `deadline` (seconds) bounds the whole call including backoff sleeps.
+        Returns the final Response (which may still be a 4xx); raises
+        TransportError / DeadlineExceeded when no usable response arrived.
+        """
+        self.metrics.record(requests=1, in_flight=1)
+        try:
+            with UPSTREAM_IN_FLIGHT.track(host=urlsplit(url).netloc):
+                return self._request(method, url, deadline, **kwargs)
+        finally:
+            self.metrics.record(in_flight=-1)
+
+    def _request(self, method, url, deadline, **kwargs):
+        budget = self.deadline if deadline is None else deadline
+        expires = time.monotonic() + budget
+        host = urlsplit(url).netloc
+        bucket, guard = self._host_limits(host)
+
+        attempt = 0
+        while True:
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                self.metrics.record(deadline_exceeded=1, failures=1)
+                raise DeadlineExceeded(f"{method} {url}: deadline of {budget:.1f}s exceeded")
+
+            self.check_circuit(host, guard)
+            try:
+                waited = bucket.acquire(timeout=remaining)
+            except DeadlineExceeded:
+                self.record_outcome(guard, None)
+                self.metrics.record(deadline_exceeded=1, failures=1)
+                raise
+            self.metrics.record(rate_limit_wait_seconds=waited)
+
+            started = time.monotonic()
+            if not guard.limiter.acquire(timeout=max(0.0, min(self.limit_wait, expires - started))):
+                self.record_outcome(guard, None)
+                self.metrics.record(rejected=1, failures=1, pool_wait_seconds=time.monotonic() - started)
+                UPSTREAM_REJECTED.inc(host=host, reason="concurrency_limit")
+                raise Overloaded(f"{method} {url}: {host} is at its concurrency limit")
+            self.metrics.record(pool_wait_seconds=time.monotonic() - started, attempts=1)
+
+            remaining = max(0.001, expires - time.monotonic())
+            timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+            response = error = None
+            sent = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                seconds = time.monotonic() - sent
+                # Only the host's own behaviour counts: a 404 is a healthy answer, a slow 200 is not,
+                # and a request that raised anything else never got an answer to judge
+                if response is None and error is None:
+                    ok = None
+                else:
+                    ok = response is not None and response.status_code not in RETRY_STATUSES \
+                        and seconds <= self.slow_call_seconds
+                guard.limiter.release(ok)
+                self.record_outcome(guard, ok)
+            UPSTREAM_LATENCY.observe(seconds, host=host)
+            if response is not None:
+                UPSTREAM_RESPONSES.inc(host=host, status=response.status_code)
+            if error is not None or response.status_code in RETRY_STATUSES:
+                UPSTREAM_ERRORS.inc(host=host, reason=type(error).__name__ if error else response.status_code)
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if attempt >= self.max_retries:
+                self.metrics.record(failures=1)
+                if response is not None:
+                    return response
+                raise TransportError(f"{method} {url}: {error}")
+
+            retry_after = None
+            if response is not None:
+                reason = str(response.status_code)
+                header = response.headers.get("Retry-After", "")
+                if header.isdigit():
+                    retry_after = float(header)
+                response.close()
+            else:
+                reason = type(error).__name__
+            delay = self.backoff(attempt, retry_after)
+            if time.monotonic() + delay >= expires:
+                self.metrics.record(deadline_exceeded=1, failures=1)
+                if response is not None:
+                    return response
+                raise DeadlineExceeded(f"{method} {url}: deadline exceeded while backing off ({error})")
+            self.metrics.record_retry(reason)
+            time.sleep(delay)
+            attempt += 1
+
+    def throttle(self, url, timeout=None):
+        """Wait for url's host rate limit, for requests sent some other way (pooled browsers).
+
+        Raises CircuitOpen if the host's breaker is open; otherwise the caller
+        reports how the request went with record(url, ok).
+        """
+        host = urlsplit(url).netloc
+        bucket, guard = self._host_limits(host)
+        self.check_circuit(host, guard)
+        try:
+            waited = bucket.acquire(timeout=self.deadline if timeout is None else timeout)
+        except DeadlineExceeded:
+            self.record_outcome(guard, None)
+            raise
+        self.metrics.record(rate_limit_wait_seconds=waited)
+        return waited
+
+    def record(self, url, ok):
+        """How a request let through by throttle() went: True, False, or None if it was not sent"""
+        self.record_outcome(self._host_limits(urlsplit(url).netloc)[1], ok)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def drain(self, timeout=30.0):
+        """Wait for in-flight requests to finish; True if none are left"""
+        expires = time.monotonic() + timeout
+        while self.metrics.in_flight > 0 and time.monotonic() < expires:
+            time.sleep(0.05)
+        return self.metrics.in_flight == 0
+
+    def close(self):
+        if self._adapter is not None:
+            self._adapter.close()
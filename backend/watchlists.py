@@ -0,0 +1,519 @@
+"""Watchlists: users register the cases they track and get a webhook when
+one of them appears in a newly ingested cause list.
+
+Matching does not scan users. Every watched case key (normalised CNR or
+TYPE/NUMBER/YEAR, as in listing_index) maps to the users watching it, and
+an ingested list is matched in one pass: the set of keys in the list
+intersected with the watched keys. Cost is proportional to the entries
+ingested, however many cases are watched.
+
+Matches are queued per user and delivered by WebhookNotifier in batches
+(one POST per user per flush, several users in parallel), signed with the
+user's secret when one is set, and retried with backoff when the webhook
+fails. An event is claimed when it is queued, so a refreshed list does not
+queue it again, and recorded as notified only once its POST succeeded; a
+batch that could not be delivered is released, and notifies again the
+next time its list is ingested.
+
+Webhook URLs come from users, so they must be http(s) and resolve only to
+public addresses (checked when set and again before every delivery), and
+webhooks go out on a session of their own, without following redirects,
+never through the portal's Transport. Each POST connects to the address
+that was checked rather than looking the host up again, so a DNS answer
+that changes in between (rebinding) cannot point it elsewhere.
+
+A watchlist is managed with its secret: replacing its webhook needs the
+current one, as do reading and editing its cases (see authorized()).
+"""
+import functools
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import queue
+import random
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+from cause_lists import iso_date
+from lazy import LazyModule
+from listing_index import ListingIndex
+from portal import case_key
+
+requests = LazyModule("requests")
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_webhook_url(url):
+    """(parts, port) of an http(s) URL with a host; ValueError otherwise"""
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise ValueError(f"Invalid webhook URL {url!r}") from None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url must be an http(s) URL with a host")
+    return parts, port
+
+
+def _public_addresses(host, port):
+    """The host's addresses, in resolver order; ValueError unless every one of them is public"""
+    try:
+        addresses = list(dict.fromkeys(
+            info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)))
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"Webhook host {host} does not resolve") from None
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"Webhook host {host} resolves to a non-public address ({ip})")
+    return addresses
+
+
+def check_webhook_url(url, allow_private=False):
+    """url if it is http(s) and its host resolves only to public addresses; ValueError otherwise.
+
+    allow_private skips the address check (a webhook sink on localhost in development).
+    """
+    parts, port = _parse_webhook_url(url)
+    if not allow_private:
+        _public_addresses(parts.hostname, port)
+    return url
+
+
+def pin_webhook_url(url, allow_private=False):
+    """(url to connect to, Host header) with the host replaced by an address check_webhook_url accepts.
+
+    Connecting to the checked address means the host is not looked up again
+    between the check and the POST. Host is None when nothing was replaced
+    (allow_private: no check, so nothing to pin).
+    """
+    parts, port = _parse_webhook_url(url)
+    if allow_private:
+        return url, None
+    address = _public_addresses(parts.hostname, port)[0].split("%", 1)[0]
+    netloc = f"[{address}]:{port}" if ":" in address else f"{address}:{port}"
+    host = f"[{parts.hostname}]" if ":" in parts.hostname else parts.hostname
+    if parts.port is not None:
+        host = f"{host}:{parts.port}"
+    userinfo, at, _ = parts.netloc.rpartition("@")
+    return urlunsplit((parts.scheme, userinfo + at + netloc, parts.path or "/", parts.query, "")), host
+
+
+@functools.lru_cache(maxsize=None)
+def _pinned_adapter():
+    """HTTPAdapter whose HTTPS connections check the certificate (and send SNI) for the Host header's name,
+    not for the address in the URL; a class made on first use, since requests is imported lazily"""
+
+    class PinnedAdapter(requests.adapters.HTTPAdapter):
+        def build_connection_pool_key_attributes(self, request, verify, cert=None):
+            host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+            host = request.headers.get("Host")
+            if host_params["scheme"] == "https" and host:
+                name = urlsplit(f"//{host}").hostname
+                pool_kwargs["server_hostname"] = name
+                pool_kwargs["assert_hostname"] = name
+            return host_params, pool_kwargs
+
+    return PinnedAdapter
+
+
+def _same_secret(secret, given):
+    """Whether given matches a watchlist's secret; one registered without a secret needs none"""
+    if secret is None:
+        return True
+    return given is not None and hmac.compare_digest(secret.encode("utf-8"), str(given).encode("utf-8"))
+
+
+class Watchlists:
+    """Watched case keys per user, persisted in SQLite and indexed in memory"""
+
+    def __init__(self, path, notifier=None, resolve=None, allow_private_webhooks=False, claim_seconds=3600.0):
+        self.path = path
+        self.notifier = notifier
+        # Optional case_details -> extra keys (e.g. a CNR's case number from its status page)
+        self.resolve = resolve
+        self.allow_private_webhooks = allow_private_webhooks
+        # A queued event not delivered (or released) within this long is taken to be lost, e.g. with its process
+        self.claim_seconds = claim_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._watchers = {}  # key -> user_id, or tuple of user_ids
+        self._version = None
+        self._connection().executescript(
+            "CREATE TABLE IF NOT EXISTS watchlists ("
+            " user_id TEXT PRIMARY KEY, webhook_url TEXT NOT NULL, secret TEXT);"
+            "CREATE TABLE IF NOT EXISTS watched_cases ("
+            " user_id TEXT NOT NULL, case_key TEXT NOT NULL, PRIMARY KEY (user_id, case_key));"
+            # pending_since: queued at, until delivered (then NULL)
+            "CREATE TABLE IF NOT EXISTS watch_notifications ("
+            " user_id TEXT NOT NULL, case_key TEXT NOT NULL, court_complex TEXT NOT NULL,"
+            " list_date TEXT NOT NULL, serial_no INTEGER, pending_since REAL,"
+            " PRIMARY KEY (user_id, case_key, court_complex, list_date));"
+            "CREATE TABLE IF NOT EXISTS watch_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+            "INSERT OR IGNORE INTO watch_meta VALUES ('version', 0);"
+        )
+        columns = {row[1] for row in self._connection().execute("PRAGMA table_info(watch_notifications)")}
+        if "pending_since" not in columns:
+            # Rows from before delivery was tracked were all sent
+            self._connection().execute("ALTER TABLE watch_notifications ADD COLUMN pending_since REAL")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _bump(self, conn):
+        # Other processes reload their index when they see the version move
+        conn.execute("UPDATE watch_meta SET value = value + 1 WHERE name = 'version'")
+
+    def set_webhook(self, user_id, webhook_url, secret=None, current_secret=None):
+        """Register a user's webhook, or replace it given the current secret.
+
+        ValueError for a URL check_webhook_url refuses; PermissionError if the
+        watchlist exists and current_secret is not its secret.
+        """
+        check_webhook_url(webhook_url, self.allow_private_webhooks)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT secret FROM watchlists WHERE user_id = ?", (user_id,)).fetchone()
+            if row is not None and not _same_secret(row[0], current_secret):
+                raise PermissionError(f"Watchlist {user_id} exists; its current secret is needed to replace it")
+            conn.execute("INSERT OR REPLACE INTO watchlists VALUES (?, ?, ?)", (user_id, webhook_url, secret))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def authorized(self, user_id, secret):
+        """Whether secret is the watchlist's secret (False for an unknown watchlist)"""
+        row = self.webhook(user_id)
+        return row is not None and _same_secret(row[1], secret)
+
+    def webhook(self, user_id):
+        """(url, secret) or None"""
+        return self._connection().execute(
+            "SELECT webhook_url, secret FROM watchlists WHERE user_id = ?", (user_id,)).fetchone()
+
+    def keys_for(self, case_details):
+        keys = {case_key(case_details)}
+        if self.resolve is not None:
+            try:
+                keys.update(self.resolve(case_details))
+            except Exception:
+                logger.exception("Could not resolve %s for watching", case_key(case_details))
+        keys.discard("")
+        return keys
+
+    def add(self, user_id, cases):
+        """Watch case_details dicts; returns the keys now watched for them"""
+        keys = set()
+        for case_details in cases:
+            keys |= self.keys_for(case_details)
+        self.add_keys(user_id, keys)
+        return sorted(keys)
+
+    def add_keys(self, user_id, keys):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("INSERT OR IGNORE INTO watched_cases VALUES (?, ?)", ((user_id, key) for key in keys))
+        self._bump(conn)
+        conn.execute("COMMIT")
+
+    def remove(self, user_id, cases=None):
+        """Stop watching cases (all of them when cases is None)"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        if cases is None:
+            conn.execute("DELETE FROM watched_cases WHERE user_id = ?", (user_id,))
+        else:
+            keys = set()
+            for case_details in cases:
+                keys |= self.keys_for(case_details)
+            conn.executemany("DELETE FROM watched_cases WHERE user_id = ? AND case_key = ?",
+                             ((user_id, key) for key in keys))
+        self._bump(conn)
+        conn.execute("COMMIT")
+
+    def cases(self, user_id):
+        return [key for key, in self._connection().execute(
+            "SELECT case_key FROM watched_cases WHERE user_id = ? ORDER BY case_key", (user_id,))]
+
+    def _index(self):
+        """The key -> watchers map, rebuilt if any process changed a watchlist"""
+        version = self._connection().execute(
+            "SELECT value FROM watch_meta WHERE name = 'version'").fetchone()[0]
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    watchers = {}
+                    for user_id, key in self._connection().execute(
+                            "SELECT user_id, case_key FROM watched_cases"):
+                        current = watchers.get(key)
+                        if current is None:
+                            watchers[sys.intern(key)] = sys.intern(user_id)
+                        elif isinstance(current, tuple):
+                            watchers[key] = current + (user_id,)
+                        else:
+                            watchers[key] = (current, user_id)
+                    self._watchers = watchers
+                    self._version = version
+        return self._watchers
+
+    def match(self, lists):
+        """{user_id: [event]} for watched cases in lists of (court_complex, date_str, entries)"""
+        watchers = self._index()
+        watched = watchers.keys()
+        matches = defaultdict(list)
+        for court_complex, date_str, entries in lists:
+            keyed = [(ListingIndex.entry_keys(entry), entry) for entry in entries]
+            hits = watched & {key for keys, _ in keyed for key in keys}
+            if not hits:
+                continue
+            list_date = iso_date(date_str)
+            for keys, entry in keyed:
+                for key in keys:
+                    if key not in hits:
+                        continue
+                    users = watchers[key]
+                    event = {
+                        "case": key,
+                        "court_complex": court_complex,
+                        "date": list_date,
+                        "court": entry.get("court"),
+                        "serial_no": entry.get("serial_no"),
+                        "case_number": entry.get("case_number"),
+                        "purpose": entry.get("purpose")
+                    }
+                    for user_id in users if isinstance(users, tuple) else (users,):
+                        matches[user_id].append(event)
+        return matches
+
+    def _unsent(self, matches):
+        """Claim the events not yet notified or queued (a refreshed list must not notify twice)"""
+        conn = self._connection()
+        now = time.time()
+        fresh = {}
+        conn.execute("BEGIN IMMEDIATE")
+        for user_id, events in matches.items():
+            kept = [event for event in events if conn.execute(
+                "INSERT INTO watch_notifications VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (user_id, case_key, court_complex, list_date) DO UPDATE"
+                " SET serial_no = excluded.serial_no, pending_since = excluded.pending_since"
+                " WHERE watch_notifications.pending_since < ?",
+                (user_id, event["case"], event["court_complex"], event["date"], event["serial_no"], now,
+                 now - self.claim_seconds)
+            ).rowcount]
+            if kept:
+                fresh[user_id] = kept
+        conn.execute("COMMIT")
+        return fresh
+
+    def delivered(self, user_id, events, sent):
+        """WebhookNotifier callback: record sent events as notified, release the rest to be queued again"""
+        rows = [(user_id, event["case"], event["court_complex"], event["date"]) for event in events]
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        if sent:
+            conn.executemany("UPDATE watch_notifications SET pending_since = NULL WHERE user_id = ?"
+                             " AND case_key = ? AND court_complex = ? AND list_date = ?", rows)
+        else:
+            conn.executemany("DELETE FROM watch_notifications WHERE user_id = ? AND case_key = ?"
+                             " AND court_complex = ? AND list_date = ? AND pending_since IS NOT NULL", rows)
+        conn.execute("COMMIT")
+
+    def ingest(self, lists):
+        """Match lists against every watchlist and queue notifications; returns events queued"""
+        if self.notifier is None:
+            return 0
+        matches = self._unsent(self.match(lists))
+        for user_id, events in matches.items():
+            self.notifier.enqueue(user_id, events)
+        return sum(len(events) for events in matches.values())
+
+    def on_cause_list(self, court_complex, date_str, entries):
+        """CauseListStore.on_save listener"""
+        return self.ingest([(court_complex, date_str, entries)])
+
+    def stats(self):
+        watchers = self._index()
+        return {
+            "watched_keys": len(watchers),
+            "notifier": self.notifier.stats() if self.notifier is not None else None
+        }
+
+
+class WebhookNotifier:
+    """Batches queued events per user and POSTs them to the user's webhook"""
+
+    def __init__(self, webhooks, delivered=None, batch_size=100, flush_interval=2.0, max_attempts=6,
+                 backoff_base=2.0, backoff_max=300.0, concurrency=16, timeout=(5.0, 15.0), allow_private=False):
+        self.webhooks = webhooks  # user_id -> (url, secret) or None
+        # (user_id, events, sent) once a batch is delivered or given up on; Watchlists.delivered
+        self.delivered = delivered
+        self.timeout = timeout
+        self.allow_private = allow_private
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.concurrency = concurrency
+        self._pending = defaultdict(list)  # user_id -> events not yet sent
+        self._retries = queue.PriorityQueue()  # (due, seq, user_id, events, attempt)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._adapter = None
+        self._local = threading.local()
+        self.counters = {"queued": 0, "sent_events": 0, "sent_batches": 0, "retries": 0,
+                         "dropped_events": 0, "no_webhook": 0, "refused_url": 0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                self.counters[name] += value
+
+    @property
+    def session(self):
+        """Per-thread Session on a connection pool of the notifier's own"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            with self._lock:
+                if self._adapter is None:
+                    self._adapter = _pinned_adapter()(
+                        pool_connections=self.concurrency, pool_maxsize=self.concurrency, max_retries=0)
+            session = requests.Session()
+            session.trust_env = False  # no proxies or .netrc credentials from the environment
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def _finish(self, user_id, events, sent):
+        if self.delivered is not None:
+            try:
+                self.delivered(user_id, events, sent)
+            except Exception:
+                logger.exception("Could not record watchlist notifications for %s", user_id)
+
+    def enqueue(self, user_id, events):
+        with self._lock:
+            self._pending[user_id].extend(events)
+            self.counters["queued"] += len(events)
+            full = len(self._pending[user_id]) >= self.batch_size
+        self.start()
+        if full:
+            self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="watchlist-webhooks", daemon=True)
+                    self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self, now=None):
+        """Send every pending batch and every retry that is due"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(list)
+        batches = [(user_id, events[start:start + self.batch_size], 1)
+                   for user_id, events in pending.items()
+                   for start in range(0, len(events), self.batch_size)]
+        while True:
+            try:
+                due, seq, user_id, events, attempt = self._retries.get_nowait()
+            except queue.Empty:
+                break
+            if due > now:
+                self._retries.put((due, seq, user_id, events, attempt))
+                break
+            batches.append((user_id, events, attempt))
+        if len(batches) > 1:
+            with ThreadPoolExecutor(min(self.concurrency, len(batches))) as executor:
+                list(executor.map(lambda batch: self._deliver(*batch), batches))
+        elif batches:
+            self._deliver(*batches[0])
+
+    def _deliver(self, user_id, events, attempt):
+        webhook = self.webhooks(user_id)
+        if webhook is None:
+            self._count(no_webhook=len(events))
+            self._finish(user_id, events, False)
+            return
+        url, secret = webhook
+        try:
+            # Again at delivery: the host's DNS may have changed since the URL was set
+            target, host = pin_webhook_url(url, self.allow_private)
+        except ValueError as e:
+            self._count(refused_url=len(events))
+            logger.warning("Not delivering %d watchlist notifications for %s: %s", len(events), user_id, e)
+            self._finish(user_id, events, False)
+            return
+        body = json.dumps({"user_id": user_id, "events": events}, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if host is not None:
+            headers["Host"] = host
+        if secret:
+            headers["X-Signature"] = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        try:
+            response = self.session.post(target, data=body, headers=headers, timeout=self.timeout,
+                                         allow_redirects=False)
+            ok = 200 <= response.status_code < 300
+            response.close()
+        except requests.RequestException:
+            ok = False
+        if ok:
+            self._count(sent_events=len(events), sent_batches=1)
+            self._finish(user_id, events, True)
+        elif attempt >= self.max_attempts:
+            self._count(dropped_events=len(events))
+            logger.warning("Dropping %d watchlist notifications for %s after %d attempts",
+                           len(events), user_id, attempt)
+            self._finish(user_id, events, False)
+        else:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+            with self._lock:
+                self._seq += 1
+                seq = self._seq
+            self._retries.put((time.monotonic() + delay, seq, user_id, events, attempt + 1))
+            self._count(retries=1)
+
+    def stop(self, timeout=None):
+        """Flush what is pending (retries still waiting are abandoned) and stop"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+        if self._adapter is not None:
+            self._adapter.close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, pending=sum(len(events) for events in self._pending.values()),
+                        retry_queue=self._retries.qsize())